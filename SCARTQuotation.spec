@@ -1,11 +1,15 @@
 # -*- mode: python ; coding: utf-8 -*-
+import subprocess
+import sys
 
+# テンプレートを事前コンパイルし、バイトコードキャッシュを同梱する（EXE と同じ Python で実行）
+subprocess.check_call([sys.executable, 'scripts\\precompile_templates.py', 'build\\jinja_cache'])
 
 a = Analysis(
     ['run.py'],
     pathex=[],
     binaries=[],
-    datas=[('app\\templates', 'templates'), ('app\\static', 'static')],
+    datas=[('app\\templates', 'templates'), ('app\\static', 'static'), ('build\\jinja_cache', 'jinja_cache')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -1,15 +1,17 @@
-import sqlite3
+"""
+（旧）quotations.discount_rate 列の追加スクリプト。
+現在は app/migrations.py の番号付き移行（PRAGMA user_version）に統合済み。
+互換のため残しているが、移行ランナーを呼ぶだけ（適用済みなら何もしない）。
 
-db_path = "dist/SCART_Quotation/estimates.db"  # ←あなたの環境に合わせて
+使い方:
+  python add_discount_column.py [DBパス] [--dry-run]
+"""
+import os
+import sys
 
-conn = sqlite3.connect(db_path)
-cur = conn.cursor()
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    cur.execute("ALTER TABLE quotations ADD COLUMN discount_rate REAL DEFAULT 0;")
-    print("カラム discount_rate を追加しました。")
-except Exception as e:
-    print("既に追加済み、またはエラー:", e)
+from app.migrations import cli_main
 
-conn.commit()
-conn.close()
+if __name__ == "__main__":
+    sys.exit(cli_main())
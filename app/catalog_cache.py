@@ -0,0 +1,128 @@
+"""
+商品カタログのプロセス内キャッシュ
+
+見積フォーム（新規・改定）は毎回 products 全件を名前順に読んでいた。
+商品マスタは滅多に変わらないため、読み込み結果を「カタログ版数」付きでメモリに保持する。
+
+- 版数は products テーブルの版数（app/master_versions.py。Product の INSERT / UPDATE / DELETE を含む
+  トランザクションのコミット時に +1）。版数が変わった後の最初の参照で1回だけ読み直す。
+- ORM を通さない変更（sqlite3 直書きのスクリプト等）は検知できない。その場合は invalidate_catalog() を呼ぶ。
+- resolve(ids) は見積明細の商品 id をまとめて引く。カタログに無い id（直後に追加された商品など）だけを
+  1回の IN (...) で DB から読むため、明細行数によらずクエリ数は一定。
+CATALOG_CACHE_ENABLED=0 で毎回 DB から読む（従来動作）。ヒット率は /admin/metrics の catalog_cache で確認できる。
+"""
+import threading
+
+from flask import current_app
+
+from app.metrics import register_metrics
+
+
+def _product_dict(p):
+    return {
+        "id": p.id,
+        "name": p.name,
+        "unit_price": p.unit_price,
+        "cost": p.cost,
+        "note": p.note,
+    }
+
+
+class ProductCatalog:
+    """読み込み時点の商品一覧（名前順）と id 引きの辞書。読み取り専用として扱うこと。"""
+
+    __slots__ = ("version", "products", "by_id")
+
+    def __init__(self, version, products):
+        self.version = version
+        self.products = products
+        self.by_id = {p["id"]: p for p in products}
+
+
+class CatalogCache:
+    def __init__(self, versions, enabled=True):
+        self.versions = versions
+        self.enabled = enabled
+        self._catalog = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._loads = 0
+        self._db_resolves = 0
+
+    @property
+    def version(self):
+        return self.versions.get("products")
+
+    def invalidate(self):
+        self.versions.bump("products")
+
+    def get(self):
+        catalog = self._catalog
+        if self.enabled and catalog is not None and catalog.version == self.version:
+            self._hits += 1
+            return catalog
+        with self._lock:
+            catalog = self._catalog
+            if self.enabled and catalog is not None and catalog.version == self.version:
+                self._hits += 1
+                return catalog
+            # 読み込み中にコミットされた場合は古い版数で保存され、次の参照で読み直される
+            version = self.version
+            catalog = ProductCatalog(version, self._load())
+            self._loads += 1
+            if self.enabled:
+                self._catalog = catalog
+            return catalog
+
+    def resolve(self, ids):
+        """商品 id の集合 → {id: 商品 dict}。存在しない id は含まれない。"""
+        ids = {i for i in ids if i is not None}
+        if not ids:
+            return {}
+        by_id = self.get().by_id
+        found = {i: by_id[i] for i in ids if i in by_id}
+        missing = ids - found.keys()
+        if missing:
+            from app.models.product import Product
+
+            self._db_resolves += 1
+            for p in Product.query.filter(Product.id.in_(missing)).all():
+                found[p.id] = _product_dict(p)
+        return found
+
+    def _load(self):
+        from app.models.product import Product
+
+        return [_product_dict(p) for p in Product.query.order_by(Product.name).all()]
+
+    def stats(self):
+        catalog = self._catalog
+        return {
+            "enabled": self.enabled,
+            "version": self.version,
+            "cached_version": catalog.version if catalog is not None else None,
+            "products": len(catalog.products) if catalog is not None else 0,
+            "hits": self._hits,
+            "loads": self._loads,
+            "db_resolves": self._db_resolves,
+        }
+
+
+def install_catalog_cache(app, versions):
+    cache = CatalogCache(versions, enabled=app.config.get("CATALOG_CACHE_ENABLED", True))
+    app.extensions["scart_catalog_cache"] = cache
+    register_metrics("catalog_cache", cache.stats)
+    return cache
+
+
+def get_catalog():
+    """現在のアプリの商品カタログ（ProductCatalog）。"""
+    return current_app.extensions["scart_catalog_cache"].get()
+
+
+def resolve_products(ids):
+    return current_app.extensions["scart_catalog_cache"].resolve(ids)
+
+
+def invalidate_catalog():
+    current_app.extensions["scart_catalog_cache"].invalidate()
@@ -0,0 +1,134 @@
+"""
+flask scart ... 管理コマンド
+
+  flask --app app scart migrate            未適用の DB 移行を適用
+  flask --app app scart migrate --dry-run  適用予定の SQL と見積もりコストを表示
+                                           （起動時の自動移行を止めるには SCART_AUTO_MIGRATE=0）
+  flask --app app scart reindex-customers  顧客検索の全文索引（customers_fts）を作り直す
+  flask --app app scart reindex-quotations 見積検索の全文索引（quotations_fts）を作り直す
+  flask --app app scart pricing-grid --vehicles 3,5,8 --distance 200-800:100 [--json]
+                                           設計/セットアップ費用の what-if グリッドを表示（CSV / JSON）
+  flask --app app scart layout-params layout.csv [--nodes nodes.csv] [--vehicles 3] [--json]
+                                           走行レイアウトから走行条件と設計/セットアップ費用を表示
+"""
+import math
+import sys
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+scart_cli = AppGroup("scart", help="S-CART 見積システム管理コマンド")
+
+
+@scart_cli.command("migrate")
+@click.option("--dry-run", is_flag=True, help="SQL と見積もりコストを表示するだけで変更しない")
+def migrate_command(dry_run):
+    """番号付き DB 移行（PRAGMA user_version）を適用する。"""
+    from app.migrations import migrate
+
+    sys.exit(migrate(current_app.config["SCART_DB_PATH"], dry_run=dry_run, echo=click.echo))
+
+
+@scart_cli.command("reindex-customers")
+def reindex_customers_command():
+    """顧客検索の全文索引（customers_fts）を customers から作り直す。"""
+    from app.customer_search import rebuild_customer_fts
+
+    _rebuild_fts_index("customers_fts", rebuild_customer_fts)
+
+
+@scart_cli.command("reindex-quotations")
+def reindex_quotations_command():
+    """見積検索の全文索引（quotations_fts）を quotations / quotation_details から作り直す。"""
+    from app.quotation_search import rebuild_quotation_fts
+
+    _rebuild_fts_index("quotations_fts", rebuild_quotation_fts)
+
+
+@scart_cli.command("pricing-grid")
+@click.option("--vehicles", "vehicle_count", default="", help="台数（例: 3,5,8）")
+@click.option("--distance", "distance_m", default="", help="走行距離 m（例: 200-800:100）")
+@click.option("--intersections", "intersection_count", default="", help="交差点数（例: 0-10:2）")
+@click.option("--stations", "station_count", default="", help="ステーション数（例: 2,4,6）")
+@click.option("--fields", default="", help="出力する値（カンマ区切り。既定は全部）")
+@click.option("--json", "as_json", is_flag=True, help="GET /quotation/pricing-grid と同じ JSON を出力する")
+def pricing_grid_command(vehicle_count, distance_m, intersection_count, station_count, fields, as_json):
+    """台数 × 距離 × 交差点数 × ステーション数 の設計/セットアップ費用を一括計算する（既定は1セル1行の CSV）。"""
+    import csv
+    import itertools
+    import json
+
+    from app.pricing_grid import GRID_AXES, PricingGridError, get_pricing_grid
+
+    specs = {"vehicle_count": vehicle_count, "distance_m": distance_m,
+             "intersection_count": intersection_count, "station_count": station_count}
+    try:
+        grid = get_pricing_grid(specs, fields)
+    except PricingGridError as e:
+        raise click.UsageError(str(e))
+    if as_json:
+        click.echo(grid.body.decode("utf-8"))
+        return
+    payload = json.loads(grid.body)
+    names = list(payload["fields"])
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+    writer.writerow(list(GRID_AXES) + names)
+    columns = [payload["fields"][name] for name in names]
+    for i, cell in enumerate(itertools.product(*(payload["axes"][name] for name in GRID_AXES))):
+        writer.writerow(list(cell) + [column[i] for column in columns])
+    click.echo(f"# {payload['cells']} cells, rate table {payload['rate_table_version']}", err=True)
+
+
+@scart_cli.command("layout-params")
+@click.argument("layout", type=click.Path(exists=True, dir_okay=False))
+@click.option("--nodes", "nodes_path", type=click.Path(exists=True, dir_okay=False),
+              help="ノード一覧の CSV（座標・ステーション。エッジが CSV のとき）")
+@click.option("--vehicles", "vehicle_count", type=float, default=0, help="台数")
+@click.option("--json", "as_json", is_flag=True, help="POST /quotation/layout-params と同じ JSON を出力する")
+def layout_params_command(layout, nodes_path, vehicle_count, as_json):
+    """AGV 走行レイアウト（CSV / JSON / JSON Lines）から走行条件と設計/セットアップ費用を出す。"""
+    import json
+
+    from app.route_layout import LayoutError, load_layout, price_layout
+
+    if not math.isfinite(vehicle_count):
+        raise click.BadParameter("有限の数値で指定してください", param_hint="--vehicles")
+    t0 = time.perf_counter()
+    try:
+        route = load_layout(layout, nodes_path)
+    except LayoutError as e:
+        raise click.UsageError(str(e))
+    params, amounts = price_layout(route, vehicle_count)
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+    if as_json:
+        click.echo(json.dumps({"params": params, "amounts": amounts, "layout": route.summary(),
+                               "elapsed_ms": round(elapsed_ms, 1)}, ensure_ascii=False))
+        return
+    for name, value in {**params, **amounts}.items():
+        click.echo(f"{name}={value}")
+    click.echo(f"# {route.node_count} nodes, {route.edge_count} edges"
+               f" ({route.duplicate_edges} duplicates), {elapsed_ms:.0f}ms", err=True)
+
+
+def _rebuild_fts_index(table, rebuild):
+    from app.fts import fts_supported
+    from app.migrations import connect
+
+    if not fts_supported():
+        click.echo("この SQLite は FTS5 trigram に対応していません（検索は LIKE で動作します）。")
+        sys.exit(1)
+    t0 = time.perf_counter()
+    conn = connect(current_app.config["SCART_DB_PATH"])
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = rebuild(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    click.echo(f"{table}: {count} rows ({(time.perf_counter() - t0) * 1000.0:.0f}ms)")
@@ -9,3 +9,62 @@ class Config:
     SECRET_KEY = "dev-secret-key"
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 起動時に未適用の DB 移行を自動適用する（0 で無効。flask scart migrate --dry-run で事前確認する場合など）
+    SCART_AUTO_MIGRATE = os.environ.get("SCART_AUTO_MIGRATE", "1") == "1"
+    # テンプレートモード: "debug"（毎回再読込）/ "production"（バイトコードキャッシュ）。空なら FLASK_DEBUG に従う
+    SCART_TEMPLATE_MODE = os.environ.get("SCART_TEMPLATE_MODE", "")
+    # SQLite 接続ごとの PRAGMA（app/sqlite_tuning.py）。SQLITE_TUNING=0 で適用しない
+    SQLITE_TUNING = os.environ.get("SQLITE_TUNING", "1") == "1"
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", "-20000"))  # 負数は KiB（約20MB）
+    SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_TEMP_STORE = os.environ.get("SQLITE_TEMP_STORE", "MEMORY")
+    SQLITE_FOREIGN_KEYS = os.environ.get("SQLITE_FOREIGN_KEYS", "1") == "1"
+    # 書き込みキュー（app/write_queue.py）。WRITE_QUEUE_ENABLED=0 で呼び出しスレッドで直接書き込む
+    WRITE_QUEUE_ENABLED = os.environ.get("WRITE_QUEUE_ENABLED", "1") == "1"
+    WRITE_QUEUE_MAXSIZE = int(os.environ.get("WRITE_QUEUE_MAXSIZE", "256"))
+    WRITE_QUEUE_MAX_RETRIES = int(os.environ.get("WRITE_QUEUE_MAX_RETRIES", "5"))  # SQLITE_BUSY 時の再試行回数
+    WRITE_QUEUE_BACKOFF_MS = int(os.environ.get("WRITE_QUEUE_BACKOFF_MS", "50"))  # 初回待ち（以降倍々）
+    WRITE_QUEUE_BACKOFF_MAX_MS = int(os.environ.get("WRITE_QUEUE_BACKOFF_MAX_MS", "2000"))
+    WRITE_QUEUE_SUBMIT_TIMEOUT = float(os.environ.get("WRITE_QUEUE_SUBMIT_TIMEOUT", "5"))  # 満杯時の投入待ち（秒）
+    WRITE_QUEUE_RESULT_TIMEOUT = float(os.environ.get("WRITE_QUEUE_RESULT_TIMEOUT", "30"))  # 完了待ち（秒）
+    # リクエスト単位の SQL 計測（app/query_stats.py）
+    QUERY_STATS_ENABLED = os.environ.get("QUERY_STATS_ENABLED", "1") == "1"
+    QUERY_STATS_HEADERS = os.environ.get("QUERY_STATS_HEADERS", "1") == "1"  # X-DB-Query-Count / X-DB-Time-ms
+    QUERY_NPLUS1_THRESHOLD = int(os.environ.get("QUERY_NPLUS1_THRESHOLD", "5"))  # 同形の文がこの回数以上で N+1 警告
+    # strict モード（テスト用）: 予算超過・N+1 の疑いで QueryBudgetExceeded
+    QUERY_STATS_STRICT = os.environ.get("QUERY_STATS_STRICT", "0") == "1"
+    QUERY_BUDGET_DEFAULT = int(os.environ.get("QUERY_BUDGET_DEFAULT", "0"))  # 0 は無制限
+    QUERY_BUDGETS = {}  # エンドポイント名 → 上限件数（例: {"quotation.quotation_list": 5}）
+    # スロークエリログ（app/slow_query.py）。しきい値以上の文を logs/slow_query.log に JSON で記録
+    SLOW_QUERY_LOG_ENABLED = os.environ.get("SLOW_QUERY_LOG_ENABLED", "1") == "1"
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+    SLOW_QUERY_LOG_PATH = os.environ.get("SLOW_QUERY_LOG_PATH", "")  # 空なら <EXE/プロジェクト>/logs/slow_query.log
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get("SLOW_QUERY_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+    SLOW_QUERY_LOG_BACKUPS = int(os.environ.get("SLOW_QUERY_LOG_BACKUPS", "5"))
+    SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "1") == "1"  # EXPLAIN QUERY PLAN を添える
+    # 見積一覧のページサイズ（?page_size= で変更可、上限あり）
+    QUOTATION_LIST_PAGE_SIZE = int(os.environ.get("QUOTATION_LIST_PAGE_SIZE", "50"))
+    QUOTATION_LIST_MAX_PAGE_SIZE = int(os.environ.get("QUOTATION_LIST_MAX_PAGE_SIZE", "200"))
+    # 商品カタログのプロセス内キャッシュ（app/catalog_cache.py）。0 で毎回 DB から読む
+    CATALOG_CACHE_ENABLED = os.environ.get("CATALOG_CACHE_ENABLED", "1") == "1"
+    # 見積フォーム用マスタ JSON（/quotation/form-master）の Cache-Control max-age（秒。URL の版数が一致するとき）
+    FORM_MASTER_MAX_AGE = int(os.environ.get("FORM_MASTER_MAX_AGE", "86400"))
+    # 顧客タイプアヘッド（/customers/typeahead）の既定件数と上限
+    CUSTOMER_TYPEAHEAD_LIMIT = int(os.environ.get("CUSTOMER_TYPEAHEAD_LIMIT", "10"))
+    CUSTOMER_TYPEAHEAD_MAX_LIMIT = int(os.environ.get("CUSTOMER_TYPEAHEAD_MAX_LIMIT", "50"))
+    # 設計/セットアップ費用の what-if グリッド（app/pricing_grid.py）のセル数上限と結果キャッシュの件数
+    # （JSON 本文は 1 セルあたり約 75 バイト。20万セルで約 15MB）
+    PRICING_GRID_MAX_CELLS = int(os.environ.get("PRICING_GRID_MAX_CELLS", "200000"))
+    PRICING_GRID_CACHE_SIZE = int(os.environ.get("PRICING_GRID_CACHE_SIZE", "16"))
+    # 結果キャッシュの本文の合計バイト上限と、これを超える本文は保持しない1件の上限
+    PRICING_GRID_CACHE_MAX_BYTES = int(os.environ.get("PRICING_GRID_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    PRICING_GRID_CACHE_ENTRY_MAX_BYTES = int(os.environ.get("PRICING_GRID_CACHE_ENTRY_MAX_BYTES",
+                                                            str(16 * 1024 * 1024)))
+    # 設計/セットアップ費用のスカラー計算のメモ（app/pricing_memo.py）の件数。0 で無効
+    PRICING_MEMO_SIZE = int(os.environ.get("PRICING_MEMO_SIZE", "4096"))
+    # 走行レイアウトの取り込み（POST /quotation/layout-params）で受け付けるファイルの合計サイズの上限（バイト）
+    LAYOUT_IMPORT_MAX_BYTES = int(os.environ.get("LAYOUT_IMPORT_MAX_BYTES", str(64 * 1024 * 1024)))
+    # リクエスト本文全体の上限（バイト。Content-Length の無いチャンク転送にも効く）。最大の受け付けは上のレイアウト
+    MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", str(LAYOUT_IMPORT_MAX_BYTES)))
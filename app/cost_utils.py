@@ -1,11 +1,103 @@
 
 
 # --- v6 JSロジックと同じ設計/セットアップ費用計算 ---
-import math
+# 単価・係数は RateTable（不変のスナップショット）で渡す。省略時は current_rate_table()
+# （アプリ内では logic_configs の最新版 = app/rate_table.py、アプリ外では DEFAULT_RATE_TABLE）。
+# 計算式は app/pricing_rules.PRICING_RULES にだけ書き、RateTable.rules でコンパイルした関数を呼ぶ
+# （見積フォームの JS も同じ定義から生成する）。
+from dataclasses import dataclass
+from functools import cached_property
 
+from app.pricing_memo import current_pricing_memo
+
+# logic_configs に行が無いときの単価（v6 JS ロジックの値）
 LABOR_RATE = 7920
 DESIGN_SELL_RATE = 15000
 SETUP_SELL_RATE = 15000
+# 上の単価・計算式の版。見積に内訳と一緒に保存し、どの単価で計算したかを後から辿れるようにする
+RATE_TABLE_VERSION = "v6"
+
+# 見積に保存する走行条件パラメータ（フォームの name と同じ）
+TRAVEL_PARAM_KEYS = (
+    "distance_m", "intersection_count", "station_count",
+    "vehicle_count", "equipment_count", "circuit_difficulty",
+)
+# 見積に保存する設計/セットアップの内訳
+DESIGN_SETUP_KEYS = (
+    "design_hours", "design_cost", "design_fee", "design_profit_rate",
+    "setup_hours", "setup_cost", "setup_fee", "setup_profit_rate",
+)
+
+@dataclass(frozen=True)
+class WorkerTier:
+    """台数が min_vehicles〜max_vehicles（None は制限なし）かつ距離 max_distance 以下なら workers 人。"""
+    min_vehicles: float
+    max_vehicles: float
+    max_distance: float
+    workers: float
+
+
+@dataclass(frozen=True)
+class RateTable:
+    """設計/セットアップ費用の単価と係数（読み取り専用）。version は見積の rate_table_version に記録する。"""
+    version: str
+    labor_rate: float                   # 原価単価（円/h）
+    design_sell_rate: float             # 設計の売価単価（円/h）
+    setup_sell_rate: float              # セットアップの売価単価（円/h）
+    design_intersection_hours: float    # 設計: 台数 × 交差点 あたりの工数
+    design_station_hours: float         # 設計: ステーションあたりの工数
+    design_meters_per_hour: float       # 設計: 1時間あたりの走行距離(m)
+    design_safety_factor: float         # 設計: 安全率
+    setup_speed_m_per_min: float        # AGV速度(m/min)
+    setup_station_ct_min: float         # ステーションあたりの CT 加算(分)
+    trial_runs_per_vehicle: float       # 1台あたりの試運転回数
+    bug_fix_hours_per_trial: float      # 試運転1回あたりのバグ修正工数
+    interlock_hours: float              # 台数 × 交差点 × ステーション あたりのインターロック工数
+    setup_safety_factor: float          # セットアップ: 安全率
+    worker_tiers: tuple                 # WorkerTier を上から順に評価し、最初に当てはまった人数
+    default_workers: float              # どの段階にも当てはまらないときの人数
+
+    @cached_property
+    def rules(self):
+        """この単価表でコンパイルした計算式（app/pricing_rules.PricingRules）。初回参照時に1回だけコンパイルする。"""
+        from app.pricing_rules import compile_pricing_rules
+
+        return compile_pricing_rules(self)
+
+
+DEFAULT_RATE_TABLE = RateTable(
+    version=RATE_TABLE_VERSION,
+    labor_rate=LABOR_RATE,
+    design_sell_rate=DESIGN_SELL_RATE,
+    setup_sell_rate=SETUP_SELL_RATE,
+    design_intersection_hours=2.0,
+    design_station_hours=1.0,
+    design_meters_per_hour=100.0,
+    design_safety_factor=1.1,
+    setup_speed_m_per_min=30.0,
+    setup_station_ct_min=0.1,
+    trial_runs_per_vehicle=10.0,
+    bug_fix_hours_per_trial=1.0,
+    interlock_hours=0.1,
+    setup_safety_factor=1.1,
+    worker_tiers=(
+        WorkerTier(min_vehicles=None, max_vehicles=1, max_distance=50, workers=1.0),
+        WorkerTier(min_vehicles=2, max_vehicles=5, max_distance=100, workers=2.0),
+    ),
+    default_workers=3.0,
+)
+
+
+def current_rate_table():
+    """アプリ内では logic_configs の最新版のスナップショット（DB には読みに行かない）、アプリ外では既定値。"""
+    from flask import current_app, has_app_context
+
+    if has_app_context():
+        cache = current_app.extensions.get("scart_rate_table")
+        if cache is not None:
+            return cache.get()
+    return DEFAULT_RATE_TABLE
+
 
 def _safe_float(value):
     try:
@@ -13,94 +105,120 @@ def _safe_float(value):
     except (TypeError, ValueError):
         return 0.0
 
-def calc_design_hours_from_params(distance, intersections, stations, vehicle_count):
-    distance        = _safe_float(distance)
-    intersections   = _safe_float(intersections)
-    stations        = _safe_float(stations)
-    vehicle_count   = _safe_float(vehicle_count)
+def calc_design_hours_from_params(distance, intersections, stations, vehicle_count, rates=None):
+    """設計工数（切り上げ前）。"""
+    rates = rates or current_rate_table()
+    return rates.rules.raw_hours(_safe_float(distance), _safe_float(intersections),
+                                 _safe_float(stations), _safe_float(vehicle_count))[0]
+
+def calc_setup_hours_from_params(distance, intersections, stations, vehicle_count, rates=None):
+    """セットアップ工数（切り上げ前）。"""
+    rates = rates or current_rate_table()
+    return rates.rules.raw_hours(_safe_float(distance), _safe_float(intersections),
+                                 _safe_float(stations), _safe_float(vehicle_count))[1]
+
+
+def parse_travel_params(values):
+    """
+    フォーム値（文字列）から走行条件パラメータを数値にして返す。
+    未入力・数値にできない値は None（見積には NULL で保存する）。
+    """
+    params = {}
+    for key in TRAVEL_PARAM_KEYS:
+        raw = values.get(key)
+        try:
+            params[key] = float(raw) if raw not in (None, "") else None
+        except (TypeError, ValueError):
+            params[key] = None
+    return params
+
 
-    design_hours_base = (
-        vehicle_count * intersections * 2.0
-        + stations * 1.0
-        + distance / 100.0
+def calc_design_setup_breakdown(param_dict, rates=None):
+    """
+    走行条件パラメータから設計/セットアップの工数・原価・売価・利益率を計算し、
+    DESIGN_SETUP_KEYS と rate_table_version の dict で返す。rates 省略時は current_rate_table()。
+    式は app/pricing_rules.PRICING_RULES（見積フォームの JS と同じ定義）。
+    rates 省略時の結果はアプリ内ではメモ（app/pricing_memo.py）に保持し、同じパラメータでは計算しない。
+    """
+    # 呼び出し側のキー名の揺れを吸収
+    params = (
+        _safe_float(param_dict.get("distance_m", param_dict.get("distance", 0))),
+        _safe_float(param_dict.get("intersection_count", param_dict.get("intersections", 0))),
+        _safe_float(param_dict.get("station_count", param_dict.get("stations", 0))),
+        _safe_float(param_dict.get("vehicle_count", param_dict.get("vehicles", 0))),
     )
-    design_hours_raw = design_hours_base * 1.1  # 安全率
-    return design_hours_raw
+    if rates is None:
+        rates = current_rate_table()
+        memo = current_pricing_memo()
+        if memo is not None:
+            return dict(memo.get(rates, params, _evaluate_breakdown))
+    return _evaluate_breakdown(rates, params)
 
-def calc_setup_hours_from_params(distance, intersections, stations, vehicle_count):
-    distance        = _safe_float(distance)
-    intersections   = _safe_float(intersections)
-    stations        = _safe_float(stations)
-    vehicle_count   = _safe_float(vehicle_count)
 
-    # AGV速度・CT
-    speed = 30.0  # m/min
-    ct_min = distance / speed + 0.1 * stations
+def _evaluate_breakdown(rates, params):
+    """正規化済みの (距離, 交差点数, ステーション数, 台数) → calc_design_setup_breakdown の dict。"""
+    breakdown = dict(zip(DESIGN_SETUP_KEYS, rates.rules.evaluate(*params)))
+    breakdown["rate_table_version"] = rates.version
+    return breakdown
 
-    # 試運転
-    trial_count = 10.0 * vehicle_count
-    trial_hours = (ct_min * trial_count) / 60.0
 
-    # バグ修正
-    bug_fix_hours = 1.0 * trial_count
+def _batch_column(params, *names):
+    """dict / 構造化配列 / DataFrame から列を取り出す（最初に見つかった名前）。無ければ None。"""
+    for name in names:
+        try:
+            return params[name]
+        except (KeyError, ValueError, IndexError):
+            continue
+    return None
 
-    # インターロック
-    interlock_hours = 0.1 * vehicle_count * intersections * stations
 
-    base_hours = trial_hours + bug_fix_hours + interlock_hours
-    base_hours_with_safety = base_hours * 1.1
+def calc_design_setup_batch(params, rates=None):
+    """
+    calc_design_setup_breakdown の一括版（NumPy）。パラメータ集合を列ごとの配列で受け取り、
+    DESIGN_SETUP_KEYS の各値を配列で返す（rate_table_version は単一の値）。rates 省略時は current_rate_table()。
+
+    params: distance_m / intersection_count / station_count / vehicle_count（別名 distance / intersections /
+    stations / vehicles も可）の列を持つ dict・構造化配列・DataFrame など。
+    無い列は 0、スカラーは他の列の長さに揃える。NaN は未入力とみなして 0（_safe_float と同じ扱い）。
+    式はスカラー版と同じ PRICING_RULES を NumPy 向けにコンパイルしたもので、各要素の結果は
+    calc_design_setup_breakdown と完全に一致する（工数・原価・売価は int64、利益率は float64）。
+    """
+    import numpy as np
+
+    rates = rates or current_rate_table()
+    columns = []
+    for names in (("distance_m", "distance"), ("intersection_count", "intersections"),
+                  ("station_count", "stations"), ("vehicle_count", "vehicles")):
+        col = _batch_column(params, *names)
+        col = np.asarray(0.0 if col is None else col, dtype=np.float64)
+        columns.append(np.where(np.isnan(col), 0.0, col))
+    distance, intersections, stations, vehicle_count = np.broadcast_arrays(*columns)
 
-    # 人数ロジック
-    workers = 3.0
-    if vehicle_count <= 1 and distance <= 50:
-        workers = 1.0
-    elif 2 <= vehicle_count <= 5 and distance <= 100:
-        workers = 2.0
+    breakdown = dict(zip(DESIGN_SETUP_KEYS, rates.rules.evaluate_batch(distance, intersections, stations, vehicle_count)))
+    breakdown["rate_table_version"] = rates.version
+    return breakdown
 
-    setup_hours_raw = base_hours_with_safety * workers
-    return setup_hours_raw
 
-def calc_design_setup_for_quotation(quotation):
+def calc_design_setup_for_quotation(quotation, rates=None):
     """
-    Quotation インスタンスから走行パラメータを読み取り、
-    JS と同じロジックで設計/セットアップの工数・原価・売価・利益率を計算する。
+    Quotation インスタンスに保存した走行パラメータから内訳を計算し直す（calc_design_setup_breakdown と同じ dict）。
+    画面表示は stored_design_setup() で保存値を読む。こちらは単価改定の影響確認などに使う。
     """
-    distance      = getattr(quotation, "distance_m", 0)
-    intersections = getattr(quotation, "intersection_count", 0)
-    stations      = getattr(quotation, "station_count", 0)
-    vehicle_count = getattr(quotation, "vehicle_count", 0)
-
-    # 設計
-    design_hours_raw = calc_design_hours_from_params(
-        distance=distance,
-        intersections=intersections,
-        stations=stations,
-        vehicle_count=vehicle_count,
-    )
-    design_hours = math.ceil(design_hours_raw)
-    design_cost  = design_hours * LABOR_RATE
-    design_fee   = design_hours * DESIGN_SELL_RATE
-    design_profit_rate = (
-        (design_fee - design_cost) / design_fee * 100.0 if design_fee > 0 else 0.0
-    )
+    return calc_design_setup_breakdown({key: getattr(quotation, key, None) for key in TRAVEL_PARAM_KEYS}, rates)
 
-    # セットアップ
-    setup_hours_raw = calc_setup_hours_from_params(
-        distance=distance,
-        intersections=intersections,
-        stations=stations,
-        vehicle_count=vehicle_count,
-    )
-    setup_hours = math.ceil(setup_hours_raw)
-    setup_cost  = setup_hours * LABOR_RATE
-    setup_fee   = setup_hours * SETUP_SELL_RATE
-    setup_profit_rate = (
-        (setup_fee - setup_cost) / setup_fee * 100.0 if setup_fee > 0 else 0.0
-    )
+
+def stored_design_setup(quotation):
+    """
+    見積に保存済みの設計/セットアップ内訳を dict で返す（再計算しない）。
+    内訳の無い見積（走行条件なし・保存前の旧データ）は 0 と rate_table_version=None。
+    """
+    breakdown = {key: getattr(quotation, key, None) or 0 for key in DESIGN_SETUP_KEYS}
+    breakdown["rate_table_version"] = getattr(quotation, "rate_table_version", None)
+    return breakdown
 
 
 # --- フォームパラメータから計算する用: JS v6ロジック互換 ---
-def calc_design_and_setup_amounts(param_dict):
+def calc_design_and_setup_amounts(param_dict, rates=None):
     """
     見積作成画面で使う「設計費・セットアップ費」を計算する。
     引数:
@@ -111,57 +229,13 @@ def calc_design_and_setup_amounts(param_dict):
         (design_fee, design_cost, design_hours,
          setup_fee,  setup_cost,  setup_hours)
     """
-
-    # 呼び出し側のキー名の揺れを吸収
-    distance      = param_dict.get("distance_m", param_dict.get("distance", 0))
-    intersections = param_dict.get("intersection_count", param_dict.get("intersections", 0))
-    stations      = param_dict.get("station_count", param_dict.get("stations", 0))
-    vehicle_count = param_dict.get("vehicle_count", param_dict.get("vehicles", 0))
-
-    distance_f      = _safe_float(distance)
-    intersections_f = _safe_float(intersections)
-    stations_f      = _safe_float(stations)
-    vehicle_count_f = _safe_float(vehicle_count)
-
-    # --- 設計 ---
-    design_hours_raw = calc_design_hours_from_params(
-        distance=distance_f,
-        intersections=intersections_f,
-        stations=stations_f,
-        vehicle_count=vehicle_count_f,
-    )
-    design_hours = math.ceil(design_hours_raw)
-    design_cost  = design_hours * LABOR_RATE
-    design_fee   = design_hours * DESIGN_SELL_RATE
-
-    # --- セットアップ ---
-    setup_hours_raw = calc_setup_hours_from_params(
-        distance=distance_f,
-        intersections=intersections_f,
-        stations=stations_f,
-        vehicle_count=vehicle_count_f,
-    )
-    setup_hours = math.ceil(setup_hours_raw)
-    setup_cost  = setup_hours * LABOR_RATE
-    setup_fee   = setup_hours * SETUP_SELL_RATE
-
+    b = calc_design_setup_breakdown(param_dict, rates)
     # quotation_new 側のアンパックを壊さないため、この順序で返す
     return (
-        design_fee,
-        design_cost,
-        design_hours,
-        setup_fee,
-        setup_cost,
-        setup_hours,
+        b["design_fee"],
+        b["design_cost"],
+        b["design_hours"],
+        b["setup_fee"],
+        b["setup_cost"],
+        b["setup_hours"],
     )
-
-    return {
-        "design_hours": design_hours,
-        "design_cost": design_cost,
-        "design_fee": design_fee,
-        "design_profit_rate": design_profit_rate,
-        "setup_hours": setup_hours,
-        "setup_cost": setup_cost,
-        "setup_fee": setup_fee,
-        "setup_profit_rate": setup_profit_rate,
-    }
@@ -0,0 +1,201 @@
+"""
+顧客一覧の全文検索（SQLite FTS5 trigram）
+
+customer_list の検索は name / name_kana への LIKE '%q%' で、顧客表の全件走査になっていた。
+また全角半角・カタカナひらがなの揺れも吸収できなかった。
+
+- 索引: 仮想表 customers_fts（rowid = customers.id）に name / name_kana / customer_code / address / phone を
+  app/text_normalize.normalize_text で正規化した値で持つ。tokenize='trigram' なので部分一致が索引で引ける。
+  作成と初回投入は移行 v6、作り直しは flask --app app scart reindex-customers。
+- 同期: ORM の after_flush で、追加・索引列の変更・削除された Customer を同じトランザクション内で反映する。
+  索引列を生 SQL や sqlite3 直書きで変えた場合は reindex-customers で作り直す。
+- 検索語: 空白で区切った語ごとに正規化し、すべてを含む顧客（AND）を返す。
+  3文字以上の語は MATCH（フレーズ）、3文字未満の語は trigram で引けないため正規化済み列への LIKE。
+- 並び順: MATCH があれば bm25（顧客名 > カナ・コード > 住所・電話 の重み）、無ければ顧客名の前方一致を先に。
+  同点は顧客名順。
+- FTS5（trigram）が使えない SQLite では索引が作られず、従来の name / name_kana の LIKE にフォールバックする。
+  索引の有無は起動時（移行の後）に一度だけ確かめる（CustomerSearch.probe）。
+"""
+import logging
+import time
+
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+from sqlalchemy import event, text
+
+from app.fts import TRIGRAM_MIN_CHARS, escape_like, fts_phrase, fts_table_exists, register_text_functions
+from app.metrics import register_metrics
+from app.text_normalize import normalize_text
+
+CUSTOMER_FTS_TABLE = "customers_fts"
+CUSTOMER_FTS_COLUMNS = ("name", "name_kana", "customer_code", "address", "phone")
+# bm25 の列ごとの重み（CUSTOMER_FTS_COLUMNS と同じ順）
+CUSTOMER_FTS_WEIGHTS = (10.0, 5.0, 5.0, 1.0, 1.0)
+
+CUSTOMER_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {CUSTOMER_FTS_TABLE} USING fts5("
+    f"{', '.join(CUSTOMER_FTS_COLUMNS)}, tokenize='trigram')"
+)
+# 全件作り直し（app.fts.register_text_functions 済みの接続で実行する）
+CUSTOMER_FTS_REBUILD_SQL = (
+    f"DELETE FROM {CUSTOMER_FTS_TABLE}",
+    f"INSERT INTO {CUSTOMER_FTS_TABLE} (rowid, {', '.join(CUSTOMER_FTS_COLUMNS)}) "
+    f"SELECT id, {', '.join(f'scart_normalize({c})' for c in CUSTOMER_FTS_COLUMNS)} FROM customers",
+)
+
+# SQLAlchemy から JOIN するための表定義（db.metadata には載せない = create_all の対象外）
+customers_fts = sa.Table(
+    CUSTOMER_FTS_TABLE,
+    sa.MetaData(),
+    sa.Column("rowid", sa.Integer, primary_key=True),
+    *(sa.Column(c, sa.Text) for c in CUSTOMER_FTS_COLUMNS),
+)
+
+
+def rebuild_customer_fts(conn):
+    """
+    customers_fts を customers から作り直す（sqlite3 接続、トランザクションは呼び出し側）。
+    投入件数を返す。
+    """
+    register_text_functions(conn)
+    conn.execute(CUSTOMER_FTS_DDL)
+    for sql in CUSTOMER_FTS_REBUILD_SQL:
+        conn.execute(sql)
+    conn.execute(f"INSERT INTO {CUSTOMER_FTS_TABLE} ({CUSTOMER_FTS_TABLE}) VALUES ('optimize')")
+    return conn.execute(f"SELECT COUNT(*) FROM {CUSTOMER_FTS_TABLE}").fetchone()[0]
+
+
+def split_terms(q):
+    """検索語を空白で区切って正規化する（空の語は捨てる）。"""
+    return [t for t in (normalize_text(part) for part in (q or "").split()) if t]
+
+
+def build_match_query(terms):
+    """3文字以上の語を FTS5 の MATCH 式（フレーズの AND）にする。対象が無ければ None。"""
+    phrases = [fts_phrase(t) for t in terms if len(t) >= TRIGRAM_MIN_CHARS]
+    return " AND ".join(phrases) or None
+
+
+def _customer_row(customer):
+    return {"rowid": customer.id, **{c: normalize_text(getattr(customer, c)) for c in CUSTOMER_FTS_COLUMNS}}
+
+
+class CustomerSearch:
+    def __init__(self):
+        self._available = None
+        self._searches = 0
+        self._fallbacks = 0
+        self._synced = 0
+        self._last_ms = 0.0
+
+    def probe(self, db_path):
+        """
+        起動時（移行の後）に customers_fts の有無を確かめる。
+        移行前・FTS5 非対応の SQLite では無く、その間は LIKE で検索する（作成後は再起動で切り替わる）。
+        """
+        self._available = fts_table_exists(db_path, CUSTOMER_FTS_TABLE)
+        if not self._available:
+            logging.warning("[SEARCH] %s not found; customer search falls back to LIKE", CUSTOMER_FTS_TABLE)
+        return self._available
+
+    def available(self, session):
+        if self._available is None:
+            # probe() 前（create_app の途中など）はセッションで確かめる
+            row = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": CUSTOMER_FTS_TABLE},
+            ).first()
+            self._available = row is not None
+        return self._available
+
+    def apply(self, query, q):
+        """Customer のクエリに検索条件と関連度順の ORDER BY を足して返す。"""
+        from app import db
+        from app.models.customer import Customer
+
+        self._searches += 1
+        terms = split_terms(q)
+        if not terms:
+            return query
+        if not self.available(db.session):
+            self._fallbacks += 1
+            raw = q.strip()
+            return query.filter(sa.or_(Customer.name.contains(raw), Customer.name_kana.contains(raw)))
+
+        query = query.join(customers_fts, customers_fts.c.rowid == Customer.id)
+        match = build_match_query(terms)
+        if match is not None:
+            query = query.filter(sa.literal_column(CUSTOMER_FTS_TABLE).op("MATCH")(match))
+        for term in terms:
+            if len(term) < TRIGRAM_MIN_CHARS:
+                pattern = f"%{escape_like(term)}%"
+                query = query.filter(sa.or_(*(customers_fts.c[c].like(pattern, escape="\\")
+                                              for c in CUSTOMER_FTS_COLUMNS)))
+        if match is not None:
+            rank = sa.func.bm25(sa.literal_column(CUSTOMER_FTS_TABLE), *CUSTOMER_FTS_WEIGHTS)
+        else:
+            rank = sa.case((customers_fts.c.name.like(f"{escape_like(terms[0])}%", escape="\\"), 0), else_=1)
+        return query.order_by(rank)
+
+    def sync(self, session, upserts, deletes):
+        """after_flush から呼ぶ。変更された顧客の索引行を入れ替える。"""
+        if not self.available(session):
+            return
+        t0 = time.perf_counter()
+        ids = [{"rowid": r["rowid"]} for r in upserts] + [{"rowid": i} for i in deletes]
+        conn = session.connection()
+        if ids:
+            conn.execute(text(f"DELETE FROM {CUSTOMER_FTS_TABLE} WHERE rowid = :rowid"), ids)
+        if upserts:
+            conn.execute(
+                text(f"INSERT INTO {CUSTOMER_FTS_TABLE} (rowid, {', '.join(CUSTOMER_FTS_COLUMNS)}) "
+                     f"VALUES (:rowid, {', '.join(':' + c for c in CUSTOMER_FTS_COLUMNS)})"),
+                upserts,
+            )
+        self._synced += len(upserts) + len(deletes)
+        self._last_ms = (time.perf_counter() - t0) * 1000.0
+
+    def stats(self):
+        return {
+            "available": self._available,
+            "searches": self._searches,
+            "fallbacks": self._fallbacks,
+            "synced_rows": self._synced,
+            "last_sync_ms": round(self._last_ms, 2),
+        }
+
+
+def _customer_search_after_flush(session, flush_context):
+    from app.models.customer import Customer
+
+    search = current_app.extensions.get("scart_customer_search") if has_app_context() else None
+    if search is None:
+        return
+    upserts = []
+    for obj in (*session.new, *session.dirty):
+        if not isinstance(obj, Customer):
+            continue
+        if obj in session.dirty:
+            state = sa.inspect(obj)
+            if not any(state.attrs[c].history.has_changes() for c in CUSTOMER_FTS_COLUMNS):
+                continue
+        upserts.append(_customer_row(obj))
+    deletes = [obj.id for obj in session.deleted if isinstance(obj, Customer)]
+    if upserts or deletes:
+        search.sync(session, upserts, deletes)
+
+
+def install_customer_search(app, db):
+    search = CustomerSearch()
+    app.extensions["scart_customer_search"] = search
+    register_metrics("customer_search", search.stats)
+
+    # db.session はプロセスで1つなので、リスナーは最初の create_app() で1回だけ登録する
+    if not event.contains(db.session, "after_flush", _customer_search_after_flush):
+        event.listen(db.session, "after_flush", _customer_search_after_flush)
+
+    return search
+
+
+def search_customers(query, q):
+    return current_app.extensions["scart_customer_search"].apply(query, q)
@@ -0,0 +1,198 @@
+"""
+承認済み顧客のタイプアヘッド（見積フォームの顧客選択）
+
+承認済み顧客を全件ページに載せる代わりに、GET /customers/typeahead?q= が上位 N 件だけを返す。
+検索はプロセス内の索引で行い、DB には触れない。
+
+- 索引の対象: name / name_kana / customer_code（status = approved のみ）。
+  すべて app/text_normalize.normalize_text で正規化する（全角半角・カタカナひらがな・空白の揺れを吸収）。
+- 前方一致: 3列の正規化キーを1本のソート済み配列にまとめ、bisect で引く。先に前方一致を返す。
+- 部分一致: 2文字 n-gram（bigram）→ 顧客位置（名前順）の転置リスト。検索語の bigram のうち
+  最も短いリストを名前順に走査して検証し、N 件たまったら打ち切る。
+  1文字の検索語は転置リストを持たず、正規化済み文字列を名前順に走査する（全体に無ければ即終了）。
+- 索引は customers / payment_terms の版数（app/master_versions.py）が変わった後の最初の検索で作り直す。
+  承認（書き込みキュー）や顧客編集のコミットで版数が上がる。
+  作り直し（3万件で約1秒）はバックグラウンドのスレッドで行い、出来上がるまでは古い索引で答える
+  （その間の検索は待たない。反映は作り直しの完了後）。索引がまだ無い最初の検索だけはその場で作る。
+"""
+import bisect
+import collections
+import threading
+import time
+
+from flask import current_app
+
+from app.metrics import register_metrics
+from app.startup_profile import run_in_background
+from app.text_normalize import normalize_text
+
+TYPEAHEAD_TABLES = ("customers", "payment_terms")
+_FIELD_SEP = "\x1f"  # 部分一致が列をまたがないための区切り
+
+
+class TypeaheadIndex:
+    def __init__(self, key, items):
+        self.key = key
+        self.items = items  # 名前順。位置がそのまま並び順
+        self.by_id = {item["id"]: pos for pos, item in enumerate(items)}
+        self.texts = []
+        prefix = []
+        grams = collections.defaultdict(list)
+        for pos, item in enumerate(items):
+            fields = [normalize_text(item.get(k)) for k in ("name", "name_kana", "customer_code")]
+            fields = [f for f in fields if f]
+            text = _FIELD_SEP.join(fields)
+            self.texts.append(text)
+            prefix.extend((f, pos) for f in fields)
+            # 区切りをまたぐ bigram も入るが、検索語は区切りを含まないので当たらない
+            for g in {text[i:i + 2] for i in range(len(text) - 1)}:
+                grams[g].append(pos)
+        prefix.sort()
+        self.prefix_keys = [k for k, _ in prefix]
+        self.prefix_pos = [p for _, p in prefix]
+        self.grams = dict(grams)
+        self.all_text = "\x1e".join(self.texts)
+
+    def search(self, query, limit):
+        q = normalize_text(query)
+        if not q or limit <= 0:
+            return []
+        hits = []
+        seen = set()
+        # 1) 前方一致（いずれかの列）
+        i = bisect.bisect_left(self.prefix_keys, q)
+        while i < len(self.prefix_keys) and self.prefix_keys[i].startswith(q) and len(hits) < limit:
+            pos = self.prefix_pos[i]
+            if pos not in seen:
+                seen.add(pos)
+                hits.append(pos)
+            i += 1
+        # 2) 部分一致（最も絞り込める bigram の転置リストを名前順に走査）
+        if len(hits) < limit:
+            if len(q) == 1:
+                postings = range(len(self.texts)) if q in self.all_text else ()
+            else:
+                postings = min((self.grams.get(q[j:j + 2], ()) for j in range(len(q) - 1)), key=len)
+            for pos in postings:
+                if pos not in seen and q in self.texts[pos]:
+                    seen.add(pos)
+                    hits.append(pos)
+                    if len(hits) >= limit:
+                        break
+        return [self.items[pos] for pos in hits]
+
+    def get(self, customer_id):
+        pos = self.by_id.get(customer_id)
+        return self.items[pos] if pos is not None else None
+
+
+def load_typeahead_items():
+    """承認済み顧客を名前順に、タイプアヘッドの応答に載せる列だけ読む（ORM オブジェクトは作らない）。"""
+    from app import db
+    from app.models.customer import Customer, CustomerStatus, PaymentTerm
+
+    rows = (
+        db.session.query(Customer.id, Customer.name, Customer.name_kana, Customer.customer_code,
+                         Customer.payment_terms, PaymentTerm.name)
+        .outerjoin(PaymentTerm, PaymentTerm.id == Customer.payment_term_id)
+        .filter(Customer.status == CustomerStatus.APPROVED.value)
+        .order_by(Customer.name)
+        .all()
+    )
+    return [
+        {
+            "id": r[0],
+            "name": r[1] or "",
+            "name_kana": r[2] or "",
+            "customer_code": r[3] or "",
+            "payment_terms_legacy": r[4] or "",
+            "payment_term_name": r[5] or "",
+        }
+        for r in rows
+    ]
+
+
+class CustomerTypeahead:
+    def __init__(self, versions):
+        self.versions = versions
+        self._index = None
+        self._lock = threading.Lock()
+        self._rebuild_thread = None
+        self._builds = 0
+        self._last_build_ms = 0.0
+        self._searches = 0
+        self._stale_searches = 0
+
+    def index(self):
+        key = self.versions.snapshot(TYPEAHEAD_TABLES)
+        current = self._index
+        if current is not None and current.key == key:
+            return current
+        if current is None:
+            with self._lock:
+                if self._index is None:
+                    self._build(key)
+                return self._index
+        self._start_rebuild()
+        self._stale_searches += 1
+        return current
+
+    def _build(self, key):
+        t0 = time.perf_counter()
+        index = TypeaheadIndex(key, load_typeahead_items())
+        self._last_build_ms = (time.perf_counter() - t0) * 1000.0
+        self._builds += 1
+        self._index = index
+        return index
+
+    def _start_rebuild(self):
+        with self._lock:
+            if self._rebuild_thread is not None:
+                return
+            app = current_app._get_current_object()
+            self._rebuild_thread = run_in_background("typeahead-rebuild", self._rebuild, app)
+
+    def _rebuild(self, app):
+        try:
+            with app.app_context():
+                # 読み込み中に版数が上がった場合は key が古いまま残り、次の検索でもう一度作り直す
+                self._build(self.versions.snapshot(TYPEAHEAD_TABLES))
+        finally:
+            with self._lock:
+                self._rebuild_thread = None
+
+    def wait(self, timeout=None):
+        """作り直し中ならその完了を待つ（テスト・CLI 用）。"""
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def search(self, query, limit):
+        self._searches += 1
+        return self.index().search(query, limit)
+
+    def get(self, customer_id):
+        return self.index().get(customer_id)
+
+    def stats(self):
+        current = self._index
+        return {
+            "customers": len(current.items) if current is not None else 0,
+            "grams": len(current.grams) if current is not None else 0,
+            "builds": self._builds,
+            "last_build_ms": round(self._last_build_ms, 2),
+            "rebuilding": self._rebuild_thread is not None,
+            "searches": self._searches,
+            "stale_searches": self._stale_searches,
+        }
+
+
+def install_customer_typeahead(app, versions):
+    typeahead = CustomerTypeahead(versions)
+    app.extensions["scart_customer_typeahead"] = typeahead
+    register_metrics("customer_typeahead", typeahead.stats)
+    return typeahead
+
+
+def get_customer_typeahead():
+    return current_app.extensions["scart_customer_typeahead"]
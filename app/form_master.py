@@ -0,0 +1,83 @@
+"""
+見積フォーム用マスタデータ（商品）の JSON とそのメモ化
+
+見積フォーム（新規・改定）は商品と顧客のマスタ全件をページに埋め込んでいた。
+商品マスタは GET /quotation/form-master（app/routes/quotation.py）から JSON で配り、ページには版数トークンと URL だけを載せる。
+顧客は件数が多くなるため全件は配らず、GET /customers/typeahead（app/customer_typeahead.py）で都度引く。
+
+- 本文は products の版数（app/master_versions.py）をキーにメモ化する。
+  変わるまで再構築も再シリアライズもしない。
+- ETag は本文の SHA-256（先頭20桁）。版数トークンも同じ値なので、ページ側 URL の ?v= が一致する限り
+  ブラウザはキャッシュを使い続け、マスタが変わるとページが新しい URL を指す。
+"""
+import hashlib
+import json
+import threading
+
+from flask import current_app
+
+from app.metrics import register_metrics
+
+FORM_MASTER_TABLES = ("products",)
+
+
+class FormMaster:
+    __slots__ = ("key", "body", "etag")
+
+    def __init__(self, key, body):
+        self.key = key
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+
+
+def build_form_master_payload(catalog):
+    """フォームの JS（window.products）が使う形の dict を組み立てる。"""
+    return {"products": catalog.products}
+
+
+class FormMasterCache:
+    def __init__(self, versions, catalog_cache):
+        self.versions = versions
+        self.catalog_cache = catalog_cache
+        self._current = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._builds = 0
+
+    def get(self):
+        key = self.versions.snapshot(FORM_MASTER_TABLES)
+        current = self._current
+        if current is not None and current.key == key:
+            self._hits += 1
+            return current
+        with self._lock:
+            current = self._current
+            if current is not None and current.key == key:
+                self._hits += 1
+                return current
+            payload = build_form_master_payload(self.catalog_cache.get())
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            current = FormMaster(key, body)
+            self._current = current
+            self._builds += 1
+            return current
+
+    def stats(self):
+        current = self._current
+        return {
+            "etag": current.etag if current is not None else None,
+            "bytes": len(current.body) if current is not None else 0,
+            "hits": self._hits,
+            "builds": self._builds,
+        }
+
+
+def install_form_master(app, versions, catalog_cache):
+    cache = FormMasterCache(versions, catalog_cache)
+    app.extensions["scart_form_master"] = cache
+    register_metrics("form_master", cache.stats)
+    return cache
+
+
+def get_form_master():
+    return current_app.extensions["scart_form_master"].get()
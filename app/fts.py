@@ -0,0 +1,50 @@
+"""
+SQLite FTS5（trigram）索引の共通部品（app/customer_search.py、app/quotation_search.py）
+
+- fts_supported(): この SQLite で FTS5 の trigram トークナイザが使えるか
+- register_text_functions(conn): 移行・作り直し用の SQL 関数を sqlite3 接続に登録する
+    scart_normalize(text)  検索キー用の正規化（app/text_normalize.normalize_text）
+    scart_fold_width(text) 表示も兼ねる列用の幅の統一（app/text_normalize.fold_width）
+- fts_table_exists(db_path, table): 起動時（移行の後）の索引の有無の確認
+- trigram は3文字未満の語を索引で引けないため、短い語は呼び出し側で LIKE に回す（TRIGRAM_MIN_CHARS）。
+"""
+import sqlite3
+
+from app.text_normalize import fold_width, normalize_text
+
+TRIGRAM_MIN_CHARS = 3
+
+
+def fts_supported():
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def register_text_functions(conn):
+    conn.create_function("scart_normalize", 1, normalize_text, deterministic=True)
+    conn.create_function("scart_fold_width", 1, fold_width, deterministic=True)
+
+
+def fts_table_exists(db_path, table):
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                            (table,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def fts_phrase(term):
+    """語を FTS5 のフレーズ（"..."）にする。引用符は二重にして、演算子として解釈させない。"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def escape_like(term):
+    """LIKE ... ESCAPE '\\' 用に %, _, \\ をエスケープする。"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,100 @@
+"""
+マスタテーブルの版数（プロセス内キャッシュの無効化キー）
+
+商品・顧客・支払条件などのマスタを読み込んでメモリに持つキャッシュ（app/catalog_cache.py、
+app/form_master.py、app/customer_typeahead.py）は、ここで管理するテーブルごとの版数をキーにする。
+
+- ORM セッションで INSERT / UPDATE / DELETE したテーブルを after_flush / do_orm_execute で記録し、
+  そのトランザクションのコミット時（after_commit）に各テーブルの版数を +1 する。ロールバックなら何もしない。
+- text() の生 SQL で書き換えた場合は mark_tables_changed(db.session, "customers") のように明示する。
+- ORM を通さない別プロセスの変更（sqlite3 直書きのスクリプト等）は検知できない。bump() を呼ぶか再起動する。
+"""
+import logging
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+from app.metrics import register_metrics
+
+_SESSION_KEY = "scart_changed_tables"
+
+
+class MasterVersions:
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, table):
+        return self._versions.get(table, 0)
+
+    def snapshot(self, tables):
+        """tables の版数のタプル（キャッシュキー用）。"""
+        return tuple(self._versions.get(t, 0) for t in tables)
+
+    def bump(self, *tables):
+        with self._lock:
+            for t in tables:
+                self._versions[t] = self._versions.get(t, 0) + 1
+        logging.debug("[MASTER] version bumped: %s", tables)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._versions)
+
+
+def mark_tables_changed(session, *tables):
+    """コミット時に版数を上げるテーブルを記録する（生 SQL で書き込んだとき用）。"""
+    session.info.setdefault(_SESSION_KEY, set()).update(tables)
+
+
+def _master_after_flush(session, flush_context):
+    changed = {type(o).__tablename__ for o in (*session.new, *session.dirty, *session.deleted)
+               if hasattr(type(o), "__tablename__")}
+    if changed:
+        mark_tables_changed(session, *changed)
+
+
+def _master_bulk_write(orm_execute_state):
+    # query(Product).update(...) / session.execute(update(Product)...) などフラッシュを通らない書き込み
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mark_tables_changed(orm_execute_state.session,
+                            *(m.class_.__tablename__ for m in orm_execute_state.all_mappers))
+
+
+def _master_after_commit(session):
+    changed = session.info.pop(_SESSION_KEY, None)
+    if changed and has_app_context():
+        current = current_app.extensions.get("scart_master_versions")
+        if current is not None:
+            current.bump(*sorted(changed))
+
+
+def _master_after_rollback(session):
+    session.info.pop(_SESSION_KEY, None)
+
+
+_SESSION_LISTENERS = (
+    ("after_flush", _master_after_flush),
+    ("do_orm_execute", _master_bulk_write),
+    ("after_commit", _master_after_commit),
+    ("after_rollback", _master_after_rollback),
+)
+
+
+def install_master_versions(app, db):
+    versions = MasterVersions()
+    app.extensions["scart_master_versions"] = versions
+    register_metrics("master_versions", versions.stats)
+
+    # db.session はプロセスで1つ。create_app() を何度呼んでもリスナーは1組だけ登録し、
+    # アプリごとの版数は current_app から引く
+    for name, fn in _SESSION_LISTENERS:
+        if not event.contains(db.session, name, fn):
+            event.listen(db.session, name, fn)
+
+    return versions
+
+
+def get_master_versions():
+    return current_app.extensions["scart_master_versions"]
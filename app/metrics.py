@@ -0,0 +1,35 @@
+"""
+運用メトリクスの登録先
+
+各機能（書き込みキュー等）が register_metrics(name, fn) でスナップショット関数を登録し、
+/admin/metrics（管理者のみ）が collect_metrics() の結果を JSON で返す。
+fn は JSON 化できる dict を返すこと。例外を出したソースは error として記録し、他のソースは返す。
+"""
+import logging
+import threading
+
+_sources = {}
+_lock = threading.Lock()
+
+
+def register_metrics(name, fn):
+    with _lock:
+        _sources[name] = fn
+
+
+def unregister_metrics(name):
+    with _lock:
+        _sources.pop(name, None)
+
+
+def collect_metrics():
+    with _lock:
+        sources = list(_sources.items())
+    result = {}
+    for name, fn in sources:
+        try:
+            result[name] = fn()
+        except Exception as e:
+            logging.exception("[METRICS] source %s failed", name)
+            result[name] = {"error": str(e)}
+    return result
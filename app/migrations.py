@@ -0,0 +1,870 @@
+"""
+バージョン管理付き DB 移行（PRAGMA user_version をキーにした番号付きステップ）
+
+- 各ステップは user_version がそのバージョン未満のときに一度だけ、
+  単一トランザクション（BEGIN IMMEDIATE ... COMMIT）内で適用される。
+- ステップは冪等に書く（既存DBの状態がまちまちなため、存在確認してから作成/追加する）。
+- 最新バージョン到達後の起動は user_version とスキーマ指紋の確認だけで終わる。
+
+新しいステップを追加するときは @migration(次の番号, "説明") を末尾に足すだけでよい。
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from werkzeug.security import generate_password_hash
+
+from app.slow_query import TimedConnection, slow_query_source
+
+SCHEMA_META_TABLE = "scart_schema_meta"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version, description):
+    def decorator(fn):
+        if MIGRATIONS and version != MIGRATIONS[-1].version + 1:
+            raise RuntimeError(f"migration version must be sequential: {version}")
+        MIGRATIONS.append(Migration(version, description, fn))
+        return fn
+    return decorator
+
+
+class MigrationContext:
+    """
+    ステップに渡す実行コンテキスト。
+    - query(): 読み取り。dry-run でも実行する
+    - execute(): 書き込み。記録した上で、dry-run でなければ実行する
+    - repair=True（スキーマ指紋の不一致からの修復）: 無いテーブル・列・索引・トリガーを作る文（CREATE ... /
+      ALTER TABLE ... ADD COLUMN）だけを実行し、データの書き換え（UPDATE/INSERT/DELETE）と
+      テーブルの作り直し（RENAME）は skipped に記録して実行しない。
+      ただし create_populated_table() で無かったテーブルを作ったときは、その初回投入も実行する（空の全文索引を残さない）
+    テーブル/列の存在確認はコンテキスト内でキャッシュし、PRAGMA table_info の往復を減らす。
+    """
+
+    def __init__(self, conn, dry_run=False, repair=False):
+        self.conn = conn
+        self.dry_run = dry_run
+        self.repair = repair
+        self.statements = []
+        self.skipped = []
+        self._tables = None
+        self._columns = {}
+
+    def query(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def execute(self, sql, params=()):
+        if self.repair and not _is_schema_only(sql):
+            self.skipped.append((sql, params))
+            return
+        self._run(sql, params)
+
+    def _run(self, sql, params=()):
+        self.statements.append((sql, params))
+        if not self.dry_run:
+            self.conn.execute(sql, params)
+
+    def table_exists(self, name):
+        if self._tables is None:
+            self._tables = {
+                r[0] for r in self.query("SELECT name FROM sqlite_master WHERE type='table'")
+            }
+        return name in self._tables
+
+    def columns(self, table):
+        if table not in self._columns:
+            self._columns[table] = [r[1] for r in self.query(f"PRAGMA table_info({table})")]
+        return self._columns[table]
+
+    def create_table(self, name, ddl):
+        if self.table_exists(name):
+            return False
+        logging.info("[MIG] creating table %s", name)
+        self.execute(ddl)
+        self._tables.add(name)
+        # dry-run では実テーブルが無いため、DDL から列名を拾ってキャッシュしておく
+        self._columns[name] = _ddl_columns(ddl)
+        return True
+
+    def create_populated_table(self, name, ddl, populate):
+        """
+        作成（ddl）と元の表からの投入（populate の文）で1つの手順になるテーブル（全文索引）。
+        通常は毎回投入し直す。修復では、テーブルが無くて作ったときだけ投入する（あれば行に触れない）。
+        """
+        created = not self.table_exists(name)
+        self.execute(ddl)
+        self._tables.add(name)
+        for sql in populate:
+            if self.repair and not created:
+                self.skipped.append((sql, ()))
+            else:
+                self._run(sql)
+        return created
+
+    def rename_table(self, old, new):
+        if self.repair:
+            # 作り直し（RENAME → CREATE → 移し替え）は修復では行わない。元のテーブルはそのまま残る
+            self.skipped.append((f"ALTER TABLE {old} RENAME TO {new}", ()))
+            return
+        self.execute(f"ALTER TABLE {old} RENAME TO {new}")
+        self.table_exists(old)
+        self._tables.discard(old)
+        self._tables.add(new)
+        self._columns.pop(old, None)
+        self._columns.pop(new, None)
+
+    def add_column(self, table, column, coldef):
+        if not self.table_exists(table):
+            logging.error("[MIG] Table '%s' does not exist; cannot add column '%s'", table, column)
+            return False
+        cols = self.columns(table)
+        if column in cols:
+            return False
+        logging.info("[MIG] Adding column '%s' to '%s' (%s)", column, table, coldef)
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {coldef}")
+        cols.append(column)
+        return True
+
+
+def _is_schema_only(sql):
+    """無いものを作るだけの文（既存の行を書き換えない）か。"""
+    words = sql.split()
+    head = " ".join(words[:2]).upper()
+    if head.startswith("CREATE "):
+        return True
+    return head == "ALTER TABLE" and " ADD COLUMN " in f" {sql.upper()} "
+
+
+def _ddl_columns(ddl):
+    body = ddl[ddl.index("(") + 1:ddl.rindex(")")]
+    parts, depth, buf = [], 0, ""
+    for ch in body:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(buf)
+            buf = ""
+        else:
+            buf += ch
+    parts.append(buf)
+    names = []
+    for part in parts:
+        words = part.split()
+        if words and words[0].upper() not in ("PRIMARY", "UNIQUE", "CONSTRAINT", "FOREIGN", "CHECK"):
+            names.append(words[0].strip('"'))
+    return names
+
+
+# ---------------------------------------------------------------------------
+# 移行ステップ
+# ---------------------------------------------------------------------------
+
+_USERS_DDL = """CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    login_id TEXT NOT NULL UNIQUE,
+    display_name TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'user',
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)"""
+
+_CUSTOMER_APPROVAL_LOG_DDL = """CREATE TABLE customer_approval_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    approved_by INTEGER NOT NULL,
+    approved_at DATETIME NOT NULL
+)"""
+
+
+def _ensure_users(ctx):
+    ctx.create_table("users", _USERS_DDL)
+
+    required = ["login_id", "display_name", "password_hash"]
+    columns = ctx.columns("users")
+    if not [c for c in required if c not in columns]:
+        return
+
+    logging.warning("[MIG] users table schema mismatch detected. columns=%s", columns)
+    backup = "users_legacy"
+    i = 1
+    while ctx.table_exists(backup):
+        i += 1
+        backup = f"users_legacy_{i}"
+
+    logging.warning("[MIG] renaming users -> %s", backup)
+    ctx.rename_table("users", backup)
+    ctx.create_table("users", _USERS_DDL)
+    ctx.execute(f"""
+        INSERT INTO users (login_id, display_name, password_hash, role, is_active, created_at)
+        SELECT
+            COALESCE(CAST(user_id AS TEXT), name, 'legacy') AS login_id,
+            COALESCE(name, CAST(user_id AS TEXT), 'legacy') AS display_name,
+            password_hash,
+            COALESCE(role, 'user') AS role,
+            COALESCE(is_active, 1) AS is_active,
+            COALESCE(created_at, CURRENT_TIMESTAMP) AS created_at
+        FROM {backup}
+    """)
+    logging.warning("[MIG] users table migrated. legacy table kept as %s", backup)
+
+
+def _ensure_customer_approval_log(ctx):
+    # 目標：最小承認ログ型
+    required_cols = {"id", "customer_id", "user_id", "approved_by", "approved_at"}
+    # 監査ログ型にありがちな列（現DBに合わせて広めに拾う）
+    audit_like_cols = {
+        "action", "from_status", "to_status",
+        "actor_user_id", "acted_by_user_id",
+        "acted_at", "created_at",
+        "comment",
+    }
+    if ctx.create_table("customer_approval_log", _CUSTOMER_APPROVAL_LOG_DDL):
+        return
+
+    cols = set(ctx.columns("customer_approval_log"))
+    is_minimal_ok = required_cols.issubset(cols)
+    looks_audit = len(cols.intersection(audit_like_cols)) > 0
+    # 最小型じゃない、または監査ログっぽい列があるなら退避→作り直し
+    if (not is_minimal_ok) or looks_audit:
+        legacy = f"customer_approval_log_legacy_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+        logging.warning("[MIG] customer_approval_log schema mismatch. rename to %s and recreate", legacy)
+        ctx.rename_table("customer_approval_log", legacy)
+        ctx.create_table("customer_approval_log", _CUSTOMER_APPROVAL_LOG_DDL)
+        logging.warning("[MIG] legacy approval log kept as %s (no data migration)", legacy)
+
+
+def _seed_admin_user(ctx):
+    if ctx.query("SELECT id FROM users WHERE login_id = ?", ("admin",)).fetchone():
+        return
+    ctx.execute(
+        "INSERT INTO users (login_id, display_name, password_hash, role, is_active, created_at) "
+        "VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+        ("admin", "管理者", generate_password_hash("admin1234"), "admin", 1),
+    )
+
+
+@migration(1, "baseline: users/customers/quotations/approval log (旧 apply_migrations 相当)")
+def _m0001_baseline(ctx):
+    ctx.create_table("auth_login_log", """CREATE TABLE auth_login_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    login_id TEXT,
+    user_id INTEGER,
+    result TEXT,
+    ip TEXT,
+    user_agent TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)""")
+    _ensure_customer_approval_log(ctx)
+
+    ctx.create_table("customers", """CREATE TABLE customers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_code TEXT,
+    name TEXT NOT NULL UNIQUE,
+    name_kana TEXT,
+    postal_code TEXT,
+    address TEXT,
+    contact_name TEXT,
+    phone TEXT,
+    email TEXT,
+    transaction_type TEXT,
+    payment_terms TEXT,
+    transaction_type_id INTEGER,
+    payment_term_id INTEGER,
+    note TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)""")
+    _ensure_users(ctx)
+    _seed_admin_user(ctx)
+
+    ctx.create_table("quotations", """CREATE TABLE quotations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company_name TEXT NOT NULL,
+    contact_name TEXT,
+    project_name TEXT NOT NULL,
+    delivery_date TEXT,
+    delivery_terms TEXT,
+    payment_terms TEXT,
+    valid_until TEXT,
+    remarks TEXT,
+    estimator_name TEXT,
+    discount_rate REAL DEFAULT 0,
+    original_id INTEGER,
+    revision_no INTEGER DEFAULT 0,
+    customer_id INTEGER,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)""")
+    ctx.create_table("quotation_details", """CREATE TABLE quotation_details (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    quotation_id INTEGER NOT NULL,
+    item_name TEXT,
+    quantity REAL DEFAULT 0,
+    unit_price REAL DEFAULT 0,
+    subtotal REAL DEFAULT 0,
+    label TEXT,
+    profit_rate REAL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)""")
+    ctx.execute("CREATE INDEX IF NOT EXISTS idx_quotation_details_quotation_id ON quotation_details(quotation_id)")
+
+    # customers master columns (model準拠)
+    for column, coldef in (
+        ("customer_code", "TEXT"),
+        ("name_kana", "TEXT"),
+        ("postal_code", "TEXT"),
+        ("address", "TEXT"),
+        ("contact_name", "TEXT"),
+        ("phone", "TEXT"),
+        ("email", "TEXT"),
+        ("transaction_type", "TEXT"),
+        ("payment_terms", "TEXT"),
+        ("transaction_type_id", "INTEGER"),
+        ("payment_term_id", "INTEGER"),
+        ("note", "TEXT"),
+        ("created_at", "DATETIME"),
+        ("updated_at", "DATETIME"),
+        # approval columns
+        ("status", "TEXT NOT NULL DEFAULT 'approved'"),
+        ("requested_by_user_id", "INTEGER"),
+        ("approved_by_user_id", "INTEGER"),
+        ("approved_at", "DATETIME"),
+        ("rejected_at", "DATETIME"),
+        ("approval_comment", "TEXT"),
+    ):
+        ctx.add_column("customers", column, coldef)
+
+    ctx.create_table("customer_credit", """CREATE TABLE customer_credit (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL,
+    fiscal_year INTEGER NOT NULL,
+    sales_amount REAL,
+    net_income REAL,
+    equity REAL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(customer_id, fiscal_year)
+)""")
+
+    ctx.add_column("quotations", "customer_id", "INTEGER")
+    ctx.add_column("quotations", "original_id", "INTEGER")
+    ctx.add_column("quotations", "revision_no", "INTEGER DEFAULT 0")
+    ctx.add_column("quotations", "contact_name", "TEXT")
+    ctx.add_column("quotations", "estimator_name", "TEXT")
+    if "contact_person" in ctx.columns("quotations"):
+        ctx.execute("UPDATE quotations SET contact_name = contact_person WHERE contact_name IS NULL AND contact_person IS NOT NULL")
+    ctx.execute("UPDATE quotations SET original_id = id WHERE original_id IS NULL")
+    ctx.execute("UPDATE quotations SET revision_no = 0 WHERE revision_no IS NULL")
+    ctx.add_column("quotation_details", "profit_rate", "REAL")
+
+
+@migration(2, "model alignment: products/master tables, discount_rate, detail columns")
+def _m0002_model_alignment(ctx):
+    # migrate_customer_master.py / add_discount_column.py / scripts/add_*_column.py 相当
+    ctx.create_table("transaction_types", """CREATE TABLE transaction_types (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code VARCHAR(20) UNIQUE NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    note TEXT,
+    is_active BOOLEAN DEFAULT 1
+)""")
+    ctx.create_table("payment_terms", """CREATE TABLE payment_terms (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code VARCHAR(20) UNIQUE NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    description TEXT,
+    is_active BOOLEAN DEFAULT 1
+)""")
+    ctx.create_table("products", """CREATE TABLE products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(200) NOT NULL,
+    unit_price FLOAT NOT NULL,
+    note TEXT,
+    cost FLOAT NOT NULL DEFAULT 0
+)""")
+    ctx.add_column("products", "cost", "REAL DEFAULT 0")
+    ctx.create_table("logic_configs", """CREATE TABLE logic_configs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    design_rate FLOAT NOT NULL,
+    setup_rate FLOAT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+)""")
+
+    ctx.add_column("quotations", "discount_rate", "REAL DEFAULT 0")
+    ctx.add_column("quotation_details", "product_id", "INTEGER")
+    ctx.add_column("quotation_details", "description", "VARCHAR(255)")
+    if ctx.add_column("quotation_details", "price", "REAL DEFAULT 0"):
+        if "unit_price" in ctx.columns("quotation_details"):
+            ctx.execute("UPDATE quotation_details SET price = COALESCE(unit_price, 0)")
+    if "item_name" in ctx.columns("quotation_details"):
+        ctx.execute(
+            "UPDATE quotation_details SET description = item_name "
+            "WHERE description IS NULL AND item_name IS NOT NULL"
+        )
+
+
+
+# 画面のクエリ形状に合わせた索引（scripts/test_query_plans.py で全表走査に戻っていないか検査する）
+QUERY_INDEXES = (
+    # quotation_list: revision_no = 0 ORDER BY created_at DESC
+    ("ix_quotations_revision_created", "quotations", "revision_no, created_at DESC, id DESC"),
+    # quotation_list の最新改定: original_id IN (...) AND revision_no > 0 GROUP BY original_id / 改定採番の max(revision_no)
+    ("ix_quotations_original_revision", "quotations", "original_id, revision_no"),
+    # customer_delete: 社名での使用中チェック
+    ("ix_quotations_company_name", "quotations", "company_name"),
+    # customer_list（一般ユーザー）: status = 'approved' ORDER BY name
+    ("ix_customers_status_name", "customers", "status, name"),
+    # customer_approval_history: customer_id = ? ORDER BY approved_at DESC
+    ("ix_customer_approval_log_customer_approved", "customer_approval_log", "customer_id, approved_at"),
+    # 商品一覧・見積フォームの商品リスト: ORDER BY name
+    ("ix_products_name", "products", "name"),
+)
+
+
+@migration(3, "query-shape indexes for list/approval/delete screens")
+def _m0003_query_indexes(ctx):
+    for name, table, columns in QUERY_INDEXES:
+        ctx.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+
+
+
+@migration(4, "latest-revision pointer on rev0 rows (latest_revision_id / revision_count)")
+def _m0004_latest_revision_pointer(ctx):
+    # 旧 normalize_revision_fields（一覧表示のたびに実行していた NULL 補正）はここで一度だけ行う
+    ctx.execute("UPDATE quotations SET original_id = id WHERE original_id IS NULL")
+    ctx.execute("UPDATE quotations SET revision_no = 0 WHERE revision_no IS NULL")
+    ctx.add_column("quotations", "latest_revision_id", "INTEGER")
+    ctx.add_column("quotations", "revision_count", "INTEGER")
+    ctx.execute("""
+        UPDATE quotations SET
+            revision_count = (SELECT COUNT(*) FROM quotations r WHERE r.original_id = quotations.id),
+            latest_revision_id = (
+                SELECT r.id FROM quotations r WHERE r.original_id = quotations.id
+                ORDER BY r.revision_no DESC, r.id DESC LIMIT 1
+            )
+        WHERE revision_no = 0
+    """)
+
+
+# quotations の金額集計列（app/services/quotation_totals.py の compute_totals を SQL にしたもの）
+QUOTATION_TOTAL_COLUMNS = (
+    "subtotal_amount", "discount_amount", "total_amount",
+    "cost_amount", "gross_margin_amount", "gross_margin_rate",
+)
+
+
+def _legacy_cost_sql():
+    """
+    内訳を保存していない見積の原価 = 商品明細の原価 + 走行条件の明細の金額から戻した設計/セットアップ原価
+    （quotation_totals.legacy_design_setup_cost と同じ式）。
+    """
+    from app.services.quotation_totals import LEGACY_DESIGN_SETUP_LABELS, LEGACY_LABOR_RATE, LEGACY_SELL_RATE
+
+    labels = ", ".join(f"'{label}'" for label in LEGACY_DESIGN_SETUP_LABELS)
+    return f"""
+        (SELECT COALESCE(SUM(p.cost * d.quantity), 0) FROM quotation_details d
+         JOIN products p ON p.id = d.product_id
+         WHERE d.quotation_id = quotations.id)
+        + (SELECT COALESCE(SUM(d.subtotal), 0) FROM quotation_details d
+           WHERE d.quotation_id = quotations.id AND d.product_id IS NULL AND d.label IN ({labels}))
+          * {LEGACY_LABOR_RATE} / {float(LEGACY_SELL_RATE)}
+    """
+
+
+_GROSS_MARGIN_SQL = """
+    gross_margin_amount = total_amount - cost_amount,
+    gross_margin_rate = CASE WHEN total_amount > 0
+                             THEN (total_amount - cost_amount) * 100.0 / total_amount ELSE 0 END
+"""
+
+
+@migration(5, "stored quotation totals (subtotal/discount/total/cost/gross margin)")
+def _m0005_quotation_totals(ctx):
+    for column in QUOTATION_TOTAL_COLUMNS:
+        ctx.add_column("quotations", column, "REAL")
+    ctx.execute(f"""
+        UPDATE quotations SET
+            subtotal_amount = (SELECT COALESCE(SUM(d.subtotal), 0) FROM quotation_details d
+                               WHERE d.quotation_id = quotations.id),
+            cost_amount = {_legacy_cost_sql()}
+    """)
+    # floor(x) = CAST(x AS INTEGER) − (切り捨てが x を超えたら 1)。math 関数の無い SQLite でも動く書き方
+    ctx.execute("""
+        UPDATE quotations SET discount_amount = (
+            SELECT CAST(v AS INTEGER) - (CAST(v AS INTEGER) > v)
+            FROM (SELECT subtotal_amount * COALESCE(discount_rate, 0) / 100.0 AS v)
+        )
+    """)
+    ctx.execute("UPDATE quotations SET total_amount = subtotal_amount - discount_amount")
+    ctx.execute(f"UPDATE quotations SET {_GROSS_MARGIN_SQL}")
+
+
+@migration(6, "customers_fts: FTS5 trigram index over normalized customer name/kana/code/address/phone")
+def _m0006_customer_fts(ctx):
+    from app.customer_search import CUSTOMER_FTS_DDL, CUSTOMER_FTS_REBUILD_SQL, CUSTOMER_FTS_TABLE
+    from app.fts import fts_supported, register_text_functions
+
+    if not fts_supported():
+        # 索引が無い間、顧客検索は従来の LIKE で動く（app/customer_search.py）
+        logging.warning("[MIG] SQLite %s has no FTS5 trigram tokenizer; customers_fts skipped", sqlite3.sqlite_version)
+        return
+    register_text_functions(ctx.conn)
+    ctx.create_populated_table(CUSTOMER_FTS_TABLE, CUSTOMER_FTS_DDL, CUSTOMER_FTS_REBUILD_SQL)
+
+
+@migration(7, "quotations_fts: FTS5 trigram index over quotation header text and detail descriptions")
+def _m0007_quotation_fts(ctx):
+    from app.fts import fts_supported, register_text_functions
+    from app.quotation_search import QUOTATION_FTS_DDL, QUOTATION_FTS_REBUILD_SQL, QUOTATION_FTS_TABLE
+
+    if not fts_supported():
+        logging.warning("[MIG] SQLite %s has no FTS5 trigram tokenizer; quotations_fts skipped", sqlite3.sqlite_version)
+        return
+    register_text_functions(ctx.conn)
+    ctx.create_populated_table(QUOTATION_FTS_TABLE, QUOTATION_FTS_DDL, QUOTATION_FTS_REBUILD_SQL)
+
+
+
+@migration(8, "travel parameters and design/setup breakdown stored on quotations")
+def _m0008_design_setup_breakdown(ctx):
+    # 列はこの版の時点の cost_utils.TRAVEL_PARAM_KEYS + DESIGN_SETUP_KEYS（後で増減しても適用済みの版は変えない）
+    for column in (
+        "distance_m", "intersection_count", "station_count",
+        "vehicle_count", "equipment_count", "circuit_difficulty",
+        "design_hours", "design_cost", "design_fee", "design_profit_rate",
+        "setup_hours", "setup_cost", "setup_fee", "setup_profit_rate",
+    ):
+        ctx.add_column("quotations", column, "REAL")
+    ctx.add_column("quotations", "rate_table_version", "VARCHAR(50)")
+    # 既存の見積には入力値が残っていないため NULL のまま（表示は内訳 0 として扱う）
+
+
+@migration(9, "logic_configs: versioned pricing coefficients (labor rate, hour factors, worker tiers)")
+def _m0009_logic_config_rates(ctx):
+    # 既定値はこの版の時点の app/cost_utils.DEFAULT_RATE_TABLE（既存の行は design_rate / setup_rate 以外が既定値になる）。
+    # 後で既定値を変えても適用済みの版は変えない
+    for column, default in (
+        ("labor_rate", 7920),
+        ("design_intersection_hours", 2.0),
+        ("design_station_hours", 1.0),
+        ("design_meters_per_hour", 100.0),
+        ("design_safety_factor", 1.1),
+        ("setup_speed_m_per_min", 30.0),
+        ("setup_station_ct_min", 0.1),
+        ("trial_runs_per_vehicle", 10.0),
+        ("bug_fix_hours_per_trial", 1.0),
+        ("interlock_hours", 0.1),
+        ("setup_safety_factor", 1.1),
+        ("default_workers", 3.0),
+    ):
+        ctx.add_column("logic_configs", column, f"FLOAT NOT NULL DEFAULT {default}")
+    ctx.add_column(
+        "logic_configs", "worker_tiers",
+        "TEXT NOT NULL DEFAULT '[{\"min_vehicles\": null, \"max_vehicles\": 1, \"max_distance\": 50, \"workers\": 1}, "
+        "{\"min_vehicles\": 2, \"max_vehicles\": 5, \"max_distance\": 100, \"workers\": 2}]'",
+    )
+    ctx.add_column("logic_configs", "note", "TEXT")
+    ctx.add_column("logic_configs", "created_by", "INTEGER")
+
+
+@migration(10, "legacy design/setup cost in stored quotation totals")
+def _m0010_legacy_design_setup_cost(ctx):
+    from app.services.quotation_totals import LEGACY_DESIGN_SETUP_LABELS
+
+    # 以前の v5 は商品明細の原価だけを集計していた。内訳を保存していない見積のうち走行条件の明細があるものの
+    # 原価・粗利を、保存時（refresh_quotation_totals）と同じく設計/セットアップ原価込みで計算し直す
+    labels = ", ".join(f"'{label}'" for label in LEGACY_DESIGN_SETUP_LABELS)
+    where = f"""
+        WHERE design_cost IS NULL AND setup_cost IS NULL AND subtotal_amount IS NOT NULL
+          AND id IN (SELECT quotation_id FROM quotation_details WHERE product_id IS NULL AND label IN ({labels}))
+    """
+    ctx.execute(f"UPDATE quotations SET cost_amount = {_legacy_cost_sql()} {where}")
+    ctx.execute(f"UPDATE quotations SET {_GROSS_MARGIN_SQL} {where}")
+
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# ---------------------------------------------------------------------------
+# 実行系
+# ---------------------------------------------------------------------------
+
+def connect(db_path):
+    # 自動トランザクションを切り、BEGIN/COMMIT を自前で管理する
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, factory=TimedConnection)
+    for sql in ("PRAGMA foreign_keys=ON", "PRAGMA journal_mode=WAL"):
+        try:
+            conn.execute(sql)
+        except Exception as e:
+            logging.warning("PRAGMA failed: %s (%s)", sql, e)
+    return conn
+
+
+def get_user_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def schema_fingerprint(conn):
+    """
+    現在のスキーマ（sqlite_master の DDL）と user_version から指紋を作る。
+    sqlite_master 1回の読み取りで済むため、起動毎に実行しても軽い。
+    """
+    rows = conn.execute(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master "
+        "WHERE name NOT LIKE 'sqlite_%' AND name != ? ORDER BY type, name",
+        (SCHEMA_META_TABLE,),
+    ).fetchall()
+    h = hashlib.sha256()
+    h.update(f"user_version={get_user_version(conn)}\n".encode("utf-8"))
+    for row in rows:
+        h.update(repr(row).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def read_stored_fingerprint(conn):
+    try:
+        row = conn.execute(
+            f"SELECT value FROM {SCHEMA_META_TABLE} WHERE key = 'schema_fingerprint'"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def store_fingerprint(conn, fingerprint):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {SCHEMA_META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            f"INSERT OR REPLACE INTO {SCHEMA_META_TABLE} (key, value) VALUES ('schema_fingerprint', ?)",
+            (fingerprint,),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def pending_migrations(current_version):
+    return [m for m in MIGRATIONS if m.version > current_version]
+
+
+def apply_migration(conn, m, set_version=True, repair=False):
+    """
+    1ステップを単一トランザクションで適用する。失敗時は丸ごとロールバック。
+    repair=True はスキーマだけを補う（MigrationContext 参照）。
+    """
+    t0 = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ctx = MigrationContext(conn, repair=repair)
+        with slow_query_source(f"migration:v{m.version}"):
+            m.apply(ctx)
+        if set_version:
+            # user_version の更新も同じトランザクションに含める
+            conn.execute(f"PRAGMA user_version = {int(m.version)}")
+        conn.execute("COMMIT")
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        logging.exception("[MIG] v%s failed, rolled back: %s", m.version, e)
+        raise RuntimeError(f"DB migration v{m.version} failed: {e}")
+    logging.info(
+        "[MIG] v%s %s (%s) statements=%s %.1fms",
+        m.version, "repaired" if repair else "applied", m.description, len(ctx.statements),
+        (time.perf_counter() - t0) * 1000.0,
+    )
+    return ctx
+
+
+def run_migrations(db_path):
+    """
+    起動時のDB移行。
+    - user_version が最新かつスキーマ指紋が前回と一致 → 何もしない（O(1)）
+    - 未適用のステップがある → その分だけ順に適用
+    - バージョンは最新だが指紋が不一致（外部でスキーマが変更された）
+      → 全ステップのうちスキーマを補う文（無いテーブル・列・索引の作成）だけを再適用して修復する。
+        データのバックフィル（全行 UPDATE 等）は再実行しない（毎回の起動で全行を書き換えないように）
+    """
+    timings = []
+    t0 = time.perf_counter()
+
+    def mark(phase):
+        nonlocal t0
+        now = time.perf_counter()
+        timings.append((phase, (now - t0) * 1000.0))
+        t0 = now
+
+    conn = connect(db_path)
+    try:
+        mark("connect")
+        version = get_user_version(conn)
+        pending = pending_migrations(version)
+        stored = None if pending else read_stored_fingerprint(conn)
+        live = None if pending else schema_fingerprint(conn)
+        mark("check")
+
+        if not pending and stored is not None and stored == live:
+            logging.info("[MIG] up to date (user_version=%s, fingerprint %s...)", version, live[:12])
+        else:
+            if pending:
+                logging.info("[MIG] user_version=%s, pending=%s", version, [m.version for m in pending])
+                for m in pending:
+                    apply_migration(conn, m)
+            else:
+                logging.warning("[MIG] schema fingerprint mismatch at user_version=%s, re-applying schema-only statements",
+                                version)
+                skipped = 0
+                for m in MIGRATIONS:
+                    skipped += len(apply_migration(conn, m, set_version=False, repair=True).skipped)
+                if skipped:
+                    logging.info("[MIG] repair skipped %s data statements (backfills are applied once per version)",
+                                 skipped)
+            mark("apply")
+            store_fingerprint(conn, schema_fingerprint(conn))
+            mark("store_fingerprint")
+    finally:
+        conn.close()
+
+    total = sum(ms for _, ms in timings)
+    logging.info(
+        "[BOOT] migrations %.1fms (%s)",
+        total,
+        ", ".join(f"{phase}={ms:.1f}ms" for phase, ms in timings),
+    )
+
+
+def _count_rows(conn, table):
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    except sqlite3.Error:
+        return None
+
+
+def estimate_cost(conn, sql):
+    """
+    dry-run 用のコスト見積もり（文字列）。
+    DDL は種類から、DML は EXPLAIN QUERY PLAN と対象テーブル行数から見積もる。
+    """
+    words = sql.split()
+    head = " ".join(words[:3]).upper()
+    if head.startswith("ALTER TABLE") and " ADD COLUMN " in f" {sql.upper()} ":
+        return "O(1) schema only"
+    if head.startswith("ALTER TABLE"):
+        return "O(1) rename"
+    if head.startswith("CREATE TABLE"):
+        return "O(1) new table"
+    if head.startswith("CREATE INDEX") or head.startswith("CREATE UNIQUE"):
+        upper = [w.upper() for w in words]
+        if "ON" in upper:
+            table = words[upper.index("ON") + 1].split("(")[0]
+            rows = _count_rows(conn, table)
+            return f"index build over {table} (~{rows if rows is not None else '?'} rows)"
+        return "index build"
+    try:
+        plan = [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    except sqlite3.Error:
+        # 同じ計画内の先行 DDL に依存する文（追加予定の列を使う UPDATE 等）は対象表の行数で見積もる
+        upper = [w.upper() for w in words]
+        for kw in ("UPDATE", "INTO", "FROM"):
+            if kw in upper[:3]:
+                table = words[upper.index(kw) + 1]
+                rows = _count_rows(conn, table)
+                return f"SCAN {table} (~{rows if rows is not None else '?'} rows, plan after preceding DDL)"
+        return "unknown"
+    parts = []
+    for detail in plan:
+        tokens = detail.split()
+        if tokens and tokens[0] in ("SCAN", "SEARCH") and len(tokens) > 1:
+            rows = _count_rows(conn, tokens[1])
+            suffix = f" (~{rows} rows)" if rows is not None and tokens[0] == "SCAN" else ""
+            parts.append(f"{detail}{suffix}")
+    return "; ".join(parts) or "O(1)"
+
+
+def migrate(db_path, dry_run=False, echo=print):
+    """
+    CLI（flask scart migrate / 旧スクリプト）用。
+    dry_run=True のときは SQL と見積もりコストを表示するだけで、何も変更しない。
+    """
+    conn = connect(db_path)
+    try:
+        version = get_user_version(conn)
+        pending = pending_migrations(version)
+        echo(f"DB: {db_path}")
+        echo(f"user_version={version} latest={LATEST_VERSION} pending={[m.version for m in pending]}")
+        if not pending:
+            echo("up to date.")
+            return 0
+        for m in pending:
+            if not dry_run:
+                apply_migration(conn, m)
+                echo(f"[v{m.version}] applied: {m.description}")
+                continue
+            ctx = MigrationContext(conn, dry_run=True)
+            m.apply(ctx)
+            echo(f"[v{m.version}] {m.description} ({len(ctx.statements)} statements)")
+            for sql, params in ctx.statements:
+                one_line = " ".join(sql.split())
+                echo(f"  {one_line};")
+                if params:
+                    echo(f"    -- params: {len(params)}")
+                echo(f"    -- est: {estimate_cost(conn, sql)}")
+        if dry_run:
+            echo("dry-run: no changes were made.")
+        else:
+            store_fingerprint(conn, schema_fingerprint(conn))
+        return 0
+    finally:
+        conn.close()
+
+
+def default_db_path():
+    """create_app と同じ規則（SCART_DB_PATH → プロジェクトルートの estimates.db）。"""
+    env_db = os.environ.get("SCART_DB_PATH")
+    if env_db:
+        return env_db
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "estimates.db")
+
+
+def cli_main(argv=None):
+    """
+    Flask を起動せずに移行だけを実行する入口（旧 add_*_column.py 等から呼ばれる）。
+      python -m app.migrations [DBパス] [--dry-run]
+    """
+    parser = argparse.ArgumentParser(description="S-CART DB migration (PRAGMA user_version)")
+    parser.add_argument("db_path", nargs="?", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s in %(module)s: %(message)s")
+    db_path = args.db_path or default_db_path()
+    if not os.path.exists(db_path):
+        print(f"[FAIL] DB not found: {db_path}")
+        return 2
+    return migrate(db_path, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    sys.exit(cli_main())
@@ -1,11 +1,36 @@
 from app import db
 from datetime import datetime
 
+# 人数の段階の既定値（app/cost_utils.DEFAULT_RATE_TABLE と同じ）。JSON の配列で保存する
+DEFAULT_WORKER_TIERS = (
+    '[{"min_vehicles": null, "max_vehicles": 1, "max_distance": 50, "workers": 1}, '
+    '{"min_vehicles": 2, "max_vehicles": 5, "max_distance": 100, "workers": 2}]'
+)
+
 class LogicConfig(db.Model):
+    """
+    設計/セットアップ費用の単価・係数の版（1行 = 1版。変更は新しい行の追加で行い、既存の行は書き換えない）。
+    最新の行（id 最大）が有効。app/rate_table.py が読み込んでメモリに持つ。
+    """
     __tablename__ = "logic_configs"
 
     id = db.Column(db.Integer, primary_key=True)
-    design_rate = db.Column(db.Float, nullable=False)
-    setup_rate = db.Column(db.Float, nullable=False)
+    design_rate = db.Column(db.Float, nullable=False)  # 設計の売価単価（円/h）
+    setup_rate = db.Column(db.Float, nullable=False)  # セットアップの売価単価（円/h）
+    labor_rate = db.Column(db.Float, nullable=False, default=7920)  # 原価単価（円/h）
+    design_intersection_hours = db.Column(db.Float, nullable=False, default=2.0)
+    design_station_hours = db.Column(db.Float, nullable=False, default=1.0)
+    design_meters_per_hour = db.Column(db.Float, nullable=False, default=100.0)
+    design_safety_factor = db.Column(db.Float, nullable=False, default=1.1)
+    setup_speed_m_per_min = db.Column(db.Float, nullable=False, default=30.0)
+    setup_station_ct_min = db.Column(db.Float, nullable=False, default=0.1)
+    trial_runs_per_vehicle = db.Column(db.Float, nullable=False, default=10.0)
+    bug_fix_hours_per_trial = db.Column(db.Float, nullable=False, default=1.0)
+    interlock_hours = db.Column(db.Float, nullable=False, default=0.1)
+    setup_safety_factor = db.Column(db.Float, nullable=False, default=1.1)
+    worker_tiers = db.Column(db.Text, nullable=False, default=DEFAULT_WORKER_TIERS)  # JSON
+    default_workers = db.Column(db.Float, nullable=False, default=3.0)
+    note = db.Column(db.Text, nullable=True)  # 改定理由など
+    created_by = db.Column(db.Integer, nullable=True)  # 登録したユーザー id
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -24,7 +24,36 @@ class Quotation(db.Model):
     # 改定管理用
     original_id = db.Column(db.Integer, nullable=True, index=True)  # オリジナル見積ID（rev0は自分のid）
     revision_no = db.Column(db.Integer, nullable=False, default=0)  # 改定番号（rev0=0, 改定は1,2...）
+    # 系列の集計（rev0 の行にのみ保持。保存時に _save_quotation が同じトランザクションで更新する）
+    latest_revision_id = db.Column(db.Integer, nullable=True)  # 系列で revision_no が最大の見積ID
+    revision_count = db.Column(db.Integer, nullable=True)  # 系列の件数（rev0 を含む）
 
+    # 金額集計（明細の書き込み時に app/services/quotation_totals.py が更新する）
+    subtotal_amount = db.Column(db.Float, nullable=True)  # 小計（明細 subtotal の合計）
+    discount_amount = db.Column(db.Float, nullable=True)  # 値引額（切り捨て）
+    total_amount = db.Column(db.Float, nullable=True)  # 合計金額（小計 − 値引額）
+    cost_amount = db.Column(db.Float, nullable=True)  # 原価合計
+    gross_margin_amount = db.Column(db.Float, nullable=True)  # 粗利（合計 − 原価）
+    gross_margin_rate = db.Column(db.Float, nullable=True)  # 粗利率(%)
+
+    # 走行条件パラメータ（見積作成時の入力値。未入力は NULL）
+    distance_m = db.Column(db.Float, nullable=True)  # 走行距離(m)
+    intersection_count = db.Column(db.Float, nullable=True)  # 交差点数
+    station_count = db.Column(db.Float, nullable=True)  # ステーション数
+    vehicle_count = db.Column(db.Float, nullable=True)  # 台数
+    equipment_count = db.Column(db.Float, nullable=True)  # 設備数
+    circuit_difficulty = db.Column(db.Float, nullable=True)  # 回路難易度
+
+    # 設計/セットアップの内訳（保存時に app/cost_utils.py で計算。表示は再計算しない）
+    design_hours = db.Column(db.Float, nullable=True)
+    design_cost = db.Column(db.Float, nullable=True)
+    design_fee = db.Column(db.Float, nullable=True)
+    design_profit_rate = db.Column(db.Float, nullable=True)  # %
+    setup_hours = db.Column(db.Float, nullable=True)
+    setup_cost = db.Column(db.Float, nullable=True)
+    setup_fee = db.Column(db.Float, nullable=True)
+    setup_profit_rate = db.Column(db.Float, nullable=True)  # %
+    rate_table_version = db.Column(db.String(50), nullable=True)  # 計算に使った単価表の版
 
     customer_id = db.Column(db.Integer, db.ForeignKey("customers.id"), nullable=True, index=True)
     customer = relationship("Customer", back_populates="quotations")
@@ -0,0 +1,235 @@
+"""
+設計/セットアップ費用の what-if グリッド
+
+「AGV 3・5・8台、走行距離 200〜800m だといくらか」を出すために、営業が見積作成画面の送信を
+繰り返していた。GET /quotation/pricing-grid（app/routes/quotation.py）と flask --app app scart pricing-grid が
+台数 × 距離 × 交差点数 × ステーション数 の全組み合わせを app/cost_utils.calc_design_setup_batch で一度に計算する。
+
+- 軸の指定: "3,5,8"（列挙）・"200-800:100"（開始-終了:刻み。刻み省略は 1）・両者のカンマ混在。省略した軸は 0 のみ。
+- 結果: 各値（GRID_FIELDS）を軸の順（GRID_AXES）に C 順で平たくした配列（最後の軸 station_count が最も速く変わる）。
+  利益率は小数2桁に丸める。セル (i, j, k, l) は fields[f][((i * n_j + j) * n_k + k) * n_l + l]。
+- キャッシュ: 単価表の版（cost_utils.current_rate_table() = logic_configs の最新版）と軸・値の組をキーに、
+  JSON 本文を LRU で保持する（PRICING_GRID_CACHE_SIZE 件かつ本文の合計 PRICING_GRID_CACHE_MAX_BYTES バイトまで）。
+  本文が PRICING_GRID_CACHE_ENTRY_MAX_BYTES を超えるグリッドは保持しない（毎回計算する）。
+  版が変わると全件捨てる。ETag は本文の SHA-256（先頭20桁）。
+- 上限: セル数が PRICING_GRID_MAX_CELLS を超える指定は PricingGridError（画面は 400）。
+ヒット率・計算時間は /admin/metrics の pricing_grid で確認できる。
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from app import cost_utils
+from app.cost_utils import DESIGN_SETUP_KEYS
+from app.metrics import register_metrics
+
+# 軸の順（結果配列の次元の順）。名前はフォーム・見積の列名と同じ
+GRID_AXES = ("vehicle_count", "distance_m", "intersection_count", "station_count")
+GRID_FIELDS = DESIGN_SETUP_KEYS + ("total_fee", "total_cost", "total_profit_rate")
+_RATE_FIELDS = ("design_profit_rate", "setup_profit_rate", "total_profit_rate")
+
+_RANGE_RE = re.compile(r"^(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)(?:\s*:\s*(\d+(?:\.\d+)?))?$")
+_NUMBER_RE = re.compile(r"^\d+(?:\.\d+)?$")
+
+
+class PricingGridError(ValueError):
+    """軸・値の指定が不正、またはセル数が上限を超える。"""
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def parse_axis(spec, name="axis", max_values=None):
+    """
+    軸の指定文字列を値のリスト（重複を除き指定順）にする。空・None は [0]。
+    max_values を超える展開は計算前に PricingGridError にする（巨大な範囲でメモリを使わないため）。
+    """
+    spec = (spec or "").strip()
+    if not spec:
+        return [0]
+    values = []
+    seen = set()
+    for part in spec.split(","):
+        part = part.strip()
+        m = _RANGE_RE.match(part)
+        if m:
+            start, end = float(m.group(1)), float(m.group(2))
+            step = float(m.group(3)) if m.group(3) else 1.0
+            if step <= 0 or end < start:
+                raise PricingGridError(f"{name}: 範囲 '{part}' は 開始 ≦ 終了、刻み > 0 で指定してください")
+            count = int(math.floor((end - start) / step + 1e-9)) + 1
+            if max_values is not None and len(values) + count > max_values:
+                raise PricingGridError(f"{name}: 値が多すぎます（上限 {max_values}）")
+            items = (round(start + step * i, 6) for i in range(count))
+        elif _NUMBER_RE.match(part):
+            items = (float(part),)
+        else:
+            raise PricingGridError(f"{name}: '{part}' は数値でも範囲（例: 200-800:100）でもありません")
+        for v in items:
+            v = _number(v)
+            if v not in seen:
+                seen.add(v)
+                values.append(v)
+    return values
+
+
+def parse_grid_axes(specs, max_cells):
+    """{軸名: 指定文字列} → {軸名: 値のリスト}。セル数が max_cells を超えれば PricingGridError。"""
+    axes = {}
+    cells = 1
+    for name in GRID_AXES:
+        axes[name] = parse_axis(specs.get(name), name, max_values=max_cells)
+        cells *= len(axes[name])
+        if cells > max_cells:
+            raise PricingGridError(f"セル数が上限 {max_cells:,} を超えます")
+    return axes
+
+
+def parse_grid_fields(spec):
+    """カンマ区切りの値名 → タプル（GRID_FIELDS の順）。空は全部。"""
+    if not spec:
+        return GRID_FIELDS
+    wanted = {f.strip() for f in spec.split(",") if f.strip()}
+    unknown = wanted - set(GRID_FIELDS)
+    if unknown:
+        raise PricingGridError(f"未知の値: {', '.join(sorted(unknown))}（指定可能: {', '.join(GRID_FIELDS)}）")
+    return tuple(f for f in GRID_FIELDS if f in wanted)
+
+
+def evaluate_pricing_grid(axes, fields=GRID_FIELDS, rates=None):
+    """
+    全組み合わせを一括計算し、{値名: 軸の形の ndarray} と単価表の版を返す（rates 省略時は現在の単価表）。
+    疎なメッシュ（各軸 1 次元）を渡し、calc_design_setup_batch のブロードキャストでグリッドに広げる。
+    """
+    import numpy as np
+
+    mesh = np.meshgrid(*(np.asarray(axes[name], dtype=np.float64) for name in GRID_AXES),
+                       indexing="ij", sparse=True)
+    result = cost_utils.calc_design_setup_batch(dict(zip(GRID_AXES, mesh)), rates)
+    total_fee = result["design_fee"] + result["setup_fee"]
+    total_cost = result["design_cost"] + result["setup_cost"]
+    total_profit_rate = np.zeros(total_fee.shape, dtype=np.float64)
+    positive = total_fee > 0
+    total_profit_rate[positive] = (total_fee[positive] - total_cost[positive]) / total_fee[positive] * 100.0
+    result.update(total_fee=total_fee, total_cost=total_cost, total_profit_rate=total_profit_rate)
+    return {f: result[f] for f in fields}, result["rate_table_version"]
+
+
+def build_pricing_grid_payload(axes, fields=GRID_FIELDS, rates=None):
+    import numpy as np
+
+    values, version = evaluate_pricing_grid(axes, fields, rates)
+    shape = [len(axes[name]) for name in GRID_AXES]
+    return {
+        "rate_table_version": version,
+        "axes": {name: axes[name] for name in GRID_AXES},
+        "shape": shape,
+        "cells": int(np.prod(shape)),
+        "fields": {
+            f: (np.round(values[f], 2) if f in _RATE_FIELDS else values[f]).ravel().tolist()
+            for f in fields
+        },
+    }
+
+
+class PricingGrid:
+    __slots__ = ("key", "body", "etag", "cells")
+
+    def __init__(self, key, body, cells):
+        self.key = key
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        self.cells = cells
+
+
+class PricingGridCache:
+    def __init__(self, max_entries=16, max_bytes=64 * 1024 * 1024, max_entry_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._too_large = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._last_cells = 0
+        self._last_ms = 0.0
+
+    def get(self, axes, fields=GRID_FIELDS):
+        rates = cost_utils.current_rate_table()
+        version = rates.version
+        key = (version, tuple(tuple(axes[name]) for name in GRID_AXES), tuple(fields))
+        with self._lock:
+            if self._version != version:
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+            grid = self._entries.get(key)
+            if grid is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return grid
+            self._misses += 1
+        # 計算はロックの外（同じ指定が同時に来たら両方計算し、後勝ちで入れる）
+        t0 = time.perf_counter()
+        payload = build_pricing_grid_payload(axes, fields, rates)
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        grid = PricingGrid(key, body, payload["cells"])
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self._last_cells = grid.cells
+            self._last_ms = elapsed
+            if len(body) > min(self.max_entry_bytes, self.max_bytes):
+                self._too_large += 1
+            elif self._version == version and self.max_entries > 0:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= len(old.body)
+                self._entries[key] = grid
+                self._bytes += len(body)
+                while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted.body)
+                    self._evictions += 1
+        return grid
+
+    def stats(self):
+        return {
+            "rate_table_version": self._version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "too_large": self._too_large,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "last_cells": self._last_cells,
+            "last_build_ms": round(self._last_ms, 2),
+        }
+
+
+def install_pricing_grid(app):
+    cache = PricingGridCache(max_entries=app.config.get("PRICING_GRID_CACHE_SIZE", 16),
+                             max_bytes=app.config.get("PRICING_GRID_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+                             max_entry_bytes=app.config.get("PRICING_GRID_CACHE_ENTRY_MAX_BYTES", 16 * 1024 * 1024))
+    app.extensions["scart_pricing_grid"] = cache
+    register_metrics("pricing_grid", cache.stats)
+    return cache
+
+
+def get_pricing_grid(specs, fields_spec=None):
+    """リクエストの軸指定から PricingGrid（JSON 本文と ETag）を返す。指定が不正なら PricingGridError。"""
+    axes = parse_grid_axes(specs, current_app.config["PRICING_GRID_MAX_CELLS"])
+    fields = parse_grid_fields(fields_spec)
+    return current_app.extensions["scart_pricing_grid"].get(axes, fields)
@@ -0,0 +1,93 @@
+"""
+設計/セットアップ費用のスカラー計算のメモ（プロセス内 LRU）
+
+同じ走行条件の計算が繰り返される（フォームの再表示・改定で引き継いだパラメータ・見積の保存と再計算）。
+cost_utils.calc_design_setup_breakdown（と、それを呼ぶ calc_design_and_setup_amounts・
+calc_design_setup_for_quotation）は、単価表を省略した呼び出し（= 現在の単価表）の結果をここに保持する。
+
+- キー: 正規化したパラメータ（_safe_float 後の 距離・交差点数・ステーション数・台数。"120" と 120.0 は同じキー）。
+  保持している結果はすべて同じ単価表の版のもので、版が変わる（logic_configs に新しい版。app/rate_table.py）と
+  次の参照で全件捨てる。
+- 件数は PRICING_MEMO_SIZE（0 で無効）。あふれたら最も長く参照されていないものから捨てる。
+- 単価表を明示した呼び出し（一括計算・what-if グリッド・試算用の単価表）は通さない。
+ヒット率・追い出し件数は /admin/metrics の pricing_memo で確認できる。
+"""
+import threading
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+
+from app.metrics import register_metrics
+
+
+class PricingMemo:
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, rates, params, compute):
+        """
+        params（正規化済みのタプル）の結果を返す。無ければ compute(rates, params) で計算して保持する。
+        返す値は保持しているものそのもの（呼び出し側で変更しないこと）。
+        """
+        version = rates.version
+        with self._lock:
+            if self._version != version:
+                if self._entries:
+                    self._entries.clear()
+                    self._invalidations += 1
+                self._version = version
+            value = self._entries.get(params)
+            if value is not None:
+                self._entries.move_to_end(params)
+                self._hits += 1
+                return value
+            self._misses += 1
+        # 計算はロックの外（同じキーが同時に来たら両方計算し、後勝ちで入れる）
+        value = compute(rates, params)
+        with self._lock:
+            if self._version == version and self.max_entries > 0:
+                self._entries[params] = value
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            "rate_table_version": self._version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else None,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+        }
+
+
+def install_pricing_memo(app):
+    memo = PricingMemo(max_entries=app.config.get("PRICING_MEMO_SIZE", 4096))
+    app.extensions["scart_pricing_memo"] = memo
+    register_metrics("pricing_memo", memo.stats)
+    return memo
+
+
+def current_pricing_memo():
+    """アプリ内で有効（PRICING_MEMO_SIZE > 0）なら PricingMemo、それ以外は None。"""
+    if not has_app_context():
+        return None
+    memo = current_app.extensions.get("scart_pricing_memo")
+    return memo if memo is not None and memo.max_entries > 0 else None
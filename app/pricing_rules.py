@@ -0,0 +1,312 @@
+"""
+設計/セットアップ費用の計算式（宣言的なルール定義）と、その Python / NumPy / JavaScript へのコンパイル
+
+計算式は cost_utils の関数と static/js/quotation_form.js（v6 JS ロジック）に二重に書かれ、ずれが出ていた。
+PRICING_RULES を唯一の定義とし、単価表（cost_utils.RateTable）ごとに一度だけコンパイルする。
+
+- ルールは (名前, 式) の並び。式は Python の式の部分集合（四則演算・単項マイナス・比較1つ・and/or・
+  条件式 x if c else y・数値）で、ast で検証する。名前は入力（RULE_INPUTS）・前のルールの値・単価表の係数。
+  係数はコンパイル時に定数へ畳み込む。関数は ceil(x)（切り上げて整数）と tiers(台数, 距離)
+  （単価表の worker_tiers を上から評価し、最初に当てはまった人数。どれにも当てはまらなければ default_workers）だけ。
+- 3つのターゲットは同じ AST から生成し、演算の順序は定義のまま（倍精度の四則演算なので結果は一致する）。
+  python: ローカル変数だけの関数。cost_utils.calc_design_setup_breakdown などスカラー計算が使う。
+  numpy : 列の配列を受ける関数（ceil → int64、条件式 → np.where、tiers → np.select）。calc_design_setup_batch が使う。
+  js    : window.PRICING_RULES.evaluate を定義するスクリプト。GET /quotation/pricing-rules.js で見積フォームに配る。
+- コンパイル結果は RateTable.rules（初回参照時にコンパイル）で単価表に結びつく。
+  単価表の新しい版は新しいインスタンスなので、版が変わると次の参照でコンパイルし直す。
+"""
+import ast
+import copy
+import dataclasses
+import hashlib
+import json
+import math
+
+# 入力（コンパイルした関数の引数の順）
+RULE_INPUTS = ("distance", "intersections", "stations", "vehicles")
+
+PRICING_RULES = (
+    # 設計: 台数 × 交差点・ステーション・距離から工数、安全率を掛けて切り上げ
+    ("design_hours_raw", "(vehicles * intersections * design_intersection_hours + stations * design_station_hours"
+                         " + distance / design_meters_per_hour) * design_safety_factor"),
+    ("design_hours", "ceil(design_hours_raw)"),
+    ("design_cost", "design_hours * labor_rate"),
+    ("design_fee", "design_hours * design_sell_rate"),
+    ("design_profit_rate", "(design_fee - design_cost) / design_fee * 100.0 if design_fee > 0 else 0.0"),
+    # セットアップ: AGV の CT から試運転、バグ修正・インターロックを足し、安全率と人数を掛けて切り上げ
+    ("ct_min", "distance / setup_speed_m_per_min + setup_station_ct_min * stations"),
+    ("trial_count", "trial_runs_per_vehicle * vehicles"),
+    ("trial_hours", "(ct_min * trial_count) / 60.0"),
+    ("bug_fix_hours", "bug_fix_hours_per_trial * trial_count"),
+    ("interlock", "interlock_hours * vehicles * intersections * stations"),
+    ("setup_base_hours", "(trial_hours + bug_fix_hours + interlock) * setup_safety_factor"),
+    ("workers", "tiers(vehicles, distance)"),
+    ("setup_hours_raw", "setup_base_hours * workers"),
+    ("setup_hours", "ceil(setup_hours_raw)"),
+    ("setup_cost", "setup_hours * labor_rate"),
+    ("setup_fee", "setup_hours * setup_sell_rate"),
+    ("setup_profit_rate", "(setup_fee - setup_cost) / setup_fee * 100.0 if setup_fee > 0 else 0.0"),
+)
+
+# evaluate / evaluate_batch / JS が返す値（cost_utils.DESIGN_SETUP_KEYS と同じ順）
+RULE_OUTPUTS = (
+    "design_hours", "design_cost", "design_fee", "design_profit_rate",
+    "setup_hours", "setup_cost", "setup_fee", "setup_profit_rate",
+)
+RAW_HOURS_OUTPUTS = ("design_hours_raw", "setup_hours_raw")
+
+_FUNCTIONS = {"ceil": 1, "tiers": 2}
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call, ast.Name, ast.Constant,
+    ast.Load, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.USub, ast.And, ast.Or,
+    ast.Gt, ast.GtE, ast.Lt, ast.LtE, ast.Eq, ast.NotEq,
+)
+_JS_OPS = {
+    ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/", ast.And: "&&", ast.Or: "||",
+    ast.Gt: ">", ast.GtE: ">=", ast.Lt: "<", ast.LtE: "<=", ast.Eq: "===", ast.NotEq: "!==",
+}
+
+
+class PricingRuleError(ValueError):
+    """ルールの式が不正（未知の名前・許可しない構文・名前の重複）。"""
+
+
+def rate_constants(rates):
+    """単価表の数値の係数 → {名前: 値}（式の中で定数として使える名前）。"""
+    return {
+        f.name: getattr(rates, f.name)
+        for f in dataclasses.fields(rates)
+        if isinstance(getattr(rates, f.name), (int, float)) and not isinstance(getattr(rates, f.name), bool)
+    }
+
+
+def parse_rules(rules, constants):
+    """ルールを検証し [(名前, 式の AST)] を返す。不正なら PricingRuleError。"""
+    known = set(RULE_INPUTS)
+    parsed = []
+    for name, source in rules:
+        if not name.isidentifier() or name in known or name in constants or name in _FUNCTIONS:
+            raise PricingRuleError(f"{name}: ルール名が入力・係数・他のルールと重複しています")
+        try:
+            tree = ast.parse(source, mode="eval")
+        except SyntaxError as e:
+            raise PricingRuleError(f"{name}: 式を解釈できません: {e.msg}") from e
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED_NODES):
+                raise PricingRuleError(f"{name}: 使えない構文 {type(node).__name__}")
+            if isinstance(node, ast.Constant) and (
+                    isinstance(node.value, bool) or not isinstance(node.value, (int, float))
+                    or not math.isfinite(node.value)):
+                raise PricingRuleError(f"{name}: 定数は有限の数値のみ: {node.value!r}")
+            if isinstance(node, ast.Compare) and len(node.ops) != 1:
+                raise PricingRuleError(f"{name}: 比較の連鎖は使えません")
+            if isinstance(node, ast.Call):
+                if (not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS
+                        or len(node.args) != _FUNCTIONS[node.func.id] or node.keywords):
+                    raise PricingRuleError(f"{name}: 使える関数は ceil(x) と tiers(台数, 距離) だけです")
+            elif isinstance(node, ast.Name) and node.id not in known and node.id not in constants:
+                if node.id not in _FUNCTIONS:
+                    raise PricingRuleError(f"{name}: 未知の名前 {node.id}")
+        parsed.append((name, tree.body))
+        known.add(name)
+    return parsed
+
+
+class _Lower(ast.NodeTransformer):
+    """係数を定数に、ceil / tiers をターゲットの式に置き換える（python / numpy 共通）。"""
+
+    def __init__(self, rates, constants, target):
+        self.rates = rates
+        self.constants = constants
+        self.target = target
+
+    def visit_Name(self, node):
+        if node.id in self.constants:
+            return ast.Constant(self.constants[node.id])
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if node.func.id == "ceil":
+            return ast.Call(ast.Name("_ceil", ast.Load()), node.args, [])
+        vehicles, distance = node.args
+        conditions = [_tier_condition(tier, vehicles, distance) for tier in self.rates.worker_tiers]
+        workers = [ast.Constant(float(tier.workers)) for tier in self.rates.worker_tiers]
+        default = ast.Constant(float(self.rates.default_workers))
+        if self.target == "numpy":
+            if not conditions:
+                return default
+            conditions = [self._numpy_and(c.values) for c in conditions]
+            return ast.Call(ast.Name("_select", ast.Load()),
+                            [ast.List(conditions, ast.Load()), ast.List(workers, ast.Load()), default], [])
+        # 上から順に評価する条件式の連鎖
+        expr = default
+        for condition, value in reversed(list(zip(conditions, workers))):
+            expr = ast.IfExp(condition, value, expr)
+        return expr
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        if self.target == "numpy":
+            return ast.Call(ast.Name("_where", ast.Load()), [node.test, node.body, node.orelse], [])
+        return node
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        if self.target == "numpy":
+            return self._numpy_and(node.values) if isinstance(node.op, ast.And) else self._numpy_or(node.values)
+        return node
+
+    @staticmethod
+    def _numpy_and(values):
+        expr = values[0]
+        for value in values[1:]:
+            expr = ast.BinOp(expr, ast.BitAnd(), value)
+        return expr
+
+    @staticmethod
+    def _numpy_or(values):
+        expr = values[0]
+        for value in values[1:]:
+            expr = ast.BinOp(expr, ast.BitOr(), value)
+        return expr
+
+
+def _tier_condition(tier, vehicles, distance):
+    """WorkerTier → 「台数が下限〜上限（None は制限なし）かつ距離が上限以下」の条件（ast.BoolOp）。"""
+    parts = []
+    if tier.min_vehicles is not None:
+        parts.append(ast.Compare(vehicles, [ast.GtE()], [ast.Constant(tier.min_vehicles)]))
+    if tier.max_vehicles is not None:
+        parts.append(ast.Compare(vehicles, [ast.LtE()], [ast.Constant(tier.max_vehicles)]))
+    parts.append(ast.Compare(distance, [ast.LtE()], [ast.Constant(tier.max_distance)]))
+    return ast.BoolOp(ast.And(), parts)
+
+
+def _needed(body, outputs):
+    """outputs の計算に要るルールだけを定義順に残す。"""
+    needed = set(outputs)
+    kept = []
+    for rule, expr in reversed(body):
+        if rule in needed:
+            kept.append((rule, expr))
+            needed.update(n.id for n in ast.walk(expr) if isinstance(n, ast.Name))
+    return kept[::-1]
+
+
+def _function_def(name, body, outputs):
+    """outputs の計算に要るルールを順に代入し、outputs のタプルを返す関数定義（ast.FunctionDef）。"""
+    statements = [ast.Assign([ast.Name(rule, ast.Store())], expr) for rule, expr in _needed(body, outputs)]
+    statements.append(ast.Return(ast.Tuple([ast.Name(o, ast.Load()) for o in outputs], ast.Load())))
+    args = ast.arguments(posonlyargs=[], args=[ast.arg(a) for a in RULE_INPUTS], kwonlyargs=[], kw_defaults=[],
+                         defaults=[])
+    return ast.FunctionDef(name=name, args=args, body=statements, decorator_list=[], returns=None, type_params=[])
+
+
+def _lowered(parsed, rates, constants, target):
+    lower = _Lower(rates, constants, target)
+    return [(name, lower.visit(copy.deepcopy(expr))) for name, expr in parsed]
+
+
+def _compile_module(functions, namespace, filename):
+    module = ast.fix_missing_locations(ast.Module(body=functions, type_ignores=[]))
+    exec(compile(module, filename, "exec"), namespace)
+    return namespace, ast.unparse(module)
+
+
+def _numpy_namespace():
+    import numpy as np
+
+    def _ceil(values):
+        return np.ceil(values).astype(np.int64)
+
+    def _where(condition, then, otherwise):
+        return np.where(condition, then, otherwise)
+
+    def _select(conditions, choices, default):
+        return np.select(conditions, choices, default=default)
+
+    return {"_ceil": _ceil, "_where": _where, "_select": _select}
+
+
+def _js_expr(node):
+    if isinstance(node, ast.Constant):
+        return repr(node.value)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.BinOp):
+        return f"({_js_expr(node.left)} {_JS_OPS[type(node.op)]} {_js_expr(node.right)})"
+    if isinstance(node, ast.UnaryOp):
+        return f"(-{_js_expr(node.operand)})"
+    if isinstance(node, ast.BoolOp):
+        return "(" + f" {_JS_OPS[type(node.op)]} ".join(_js_expr(v) for v in node.values) + ")"
+    if isinstance(node, ast.Compare):
+        return f"({_js_expr(node.left)} {_JS_OPS[type(node.ops[0])]} {_js_expr(node.comparators[0])})"
+    if isinstance(node, ast.IfExp):
+        return f"({_js_expr(node.test)} ? {_js_expr(node.body)} : {_js_expr(node.orelse)})"
+    if isinstance(node, ast.Call) and node.func.id == "_ceil":
+        return f"Math.ceil({_js_expr(node.args[0])})"
+    raise PricingRuleError(f"JS に変換できない式: {ast.unparse(node)}")
+
+
+def _js_source(body, version):
+    lines = [
+        "// 設計/セットアップ費用の計算式（app/pricing_rules.py が単価表から生成。編集しないこと）",
+        "window.PRICING_RULES = {",
+        f"  version: {json.dumps(version)},",
+        f"  outputs: {json.dumps(list(RULE_OUTPUTS))},",
+        f"  evaluate: function ({', '.join(RULE_INPUTS)}) {{",
+    ]
+    lines += [f"    const {name} = {_js_expr(expr)};" for name, expr in _needed(body, RULE_OUTPUTS)]
+    lines.append("    return {" + ", ".join(f"{o}: {o}" for o in RULE_OUTPUTS) + "};")
+    lines += ["  }", "};", ""]
+    return "\n".join(lines)
+
+
+class PricingRules:
+    """
+    1つの単価表についてコンパイルした計算式。
+    evaluate(distance, intersections, stations, vehicles) → RULE_OUTPUTS のタプル（スカラー）
+    raw_hours(...) → (設計工数, セットアップ工数) の切り上げ前の値
+    evaluate_batch(...) → RULE_OUTPUTS のタプル（各要素が配列。引数は同じ形の float64 配列）
+    js / etag → 見積フォームに配るスクリプトとその SHA-256（先頭20桁）
+    """
+
+    def __init__(self, rates, rules=PRICING_RULES):
+        self.version = rates.version
+        constants = rate_constants(rates)
+        parsed = parse_rules(rules, constants)
+        names = {name for name, _ in parsed}
+        missing = [o for o in RULE_OUTPUTS + RAW_HOURS_OUTPUTS if o not in names]
+        if missing:
+            raise PricingRuleError(f"出力のルールがありません: {', '.join(missing)}")
+
+        body = _lowered(parsed, rates, constants, "python")
+        namespace, self.python_source = _compile_module(
+            [_function_def("evaluate", body, RULE_OUTPUTS), _function_def("raw_hours", body, RAW_HOURS_OUTPUTS)],
+            {"_ceil": math.ceil}, f"<pricing rules {self.version}>",
+        )
+        self.evaluate = namespace["evaluate"]
+        self.raw_hours = namespace["raw_hours"]
+        self._parsed = parsed
+        self._rates = rates
+        self._batch = None
+        self.js = _js_source(body, self.version)
+        self.etag = hashlib.sha256(self.js.encode("utf-8")).hexdigest()[:20]
+
+    def evaluate_batch(self, distance, intersections, stations, vehicles):
+        import numpy as np
+
+        if self._batch is None:
+            # NumPy 版は一括計算を使うときだけコンパイルする
+            body = _lowered(self._parsed, self._rates, rate_constants(self._rates), "numpy")
+            namespace, _ = _compile_module([_function_def("evaluate", body, RULE_OUTPUTS)], _numpy_namespace(),
+                                           f"<pricing rules {self.version} (numpy)>")
+            self._batch = namespace["evaluate"]
+        # 条件式は両辺を計算してから選ぶ（売価 0 の要素の利益率の 0 除算は捨てる側なので警告を出さない）
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._batch(distance, intersections, stations, vehicles)
+
+
+def compile_pricing_rules(rates, rules=PRICING_RULES):
+    return PricingRules(rates, rules)
@@ -0,0 +1,108 @@
+"""
+リクエスト単位の SQL 計測と N+1 検出
+
+install_query_stats(app, db) で db.engine に before/after_cursor_execute イベントを登録し、
+リクエスト中に発行された文の件数と DB 時間を集計する。
+
+- 応答ヘッダ X-DB-Query-Count / X-DB-Time-ms に付与し、ログに1行出す（[SQL]）。
+- 同じ形の文（バインド値を除いた SQL。IN (?, ?, ...) は1つに畳む）が
+  QUERY_NPLUS1_THRESHOLD 回以上出たら N+1 の疑いとして警告する（[N+1]）。
+- QUERY_STATS_STRICT=1 のとき、QUERY_BUDGETS（エンドポイント名 → 上限件数、
+  無ければ QUERY_BUDGET_DEFAULT。0 は無制限）を超えたルートや N+1 の疑いがあるルートは
+  QueryBudgetExceeded を送出する（テスト用。TESTING 時はテストクライアントまで伝播する）。
+ライタースレッド（app/write_queue.py）で実行された文はリクエストに紐付かないため数えない。
+"""
+import collections
+import logging
+import re
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+_IN_LIST_RE = re.compile(r"IN \((?:\?|__\[POSTCOMPILE_\w+\])(?:, \?)*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """strict モードでクエリ予算超過または N+1 の疑いを検出した。"""
+
+
+def statement_shape(statement):
+    return _IN_LIST_RE.sub("IN (?...)", _SPACE_RE.sub(" ", statement.strip()))
+
+
+class RequestQueryStats:
+    __slots__ = ("count", "total_ms", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes = collections.Counter()
+
+    def add(self, statement, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """threshold 回以上繰り返された文の形（N+1 の疑い）を多い順に返す。"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+def current_query_stats():
+    """現在のリクエストの RequestQueryStats（計測対象外なら None）。"""
+    if not has_request_context():
+        return None
+    return g.get("_query_stats")
+
+
+def install_query_stats(app, db):
+    if not app.config.get("QUERY_STATS_ENABLED", True):
+        return
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _query_start(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._scart_t0 = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _query_end(conn, cursor, statement, parameters, context, executemany):
+        stats = current_query_stats()
+        if stats is None:
+            return
+        t0 = getattr(context, "_scart_t0", None)
+        stats.add(statement, (time.perf_counter() - t0) * 1000.0 if t0 else 0.0)
+
+    def _query_stats_begin():
+        g._query_stats = RequestQueryStats()
+
+    # ログインユーザー読込（load_current_user）の文も数えるため、先頭の before_request にする
+    app.before_request_funcs.setdefault(None, []).insert(0, _query_stats_begin)
+
+    @app.after_request
+    def _query_stats_end(response):
+        stats = g.pop("_query_stats", None)
+        if stats is None:
+            return response
+        endpoint = request.endpoint or request.path
+        if app.config.get("QUERY_STATS_HEADERS", True):
+            response.headers["X-DB-Query-Count"] = str(stats.count)
+            response.headers["X-DB-Time-ms"] = f"{stats.total_ms:.2f}"
+        logging.info("[SQL] %s %s endpoint=%s queries=%s db=%.2fms",
+                     request.method, request.path, endpoint, stats.count, stats.total_ms)
+
+        suspects = stats.repeated(app.config.get("QUERY_NPLUS1_THRESHOLD", 5))
+        for shape, n in suspects:
+            logging.warning("[N+1] endpoint=%s repeated %sx: %s", endpoint, n, shape[:300])
+
+        if app.config.get("QUERY_STATS_STRICT", False):
+            budget = app.config.get("QUERY_BUDGETS", {}).get(endpoint, app.config.get("QUERY_BUDGET_DEFAULT", 0))
+            if budget and stats.count > budget:
+                raise QueryBudgetExceeded(f"{endpoint}: {stats.count} queries > budget {budget}")
+            if suspects:
+                shape, n = suspects[0]
+                raise QueryBudgetExceeded(f"{endpoint}: suspected N+1 ({n}x): {shape[:300]}")
+        return response
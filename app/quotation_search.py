@@ -0,0 +1,261 @@
+"""
+見積の全文検索（SQLite FTS5 trigram）
+
+過去の見積を探すには一覧を日付順にたどるしかなかった。GET /quotations/search（app/routes/quotation.py）が
+見積ヘッダと明細の説明文を全文検索し、ヒット箇所を強調したスニペット付きで新しい順に返す。
+
+- 索引: 仮想表 quotations_fts（rowid = quotations.id。改定も1行ずつ）。
+  列は project_name / company_name / contact_name / remarks / estimator_name と、
+  明細の description を改行でつないだ details。スニペットに使うため、値は NFKC で幅だけ揃えて持つ
+  （app/text_normalize.fold_width。かなの種類は畳まない）。
+  作成と初回投入は移行 v7、作り直しは flask --app app scart reindex-quotations。
+- 更新: 見積の保存（_save_quotation）と削除（quotation_delete）が同じトランザクションで
+  index_quotation() / unindex_quotations() を呼ぶ。見積は保存後に書き換えない（改定は別行）。
+- 検索語（空白区切りで AND）:
+    語          部分一致
+    "語 句"     フレーズ（空白も含めて連続一致）
+    語*         前方一致（いずれかの列、または明細・備考の行の先頭）
+  3文字以上は MATCH で索引を引き、3文字未満は trigram で引けないため LIKE で絞る。
+- FTS5（trigram）が使えない SQLite では、ヘッダ列への LIKE にフォールバックする（明細は対象外）。
+"""
+import logging
+import re
+import time
+from dataclasses import dataclass
+
+import sqlalchemy as sa
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import text
+
+from app.fts import TRIGRAM_MIN_CHARS, escape_like, fts_phrase, fts_table_exists, register_text_functions
+from app.metrics import register_metrics
+from app.text_normalize import fold_width
+
+QUOTATION_FTS_TABLE = "quotations_fts"
+QUOTATION_HEADER_COLUMNS = ("project_name", "company_name", "contact_name", "remarks", "estimator_name")
+QUOTATION_FTS_COLUMNS = QUOTATION_HEADER_COLUMNS + ("details",)
+# スニペットの列見出し（この順に最初にヒットした列を使う）
+SNIPPET_LABELS = {
+    "project_name": "案件名",
+    "company_name": "宛先",
+    "contact_name": "担当者",
+    "estimator_name": "作成担当",
+    "details": "明細",
+    "remarks": "備考",
+}
+SNIPPET_WIDTH = 40
+
+QUOTATION_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {QUOTATION_FTS_TABLE} USING fts5("
+    f"{', '.join(QUOTATION_FTS_COLUMNS)}, tokenize='trigram')"
+)
+# 全件作り直し（app.fts.register_text_functions 済みの接続で実行する）。明細は id 順に改行でつなぐ
+QUOTATION_FTS_REBUILD_SQL = (
+    f"DELETE FROM {QUOTATION_FTS_TABLE}",
+    f"INSERT INTO {QUOTATION_FTS_TABLE} (rowid, {', '.join(QUOTATION_FTS_COLUMNS)}) "
+    f"SELECT q.id, {', '.join(f'scart_fold_width(q.{c})' for c in QUOTATION_HEADER_COLUMNS)}, "
+    "scart_fold_width((SELECT group_concat(description, char(10)) FROM ("
+    "SELECT description FROM quotation_details d WHERE d.quotation_id = q.id "
+    "AND d.description IS NOT NULL AND d.description <> '' ORDER BY d.id))) "
+    "FROM quotations q",
+)
+
+# SQLAlchemy から JOIN するための表定義（db.metadata には載せない = create_all の対象外）
+quotations_fts = sa.Table(
+    QUOTATION_FTS_TABLE,
+    sa.MetaData(),
+    sa.Column("rowid", sa.Integer, primary_key=True),
+    *(sa.Column(c, sa.Text) for c in QUOTATION_FTS_COLUMNS),
+)
+
+_TOKEN_RE = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+@dataclass(frozen=True)
+class SearchTerm:
+    text: str
+    kind: str  # "word" / "phrase" / "prefix"
+
+
+def parse_search_query(q):
+    """検索語を SearchTerm のリストにする。閉じていない引用符は行末までをフレーズとみなす。"""
+    terms = []
+    for m in _TOKEN_RE.finditer(fold_width(q)):
+        if m.group(1) is not None:
+            phrase = m.group(1).strip()
+            if phrase:
+                terms.append(SearchTerm(phrase, "phrase"))
+            continue
+        word = m.group(2)
+        if word.endswith("*") and word.rstrip("*"):
+            terms.append(SearchTerm(word.rstrip("*"), "prefix"))
+        elif word.strip("*"):
+            terms.append(SearchTerm(word.strip("*"), "word"))
+    return terms
+
+
+def rebuild_quotation_fts(conn):
+    """
+    quotations_fts を quotations / quotation_details から作り直す（sqlite3 接続、トランザクションは呼び出し側）。
+    投入件数を返す。
+    """
+    register_text_functions(conn)
+    conn.execute(QUOTATION_FTS_DDL)
+    for sql in QUOTATION_FTS_REBUILD_SQL:
+        conn.execute(sql)
+    conn.execute(f"INSERT INTO {QUOTATION_FTS_TABLE} ({QUOTATION_FTS_TABLE}) VALUES ('optimize')")
+    return conn.execute(f"SELECT COUNT(*) FROM {QUOTATION_FTS_TABLE}").fetchone()[0]
+
+
+def _line_prefix(column, term):
+    escaped = escape_like(term)
+    return sa.or_(column.like(f"{escaped}%", escape="\\"), column.like(f"%\n{escaped}%", escape="\\"))
+
+
+def make_snippet(fields, terms, width=SNIPPET_WIDTH):
+    """
+    ヒットした最初の列から、最初のヒット位置の前後 width 文字を切り出し、検索語を <mark> で囲む。
+    (列見出し, Markup) を返す。どの列にも無ければ None。
+    """
+    if not terms:
+        return None
+    pattern = re.compile("|".join(re.escape(t.text) for t in sorted(terms, key=lambda t: -len(t.text))),
+                         re.IGNORECASE)
+    for column, label in SNIPPET_LABELS.items():
+        value = fields.get(column) or ""
+        first = pattern.search(value)
+        if not first:
+            continue
+        start = max(0, first.start() - width // 2)
+        end = min(len(value), start + width)
+        start = max(0, min(start, end - width))
+        window = value[start:end]
+        parts = []
+        pos = 0
+        for m in pattern.finditer(window):
+            parts.append(escape(window[pos:m.start()]))
+            parts.append(Markup("<mark>%s</mark>") % m.group(0))
+            pos = m.end()
+        parts.append(escape(window[pos:]))
+        html = Markup("").join(parts).replace("\n", Markup(" / "))
+        if start > 0:
+            html = Markup("…") + html
+        if end < len(value):
+            html = html + Markup("…")
+        return label, html
+    return None
+
+
+class QuotationSearch:
+    def __init__(self):
+        self._available = None
+        self._searches = 0
+        self._fallbacks = 0
+        self._indexed = 0
+        self._last_ms = 0.0
+
+    def probe(self, db_path):
+        """起動時（移行の後）に quotations_fts の有無を確かめる。無ければ LIKE で検索する。"""
+        self._available = fts_table_exists(db_path, QUOTATION_FTS_TABLE)
+        if not self._available:
+            logging.warning("[SEARCH] %s not found; quotation search falls back to LIKE", QUOTATION_FTS_TABLE)
+        return self._available
+
+    def available(self, session):
+        if self._available is None:
+            row = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": QUOTATION_FTS_TABLE},
+            ).first()
+            self._available = row is not None
+        return self._available
+
+    def apply(self, query, terms):
+        """
+        Quotation のクエリに検索条件を足し、スニペット用の列（QUOTATION_FTS_COLUMNS と同名）を add_columns して返す。
+        並び順・ページングは呼び出し側（一覧と同じ created_at, id のキーセット）。
+        """
+        from app import db
+        from app.models.quotation import Quotation
+
+        self._searches += 1
+        if not self.available(db.session):
+            self._fallbacks += 1
+            columns = [getattr(Quotation, c) for c in QUOTATION_HEADER_COLUMNS]
+            for term in terms:
+                if term.kind == "prefix":
+                    query = query.filter(sa.or_(*(_line_prefix(c, term.text) for c in columns)))
+                else:
+                    pattern = f"%{escape_like(term.text)}%"
+                    query = query.filter(sa.or_(*(c.like(pattern, escape="\\") for c in columns)))
+            return query.add_columns(*(c.label(c.key) for c in columns), sa.literal("").label("details"))
+
+        query = query.join(quotations_fts, quotations_fts.c.rowid == Quotation.id)
+        columns = [quotations_fts.c[c] for c in QUOTATION_FTS_COLUMNS]
+        long_terms = [t for t in terms if len(t.text) >= TRIGRAM_MIN_CHARS]
+        if long_terms:
+            match = " AND ".join(fts_phrase(t.text) for t in long_terms)
+            query = query.filter(sa.literal_column(QUOTATION_FTS_TABLE).op("MATCH")(match))
+        for term in terms:
+            if term.kind == "prefix":
+                query = query.filter(sa.or_(*(_line_prefix(c, term.text) for c in columns)))
+            elif len(term.text) < TRIGRAM_MIN_CHARS:
+                pattern = f"%{escape_like(term.text)}%"
+                query = query.filter(sa.or_(*(c.like(pattern, escape="\\") for c in columns)))
+        return query.add_columns(*(c.label(c.key) for c in columns))
+
+    def index(self, quotation_id, header, descriptions):
+        """保存した見積1件の索引行を入れ替える（_save_quotation と同じトランザクション）。"""
+        from app import db
+
+        if not self.available(db.session):
+            return
+        t0 = time.perf_counter()
+        row = {c: fold_width(header.get(c)) for c in QUOTATION_HEADER_COLUMNS}
+        row["details"] = "\n".join(fold_width(d) for d in descriptions if d)
+        conn = db.session.connection()
+        conn.execute(text(f"DELETE FROM {QUOTATION_FTS_TABLE} WHERE rowid = :rowid"), {"rowid": quotation_id})
+        conn.execute(
+            text(f"INSERT INTO {QUOTATION_FTS_TABLE} (rowid, {', '.join(QUOTATION_FTS_COLUMNS)}) "
+                 f"VALUES (:rowid, {', '.join(':' + c for c in QUOTATION_FTS_COLUMNS)})"),
+            {"rowid": quotation_id, **row},
+        )
+        self._indexed += 1
+        self._last_ms = (time.perf_counter() - t0) * 1000.0
+
+    def unindex(self, quotation_ids):
+        from app import db
+
+        if not quotation_ids or not self.available(db.session):
+            return
+        db.session.execute(text(f"DELETE FROM {QUOTATION_FTS_TABLE} WHERE rowid = :rowid"),
+                           [{"rowid": i} for i in quotation_ids])
+
+    def stats(self):
+        return {
+            "available": self._available,
+            "searches": self._searches,
+            "fallbacks": self._fallbacks,
+            "indexed": self._indexed,
+            "last_index_ms": round(self._last_ms, 2),
+        }
+
+
+def install_quotation_search(app):
+    search = QuotationSearch()
+    app.extensions["scart_quotation_search"] = search
+    register_metrics("quotation_search", search.stats)
+    return search
+
+
+def get_quotation_search():
+    return current_app.extensions["scart_quotation_search"]
+
+
+def index_quotation(quotation_id, header, descriptions):
+    get_quotation_search().index(quotation_id, header, descriptions)
+
+
+def unindex_quotations(quotation_ids):
+    get_quotation_search().unindex(quotation_ids)
@@ -0,0 +1,160 @@
+"""
+設計/セットアップ費用の単価表（logic_configs の最新版）のプロセス内スナップショット
+
+単価・係数は app/cost_utils.py の定数だったが、logic_configs の行（1行 = 1版）から読む。
+費用計算（cost_utils.current_rate_table()）は毎回このスナップショットを参照し、DB には読みに行かない。
+
+- スナップショットは不変の cost_utils.RateTable。版は "logic_configs:<id>"（行が無ければ既定値の "v6"）で、
+  見積の rate_table_version に記録される。
+- 再読み込みは logic_configs の版数（app/master_versions.py。ORM で行を追加したトランザクションのコミット時に +1）
+  が変わった後の最初の参照で1回だけ行う。参照ごとのコストは版数の比較だけ。
+  読み込みは ORM セッションを使わず sqlite3 で行う（呼び出し元のリクエスト・トランザクションに影響しない）。
+- 起動時（移行の後）に load() で読み込む。ORM を通さない変更（別プロセス・sqlite3 直書き）は検知できない。
+  その場合は invalidate() を呼ぶか再起動する。
+"""
+import json
+import logging
+import sqlite3
+import threading
+
+from flask import current_app
+
+from app.cost_utils import DEFAULT_RATE_TABLE, RateTable, WorkerTier
+from app.metrics import register_metrics
+
+RATE_TABLE_TABLES = ("logic_configs",)
+
+# logic_configs の列 → RateTable の項目（design_rate / setup_rate は売価単価）
+_ROW_FIELDS = {
+    "labor_rate": "labor_rate",
+    "design_rate": "design_sell_rate",
+    "setup_rate": "setup_sell_rate",
+    "design_intersection_hours": "design_intersection_hours",
+    "design_station_hours": "design_station_hours",
+    "design_meters_per_hour": "design_meters_per_hour",
+    "design_safety_factor": "design_safety_factor",
+    "setup_speed_m_per_min": "setup_speed_m_per_min",
+    "setup_station_ct_min": "setup_station_ct_min",
+    "trial_runs_per_vehicle": "trial_runs_per_vehicle",
+    "bug_fix_hours_per_trial": "bug_fix_hours_per_trial",
+    "interlock_hours": "interlock_hours",
+    "setup_safety_factor": "setup_safety_factor",
+    "default_workers": "default_workers",
+}
+# 円単位の単価は整数で持つ（既定値と同じく原価・売価が int になるように）
+_YEN_FIELDS = ("labor_rate", "design_sell_rate", "setup_sell_rate")
+
+
+def rate_table_version(config_id):
+    return f"logic_configs:{config_id}"
+
+
+def parse_worker_tiers(text):
+    """worker_tiers 列（JSON の配列）→ WorkerTier のタプル。不正なら ValueError。"""
+    try:
+        items = json.loads(text or "[]")
+        if not isinstance(items, list):
+            raise ValueError("worker_tiers must be a JSON array")
+        return tuple(
+            WorkerTier(
+                min_vehicles=None if item.get("min_vehicles") is None else float(item["min_vehicles"]),
+                max_vehicles=None if item.get("max_vehicles") is None else float(item["max_vehicles"]),
+                max_distance=float(item["max_distance"]),
+                workers=float(item["workers"]),
+            )
+            for item in items
+        )
+    except (TypeError, KeyError, AttributeError, json.JSONDecodeError) as e:
+        raise ValueError(f"worker_tiers: {e}") from e
+
+
+def rate_table_from_row(row):
+    """logic_configs の1行（列名 → 値の dict）から RateTable を作る。"""
+    values = {}
+    for column, field in _ROW_FIELDS.items():
+        value = float(row[column])
+        if field in _YEN_FIELDS and value.is_integer():
+            value = int(value)
+        values[field] = value
+    return RateTable(version=rate_table_version(row["id"]),
+                     worker_tiers=parse_worker_tiers(row["worker_tiers"]), **values)
+
+
+def rate_table_to_row(table):
+    """RateTable → logic_configs の列の dict（新しい版の入力フォームの初期値用）。"""
+    row = {column: getattr(table, field) for column, field in _ROW_FIELDS.items()}
+    row["worker_tiers"] = json.dumps(
+        [{"min_vehicles": t.min_vehicles, "max_vehicles": t.max_vehicles,
+          "max_distance": t.max_distance, "workers": t.workers} for t in table.worker_tiers],
+        ensure_ascii=False,
+    )
+    return row
+
+
+def load_rate_table(db_path):
+    """logic_configs の最新行から RateTable を読む。表・行が無ければ DEFAULT_RATE_TABLE。"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute("SELECT * FROM logic_configs ORDER BY id DESC LIMIT 1").fetchone()
+    except sqlite3.OperationalError:
+        # 移行前（表・列が無い）
+        return DEFAULT_RATE_TABLE
+    finally:
+        conn.close()
+    return rate_table_from_row(dict(row)) if row is not None else DEFAULT_RATE_TABLE
+
+
+class RateTableCache:
+    def __init__(self, versions, db_path):
+        self.versions = versions
+        self.db_path = db_path
+        self._table = DEFAULT_RATE_TABLE
+        self._loaded_key = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._reloads = 0
+
+    def invalidate(self):
+        self.versions.bump(*RATE_TABLE_TABLES)
+
+    def load(self):
+        """今の logic_configs を読み込む（起動時・版数の変化時）。"""
+        with self._lock:
+            key = self.versions.snapshot(RATE_TABLE_TABLES)
+            try:
+                table = load_rate_table(self.db_path)
+            except ValueError:
+                # 壊れた行では計算を止めず、直前の単価表を使い続ける
+                logging.exception("[RATES] failed to load logic_configs; keeping %s", self._table.version)
+                table = self._table
+            if table.version != self._table.version:
+                logging.info("[RATES] rate table %s -> %s", self._table.version, table.version)
+            self._table = table
+            self._loaded_key = key
+            self._reloads += 1
+            return table
+
+    def get(self):
+        if self._loaded_key == self.versions.snapshot(RATE_TABLE_TABLES):
+            self._hits += 1
+            return self._table
+        return self.load()
+
+    def stats(self):
+        return {
+            "version": self._table.version,
+            "hits": self._hits,
+            "reloads": self._reloads,
+        }
+
+
+def install_rate_table(app, versions):
+    cache = RateTableCache(versions, app.config["SCART_DB_PATH"])
+    app.extensions["scart_rate_table"] = cache
+    register_metrics("rate_table", cache.stats)
+    return cache
+
+
+def get_rate_table():
+    return current_app.extensions["scart_rate_table"].get()
@@ -0,0 +1,358 @@
+"""
+AGV 走行レイアウト（ノード/エッジの一覧）から見積の走行条件を出す
+
+走行距離・交差点数・ステーション数は手入力だった。レイアウトの書き出し（CSV・JSON。数十万区間）を読み、
+POST /quotation/layout-params（app/routes/quotation.py）と flask --app app scart layout-params が
+走行条件と設計/セットアップ費用（cost_utils.calc_design_and_setup_amounts）を返す。
+
+形式（見出し・キーは大文字小文字を区別しない。別名は EDGE_COLUMNS / NODE_COLUMNS）:
+- エッジ CSV: from, to と任意で length（m）。length が空のエッジはノードの座標の距離。
+- ノード CSV（任意）: id と任意で x, y（m）・station（1/true/yes）または type=station。
+- JSON: {"nodes": [...], "edges": [...]}（要素は上の列名のオブジェクト）。
+- JSON Lines（.jsonl / .ndjson）: 1行1オブジェクト。from を持つ行はエッジ、それ以外はノード。
+
+読み込みはストリーム（CSV・JSON Lines は1行ずつ。JSON は文書全体を json で読む）。ノード id は出現順に
+整数へ置き換え、エッジは array の列（始点・終点・長さ）に積む。集計は NumPy で行う。
+- 走行距離 distance_m: エッジの長さの合計（同じ2ノード間の重複エッジ＝往復で書き出した区間は1本と数える）
+- 交差点数 intersection_count: 次数 3 以上のノード数（分岐・合流）
+- ステーション数 station_count: station 指定のノード数
+隣接は CSR（RouteLayout.adjacency()。offsets / neighbors の配列）。
+"""
+import csv
+import io
+import json
+import math
+import os
+from array import array
+
+EDGE_COLUMNS = {
+    "from": ("from", "source", "start", "from_node"),
+    "to": ("to", "target", "end", "to_node"),
+    "length": ("length", "length_m", "distance_m", "distance"),
+}
+NODE_COLUMNS = {
+    "id": ("id", "node", "node_id", "name"),
+    "x": ("x",),
+    "y": ("y",),
+    "station": ("station", "is_station"),
+    "type": ("type", "kind"),
+}
+_TRUE = ("1", "true", "yes", "y")
+
+
+class LayoutError(ValueError):
+    """レイアウトファイルの形式・値が不正。"""
+
+
+def _column_index(header, columns, required=()):
+    """見出し行 → {論理名: 列番号}（無い列は None）。必須の列が無ければ LayoutError。"""
+    names = [h.strip().lower() for h in header]
+    found = {}
+    for key, aliases in columns.items():
+        found[key] = next((names.index(a) for a in aliases if a in names), None)
+    missing = [key for key in required if found[key] is None]
+    if missing:
+        raise LayoutError(f"列がありません: {', '.join(missing)}（見出し: {', '.join(header)}）")
+    return found
+
+
+def _pick(obj, key, columns):
+    for alias in columns[key]:
+        if alias in obj:
+            return obj[alias]
+    return None
+
+
+def _is_station(station, kind):
+    if station is True:
+        return True
+    if station not in (None, "", False) and str(station).strip().lower() in _TRUE:
+        return True
+    return kind is not None and str(kind).strip().lower() == "station"
+
+
+def _length(value):
+    """長さの値 → float。空・None は NaN（座標から求める）。"""
+    if value is None or value == "":
+        return math.nan
+    return float(value)
+
+
+class LayoutBuilder:
+    """ノード・エッジを1件ずつ受け取り、整数 id の配列に積む。"""
+
+    def __init__(self):
+        self.index = {}            # ノード id（文字列）→ 整数
+        self.src = array("q")
+        self.dst = array("q")
+        self.length = array("d")
+        self.coords = {}           # 整数 id → (x, y)
+        self.stations = set()
+
+    def intern(self, node_id):
+        return self.index.setdefault(node_id, len(self.index))
+
+    def add_node(self, node_id, x=None, y=None, station=False):
+        i = self.intern(str(node_id))
+        if x not in (None, "") and y not in (None, ""):
+            self.coords[i] = (float(x), float(y))
+        if station:
+            self.stations.add(i)
+
+    def add_edge(self, source, target, length=None):
+        self.src.append(self.intern(str(source)))
+        self.dst.append(self.intern(str(target)))
+        self.length.append(_length(length))
+
+    def read_nodes_csv(self, f, name="nodes"):
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        cols = _column_index(header, NODE_COLUMNS, required=("id",))
+        ii, xi, yi, si, ti = (cols[k] for k in ("id", "x", "y", "station", "type"))
+        line_no = 1
+        try:
+            for line_no, row in enumerate(reader, 2):
+                if not row:
+                    continue
+                station = _is_station(row[si] if si is not None else None, row[ti] if ti is not None else None)
+                self.add_node(row[ii], row[xi] if xi is not None else None, row[yi] if yi is not None else None,
+                              station)
+        except (ValueError, IndexError) as e:
+            raise LayoutError(f"{name} {line_no}行目: {e}") from e
+
+    def read_edges_csv(self, f, name="edges"):
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise LayoutError(f"{name}: 空のファイルです")
+        cols = _column_index(header, EDGE_COLUMNS, required=("from", "to"))
+        fi, ti, li = cols["from"], cols["to"], cols["length"]
+        # 1行あたりの処理を減らすため、メソッド・属性の参照をループの外に出す
+        intern = self.intern
+        src, dst, length = self.src.append, self.dst.append, self.length.append
+        nan = math.nan
+        line_no = 1
+        try:
+            for line_no, row in enumerate(reader, 2):
+                if not row:
+                    continue
+                src(intern(row[fi]))
+                dst(intern(row[ti]))
+                value = row[li] if li is not None else ""
+                length(float(value) if value else nan)
+        except (ValueError, IndexError) as e:
+            raise LayoutError(f"{name} {line_no}行目: {e}") from e
+
+    def _add_object(self, obj, where):
+        if not isinstance(obj, dict):
+            raise LayoutError(f"{where}: オブジェクトではありません")
+        try:
+            source = _pick(obj, "from", EDGE_COLUMNS)
+            if source is not None:
+                target = _pick(obj, "to", EDGE_COLUMNS)
+                if target is None:
+                    raise LayoutError(f"{where}: to がありません")
+                self.add_edge(source, target, _pick(obj, "length", EDGE_COLUMNS))
+                return
+            node_id = _pick(obj, "id", NODE_COLUMNS)
+            if node_id is None:
+                raise LayoutError(f"{where}: id も from もありません")
+            self.add_node(node_id, _pick(obj, "x", NODE_COLUMNS), _pick(obj, "y", NODE_COLUMNS),
+                          _is_station(_pick(obj, "station", NODE_COLUMNS), _pick(obj, "type", NODE_COLUMNS)))
+        except (TypeError, ValueError) as e:
+            if isinstance(e, LayoutError):
+                raise
+            raise LayoutError(f"{where}: {e}") from e
+
+    def read_json(self, f, name="layout"):
+        try:
+            doc = json.load(f)
+        except json.JSONDecodeError as e:
+            raise LayoutError(f"{name}: JSON を解釈できません: {e}") from e
+        if not isinstance(doc, dict):
+            raise LayoutError(f'{name}: {{"nodes": [...], "edges": [...]}} の形式で指定してください')
+        for key in ("nodes", "edges"):
+            for i, obj in enumerate(doc.get(key) or ()):
+                self._add_object(obj, f"{name} {key}[{i}]")
+
+    def read_jsonl(self, f, name="layout"):
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise LayoutError(f"{name} {line_no}行目: JSON を解釈できません: {e}") from e
+            self._add_object(obj, f"{name} {line_no}行目")
+
+    def build(self):
+        import numpy as np
+
+        n = len(self.index)
+        src = np.frombuffer(self.src, dtype=np.int64)
+        dst = np.frombuffer(self.dst, dtype=np.int64)
+        length = np.frombuffer(self.length, dtype=np.float64).copy()
+        if not len(src):
+            raise LayoutError("エッジがありません")
+
+        # 往復で書き出した区間（A→B と B→A）・同じ区間の重複は1本にする
+        lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+        _, first = np.unique(lo * n + hi, return_index=True)
+        duplicates = len(src) - len(first)
+        if duplicates:
+            first.sort()
+            src, dst, length = src[first], dst[first], length[first]
+
+        missing = np.isnan(length)
+        if missing.any():
+            xy = np.full((n, 2), np.nan)
+            if self.coords:
+                ids = np.fromiter(self.coords, dtype=np.int64, count=len(self.coords))
+                xy[ids] = np.array(list(self.coords.values()), dtype=np.float64)
+            a, b = xy[src[missing]], xy[dst[missing]]
+            length[missing] = np.hypot(a[:, 0] - b[:, 0], a[:, 1] - b[:, 1])
+            unknown = np.flatnonzero(np.isnan(length))
+            if len(unknown):
+                names = list(self.index)
+                edge = unknown[0]
+                raise LayoutError(
+                    f"長さも座標も無いエッジが {len(unknown)} 本あります"
+                    f"（例: {names[src[edge]]} → {names[dst[edge]]}）")
+        # inf・1e400 などの長さや座標は費用計算（整数化）で OverflowError になるので、ここで弾く
+        infinite = np.flatnonzero(~np.isfinite(length))
+        if len(infinite):
+            names = list(self.index)
+            edge = infinite[0]
+            raise LayoutError(
+                f"長さが有限の数値でないエッジが {len(infinite)} 本あります"
+                f"（例: {names[src[edge]]} → {names[dst[edge]]}）")
+        if (length < 0).any():
+            raise LayoutError("長さが負のエッジがあります")
+        if not np.isfinite(length.sum()):
+            raise LayoutError("走行距離の合計が大きすぎます")
+        return RouteLayout(list(self.index), src, dst, length, len(self.stations), duplicates)
+
+
+class RouteLayout:
+    """読み込んだレイアウト（ノード id の一覧と、重複を除いたエッジの配列）。"""
+
+    def __init__(self, node_ids, src, dst, length, station_count, duplicate_edges=0):
+        import numpy as np
+
+        self.node_ids = node_ids
+        self.src = src
+        self.dst = dst
+        self.length = length
+        self.station_count = station_count
+        self.duplicate_edges = duplicate_edges
+        self.degrees = (np.bincount(src, minlength=len(node_ids))
+                        + np.bincount(dst, minlength=len(node_ids)))
+        self._adjacency = None
+
+    @property
+    def node_count(self):
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self):
+        return len(self.src)
+
+    @property
+    def distance_m(self):
+        return float(self.length.sum())
+
+    @property
+    def intersection_count(self):
+        return int((self.degrees >= 3).sum())
+
+    def adjacency(self):
+        """CSR の隣接: (offsets, neighbors)。ノード i の隣は neighbors[offsets[i]:offsets[i + 1]]。"""
+        import numpy as np
+
+        if self._adjacency is None:
+            ends = np.concatenate([self.src, self.dst])
+            others = np.concatenate([self.dst, self.src])
+            neighbors = others[np.argsort(ends, kind="stable")]
+            offsets = np.zeros(self.node_count + 1, dtype=np.int64)
+            np.cumsum(self.degrees, out=offsets[1:])
+            self._adjacency = (offsets, neighbors)
+        return self._adjacency
+
+    def neighbors(self, node_id):
+        offsets, neighbors = self.adjacency()
+        i = self.node_ids.index(node_id) if not isinstance(node_id, int) else node_id
+        return [self.node_ids[j] for j in neighbors[offsets[i]:offsets[i + 1]]]
+
+    def params(self):
+        """見積の走行条件（distance_m は小数3桁 = mm 単位に丸める）。"""
+        return {
+            "distance_m": round(self.distance_m, 3),
+            "intersection_count": self.intersection_count,
+            "station_count": self.station_count,
+        }
+
+    def summary(self):
+        return {
+            **self.params(),
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "duplicate_edges": self.duplicate_edges,
+        }
+
+
+def _text(f):
+    """バイナリのストリーム（アップロード等）は UTF-8（BOM 可）のテキストとして読む。"""
+    if isinstance(f, io.TextIOBase):
+        return f
+    return io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+
+
+def layout_format(filename):
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".json":
+        return "json"
+    if ext in (".csv", ".txt", ""):
+        return "csv"
+    raise LayoutError(f"対応していない形式です: {ext}（.csv / .json / .jsonl）")
+
+
+def read_layout(f, filename, nodes=None, nodes_filename="nodes"):
+    """
+    レイアウト（ファイルオブジェクト。テキストでもバイナリでも可）を読んで RouteLayout を返す。
+    形式は filename の拡張子で決める。nodes は CSV のときのノード一覧（任意）。不正なら LayoutError。
+    """
+    builder = LayoutBuilder()
+    fmt = layout_format(filename)
+    if fmt == "csv":
+        if nodes is not None:
+            builder.read_nodes_csv(_text(nodes), nodes_filename)
+        builder.read_edges_csv(_text(f), filename)
+    elif fmt == "json":
+        builder.read_json(_text(f), filename)
+    else:
+        builder.read_jsonl(_text(f), filename)
+    return builder.build()
+
+
+def load_layout(path, nodes_path=None):
+    """ファイルパスから read_layout する。"""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if nodes_path is None:
+            return read_layout(f, os.path.basename(path))
+        with open(nodes_path, encoding="utf-8-sig", newline="") as nodes:
+            return read_layout(f, os.path.basename(path), nodes, os.path.basename(nodes_path))
+
+
+def price_layout(layout, vehicle_count=0, rates=None):
+    """レイアウトの走行条件に台数を足し、calc_design_and_setup_amounts の結果を名前付きで返す。"""
+    from app.cost_utils import calc_design_and_setup_amounts
+
+    params = {**layout.params(), "vehicle_count": vehicle_count}
+    amounts = calc_design_and_setup_amounts(params, rates)
+    names = ("design_fee", "design_cost", "design_hours", "setup_fee", "setup_cost", "setup_hours")
+    return params, dict(zip(names, amounts))
@@ -5,3 +5,13 @@ from app.auth_utils import login_required, roles_required
 
 admin_bp = Blueprint("admin", __name__)
 
+
+
+@admin_bp.route("/admin/metrics")
+@login_required
+@roles_required("admin")
+def admin_metrics():
+    """運用メトリクス（書き込みキュー等）を JSON で返す。"""
+    from flask import jsonify
+    from app.metrics import collect_metrics
+    return jsonify(collect_metrics())
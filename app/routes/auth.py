@@ -42,37 +42,32 @@ def login():
     return render_template("login.html", next=next_url)
 
 
-# 監査ログ挿入関数（DBパスはSCART_DB_PATH→SQLALCHEMY_DATABASE_URI→estimates.dbの順で取得）
+# 監査ログ挿入関数（単一ライター経由で非同期に書き込む。失敗してもログイン処理は継続）
 def _insert_login_log(login_id, user_id, result):
-    import os, sqlite3
     from flask import request, current_app
-    db_path = os.environ.get("SCART_DB_PATH")
-    if not db_path:
-        uri = getattr(current_app, "config", {}).get("SQLALCHEMY_DATABASE_URI", "")
-        if uri.startswith("sqlite:///"):
-            db_path = uri.replace("sqlite:///", "", 1)
-    if not db_path:
-        db_path = "estimates.db"
+    from app.write_queue import submit_write
     ip = request.remote_addr or ""
     ua = request.headers.get("User-Agent", "")
     try:
-        conn = sqlite3.connect(db_path, timeout=10)
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO auth_login_log (login_id, user_id, result, ip, user_agent)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (login_id, user_id, result, ip, ua)
-        )
-        conn.commit()
-        conn.close()
+        submit_write("auth_login_log", _write_login_log, login_id, user_id, result, ip, ua)
     except Exception as e:
         try:
             current_app.logger.warning(f"auth_login_log insert failed: {e}")
         except Exception:
             pass
 
+
+def _write_login_log(login_id, user_id, result, ip, ua):
+    from sqlalchemy import text
+    from app import db
+    db.session.execute(
+        text("""
+            INSERT INTO auth_login_log (login_id, user_id, result, ip, user_agent)
+            VALUES (:login_id, :user_id, :result, :ip, :ua)
+        """),
+        {"login_id": login_id, "user_id": user_id, "result": result, "ip": ip, "ua": ua}
+    )
+
 @auth_bp.route("/logout")
 def logout():
     session.clear()
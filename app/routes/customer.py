@@ -2,11 +2,14 @@
 
 from app.services.notifications import notify_customer_status_changed
 from sqlalchemy import text
-from flask import Blueprint, render_template, request, redirect, url_for, flash, g, current_app, session, abort
-from sqlalchemy import or_
+from flask import Blueprint, render_template, request, redirect, url_for, flash, g, current_app, session, abort, jsonify
 from datetime import datetime
 from app.decorators import login_required, roles_required
 from app import db
+from app.write_queue import run_write
+from app.master_versions import mark_tables_changed
+from app.customer_typeahead import get_customer_typeahead
+from app.customer_search import search_customers
 from app.models.customer import Customer, CustomerStatus
 from app.models.customer_approval_log import CustomerApprovalLog
 from app.models.user import User
@@ -46,6 +49,25 @@ def customer_approval_history(customer_id):
     )
 
 
+# 見積フォームの顧客選択（承認済み顧客のタイプアヘッド）
+@customer_bp.route('/customers/typeahead')
+@login_required
+def customer_typeahead():
+    """
+    ?q= に前方一致・部分一致する承認済み顧客を上位 limit 件返す（app/customer_typeahead.py の索引から）。
+    ?id= 指定時はその顧客1件（改定時の初期表示用。承認済みでなければ空）。
+    """
+    typeahead = get_customer_typeahead()
+    customer_id = request.args.get('id', type=int)
+    if customer_id is not None:
+        item = typeahead.get(customer_id)
+        return jsonify({"items": [item] if item else []})
+    default = current_app.config["CUSTOMER_TYPEAHEAD_LIMIT"]
+    limit = request.args.get('limit', default, type=int)
+    limit = max(1, min(limit, current_app.config["CUSTOMER_TYPEAHEAD_MAX_LIMIT"]))
+    return jsonify({"items": typeahead.search(request.args.get('q', ''), limit)})
+
+
 # 与信情報取得ヘルパー
 def get_credit_rows(customer_id):
     credit_rows = list(CustomerCredit.query.filter_by(customer_id=customer_id).order_by(CustomerCredit.fiscal_year.desc()).limit(3))
@@ -100,7 +122,8 @@ def customer_list():
     q = request.args.get('q', '').strip()
     query = Customer.query
     if q:
-        query = query.filter(or_(Customer.name.contains(q), Customer.name_kana.contains(q)))
+        # 全文索引（app/customer_search.py）で絞り込み、関連度順 → 顧客名順に並べる
+        query = search_customers(query, q)
     # 一般ユーザーはapprovedのみ、管理者は全件
     is_admin = g.current_user and getattr(g.current_user, 'role', None) == 'admin'
     if not is_admin:
@@ -249,14 +272,34 @@ def customer_approve(customer_id):
     if not user:
         abort(400)
 
+    approved_by = session.get("user_id")
+    if not approved_by:
+        abort(401)
+
+    # 書き込みは単一ライター経由（app/write_queue.py）
+    approved = run_write("customer_approve", _approve_customer, customer.id, user.id, approved_by)
+    if not approved:
+        flash('既に承認済みです', 'info')
+        return redirect(url_for("customer.customer_list"))
+
+    flash('顧客を承認しました（承認ログ記録済み）', 'success')
+    return redirect(url_for("customer.customer_list"))
+
+
+def _approve_customer(customer_id, user_id, approved_by):
+    """
+    承認の書き込み単位（ライタースレッドで実行、コミットはライター側）。
+    書き込みは直列化されるため、同時承認でも状態確認と更新の間に割り込まれない。承認したら True。
+    """
+    customer = db.session.get(Customer, customer_id)
+    user = db.session.get(User, user_id)
+    if customer.status == CustomerStatus.APPROVED.value:
+        return False
+
     # ユーザー有効化
     user.is_active = 1
 
     # 承認ログ記録（最小構成）
-
-    approved_by = session.get("user_id")
-    if not approved_by:
-        abort(401)
     approval_log = CustomerApprovalLog(
         customer_id=customer.id,
         user_id=user.id,
@@ -267,12 +310,9 @@ def customer_approve(customer_id):
 
     # 顧客ステータス更新
     customer.status = CustomerStatus.APPROVED.value
-    customer.approved_by_user_id = session["user_id"]
+    customer.approved_by_user_id = approved_by
     customer.approved_at = datetime.utcnow()
-    db.session.commit()
-
-    flash('顧客を承認しました（承認ログ記録済み）', 'success')
-    return redirect(url_for("customer.customer_list"))
+    return True
 
 @customer_bp.route('/customers/<int:customer_id>/reject', methods=['POST'])
 @login_required
@@ -280,7 +320,23 @@ def customer_approve(customer_id):
 def customer_reject(customer_id):
     comment = (request.form.get('approval_comment') or request.form.get('comment') or '').strip()
     now = datetime.utcnow()
-    # 原子的UPDATEでpending→rejectedのみ更新
+    # 原子的UPDATEでpending→rejectedのみ更新（単一ライター経由）
+    rowcount = run_write("customer_reject", _reject_customer, customer_id, comment, now)
+    if rowcount == 1:
+        # 却下はDBログを取らず、loggerのみ（設計方針どおり）
+        current_app.logger.info(f"[REJECT] user_id={g.current_user.id} customer_id={customer_id} pending->rejected")
+        # 最新状態取得（404安全化）
+        customer = Customer.query.get_or_404(customer_id)
+        notify_customer_status_changed(customer, 'reject', g.current_user, comment)
+        flash(f"顧客を却下しました（企業名: {customer.name}）", "warning")
+        return redirect(url_for('customer.customer_edit', customer_id=customer.id))
+    else:
+        flash("既に処理済み、または承認待ちではありません", "warning")
+        return redirect(url_for('customer.customer_edit', customer_id=customer_id))
+
+
+def _reject_customer(customer_id, comment, now):
+    """却下の書き込み単位。更新件数（0 or 1）を返す。"""
     result = db.session.execute(
         text("""
             UPDATE customers SET status=:to_status, approval_comment=:comment, rejected_at=:now, approved_at=NULL, approved_by_user_id=NULL
@@ -294,17 +350,7 @@ def customer_reject(customer_id):
             "from_status": CustomerStatus.PENDING.value
         }
     )
-    if result.rowcount == 1:
-        # 却下はDBログを取らず、loggerのみ（設計方針どおり）
-        current_app.logger.info(f"[REJECT] user_id={g.current_user.id} customer_id={customer_id} pending->rejected")
-        db.session.commit()
-        # 最新状態取得（404安全化）
-        customer = Customer.query.get_or_404(customer_id)
-        notify_customer_status_changed(customer, 'reject', g.current_user, comment)
-        flash(f"顧客を却下しました（企業名: {customer.name}）", "warning")
-        return redirect(url_for('customer.customer_edit', customer_id=customer.id))
-    else:
-        db.session.rollback()
-        flash("既に処理済み、または承認待ちではありません", "warning")
-        return redirect(url_for('customer.customer_edit', customer_id=customer_id))
+    # 生 SQL の書き込みはセッションが検知できないため、マスタ版数の更新を明示する
+    mark_tables_changed(db.session, "customers")
+    return result.rowcount
 
@@ -0,0 +1,79 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from app import db
+from app.decorators import login_required, roles_required
+from app.models.logic_config import LogicConfig
+from app.rate_table import get_rate_table, parse_worker_tiers, rate_table_to_row, rate_table_version
+
+logic_config_bp = Blueprint("logic_config", __name__)
+
+# 入力項目（列名, 表示名, 0 を許すか）。売価・原価単価は円/h
+LOGIC_CONFIG_FIELDS = (
+    ("labor_rate", "原価単価（円/h）", False),
+    ("design_rate", "設計 売価単価（円/h）", False),
+    ("setup_rate", "セットアップ 売価単価（円/h）", False),
+    ("design_intersection_hours", "設計: 台数×交差点あたり工数(h)", True),
+    ("design_station_hours", "設計: ステーションあたり工数(h)", True),
+    ("design_meters_per_hour", "設計: 1時間あたり距離(m)", False),
+    ("design_safety_factor", "設計: 安全率", False),
+    ("setup_speed_m_per_min", "AGV速度(m/min)", False),
+    ("setup_station_ct_min", "ステーションあたり CT 加算(分)", True),
+    ("trial_runs_per_vehicle", "1台あたり試運転回数", True),
+    ("bug_fix_hours_per_trial", "試運転1回あたりバグ修正工数(h)", True),
+    ("interlock_hours", "台数×交差点×ステーションあたりインターロック工数(h)", True),
+    ("setup_safety_factor", "セットアップ: 安全率", False),
+    ("default_workers", "人数（どの段階にも当てはまらないとき）", False),
+)
+
+
+def _parse_form(form):
+    """フォーム → (列の dict, エラーメッセージ)。"""
+    values = {}
+    for column, label, allow_zero in LOGIC_CONFIG_FIELDS:
+        raw = form.get(column, "").replace(",", "").strip()
+        try:
+            value = float(raw)
+        except ValueError:
+            return None, f"「{label}」は数値で入力してください。"
+        if value < 0 or (value == 0 and not allow_zero):
+            return None, f"「{label}」は{'0 以上' if allow_zero else '0 より大きい値'}で入力してください。"
+        values[column] = value
+    values["worker_tiers"] = form.get("worker_tiers", "").strip()
+    try:
+        parse_worker_tiers(values["worker_tiers"])
+    except ValueError as e:
+        return None, f"人数の段階（JSON）が不正です: {e}"
+    values["note"] = form.get("note", "").strip() or None
+    return values, None
+
+
+# 計算ロジック管理（単価表の版の一覧と新しい版の登録・管理者のみ）
+@logic_config_bp.route("/logic-configs", methods=["GET", "POST"])
+@login_required
+@roles_required("admin")
+def logic_config_list():
+    error = None
+    active = get_rate_table()
+    values = rate_table_to_row(active)
+    values["note"] = ""
+    if request.method == "POST":
+        parsed, error = _parse_form(request.form)
+        if parsed is None:
+            values = {**values, **{k: request.form.get(k, "") for k in values}}
+        else:
+            # 既存の版は書き換えず、新しい行を追加する（コミット時に単価表の版数が上がり、次の計算から使われる）
+            config = LogicConfig(created_by=session.get("user_id"), **parsed)
+            db.session.add(config)
+            db.session.commit()
+            flash(f"単価表 {rate_table_version(config.id)} を登録しました。以後の見積に適用されます。", "success")
+            return redirect(url_for("logic_config.logic_config_list"))
+
+    configs = LogicConfig.query.order_by(LogicConfig.id.desc()).all()
+    return render_template(
+        "logic_config_list.html",
+        error=error,
+        values=values,
+        fields=LOGIC_CONFIG_FIELDS,
+        configs=configs,
+        active_version=active.version,
+        version_of=rate_table_version,
+    )
@@ -1,14 +1,29 @@
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app, jsonify
 from app import db
+from app.write_queue import run_write
+from app.catalog_cache import resolve_products
+from app.form_master import get_form_master
+from app.pricing_grid import PricingGridError, get_pricing_grid
+from app.route_layout import LayoutError, price_layout, read_layout
+from app.decorators import login_required
+from app.services.quotation_details import insert_detail_lines
+from app.services.quotation_totals import quotation_totals, refresh_quotation_totals
+from app.quotation_search import (
+    get_quotation_search, index_quotation, make_snippet, parse_search_query, unindex_quotations,
+)
 from app.models.quotation import Quotation
 from app.models.quotation_detail import QuotationDetail
-from app.models.product import Product
-from app.models.customer import Customer, CustomerStatus
-from sqlalchemy.orm import joinedload
-from datetime import datetime
-from app.cost_utils import calc_design_setup_for_quotation
-from sqlalchemy import func
+from app.models.customer import Customer
+from datetime import datetime, timedelta
+from app.cost_utils import (
+    TRAVEL_PARAM_KEYS, calc_design_setup_breakdown, current_rate_table, parse_travel_params, stored_design_setup,
+)
+from sqlalchemy import func, tuple_, type_coerce, String
+from werkzeug.exceptions import RequestEntityTooLarge
+import base64
+import math
+import time
 
 quotation_bp = Blueprint("quotation", __name__)
 
@@ -19,11 +34,14 @@ quotation_bp = Blueprint("quotation", __name__)
 def quotation_revise(quotation_id):
     orig = Quotation.query.get_or_404(quotation_id)
     details = QuotationDetail.query.filter_by(quotation_id=orig.id).all()
-    # values: id, created_at, updated_at, original_id, revision_no を除外
-    values = {c.name: getattr(orig, c.name) for c in Quotation.__table__.columns if c.name not in ("id", "created_at", "updated_at", "original_id", "revision_no")}
+    # values: id, created_at, updated_at, original_id, revision_no と系列の集計列を除外
+    values = {c.name: getattr(orig, c.name) for c in Quotation.__table__.columns if c.name not in ("id", "created_at", "updated_at", "original_id", "revision_no", "latest_revision_id", "revision_count")}
     # customer_idをvaluesに追加（テンプレ互換のため str に揃える）
     cust_id = getattr(orig, "customer_id", None)
     values["customer_id"] = str(cust_id) if cust_id else ""
+    # 保存した走行条件をフォームの入力値に戻す（未入力は空欄）
+    for key in TRAVEL_PARAM_KEYS:
+        values[key] = "" if values.get(key) is None else f"{values[key]:g}"
     # customer_idがあればcompany_nameをCustomer.nameで上書き（int変換ガード、valuesから一貫して参照）
     cust_id_int = None
     try:
@@ -35,47 +53,136 @@ def quotation_revise(quotation_id):
         if cust:
             values["company_name"] = cust.name
 
-    # 顧客リスト（approvedのみ、未承認顧客は選択不可）
-    customers_query = Customer.query.options(joinedload(Customer.payment_term_ref)).filter(Customer.status == CustomerStatus.APPROVED.value).order_by(Customer.name).all()
-    customers_json = [
-        {"id": c.id, "name": c.name, "name_kana": c.name_kana} for c in customers_query
-    ]
-    customers_meta = {
-        str(c.id): {
-            "name": c.name or "",
-            "payment_term_name": (c.payment_term_ref.name if c.payment_term_ref else "") or "",
-            "payment_terms_legacy": c.payment_terms or ""
-        }
-        for c in customers_query
-    }
     # details: id, quotation_id, created_at, updated_at を除外
     detail_dicts = []
     for d in details:
         dct = {c.name: getattr(d, c.name) for c in QuotationDetail.__table__.columns if c.name not in ("id", "quotation_id", "created_at", "updated_at")}
         detail_dicts.append(dct)
-    # product_list: 新規作成と同じ形式
-    products_query = Product.query.order_by(Product.name).all()
-    product_list = [
-        {
-            "id": p.id,
-            "name": p.name,
-            "unit_price": p.unit_price,
-            "cost": p.cost,
-            "note": p.note,
-        }
-        for p in products_query
-    ]
+    # 商品マスタはページに埋め込まず /quotation/form-master から、顧客は /customers/typeahead から読む
     return render_template(
         "quotation_form.html",
         error=None,
-        products=product_list,
         values=values,
         details=detail_dicts,
         revise_source_id=orig.id,
-        customers=customers_json,
-        customers_meta=customers_meta
+        **_form_master_context()
     )
 
+
+def _form_master_context():
+    master = get_form_master()
+    rules = current_rate_table().rules
+    return {
+        "form_master_version": master.etag,
+        "form_master_url": url_for("quotation.quotation_form_master", v=master.etag),
+        "customer_typeahead_url": url_for("customer.customer_typeahead"),
+        "pricing_rules_url": url_for("quotation.quotation_pricing_rules", v=rules.etag),
+    }
+
+
+@quotation_bp.route("/quotation/form-master")
+def quotation_form_master():
+    """
+    見積フォーム用マスタ（商品）の JSON。顧客は /customers/typeahead で引く。アクセス条件は見積フォームと同じ。
+    ?v= がフォームに載せた版数と一致すればブラウザに max-age の間キャッシュさせ、
+    それ以外は毎回 ETag で再検証させる（変わっていなければ 304）。
+    """
+    master = get_form_master()
+    if master.etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(master.body, mimetype="application/json")
+    response.set_etag(master.etag)
+    if request.args.get("v") == master.etag:
+        response.headers["Cache-Control"] = f"private, max-age={current_app.config['FORM_MASTER_MAX_AGE']}"
+    else:
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@quotation_bp.route("/quotation/pricing-rules.js")
+def quotation_pricing_rules():
+    """
+    見積フォームの設計/セットアップ費用プレビュー用の計算式（app/pricing_rules.py が現在の単価表から生成した JS）。
+    キャッシュの扱いは /quotation/form-master と同じ（?v= が一致すれば max-age、それ以外は ETag で再検証）。
+    """
+    rules = current_rate_table().rules
+    if rules.etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(rules.js, mimetype="text/javascript")
+    response.set_etag(rules.etag)
+    if request.args.get("v") == rules.etag:
+        response.headers["Cache-Control"] = f"private, max-age={current_app.config['FORM_MASTER_MAX_AGE']}"
+    else:
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@quotation_bp.route("/quotation/pricing-grid")
+@login_required
+def quotation_pricing_grid():
+    """
+    設計/セットアップ費用の what-if グリッド（app/pricing_grid.py）の JSON。
+    ?vehicle_count=3,5,8&distance_m=200-800:100&intersection_count=...&station_count=...&fields=design_fee,...
+    指定が不正・セル数超過は 400。本文は単価表の版ごとにキャッシュし、ETag で再検証させる。
+    """
+    try:
+        grid = get_pricing_grid(request.args, request.args.get("fields"))
+    except PricingGridError as e:
+        return jsonify({"error": str(e)}), 400
+    if grid.etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(grid.body, mimetype="application/json")
+    response.set_etag(grid.etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@quotation_bp.route("/quotation/layout-params", methods=["POST"])
+@login_required
+def quotation_layout_params():
+    """
+    AGV 走行レイアウト（app/route_layout.py）から走行条件と設計/セットアップ費用を返す JSON。
+    multipart: layout（.csv / .json / .jsonl）、nodes（任意。layout が CSV のときのノード一覧）、vehicle_count（任意）。
+    形式・値が不正は 400、LAYOUT_IMPORT_MAX_BYTES 超は 413。
+    上限は本文を読みながら掛ける（Content-Length の無いチャンク転送でも上限を超えたところで打ち切る）。
+    """
+    max_bytes = current_app.config["LAYOUT_IMPORT_MAX_BYTES"]
+    request.max_content_length = max_bytes
+    try:
+        layout_file = request.files.get("layout")
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"ファイルが大きすぎます（上限 {max_bytes} バイト）"}), 413
+    if layout_file is None or not layout_file.filename:
+        return jsonify({"error": "layout ファイルを指定してください"}), 400
+    try:
+        vehicle_count = float(request.form.get("vehicle_count") or 0)
+    except ValueError:
+        return jsonify({"error": "vehicle_count は数値で指定してください"}), 400
+    if not math.isfinite(vehicle_count):
+        return jsonify({"error": "vehicle_count は有限の数値で指定してください"}), 400
+    nodes_file = request.files.get("nodes")
+    if nodes_file is not None and not nodes_file.filename:
+        nodes_file = None
+
+    t0 = time.perf_counter()
+    try:
+        layout = read_layout(layout_file.stream, layout_file.filename,
+                             nodes_file.stream if nodes_file else None,
+                             nodes_file.filename if nodes_file else "nodes")
+    except (LayoutError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+    params, amounts = price_layout(layout, vehicle_count)
+    return jsonify({
+        "params": params,
+        "amounts": amounts,
+        "layout": layout.summary(),
+        "rate_table_version": current_rate_table().version,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+    })
+
 # 印刷用見積書の明細並び順ヘルパー
 def sort_details_for_display(details):
     design_labels = ("設計費", "設計費（パラメータ）")
@@ -99,83 +206,198 @@ def sort_details_for_display(details):
 def quotation_view(quotation_id):
     quotation = Quotation.query.get_or_404(quotation_id)
     details = sort_details_for_display(quotation.details)
-    # 合計金額
-    if hasattr(quotation, 'total_amount') and quotation.total_amount is not None:
-        total = quotation.total_amount
-    else:
-        total = sum([getattr(d, 'subtotal', 0) or 0 for d in details])
+    # 金額は保存時に集計済みの列を使う（テンプレート側では再計算しない）
+    totals = quotation_totals(quotation)
 
-    # --- 新ロジックで設計/セットアップ費用計算 ---
-    try:
-        design_setup = calc_design_setup_for_quotation(quotation)
-        if not isinstance(design_setup, dict):
-            raise ValueError("design_setup is not dict")
-    except Exception:
-        from flask import current_app
-        current_app.logger.exception("failed to calc design/setup amounts for quotation %s", quotation_id)
-        design_setup = {
-            "design_hours": 0,
-            "design_cost": 0,
-            "design_fee": 0,
-            "design_profit_rate": 0,
-            "setup_hours": 0,
-            "setup_cost": 0,
-            "setup_fee": 0,
-            "setup_profit_rate": 0,
-        }
+    # 設計/セットアップの内訳も保存時の値を使う（単価が変わっても発行済みの見積は変わらない）
+    design_setup = stored_design_setup(quotation)
 
     return render_template(
         "quotation_view.html",
         quotation=quotation,
         details=details,
-        total_amount=total,
+        totals=totals,
         design_setup=design_setup,
     )
 
 
-# original_id/revision_noのNULL補正（必要時のみ実行、bulk update）
-def normalize_revision_fields():
-    needs_update = False
-    if db.session.query(Quotation).filter(Quotation.original_id == None).count() > 0:
-        db.session.query(Quotation).filter(Quotation.original_id == None).update({Quotation.original_id: Quotation.id}, synchronize_session=False)
-        needs_update = True
-    if db.session.query(Quotation).filter(Quotation.revision_no == None).count() > 0:
-        db.session.query(Quotation).filter(Quotation.revision_no == None).update({Quotation.revision_no: 0}, synchronize_session=False)
-        needs_update = True
-    if needs_update:
-        db.session.commit()
+# --- 見積一覧のキーセットページング ---
+# 並び順は (created_at DESC, id DESC)。カーソルは直前ページ末尾の (created_at, id) を
+# base64 にしたもので、OFFSET を使わないため履歴が何年分あっても各ページのコストは一定。
+# created_at は DB に保存された文字列のまま比較する（旧データは CURRENT_TIMESTAMP 形式で
+# マイクロ秒が無く、datetime をバインドすると ORDER BY と比較順が食い違うため）。
+
+def _created_at_text():
+    return type_coerce(Quotation.created_at, String)
+
+
+def encode_list_cursor(created_at_text, quotation_id):
+    raw = f"{created_at_text}|{quotation_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_list_cursor(cursor):
+    """不正なカーソルは None（先頭ページ扱い）。"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at_text, quotation_id = raw.rsplit("|", 1)
+        return created_at_text, int(quotation_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d") if value else None
+    except ValueError:
+        return None
+
+
+def _list_filters(args):
+    """一覧の検索条件（画面の入力値そのまま。テンプレートでフォームに戻す）。"""
+    return {
+        "customer_id": args.get("customer_id", "").strip(),
+        "company": args.get("company", "").strip(),
+        "estimator": args.get("estimator", "").strip(),
+        "project": args.get("project", "").strip(),
+        "date_from": args.get("date_from", "").strip(),
+        "date_to": args.get("date_to", "").strip(),
+    }
+
+
+def _list_page_size(args):
+    from flask import current_app
+    default = current_app.config["QUOTATION_LIST_PAGE_SIZE"]
+    try:
+        size = int(args.get("page_size", default))
+    except ValueError:
+        size = default
+    return max(1, min(size, current_app.config["QUOTATION_LIST_MAX_PAGE_SIZE"]))
+
+
+def _contains(column, text):
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.like(f"%{escaped}%", escape="\\")
+
 
 @quotation_bp.route("/quotations")
 def quotation_list():
-    normalize_revision_fields()
-    # originals: revision_no==0のみ
-    originals = Quotation.query.filter(Quotation.revision_no == 0).order_by(Quotation.created_at.desc()).all()
-    # original_idごとに最新改定（DBでmaxを取得）
-    orig_ids = [o.id for o in originals]
+    filters = _list_filters(request.args)
+    page_size = _list_page_size(request.args)
+
+    # originals: revision_no==0のみ（ix_quotations_revision_created の順で読む）
+    query = Quotation.query.filter(Quotation.revision_no == 0)
+    if filters["customer_id"].isdigit():
+        query = query.filter(Quotation.customer_id == int(filters["customer_id"]))
+    if filters["company"]:
+        query = query.filter(_contains(Quotation.company_name, filters["company"]))
+    if filters["estimator"]:
+        query = query.filter(_contains(Quotation.estimator_name, filters["estimator"]))
+    if filters["project"]:
+        query = query.filter(_contains(Quotation.project_name, filters["project"]))
+    # 日付は 'YYYY-MM-DD' 文字列で比較する（保存形式に依らず日付単位で正しく絞れる）
+    date_from = _parse_date(filters["date_from"])
+    if date_from:
+        query = query.filter(_created_at_text() >= date_from.strftime("%Y-%m-%d"))
+    date_to = _parse_date(filters["date_to"])
+    if date_to:
+        query = query.filter(_created_at_text() < (date_to + timedelta(days=1)).strftime("%Y-%m-%d"))
+
+    cursor = decode_list_cursor(request.args.get("cursor", ""))
+    if cursor:
+        query = query.filter(tuple_(_created_at_text(), Quotation.id) < tuple_(*cursor))
+
+    # 1件多く読んで次ページの有無を判定する
+    rows = (
+        query.add_columns(_created_at_text().label("created_at_text"))
+        .order_by(Quotation.created_at.desc(), Quotation.id.desc())
+        .limit(page_size + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_list_cursor(rows[-1].created_at_text, rows[-1][0].id)
+    originals = [row[0] for row in rows]
+
+    # 系列ごとの最新改定（rev0 が保持する latest_revision_id を主キーで引く）
+    latest_ids = [o.latest_revision_id for o in originals if o.latest_revision_id and o.latest_revision_id != o.id]
     latest_rev_map = {}
-    if orig_ids:
-        subq = (
-            db.session.query(
-                Quotation.original_id,
-                func.max(Quotation.revision_no).label("max_rev")
-            )
-            .filter(Quotation.original_id.in_(orig_ids), Quotation.revision_no > 0)
-            .group_by(Quotation.original_id)
-            .subquery()
-        )
-        latests = (
-            db.session.query(Quotation)
-            .join(subq, (Quotation.original_id == subq.c.original_id) & (Quotation.revision_no == subq.c.max_rev))
-            .all()
-        )
-        for row in latests:
+    if latest_ids:
+        for row in Quotation.query.filter(Quotation.id.in_(latest_ids)).all():
             latest_rev_map[row.original_id] = row
     quotations = []
     for orig in originals:
         quotations.append(orig)
         if orig.id in latest_rev_map:
             quotations.append(latest_rev_map[orig.id])
-    return render_template("quotation_list.html", quotations=quotations)
+
+    # ページ送りリンク用（カーソル以外の条件は引き継ぐ）
+    link_args = {k: v for k, v in filters.items() if v}
+    if "page_size" in request.args:
+        link_args["page_size"] = page_size
+    return render_template(
+        "quotation_list.html",
+        quotations=quotations,
+        filters=filters,
+        page_size=page_size,
+        link_args=link_args,
+        next_cursor=next_cursor,
+        is_first_page=cursor is None,
+    )
+
+
+@quotation_bp.route("/quotations/search")
+def quotation_search():
+    """
+    見積ヘッダと明細の全文検索（app/quotation_search.py）。改定も1件ずつヒットする。
+    並び順・カーソルは一覧と同じ (created_at DESC, id DESC) のキーセット。customer_id / date_from / date_to で絞れる。
+    """
+    q = request.args.get("q", "").strip()
+    filters = _list_filters(request.args)
+    page_size = _list_page_size(request.args)
+    terms = parse_search_query(q)
+    results = []
+    next_cursor = None
+    cursor = decode_list_cursor(request.args.get("cursor", ""))
+    if terms:
+        query = get_quotation_search().apply(Quotation.query, terms)
+        if filters["customer_id"].isdigit():
+            query = query.filter(Quotation.customer_id == int(filters["customer_id"]))
+        date_from = _parse_date(filters["date_from"])
+        if date_from:
+            query = query.filter(_created_at_text() >= date_from.strftime("%Y-%m-%d"))
+        date_to = _parse_date(filters["date_to"])
+        if date_to:
+            query = query.filter(_created_at_text() < (date_to + timedelta(days=1)).strftime("%Y-%m-%d"))
+        if cursor:
+            query = query.filter(tuple_(_created_at_text(), Quotation.id) < tuple_(*cursor))
+        rows = (
+            query.add_columns(_created_at_text().label("created_at_text"))
+            .order_by(Quotation.created_at.desc(), Quotation.id.desc())
+            .limit(page_size + 1)
+            .all()
+        )
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_list_cursor(rows[-1].created_at_text, rows[-1][0].id)
+        results = [(row[0], make_snippet(row._mapping, terms)) for row in rows]
+
+    link_args = {k: v for k, v in filters.items() if v and k in ("customer_id", "date_from", "date_to")}
+    if q:
+        link_args["q"] = q
+    if "page_size" in request.args:
+        link_args["page_size"] = page_size
+    return render_template(
+        "quotation_search.html",
+        q=q,
+        results=results,
+        filters=filters,
+        page_size=page_size,
+        link_args=link_args,
+        next_cursor=next_cursor,
+        is_first_page=cursor is None,
+    )
 
 
 @quotation_bp.route("/quotation/new", methods=["GET", "POST"])
@@ -184,32 +406,6 @@ def quotation_new():
     import logging
     logging.info("[quotation_new] method=%s path=%s url=%s referrer=%s revise_source_id=%s", request.method, request.path, request.url, request.referrer, request.form.get("revise_source_id"))
     error = None
-    # Productモデルのリストを取得し、JSONシリアライズ可能な辞書リストに変換
-    products_query = Product.query.order_by(Product.name).all()
-    product_list = [
-        {
-            "id": p.id,
-            "name": p.name,
-            "unit_price": p.unit_price,
-            "cost": p.cost,
-            "note": p.note,
-        }
-        for p in products_query
-    ]
-
-    # Customerリスト: approvedのみ（admin/一般共通、未承認顧客は選択不可）
-    customers_query = Customer.query.options(joinedload(Customer.payment_term_ref)).filter(Customer.status == CustomerStatus.APPROVED.value).order_by(Customer.name).all()
-    customers_json = [
-        {"id": c.id, "name": c.name, "name_kana": c.name_kana} for c in customers_query
-    ]
-    customers_meta = {
-        str(c.id): {
-            "name": c.name or "",
-            "payment_term_name": (c.payment_term_ref.name if c.payment_term_ref else "") or "",
-            "payment_terms_legacy": c.payment_terms or ""
-        }
-        for c in customers_query
-    }
     # ヘッダ入力値保持用
     values = {
         "company_name": "",
@@ -280,7 +476,7 @@ def quotation_new():
 
 
         details = []
-        total = 0
+        extra_cost = 0.0  # 商品に紐付かない明細（設計費・現地セットアップ費）の原価
         for idx in range(len(product_ids)):
             # 1) raw文字列取得
             product_id_raw = (product_ids[idx] if idx < len(product_ids) else '').strip()
@@ -323,12 +519,6 @@ def quotation_new():
             else:
                 product_id = None
 
-            # descriptionが空でproduct_idが指定されている場合はProduct.nameをセット
-            if not desc and product_id is not None:
-                product = Product.query.get(product_id)
-                if product:
-                    desc = product.name
-
             # 7) QuotationDetailインスタンス生成
             detail_kwargs = dict(
                 product_id=product_id,
@@ -342,9 +532,17 @@ def quotation_new():
             if hasattr(QuotationDetail, 'description'):
                 detail_kwargs['description'] = desc
 
-            detail = QuotationDetail(**detail_kwargs)
-            details.append(detail)
-            total += subtotal_val
+            # 保存はライタースレッドで行うため、ここでは列値の dict のみ作る
+            details.append(detail_kwargs)
+
+        # descriptionが空でproduct_idが指定されている行はProduct.nameをセット（全行まとめて解決）
+        products_by_id = resolve_products(
+            d["product_id"] for d in details if d["product_id"] is not None and not d.get("description")
+        )
+        for d in details:
+            product = products_by_id.get(d["product_id"]) if not d.get("description") else None
+            if product:
+                d["description"] = product["name"]
 
         # --- 明細件数と内容をログ出力 ---
         from flask import current_app
@@ -352,33 +550,27 @@ def quotation_new():
         for d in details:
             current_app.logger.info(
                 "quotation_new detail: product_id=%s, code=%s, description=%s, quantity=%s, price=%s, subtotal=%s",
-                getattr(d, "product_id", None),
-                getattr(d, "code", None),
-                getattr(d, "description", None),
-                getattr(d, "quantity", None),
-                getattr(d, "price", None),
-                getattr(d, "subtotal", None),
+                d.get("product_id"),
+                d.get("code"),
+                d.get("description"),
+                d.get("quantity"),
+                d.get("price"),
+                d.get("subtotal"),
             )
 
         # --- 設計費・現地セットアップ費の自動計算（パラメーター優先） ---
 
-        from app.cost_utils import calc_design_and_setup_amounts
-
-        # パラメータ入力値をdictでまとめて渡す
-        param_dict = {
-            "distance_m": values["distance_m"],
-            "intersection_count": values["intersection_count"],
-            "station_count": values["station_count"],
-            "vehicle_count": values["vehicle_count"],
-            "equipment_count": values["equipment_count"],
-            "circuit_difficulty": values["circuit_difficulty"],
-        }
+        # パラメータ入力値を数値にして見積に保存する（内訳も同じ値から計算して保存）
+        param_dict = parse_travel_params(values)
+        design_setup = {}
 
         # パラメータがすべて未入力なら設計費・現地セットアップ費は追加しない
-        if not (param_dict["distance_m"] or param_dict["intersection_count"] or param_dict["station_count"]):
+        if not (values["distance_m"] or values["intersection_count"] or values["station_count"]):
             pass
         else:
-            design_fee, design_cost, design_hours, setup_fee, setup_cost, setup_hours = calc_design_and_setup_amounts(param_dict)
+            design_setup = calc_design_setup_breakdown(param_dict)
+            design_fee, design_cost = design_setup["design_fee"], design_setup["design_cost"]
+            setup_fee, setup_cost = design_setup["setup_fee"], design_setup["setup_cost"]
             # 設計費
             if design_fee > 0:
                 design_kwargs = dict(
@@ -392,8 +584,8 @@ def quotation_new():
                     design_kwargs["code"] = ""
                 if hasattr(QuotationDetail, "description"):
                     design_kwargs["description"] = "設計費（走行条件）"
-                details.append(QuotationDetail(**design_kwargs))
-                total += design_fee
+                details.append(design_kwargs)
+                extra_cost += design_cost
             # 現地セットアップ費
             if setup_fee > 0:
                 setup_kwargs = dict(
@@ -407,8 +599,8 @@ def quotation_new():
                     setup_kwargs["code"] = ""
                 if hasattr(QuotationDetail, "description"):
                     setup_kwargs["description"] = "現地セットアップ費（走行条件）"
-                details.append(QuotationDetail(**setup_kwargs))
-                total += setup_fee
+                details.append(setup_kwargs)
+                extra_cost += setup_cost
 
         if not error and not details:
             error = "明細行が1つ以上必要です。"
@@ -434,95 +626,96 @@ def quotation_new():
             # 顧客IDがある場合はcompany_nameをCustomer.nameで上書き
             values["company_name"] = cust_obj.name
             # 顧客IDが空の場合はcompany_nameはそのまま
+            header = dict(
+                company_name=values["company_name"],
+                contact_name=values["contact_name"],
+                project_name=values["project_name"],
+                delivery_date=values["delivery_date"],
+                delivery_terms=values["delivery_terms"],
+                payment_terms=values["payment_terms"],
+                valid_until=values["valid_until"],
+                remarks=values["remarks"],
+                estimator_name=values.get("estimator_name", ""),
+                discount_rate=values.get("discount_rate", 0.0),
+                customer_id=cust_id_int,
+                **param_dict,
+                **design_setup,
+            )
+            original_id = None
             if revise_source_id:
-                # 改定保存: 系列max(revision_no)+1を採番
                 src = Quotation.query.get_or_404(int(revise_source_id))
                 original_id = src.original_id or src.id
-                max_rev = db.session.query(func.max(Quotation.revision_no)).filter(Quotation.original_id == original_id).scalar() or 0
-                revision_no = int(max_rev) + 1
-                quotation = Quotation(
-                    company_name=values["company_name"],
-                    contact_name=values["contact_name"],
-                    project_name=values["project_name"],
-                    delivery_date=values["delivery_date"],
-                    delivery_terms=values["delivery_terms"],
-                    payment_terms=values["payment_terms"],
-                    valid_until=values["valid_until"],
-                    remarks=values["remarks"],
-                    estimator_name=values.get("estimator_name", ""),
-                    discount_rate=values.get("discount_rate", 0.0),
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow(),
-                    original_id=original_id,
-                    revision_no=revision_no,
-                    customer_id=cust_id_int
-                )
-            else:
-                # 新規保存
-                quotation = Quotation(
-                    company_name=values["company_name"],
-                    contact_name=values["contact_name"],
-                    project_name=values["project_name"],
-                    delivery_date=values["delivery_date"],
-                    delivery_terms=values["delivery_terms"],
-                    payment_terms=values["payment_terms"],
-                    valid_until=values["valid_until"],
-                    remarks=values["remarks"],
-                    estimator_name=values.get("estimator_name", ""),
-                    discount_rate=values.get("discount_rate", 0.0),
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow(),
-                    customer_id=cust_id_int
-                )
-            db.session.add(quotation)
-            db.session.flush()  # quotation.id を確定
-
-            if not revise_source_id:
-                quotation.original_id = quotation.id
-                quotation.revision_no = 0
-
-            for d in details:
-                d.quotation_id = quotation.id
-                db.session.add(d)
-
-            # 合計金額をQuotationにセット（total_amount列があれば）
-            if hasattr(quotation, 'total_amount'):
-                quotation.total_amount = total
-
-            db.session.commit()
+            # 保存は単一ライター経由（採番と INSERT が直列化されるため改定番号が重複しない）
+            quotation_id = run_write("quotation_new", _save_quotation, header, details, original_id, extra_cost)
             flash("見積を登録しました。", "success")
-            return redirect(url_for("quotation.quotation_view", quotation_id=quotation.id))
+            return redirect(url_for("quotation.quotation_view", quotation_id=quotation_id))
 
         # エラー時：ヘッダ入力値をテンプレートに渡す
         return render_template(
             "quotation_form.html",
             error=error,
-            products=product_list,
             values=values,
-            customers=customers_json,
-            customers_meta=customers_meta
+            **_form_master_context()
         )
 
-    # GET 時：ヘッダ初期値と products, customers を渡す
+    # GET 時：ヘッダ初期値とマスタ JSON の URL（版数付き）を渡す
     return render_template(
         "quotation_form.html",
         error=error,
-        products=product_list,
         values=values,
-        customers=customers_json,
-        customers_meta=customers_meta
+        **_form_master_context()
     )
 
+def _save_quotation(header, details, original_id=None, extra_cost=0.0):
+    """
+    見積保存の書き込み単位（ライタースレッドで実行、コミットはライター側）。
+    original_id 指定時は改定として系列 max(revision_no)+1 を採番する。保存した見積 id を返す。
+    extra_cost は商品に紐付かない明細（設計費・現地セットアップ費）の原価合計。
+    """
+    now = datetime.utcnow()
+    quotation = Quotation(created_at=now, updated_at=now, **header)
+    if original_id:
+        # 改定保存: 系列max(revision_no)+1を採番
+        max_rev = db.session.query(func.max(Quotation.revision_no)).filter(Quotation.original_id == original_id).scalar() or 0
+        quotation.original_id = original_id
+        quotation.revision_no = int(max_rev) + 1
+    db.session.add(quotation)
+    db.session.flush()  # quotation.id を確定
+
+    if not original_id:
+        quotation.original_id = quotation.id
+        quotation.revision_no = 0
+        quotation.latest_revision_id = quotation.id
+        quotation.revision_count = 1
+    else:
+        # 系列の rev0 に最新改定ポインタを反映（書き込みは直列化されているので競合しない）
+        db.session.query(Quotation).filter(Quotation.id == original_id).update(
+            {
+                Quotation.latest_revision_id: quotation.id,
+                Quotation.revision_count: func.coalesce(Quotation.revision_count, 1) + 1,
+            },
+            synchronize_session=False,
+        )
+
+    insert_detail_lines(quotation.id, details)
+    index_quotation(quotation.id, header, [d.get("description") for d in details])
+
+    refresh_quotation_totals(quotation, extra_cost)
+    return quotation.id
+
+
 # 見積削除（例: /quotation/<int:quotation_id>/delete）
 @quotation_bp.route("/quotation/<int:quotation_id>/delete", methods=["POST"])
 def quotation_delete(quotation_id):
     quotation = Quotation.query.get_or_404(quotation_id)
     # グループID（original_idがあればそれ、なければ自分）
+    # 系列ごと削除するため rev0 の latest_revision_id / revision_count の更新は不要
     group_id = quotation.original_id or quotation.id
     targets = Quotation.query.filter((Quotation.id == group_id) | (Quotation.original_id == group_id)).all()
     for qq in targets:
         QuotationDetail.query.filter_by(quotation_id=qq.id).delete(synchronize_session=False)
         db.session.delete(qq)
+    unindex_quotations([qq.id for qq in targets])
     db.session.commit()
     flash("見積を削除しました。", "success")
     return redirect(url_for("quotation.quotation_list"))
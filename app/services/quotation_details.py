@@ -0,0 +1,39 @@
+"""
+見積明細の一括書き込み
+
+明細を1行ずつ db.session.add() すると、行数ぶんの ORM オブジェクト生成と unit of work の
+処理が保存時間の大半を占める（部品表のような数百〜千行の見積で顕著）。
+insert_detail_lines() は Core の INSERT を1回の executemany で実行し、採番された id を返す。
+（SQLite では RETURNING の行順が保証されず、順序付きの RETURNING を求めると SQLAlchemy が
+1行ずつの INSERT に落とすため使わない。id は同じ見積の末尾 N 件を読み直して得る。
+書き込みは単一ライターで直列化されており、トランザクション内の採番は挿入順に単調増加する。）
+
+ORM を通らないため、同じセッションに読み込み済みの Quotation.details には反映されない
+（必要なら expire する）。集計列は refresh_quotation_totals() が SQL で集計するので影響しない。
+"""
+from sqlalchemy import insert, select
+
+from app import db
+from app.models.quotation_detail import QuotationDetail
+
+_DETAIL_TABLE = QuotationDetail.__table__
+# id / quotation_id 以外の列（行 dict に無いキーは NULL）
+_LINE_COLUMNS = tuple(c.name for c in _DETAIL_TABLE.columns if c.name not in ("id", "quotation_id"))
+
+
+def insert_detail_lines(quotation_id, lines):
+    """
+    lines（QuotationDetail の列名 → 値の dict の列）を quotation_id の明細として一括 INSERT し、
+    採番された id のリストを行順で返す。コミットは呼び出し側。
+    """
+    if not lines:
+        return []
+    rows = [{"quotation_id": quotation_id, **{c: line.get(c) for c in _LINE_COLUMNS}} for line in lines]
+    db.session.execute(insert(_DETAIL_TABLE), rows)
+    ids = db.session.execute(
+        select(_DETAIL_TABLE.c.id)
+        .where(_DETAIL_TABLE.c.quotation_id == quotation_id)
+        .order_by(_DETAIL_TABLE.c.id.desc())
+        .limit(len(rows))
+    ).scalars().all()
+    return ids[::-1]
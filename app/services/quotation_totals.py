@@ -0,0 +1,92 @@
+"""
+見積ヘッダの金額集計（小計・値引額・合計・原価・粗利）
+
+明細を書き込んだ処理は同じトランザクション内で refresh_quotation_totals() を呼び、
+quotations の集計列を更新する。表示・一覧・帳票は集計列を読むだけで quotation_details に触れない。
+
+- 小計 = 明細 subtotal の合計
+- 値引額 = floor(小計 × 値引率 / 100)（見積書の「出精値引き」と同じ切り捨て）
+- 原価 = 商品明細の Product.cost × 数量 の合計 + extra_cost（設計費・現地セットアップ費の原価）
+- 粗利 = 合計 − 原価、粗利率(%) = 粗利 × 100 / 合計（合計 0 以下なら 0）
+走行条件の内訳（design_cost / setup_cost）を保存していない見積（v8 より前）の設計費・現地セットアップ費の原価は
+legacy_design_setup_cost() で明細の金額から戻す。migrations.py の v5 バックフィルと v10 の補正は同じ式を SQL で
+書いている。変更するときは両方を揃えること。
+"""
+import math
+
+from sqlalchemy import func
+
+from app import db
+from app.models.product import Product
+from app.models.quotation_detail import QuotationDetail
+
+# v8 より前の走行条件の明細は v6 の定数（原価 7920 円/時、設計・セットアップとも売価 15000 円/時）で作っていたため、
+# 明細の金額 × 7920 / 15000 がそのときの原価になる（単価表の版が入る前なので、保存時の定数はこれだけ）
+LEGACY_DESIGN_SETUP_LABELS = ("設計費（パラメータ）", "現地セットアップ（パラメータ）")
+LEGACY_LABOR_RATE = 7920
+LEGACY_SELL_RATE = 15000
+
+
+def compute_totals(subtotal, discount_rate, cost):
+    """集計列の値を dict で返す（DB に触れない）。"""
+    subtotal = float(subtotal or 0)
+    cost = float(cost or 0)
+    discount = float(math.floor(subtotal * float(discount_rate or 0) / 100))
+    total = subtotal - discount
+    margin = total - cost
+    return {
+        "subtotal_amount": subtotal,
+        "discount_amount": discount,
+        "total_amount": total,
+        "cost_amount": cost,
+        "gross_margin_amount": margin,
+        "gross_margin_rate": margin * 100.0 / total if total > 0 else 0.0,
+    }
+
+
+def refresh_quotation_totals(quotation, extra_cost=0.0):
+    """
+    quotation の明細から集計列を計算し直して設定する（コミットは呼び出し側）。
+    明細の合計と原価は1回の集計クエリで取る。未 flush の明細は autoflush で反映される。
+    """
+    subtotal, cost = db.session.query(
+        func.coalesce(func.sum(QuotationDetail.subtotal), 0),
+        func.coalesce(func.sum(Product.cost * QuotationDetail.quantity), 0),
+    ).outerjoin(Product, Product.id == QuotationDetail.product_id).filter(
+        QuotationDetail.quotation_id == quotation.id
+    ).one()
+    totals = compute_totals(subtotal, quotation.discount_rate, float(cost) + float(extra_cost or 0))
+    for key, value in totals.items():
+        setattr(quotation, key, value)
+    return totals
+
+
+def legacy_design_setup_cost(details):
+    """内訳を保存していない見積の、走行条件の明細（設計費・現地セットアップ費）の原価。"""
+    fees = sum(d.subtotal or 0 for d in details
+               if d.product_id is None and d.label in LEGACY_DESIGN_SETUP_LABELS)
+    return fees * LEGACY_LABOR_RATE / LEGACY_SELL_RATE
+
+
+def quotation_totals(quotation):
+    """表示用の集計値。集計列が未設定（移行前に外部から入った行など）なら明細から計算する。"""
+    if quotation.subtotal_amount is not None:
+        return {
+            "subtotal_amount": quotation.subtotal_amount,
+            "discount_amount": quotation.discount_amount or 0,
+            "total_amount": quotation.total_amount,
+            "cost_amount": quotation.cost_amount or 0,
+            "gross_margin_amount": quotation.gross_margin_amount or 0,
+            "gross_margin_rate": quotation.gross_margin_rate or 0,
+        }
+    from app.catalog_cache import resolve_products
+
+    details = quotation.details
+    products = resolve_products(d.product_id for d in details)
+    subtotal = sum(d.subtotal or 0 for d in details)
+    cost = sum((products[d.product_id]["cost"] or 0) * (d.quantity or 0) for d in details if d.product_id in products)
+    if quotation.design_cost is not None or quotation.setup_cost is not None:
+        cost += (quotation.design_cost or 0) + (quotation.setup_cost or 0)
+    else:
+        cost += legacy_design_setup_cost(details)
+    return compute_totals(subtotal, quotation.discount_rate, cost)
@@ -0,0 +1,186 @@
+"""
+スロークエリログ
+
+SLOW_QUERY_MS 以上かかった文を、ローテーションするログファイル（既定: <EXE/プロジェクト>/logs/slow_query.log）に
+1件1行の JSON で書き出す。記録内容:
+  ts / ms / source（エンドポイント名、書き込み単位名、migration:vN 等）/ sql / params（マスク済み）/ plan
+
+- SQLAlchemy エンジン: install_slow_query_log(app, db) が before/after_cursor_execute で計測する。
+- 生の sqlite3 接続（app.migrations.connect 等）: sqlite3.connect(..., factory=TimedConnection) で計測する。
+- plan は EXPLAIN QUERY PLAN の結果。本体の接続やカーソルに触れないよう、読み取り専用の別接続で取得する。
+- params は数値・日時・None はそのまま、文字列は長さのみ（"<str len=N>"）に置き換える。
+  顧客名などの個人情報やパスワードハッシュをログに残さないため。
+"""
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from logging.handlers import RotatingFileHandler
+from urllib.request import pathname2url
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+_PLAN_PREFIXES = ("SELECT", "UPDATE", "DELETE", "WITH", "INSERT")
+
+_logger = logging.getLogger("scart.slow_query")
+_logger.propagate = False
+_state = {"threshold_ms": None, "explain": True}
+_local = threading.local()
+
+
+def configure_slow_query_log(path, threshold_ms, max_bytes=5 * 1024 * 1024, backups=5, explain=True):
+    """ログ出力先としきい値を設定する（プロセス内で共有）。threshold_ms=None で無効。"""
+    for h in list(_logger.handlers):
+        _logger.removeHandler(h)
+        h.close()
+    _state["threshold_ms"] = threshold_ms
+    _state["explain"] = explain
+    if threshold_ms is None:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _logger.addHandler(handler)
+    _logger.setLevel(logging.INFO)
+
+
+@contextlib.contextmanager
+def slow_query_source(label):
+    """リクエスト外で発行される文（書き込みキュー、マイグレーション）の発行元ラベルを設定する。"""
+    prev = getattr(_local, "source", None)
+    _local.source = label
+    try:
+        yield
+    finally:
+        _local.source = prev
+
+
+def current_source():
+    label = getattr(_local, "source", None)
+    if label:
+        return label
+    if has_request_context():
+        return request.endpoint or request.path
+    return threading.current_thread().name
+
+
+def redact_params(params):
+    def one(v):
+        if v is None or isinstance(v, (bool, int, float, datetime, date)):
+            return v if not isinstance(v, (datetime, date)) else v.isoformat()
+        if isinstance(v, (str, bytes)):
+            return f"<{type(v).__name__} len={len(v)}>"
+        return f"<{type(v).__name__}>"
+
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: one(v) for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [one(v) for v in params]
+    return one(params)
+
+
+def explain_plan(db_path, statement, params, conn=None):
+    """
+    conn（生の sqlite3 接続）が渡されればその接続で、無ければ db_path への読み取り専用の別接続で EXPLAIN する。
+    マイグレーション中の文は同じ接続でないと未コミットの DDL が見えないため。
+    """
+    if not statement.lstrip().upper().startswith(_PLAN_PREFIXES):
+        return None
+    if conn is not None:
+        try:
+            return [r[3] for r in sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {statement}", params or ())]
+        except (sqlite3.Error, ValueError) as e:
+            return [f"(explain failed: {e})"]
+    if not db_path:
+        return None
+    try:
+        uri = "file:" + pathname2url(os.path.abspath(db_path)) + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=1)
+        try:
+            return [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {statement}", params or ())]
+        finally:
+            conn.close()
+    except (sqlite3.Error, ValueError) as e:
+        return [f"(explain failed: {e})"]
+
+
+def record_if_slow(db_path, statement, params, ms, conn=None):
+    threshold = _state["threshold_ms"]
+    if threshold is None or ms < threshold:
+        return False
+    entry = {
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "ms": round(ms, 2),
+        "source": current_source(),
+        "sql": " ".join(statement.split()),
+        "params": redact_params(params),
+        "plan": explain_plan(db_path, statement, params, conn) if _state["explain"] else None,
+    }
+    _logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+    return True
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_if_slow(None, sql, parameters, (time.perf_counter() - t0) * 1000.0, conn=self.connection)
+
+    def executemany(self, sql, seq_of_parameters):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_if_slow(None, sql, None, (time.perf_counter() - t0) * 1000.0)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3.connect(path, factory=TimedConnection) で使う計測付き接続。"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def install_slow_query_log(app, db):
+    if not app.config.get("SLOW_QUERY_LOG_ENABLED", True):
+        configure_slow_query_log(None, None)
+        return
+    path = app.config.get("SLOW_QUERY_LOG_PATH") or os.path.join(app.config["SCART_BASE_DIR"], "logs", "slow_query.log")
+    configure_slow_query_log(
+        path,
+        float(app.config.get("SLOW_QUERY_MS", 100)),
+        max_bytes=app.config.get("SLOW_QUERY_LOG_MAX_BYTES", 5 * 1024 * 1024),
+        backups=app.config.get("SLOW_QUERY_LOG_BACKUPS", 5),
+        explain=app.config.get("SLOW_QUERY_EXPLAIN", True),
+    )
+    db_path = app.config.get("SCART_DB_PATH")
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _slow_query_start(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._scart_slow_t0 = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _slow_query_end(conn, cursor, statement, parameters, context, executemany):
+        t0 = getattr(context, "_scart_slow_t0", None)
+        if t0 is not None:
+            record_if_slow(db_path, statement, None if executemany else parameters, (time.perf_counter() - t0) * 1000.0)
+
+    logging.debug("[DB] slow query log: %s (>= %sms)", path, app.config.get("SLOW_QUERY_MS", 100))
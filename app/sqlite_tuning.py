@@ -0,0 +1,66 @@
+"""
+SQLAlchemy エンジンの SQLite 接続チューニング
+
+これまで journal_mode=WAL / foreign_keys=ON は移行用の一時接続（app.migrations.connect）にしか
+設定されておらず、リクエストを処理するプール接続は SQLite 既定値のままだった。
+install_sqlite_pragmas(app) で db.engine に connect イベントを登録し、
+プール接続が作られるたびに Config の SQLITE_* 設定に従って PRAGMA を適用する。
+
+  SQLITE_BUSY_TIMEOUT_MS  ロック待ちの上限（ミリ秒）。"database is locked" を即時に返さない
+  SQLITE_SYNCHRONOUS      WAL では NORMAL で十分（電源断時に直近コミットのみ失われ得る）
+  SQLITE_CACHE_SIZE       ページキャッシュ。負数は KiB 指定（-20000 ≒ 20MB）
+  SQLITE_MMAP_SIZE        メモリマップ I/O のバイト数（0 で無効）
+  SQLITE_TEMP_STORE       一時テーブル・ソート領域（MEMORY / FILE / DEFAULT）
+  SQLITE_FOREIGN_KEYS     外部キー制約の有効化
+SQLITE_TUNING=0 にすると PRAGMA を一切適用しない（ベンチマークの比較用）。
+"""
+import logging
+
+from sqlalchemy import event
+
+_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def build_pragmas(config):
+    """Config から接続ごとに実行する PRAGMA 文のリストを組み立てる。"""
+    if not config.get("SQLITE_TUNING", True):
+        return []
+
+    synchronous = str(config.get("SQLITE_SYNCHRONOUS", "NORMAL")).upper()
+    if synchronous not in _SYNCHRONOUS:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {sorted(_SYNCHRONOUS)}: {synchronous}")
+    temp_store = str(config.get("SQLITE_TEMP_STORE", "MEMORY")).upper()
+    if temp_store not in _TEMP_STORE:
+        raise ValueError(f"SQLITE_TEMP_STORE must be one of {sorted(_TEMP_STORE)}: {temp_store}")
+
+    return [
+        f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA cache_size={int(config.get('SQLITE_CACHE_SIZE', -20000))}",
+        f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 268435456))}",
+        f"PRAGMA temp_store={temp_store}",
+        f"PRAGMA foreign_keys={'ON' if config.get('SQLITE_FOREIGN_KEYS', True) else 'OFF'}",
+    ]
+
+
+def install_sqlite_pragmas(app, db):
+    """db.engine（SQLite の場合のみ）に PRAGMA 適用用の connect イベントを登録する。"""
+    pragmas = build_pragmas(app.config)
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return []
+
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_conn, connection_record):
+        cur = dbapi_conn.cursor()
+        try:
+            for sql in pragmas:
+                cur.execute(sql)
+        finally:
+            cur.close()
+
+    logging.debug("[DB] sqlite pragmas per connection: %s", "; ".join(pragmas))
+    return pragmas
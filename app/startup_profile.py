@@ -0,0 +1,105 @@
+"""
+起動時間プロファイラ
+
+run.py --profile-startup（または環境変数 SCART_PROFILE_STARTUP=1）で有効化すると、
+最初のリクエスト完了時に各フェーズ（imports / config / migrations / blueprints / first_request）
+の所要時間を artifacts/startup_profile_YYYYmmdd_HHMMSS.json に書き出す。
+フェーズの記録自体は常時行い、create_app 完了時に1行サマリをログに出す。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = os.environ.get("SCART_PROFILE_STARTUP") == "1"
+        self.phases = []
+        self._lock = threading.Lock()
+        self._written = False
+
+    def enable(self):
+        self.enabled = True
+
+    def record(self, name, ms):
+        with self._lock:
+            self.phases.append({"phase": name, "ms": round(ms, 2)})
+
+    def clock(self):
+        """
+        lap(name) を呼ぶたびに、前回の lap（初回は clock() 呼び出し時点）からの経過を name として記録する。
+        """
+        last = [time.perf_counter()]
+
+        def lap(name):
+            now = time.perf_counter()
+            self.record(name, (now - last[0]) * 1000.0)
+            last[0] = now
+
+        return lap
+
+    def summary(self):
+        with self._lock:
+            return ", ".join(f"{p['phase']}={p['ms']:.1f}ms" for p in self.phases)
+
+    def write(self, out_dir):
+        """プロファイルを JSON で書き出す（1プロセス1回のみ）。書き出したパスを返す。"""
+        with self._lock:
+            if self._written:
+                return None
+            self._written = True
+            phases = list(self.phases)
+        os.makedirs(out_dir, exist_ok=True)
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(out_dir, f"startup_profile_{ts}.json")
+        payload = {
+            "timestamp": ts,
+            "pid": os.getpid(),
+            "total_ms": round(sum(p["ms"] for p in phases), 2),
+            "phases": phases,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        return path
+
+
+profiler = StartupProfiler()
+
+
+def run_in_background(name, fn, *args, **kwargs):
+    """起動のクリティカルパスから外したい処理（ルート一覧ログ等）をデーモンスレッドで実行する。"""
+    def runner():
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            logging.exception("[BOOT] background task %s failed", name)
+
+    t = threading.Thread(target=runner, name=f"scart-{name}", daemon=True)
+    t.start()
+    return t
+
+
+def install_first_request_hook(app, out_dir):
+    """
+    最初のリクエスト完了までの時間を first_request として記録し、
+    プロファイル有効時は JSON をバックグラウンドで書き出す。
+    """
+    state = {"done": False, "lap": profiler.clock()}
+
+    @app.after_request
+    def _startup_first_request(response):
+        if state["done"]:
+            return response
+        state["done"] = True
+        state["lap"]("first_request")
+        app.logger.info("[BOOT] first request served (%s)", profiler.summary())
+        if profiler.enabled:
+            def write_profile():
+                path = profiler.write(out_dir)
+                if path:
+                    app.logger.info("[BOOT] startup profile written: %s", path)
+            run_in_background("startup-profile", write_profile)
+        return response
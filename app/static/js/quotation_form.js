@@ -1,26 +1,75 @@
-// ========== Jinja埋め込みJSON読込 & グローバル変数セット ==========
+// ========== マスタJSON取得 & Jinja埋め込みJSON読込 & グローバル変数セット ==========
 // 1. 先にグローバル変数を安全なデフォルトで初期化
 window.products = window.products || [];
-window.CUSTOMERS_META = window.CUSTOMERS_META || {};
-window.CUSTOMERS = window.CUSTOMERS || [];
+window.CUSTOMERS_META = window.CUSTOMERS_META || {};  // 顧客ID → タイプアヘッドで取得した顧客（支払条件の自動反映用）
 window.INITIAL_VALUES = window.INITIAL_VALUES || null;
 window.INITIAL_DETAILS = window.INITIAL_DETAILS || null;
 
+// JSONデータをDOMから取得してparse
+function readEmbeddedJson(id, fallback) {
+  const el = document.getElementById(id);
+  if (!el) return fallback;
+  try { return JSON.parse(el.textContent || ""); } catch { return fallback; }
+}
+
+// 顧客タイプアヘッド（/customers/typeahead）を呼ぶ。params は q / limit / id
+window.fetchCustomerTypeahead = function (params, signal) {
+  const ref = readEmbeddedJson("form-master-ref", null);
+  if (!ref || !ref.customer_typeahead_url) return Promise.resolve([]);
+  const url = ref.customer_typeahead_url + "?" + new URLSearchParams(params).toString();
+  return fetch(url, { credentials: "same-origin", signal: signal })
+    .then(function (res) {
+      if (!res.ok) throw new Error("HTTP " + res.status);
+      return res.json();
+    })
+    .then(function (data) {
+      const items = data.items || [];
+      items.forEach(function (c) { window.CUSTOMERS_META[String(c.id)] = c; });
+      return items;
+    });
+};
+
+// 2. 商品マスタを /quotation/form-master から取得（URLに版数が付くのでブラウザキャッシュが効く）
+//    改定・再表示で顧客が選択済みなら、その顧客1件もタイプアヘッドから取得しておく
+//    取得失敗時は空のマスタで続行する（自由入力行での見積作成は可能）
+window.FORM_MASTER_READY = new Promise(function (resolve) {
+  function load() {
+    const ref = readEmbeddedJson("form-master-ref", null);
+    if (!ref || !ref.url) { resolve(); return; }
+    const masterLoad = fetch(ref.url, { credentials: "same-origin" })
+      .then(function (res) {
+        if (!res.ok) throw new Error("HTTP " + res.status);
+        return res.json();
+      })
+      .then(function (master) {
+        window.products = master.products || [];
+      })
+      .catch(function (e) { console.error("[quotation_form.js] form master load failed:", e); });
+    const customerIdInput = document.getElementById("customer_id");
+    const customerLoad = (customerIdInput && customerIdInput.value)
+      ? window.fetchCustomerTypeahead({ id: customerIdInput.value })
+          .catch(function (e) { console.error("[quotation_form.js] customer load failed:", e); })
+      : Promise.resolve();
+    Promise.all([masterLoad, customerLoad]).then(function () { resolve(); });
+  }
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", load);
+  } else {
+    load();
+  }
+});
+
+// DOM構築とマスタ取得の両方が済んでから fn を実行する
+window.onFormReady = function (fn) {
+  window.FORM_MASTER_READY.then(fn);
+};
+
 (function() {
   function init() {
     if (window.__quotationFormInited) return;
     window.__quotationFormInited = true;
-    // JSONデータをDOMから取得してparse
-    const readJson = (id, fallback) => {
-      const el = document.getElementById(id);
-      if (!el) return fallback;
-      try { return JSON.parse(el.textContent || ""); } catch { return fallback; }
-    };
-    window.products = readJson("products-json", []);
-    window.CUSTOMERS_META = readJson("customers-meta-json", {});
-    window.CUSTOMERS = readJson("customers-json", []);
-    window.INITIAL_VALUES = readJson("initial-values-json", null);
-    window.INITIAL_DETAILS = readJson("initial-details-json", null);
+    window.INITIAL_VALUES = readEmbeddedJson("initial-values-json", null);
+    window.INITIAL_DETAILS = readEmbeddedJson("initial-details-json", null);
     console.log("products JSON:", window.products);
 
     // submit debug
@@ -31,24 +80,33 @@ window.INITIAL_DETAILS = window.INITIAL_DETAILS || null;
       }
     }, true);
 
-    // --- 顧客選択UI ---
-    const customers = window.CUSTOMERS || [];
+    // --- 顧客選択UI（入力のたびに /customers/typeahead へ問い合わせ、上位だけ表示）---
     const customerSearch = document.getElementById('customer_search');
     const customerCandidates = document.getElementById('customer_candidates');
     const customerIdInput = document.getElementById('customer_id');
     const companyNameInput = document.getElementById('company_name');
 
+    let typeaheadTimer = null;
+    let typeaheadAbort = null;
     function renderCandidates(keyword) {
       if (!customerCandidates) return;
+      clearTimeout(typeaheadTimer);
+      if (typeaheadAbort) typeaheadAbort.abort();
+      typeaheadAbort = null;
+      const kw = (keyword || '').trim();
+      if (!kw) { customerCandidates.innerHTML = ''; return; }
+      // 入力が落ち着いてから問い合わせ、古い問い合わせは中断する（後着の結果で上書きしない）
+      typeaheadTimer = setTimeout(() => {
+        const controller = new AbortController();
+        typeaheadAbort = controller;
+        window.fetchCustomerTypeahead({ q: kw }, controller.signal)
+          .then(items => { if (typeaheadAbort === controller) showCandidates(items); })
+          .catch(e => { if (e.name !== 'AbortError') console.error('[quotation_form.js] typeahead failed:', e); });
+      }, 150);
+    }
+    function showCandidates(items) {
       customerCandidates.innerHTML = '';
-      if (!keyword) return;
-      const kw = keyword.trim().toLowerCase();
-      const filtered = customers.filter(c => {
-        const name = (c.name || '').toLowerCase();
-        const kana = (c.name_kana || '').toLowerCase();
-        return name.includes(kw) || kana.includes(kw);
-      });
-      filtered.forEach(c => {
+      items.forEach(c => {
         const item = document.createElement('button');
         item.type = 'button';
         item.className = 'list-group-item list-group-item-action';
@@ -83,26 +141,22 @@ window.INITIAL_DETAILS = window.INITIAL_DETAILS || null;
         if (customerIdInput) customerIdInput.value = '';
       });
     }
-    // 既存値があれば初期表示
-    if (customerIdInput && customerIdInput.value && customers && customers.length) {
-      const c = customers.find(c => c.id == customerIdInput.value);
+    // 既存値があれば初期表示（FORM_MASTER_READY で取得済み）
+    if (customerIdInput && customerIdInput.value) {
+      const c = window.CUSTOMERS_META[String(customerIdInput.value)];
       if (c && customerSearch) {
         customerSearch.value = c.name;
       }
     }
   }
-  if (document.readyState === "loading") {
-    document.addEventListener("DOMContentLoaded", init);
-  } else {
-    init();
-  }
+  window.onFormReady(init);
 })();
-// ========== /Jinja埋め込みJSON読込 ==========
+// ========== /マスタJSON取得 & Jinja埋め込みJSON読込 ==========
 
 // ==============================
 // 顧客選択時の支払条件自動反映
 // ==============================
-document.addEventListener('DOMContentLoaded', function() {
+window.onFormReady(function() {
   function applyPaymentTermsFromCustomer(customerId, {force=false}={}) {
     if (!window.CUSTOMERS_META) return;
     const meta = window.CUSTOMERS_META[String(customerId)];
@@ -137,12 +191,8 @@ console.log("[quotation_form.js] loaded v6");
 // 定数・ヘルパー
 // ==============================
 
-// 原価レート（hあたり）
-window.LABOR_RATE = 7920; // 原価計算用
-
-// 売価レート（設計・セットアップ共通）
-const DESIGN_SELL_RATE = 15000;
-const SETUP_SELL_RATE  = 15000;
+// 設計・セットアップの単価と計算式は window.PRICING_RULES（/quotation/pricing-rules.js。
+// app/pricing_rules.py が現在の単価表から生成し、サーバー側の計算と同じ結果になる）
 
 // 安全な数値変換
 function safeParseFloat(value) {
@@ -151,14 +201,6 @@ function safeParseFloat(value) {
   return isNaN(n) ? 0 : n;
 }
 
-// 利益率計算（%）: (売価 - 原価) / 売価 * 100
-function calcProfitRatePercent(sell, cost) {
-  const sellNum = safeParseFloat(sell);
-  const costNum = safeParseFloat(cost);
-  if (sellNum <= 0) return 0;
-  return ((sellNum - costNum) / sellNum) * 100;
-}
-
 // ==============================
 // 製品原価・売価合計関連
 // ==============================
@@ -203,64 +245,6 @@ window.updateGrandTotal = function () {
   return total;
 };
 
-// ==============================
-// 設計・セットアップ工数計算
-// ==============================
-
-// --- 設計工数計算 ---
-window.calcDesignHours = function (params) {
-  const vehicleCount      = safeParseFloat(params.vehicleCount);
-  const intersectionCount = safeParseFloat(params.intersections);
-  const stationCount      = safeParseFloat(params.stations);
-  const distance          = safeParseFloat(params.distance);
-
-  // 設計工数計算式
-  let designHoursBase =
-    vehicleCount * intersectionCount * 2 +
-    stationCount * 1 +
-    distance / 100;
-
-  let designHoursRaw = designHoursBase * 1.1; // 安全率
-  return designHoursRaw; // 切り上げは呼び出し側で
-};
-
-// --- セットアップ工数計算 ---
-window.calcSetupHours = function (params) {
-  const vehicleCount      = safeParseFloat(params.vehicleCount);
-  const intersectionCount = safeParseFloat(params.intersections);
-  const stationCount      = safeParseFloat(params.stations);
-  const distance          = safeParseFloat(params.distance);
-
-  // AGV速度・CT
-  const speed   = 30; // m/min
-  const ct_min  = distance / speed + 0.1 * stationCount;
-
-  // 試運転
-  const trialCount = 10 * vehicleCount;
-  const trialHours = (ct_min * trialCount) / 60;
-
-  // バグ修正
-  const bugFixHours = 1.0 * trialCount;
-
-  // インターロック
-  const interlockHours = 0.1 * vehicleCount * intersectionCount * stationCount;
-
-  // 安全率
-  const baseHours            = trialHours + bugFixHours + interlockHours;
-  const baseHoursWithSafety  = baseHours * 1.1;
-
-  // 人数ロジック
-  let workers = 3;
-  if (vehicleCount <= 1 && distance <= 50) {
-    workers = 1;
-  } else if (vehicleCount >= 2 && vehicleCount <= 5 && distance <= 100) {
-    workers = 2;
-  }
-
-  const setupHoursRaw = baseHoursWithSafety * workers;
-  return setupHoursRaw; // 切り上げは呼び出し側で
-};
-
 // ==============================
 // 設計/セットアップ費用プレビュー
 // ==============================
@@ -270,34 +254,22 @@ window.updateAutoFeePreview = function () {
   const intersections = safeParseFloat(document.getElementById("intersection_count")?.value);
   const stations      = safeParseFloat(document.getElementById("station_count")?.value);
   const vehicles      = safeParseFloat(document.getElementById("vehicle_count")?.value);
-  const equipments    = safeParseFloat(document.getElementById("equipment_count")?.value);
-  const difficulty    = safeParseFloat(document.getElementById("circuit_difficulty")?.value);
-
-  const params = {
-    distance,
-    intersections,
-    stations,
-    vehicleCount: vehicles,
-    equipmentCount: equipments,
-    difficulty,
-  };
-
-  // 設計・セットアップ工数（生値 → 切り上げ）
-  const designHoursRaw = window.calcDesignHours(params);
-  const setupHoursRaw  = window.calcSetupHours(params);
 
-  const designHours = Math.ceil(designHoursRaw);
-  const setupHours  = Math.ceil(setupHoursRaw);
-
-  // 原価・売価
-  const designCost = designHours * window.LABOR_RATE;
-  const setupCost  = setupHours  * window.LABOR_RATE;
-  const designFee  = designHours * DESIGN_SELL_RATE;
-  const setupFee   = setupHours  * SETUP_SELL_RATE;
+  if (!window.PRICING_RULES) {
+    console.error("[quotation_form.js] PRICING_RULES is not loaded (/quotation/pricing-rules.js)");
+    return;
+  }
 
-  // 利益率
-  const designProfitRate = calcProfitRatePercent(designFee, designCost);
-  const setupProfitRate  = calcProfitRatePercent(setupFee,  setupCost);
+  // 設計・セットアップの工数（切り上げ済み）・原価・売価・利益率
+  const b = window.PRICING_RULES.evaluate(distance, intersections, stations, vehicles);
+  const designHours      = b.design_hours;
+  const setupHours       = b.setup_hours;
+  const designCost       = b.design_cost;
+  const setupCost        = b.setup_cost;
+  const designFee        = b.design_fee;
+  const setupFee         = b.setup_fee;
+  const designProfitRate = b.design_profit_rate;
+  const setupProfitRate  = b.setup_profit_rate;
 
   // プレビュー欄更新
   const previewDesignFee         = document.getElementById("preview-design-fee");
@@ -607,7 +579,7 @@ window.addDetailRow = function () {
 // 初期化
 // ==============================
 
-document.addEventListener("DOMContentLoaded", function () {
+window.onFormReady(function () {
   console.log("[quotation_form.js] DOMContentLoaded - init start");
 
   const tbody = document.getElementById("detail-body");
@@ -722,8 +694,8 @@ document.addEventListener("DOMContentLoaded", function () {
   console.log(
     "[quotation_form.js] typeof updateAutoFeePreview =",
     typeof window.updateAutoFeePreview,
-    ", typeof calcDesignHours =",
-    typeof window.calcDesignHours,
+    ", PRICING_RULES =",
+    window.PRICING_RULES && window.PRICING_RULES.version,
     ", typeof updateTotalProfitPreview =",
     typeof window.updateTotalProfitPreview
   );
@@ -0,0 +1,57 @@
+"""
+Jinja テンプレートのバイトコードキャッシュ（本番テンプレートモード用）
+
+- キャッシュキーはテンプレート名のみ（絶対パスを含めない）。
+  ビルドマシンで事前コンパイルしたキャッシュを EXE 同梱（sys._MEIPASS/jinja_cache）しても当たる。
+- 読み込みは「EXE 横の書き込み可能ディレクトリ → 同梱ディレクトリ」の順、書き込みは前者のみ。
+- テンプレート本文のチェックサムと Python バージョンは Jinja 側で検証されるため、
+  テンプレート更新後や Python 差異があっても古いキャッシュは使われない。
+"""
+import logging
+import os
+import time
+from hashlib import sha1
+
+from jinja2 import FileSystemBytecodeCache
+
+
+class PortableBytecodeCache(FileSystemBytecodeCache):
+    def __init__(self, directory, bundled_directory=None):
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(directory)
+        self.bundled_directory = bundled_directory
+
+    def get_cache_key(self, name, filename=None):
+        return sha1(name.encode("utf-8")).hexdigest()
+
+    def load_bytecode(self, bucket):
+        super().load_bytecode(bucket)
+        if bucket.code is not None or not self.bundled_directory:
+            return
+        path = os.path.join(self.bundled_directory, self.pattern % bucket.key)
+        try:
+            with open(path, "rb") as f:
+                bucket.load_bytecode(f)
+        except OSError:
+            return
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError as e:
+            # 読み取り専用の場所に置かれた EXE でも動作は継続する
+            logging.warning("[TEMPLATE] bytecode cache write failed: %s", e)
+
+
+def warm_up_templates(env):
+    """全テンプレートを一度コンパイル（またはキャッシュから読み込み）しておく。件数を返す。"""
+    t0 = time.perf_counter()
+    count = 0
+    for name in env.list_templates(extensions=("html",)):
+        try:
+            env.get_template(name)
+            count += 1
+        except Exception as e:
+            logging.warning("[TEMPLATE] warm-up failed for %s: %s", name, e)
+    logging.info("[TEMPLATE] warmed up %s templates in %.1fms", count, (time.perf_counter() - t0) * 1000.0)
+    return count
@@ -0,0 +1,34 @@
+"""
+検索用の日本語文字列正規化
+
+索引を作るときと検索語を受け取るときの両方で同じ normalize_text() を通し、表記ゆれを吸収する。
+- NFKC: 全角英数字・半角カナ・記号の揺れを統一（"ＡＢＣ" → "ABC"、"ｶﾌﾞｼｷ" → "カブシキ"、"㈱" → "(株)"）
+- casefold: 英字の大文字小文字
+- かな畳み込み: カタカナをひらがなに寄せる（"カブシキ" → "かぶしき"）
+- 空白（全角含む）を除去: "山田 商事" と "山田商事" を同一視
+"""
+import unicodedata
+
+# ァ(U+30A1)〜ヶ(U+30F6) → ぁ(U+3041)〜ゖ(U+3096)
+_KATA_TO_HIRA = {cp: cp - 0x60 for cp in range(0x30A1, 0x30F7)}
+# ヽヾ（カタカナ繰り返し記号）→ ゝゞ
+_KATA_TO_HIRA.update({0x30FD: 0x309D, 0x30FE: 0x309E})
+
+
+def fold_kana(text):
+    """カタカナをひらがなに変換する（長音符「ー」などはそのまま）。"""
+    return text.translate(_KATA_TO_HIRA)
+
+
+def fold_width(text):
+    """NFKC で全角英数字・半角カナなどの幅を揃える（かなの種類・空白・大文字小文字はそのまま）。"""
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKC", str(text))
+
+
+def normalize_text(text):
+    """検索用に正規化した文字列を返す。None は空文字。"""
+    if not text:
+        return ""
+    return "".join(fold_kana(fold_width(text).casefold()).split())
@@ -0,0 +1,286 @@
+"""
+SQLite 書き込みの直列化（単一ライタースレッド＋有界キュー）
+
+SQLite は同時に1つの書き込みトランザクションしか持てないため、複数リクエストが同時に
+書き込むと "database is locked" になり得る（scripts/test_concurrent_approve.py 参照）。
+書き込み処理を「書き込み単位」（関数）としてキューに投入し、専用スレッドが1件ずつ実行する。
+
+- 書き込み単位はライタースレッドの新しいアプリコンテキスト内で fn(*args, **kwargs) として実行され、
+  戻り後にライター側で db.session.commit() する。リトライ時は再実行されるため、
+  ORM オブジェクトは引数で渡さず id を渡して fn 内で読み直すこと。
+- SQLITE_BUSY / SQLITE_LOCKED はロールバックして指数バックオフ（ジッタ付き）で再試行する。
+- キューが満杯のまま WRITE_QUEUE_SUBMIT_TIMEOUT 秒経つか、結果待ちが
+  WRITE_QUEUE_RESULT_TIMEOUT 秒を超えた場合は WriteQueueBusy（503 応答）。
+  未着手の単位は取り消すので、503 を返した書き込みが後から実行されることはない。
+- 呼び出し側のセッションに未コミットの書き込みを残したまま run_write しないこと（自己デッドロックになる）。
+- WRITE_QUEUE_ENABLED=0 のとき、またはライタースレッド自身から呼んだときは呼び出しスレッドで直接実行する
+  （リトライ動作は同じ）。
+キュー長・待ち時間・リトライ回数などは /admin/metrics の write_queue で確認できる。
+"""
+import atexit
+import collections
+import logging
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from flask import current_app, has_app_context
+
+from app import db
+from app.metrics import register_metrics
+from app.slow_query import slow_query_source
+
+_SQLITE_BUSY_CODES = {5, 6}  # SQLITE_BUSY, SQLITE_LOCKED
+_STOP = object()
+
+
+class WriteQueueBusy(RuntimeError):
+    """書き込みキューが混雑しており、時間内に受け付け／完了できなかった。"""
+
+
+def is_busy_error(exc):
+    orig = getattr(exc, "orig", exc)
+    if not isinstance(orig, sqlite3.OperationalError):
+        return False
+    code = getattr(orig, "sqlite_errorcode", None)
+    if code is not None:
+        return (code & 0xFF) in _SQLITE_BUSY_CODES
+    msg = str(orig).lower()
+    return "database is locked" in msg or "database table is locked" in msg or "busy" in msg
+
+
+class _Durations:
+    """直近 N 件の所要時間（ms）の集計。"""
+
+    def __init__(self, size=1000):
+        self.samples = collections.deque(maxlen=size)
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": 0, "avg_ms": 0.0, "p95_ms": 0.0, "max_ms": round(self.max_ms, 2)}
+        return {
+            "count": len(ordered),
+            "avg_ms": round(sum(ordered) / len(ordered), 2),
+            "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 2),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class _WriteUnit:
+    __slots__ = ("name", "fn", "args", "kwargs", "future", "enqueued_at")
+
+    def __init__(self, name, fn, args, kwargs):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class WriteQueue:
+    def __init__(self, app, maxsize=256, max_retries=5, backoff_ms=50, backoff_max_ms=2000,
+                 submit_timeout=5.0, result_timeout=30.0, enabled=True):
+        self.app = app
+        self.max_retries = max_retries
+        self.backoff_ms = backoff_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.submit_timeout = submit_timeout
+        self.result_timeout = result_timeout
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counts = collections.Counter()
+        self._max_depth = 0
+        self._wait = _Durations()
+        self._exec = _Durations()
+
+    # --- 投入側 ---
+
+    def submit(self, name, fn, *args, **kwargs):
+        """書き込み単位を投入し Future を返す（結果を待たない書き込み用）。"""
+        unit = _WriteUnit(name, fn, args, kwargs)
+        if not self.enabled or self._on_writer_thread():
+            self._run_unit(unit)
+            return unit.future
+        self._ensure_started()
+        try:
+            self._queue.put(unit, timeout=self.submit_timeout)
+        except queue.Full:
+            self._count("rejected")
+            logging.warning("[WRITEQ] queue full, rejected %s (depth=%s)", name, self._queue.qsize())
+            raise WriteQueueBusy(f"write queue full: {name}")
+        self._count("submitted")
+        with self._stats_lock:
+            self._max_depth = max(self._max_depth, self._queue.qsize())
+        return unit.future
+
+    def run(self, name, fn, *args, **kwargs):
+        """書き込み単位を投入して完了を待ち、fn の戻り値を返す。fn の例外はそのまま送出する。"""
+        future = self.submit(name, fn, *args, **kwargs)
+        try:
+            result = future.result(timeout=self.result_timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                self._count("timed_out")
+                logging.warning("[WRITEQ] %s not started within %.1fs, cancelled", name, self.result_timeout)
+                raise WriteQueueBusy(f"write queue timeout: {name}")
+            # 実行中なら取り消せないので完了まで待つ
+            result = future.result()
+        if has_app_context():
+            # 呼び出し側セッションの識別マップにライターの変更を反映させる
+            db.session.expire_all()
+        return result
+
+    # --- ライター側 ---
+
+    def _on_writer_thread(self):
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="scart-writer", daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            unit = self._queue.get()
+            try:
+                if unit is _STOP:
+                    return
+                self._wait.add((time.perf_counter() - unit.enqueued_at) * 1000.0)
+                self._run_unit(unit)
+            finally:
+                self._queue.task_done()
+
+    def _run_unit(self, unit):
+        if not unit.future.set_running_or_notify_cancel():
+            return
+        t0 = time.perf_counter()
+        try:
+            result = self._execute(unit)
+        except BaseException as e:
+            self._count("failed")
+            unit.future.set_exception(e)
+        else:
+            self._count("completed")
+            unit.future.set_result(result)
+        finally:
+            self._exec.add((time.perf_counter() - t0) * 1000.0)
+
+    def _execute(self, unit):
+        attempt = 0
+        while True:
+            with self.app.app_context(), slow_query_source(f"writer:{unit.name}"):
+                try:
+                    result = unit.fn(*unit.args, **unit.kwargs)
+                    db.session.commit()
+                    return result
+                except Exception as e:
+                    db.session.rollback()
+                    if not is_busy_error(e):
+                        raise
+                    self._count("busy_errors")
+                    if attempt >= self.max_retries:
+                        logging.error("[WRITEQ] %s gave up after %s retries: %s", unit.name, attempt, e)
+                        raise
+            attempt += 1
+            self._count("retries")
+            delay_ms = min(self.backoff_max_ms, self.backoff_ms * (2 ** (attempt - 1)))
+            time.sleep(delay_ms * (0.5 + random.random() / 2) / 1000.0)
+
+    def stop(self, timeout=5.0):
+        """キュー内の書き込みを処理し終えてからライタースレッドを止める。"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logging.warning("[WRITEQ] stop: queue still full, %s writes may be lost", self._queue.qsize())
+            return
+        self._thread.join(timeout)
+
+    # --- メトリクス ---
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._counts[key] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            counts = dict(self._counts)
+            max_depth = self._max_depth
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "depth": self._queue.qsize(),
+            "max_depth": max_depth,
+            "capacity": self._queue.maxsize,
+            "submitted": counts.get("submitted", 0),
+            "completed": counts.get("completed", 0),
+            "failed": counts.get("failed", 0),
+            "retries": counts.get("retries", 0),
+            "busy_errors": counts.get("busy_errors", 0),
+            "rejected": counts.get("rejected", 0),
+            "timed_out": counts.get("timed_out", 0),
+            "wait": self._wait.snapshot(),
+            "exec": self._exec.snapshot(),
+        }
+
+
+def init_write_queue(app):
+    """app に書き込みキューを設定する。ライタースレッドは最初の投入時に起動する。"""
+    wq = WriteQueue(
+        app,
+        maxsize=app.config["WRITE_QUEUE_MAXSIZE"],
+        max_retries=app.config["WRITE_QUEUE_MAX_RETRIES"],
+        backoff_ms=app.config["WRITE_QUEUE_BACKOFF_MS"],
+        backoff_max_ms=app.config["WRITE_QUEUE_BACKOFF_MAX_MS"],
+        submit_timeout=app.config["WRITE_QUEUE_SUBMIT_TIMEOUT"],
+        result_timeout=app.config["WRITE_QUEUE_RESULT_TIMEOUT"],
+        enabled=app.config["WRITE_QUEUE_ENABLED"],
+    )
+    app.extensions["scart_write_queue"] = wq
+    register_metrics("write_queue", wq.stats)
+    atexit.register(wq.stop)
+
+    @app.errorhandler(WriteQueueBusy)
+    def write_queue_busy(e):
+        return "現在書き込みが混雑しています。しばらくしてから再度お試しください。", 503, {"Retry-After": "5"}
+
+    return wq
+
+
+def get_write_queue():
+    return current_app.extensions["scart_write_queue"]
+
+
+def run_write(name, fn, *args, **kwargs):
+    """現在のアプリの書き込みキューで fn を実行し、完了を待って戻り値を返す。"""
+    return get_write_queue().run(name, fn, *args, **kwargs)
+
+
+def submit_write(name, fn, *args, **kwargs):
+    """結果を待たずに書き込みを投入する。失敗はログに残すのみ（監査ログ等のベストエフォート書き込み用）。"""
+    future = get_write_queue().submit(name, fn, *args, **kwargs)
+
+    def log_failure(f):
+        if not f.cancelled() and f.exception() is not None:
+            logging.warning("[WRITEQ] %s failed: %s", name, f.exception())
+
+    future.add_done_callback(log_failure)
+    return future
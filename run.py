@@ -1,20 +1,39 @@
 # run.py
+#   python run.py                    通常起動（ブラウザ自動起動）
+#   python run.py --profile-startup  起動フェーズ別の所要時間を artifacts/ に書き出す
+import socket
+import sys
 import threading
 import time
 import webbrowser
 
+_t_import = time.perf_counter()
 from app import create_app
+from app.startup_profile import profiler
+
+profiler.record("imports", (time.perf_counter() - _t_import) * 1000.0)
+if "--profile-startup" in sys.argv:
+    profiler.enable()
 
 app = create_app()
 
+HOST = "127.0.0.1"
+PORT = 5000
+
 
 def open_browser():
-    # 少しだけ待ってからトップページを開く
-    time.sleep(0.8)
-    webbrowser.open("http://127.0.0.1:5000/")
+    # 固定時間待つのではなく、サーバが接続を受け付け始めたらすぐトップページを開く
+    deadline = time.monotonic() + 10.0
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((HOST, PORT), timeout=0.2):
+                break
+        except OSError:
+            time.sleep(0.05)
+    webbrowser.open(f"http://{HOST}:{PORT}/")
 
 
 if __name__ == "__main__":
     # ブラウザ自動起動（EXE / 開発どちらでも動く）
     threading.Thread(target=open_browser, daemon=True).start()
-    app.run(host="127.0.0.1", port=5000, debug=True, use_reloader=False)
+    app.run(host=HOST, port=PORT, debug=app.config["SCART_DEBUG"], use_reloader=False)
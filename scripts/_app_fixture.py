@@ -0,0 +1,66 @@
+"""
+scripts/test_*.py・bench_*.py 共通の準備: 一時ディレクトリの新規 DB（= 全マイグレーション適用済み）でアプリを起動し、
+終わったら書き込みキューを止め、DB の接続を閉じて、ディレクトリごと消す。
+
+    from _app_fixture import temp_app
+
+    def main() -> int:
+        with temp_app("scart_xx_", WRITE_QUEUE_ENABLED="0") as fx:
+            return run(fx)  # fx.app / fx.db_path / fx.tmp
+
+環境変数（SCART_DB_PATH と指定したもの）は終了時に元へ戻す。アプリが要らないテストは create=False。
+"""
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+@dataclass
+class AppFixture:
+    tmp: str
+    db_path: str
+    app: object = None
+
+
+@contextmanager
+def temp_app(prefix, create=True, **environ):
+    tmp = tempfile.mkdtemp(prefix=prefix)
+    fixture = AppFixture(tmp=tmp, db_path=os.path.join(tmp, "estimates.db"))
+    overrides = {"SCART_DB_PATH": fixture.db_path, **{k: str(v) for k, v in environ.items()}}
+    if "FLASK_DEBUG" not in os.environ:
+        overrides["FLASK_DEBUG"] = "0"
+    saved = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        if create:
+            from app import create_app
+
+            fixture.app = create_app()
+        yield fixture
+    finally:
+        if fixture.app is not None:
+            _close_app(fixture.app)
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _close_app(app):
+    from app import db
+
+    write_queue = app.extensions.get("scart_write_queue")
+    if write_queue is not None:
+        write_queue.stop()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
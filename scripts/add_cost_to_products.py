@@ -1,9 +1,18 @@
-import sqlite3
-
-db_path = "app/db/estimates.db"  # 実際のパスに合わせて修正
-conn = sqlite3.connect(db_path)
-cur = conn.cursor()
-cur.execute("ALTER TABLE products ADD COLUMN cost REAL DEFAULT 0")
-conn.commit()
-conn.close()
-print("productsテーブルに cost カラムを追加しました。")
+"""
+（旧）products.cost 列の追加スクリプト。
+現在は app/migrations.py の番号付き移行（PRAGMA user_version）に統合済み。
+互換のため残しているが、移行ランナーを呼ぶだけ（適用済みなら何もしない）。
+
+使い方:
+  python scripts/add_cost_to_products.py [DBパス] [--dry-run]
+"""
+import os
+import sys
+
+# プロジェクトルートを import パスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.migrations import cli_main
+
+if __name__ == "__main__":
+    sys.exit(cli_main())
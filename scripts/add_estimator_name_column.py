@@ -1,37 +1,18 @@
-from app import app, db
-
-def add_estimator_name_column():
-    with app.app_context():
-        try:
-            engine = db.engine
-            conn = engine.raw_connection()
-            cursor = conn.cursor()
+"""
+（旧）quotations.estimator_name 列の追加スクリプト。
+現在は app/migrations.py の番号付き移行（PRAGMA user_version）に統合済み。
+互換のため残しているが、移行ランナーを呼ぶだけ（適用済みなら何もしない）。
 
-            # quotations テーブルのカラム一覧を取得
-            cursor.execute("PRAGMA table_info(quotations);")
-            columns = cursor.fetchall()
-            column_names = [col[1] for col in columns]
+使い方:
+  python scripts/add_estimator_name_column.py [DBパス] [--dry-run]
+"""
+import os
+import sys
 
-            if "estimator_name" in column_names:
-                print("estimator_name カラムは既に存在します。")
-            else:
-                cursor.execute("ALTER TABLE quotations ADD COLUMN estimator_name VARCHAR(100);")
-                conn.commit()
-                print("estimator_name カラムを追加しました。")
+# プロジェクトルートを import パスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-            cursor.close()
-            conn.close()
-        except Exception as e:
-            print(f"エラー: {e}")
+from app.migrations import cli_main
 
 if __name__ == "__main__":
-    add_estimator_name_column()
-
-"""
-【実行手順】
-1. 必要なら仮想環境を有効化してください。
-2. プロジェクトルートで以下を実行してください:
-   python scripts/add_estimator_name_column.py
-3. 「estimator_name カラムを追加しました」または
-   「estimator_name カラムは既に存在します」と表示されればOKです。
-"""
+    sys.exit(cli_main())
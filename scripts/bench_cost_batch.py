@@ -0,0 +1,74 @@
+"""
+設計/セットアップ費用の計算スループット（既定 1,000,000 パラメータ集合）: スカラー版と NumPy 一括版。
+
+使い方:
+  python scripts/bench_cost_batch.py [--count N] [--scalar-sample N] [--iterations N]
+  # 既定: 1000000件・スカラー版は先頭 100000件で計測・一括版は5回
+
+- scalar: app/cost_utils.calc_design_setup_breakdown を1件ずつ呼ぶ（dict の入力・出力を含む）
+- batch : app/cost_utils.calc_design_setup_batch に列の配列を渡す（配列の準備は計測に含めない）
+スカラー版は全件だと時間がかかるため --scalar-sample 件で計り、件/秒で比べる。
+最後にスカラー版で計った範囲の全要素が一致することを確かめる。DB もアプリも使わない。
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def make_columns(count):
+    import numpy as np
+
+    rng = np.random.default_rng(42)
+    return {
+        "distance_m": np.round(rng.uniform(0, 1500, count), 1),
+        "intersection_count": rng.integers(0, 30, count).astype(np.float64),
+        "station_count": rng.integers(0, 40, count).astype(np.float64),
+        "vehicle_count": rng.integers(0, 12, count).astype(np.float64),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--scalar-sample", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.cost_utils import DESIGN_SETUP_KEYS, calc_design_setup_batch, calc_design_setup_breakdown
+
+    columns = make_columns(args.count)
+    sample = min(args.scalar_sample, args.count)
+    rows = [dict(zip(columns, values)) for values in zip(*(columns[k][:sample].tolist() for k in columns))]
+
+    t0 = time.perf_counter()
+    scalar = [calc_design_setup_breakdown(row) for row in rows]
+    scalar_s = time.perf_counter() - t0
+
+    samples = []
+    result = None
+    for _ in range(args.iterations):
+        t0 = time.perf_counter()
+        result = calc_design_setup_batch(columns)
+        samples.append(time.perf_counter() - t0)
+    batch_s = statistics.median(samples)
+
+    print(f"{'mode':<7} {'rows':>9} {'seconds':>9} {'rows/s':>13}")
+    print(f"{'scalar':<7} {sample:>9} {scalar_s:>9.3f} {sample / scalar_s:>13,.0f}")
+    print(f"{'batch':<7} {args.count:>9} {batch_s:>9.3f} {args.count / batch_s:>13,.0f}  "
+          f"(median of {args.iterations}, min {min(samples):.3f}s)")
+    print(f"speedup: {(args.count / batch_s) / (sample / scalar_s):.0f}x")
+
+    mismatched = sum(
+        1 for i, expected in enumerate(scalar)
+        if any(result[k][i].item() != expected[k] for k in DESIGN_SETUP_KEYS)
+    )
+    print(f"exact match on {sample} scalar rows: {'yes' if not mismatched else f'NO ({mismatched} rows differ)'}")
+
+
+if __name__ == "__main__":
+    main()
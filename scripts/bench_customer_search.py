@@ -0,0 +1,122 @@
+"""
+顧客検索のレイテンシ比較（既定 100,000 件）: 従来の LIKE '%q%' と customers_fts（FTS5 trigram）。
+
+使い方:
+  python scripts/bench_customer_search.py [--customers N] [--iterations N]   # 既定: 100000件・20回
+
+一時ディレクトリの新規 DB で計測する（既存の DB には触れない）。
+- like: name / name_kana への LIKE '%q%'（従来の customer_list の条件。正規化なし）
+- fts : app/customer_search.py の search_customers（正規化・関連度順）
+どちらも customer_list と同じく Customer を全列読み込み、一般ユーザー条件（approved のみ）を付けて計る。
+ヒット件数が多い語（住所の市区名など）は ORM オブジェクトの生成が支配的になる（一覧はページングしていない）。
+索引の作り直し（flask scart reindex-customers 相当）の所要時間も表示する。
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+SURNAMES = [("山田", "ヤマダ"), ("佐藤", "サトウ"), ("鈴木", "スズキ"), ("高橋", "タカハシ"), ("田中", "タナカ"),
+            ("伊藤", "イトウ"), ("渡辺", "ワタナベ"), ("中村", "ナカムラ"), ("小林", "コバヤシ"), ("加藤", "カトウ")]
+TRADES = [("商事", "ショウジ"), ("工業", "コウギョウ"), ("建設", "ケンセツ"), ("運輸", "ウンユ"), ("電機", "デンキ"),
+          ("製作所", "セイサクショ"), ("工務店", "コウムテン"), ("印刷", "インサツ")]
+CITIES = ["東京都港区", "東京都千代田区", "大阪府大阪市北区", "愛知県名古屋市中区", "福岡県福岡市博多区", "北海道札幌市中央区"]
+# (検索語, 説明)
+QUERIES = [
+    ("山田商事", "name, 4 chars"),
+    ("やまだしょうじ", "kana (hiragana query)"),
+    ("ﾀﾅｶｹﾝｾﾂ", "kana (half-width query)"),
+    ("C012345", "customer code"),
+    ("名古屋市", "address"),
+    ("03-1234", "phone"),
+    ("佐藤 大阪府", "two terms (LIKE + MATCH)"),
+    ("該当なし顧客", "no hit"),
+]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def seed(db_path, count):
+    rnd = random.Random(42)
+    rows = []
+    for i in range(count):
+        (sn, sk), (tn, tk) = rnd.choice(SURNAMES), rnd.choice(TRADES)
+        rows.append((
+            f"{sn}{tn}{i:06d}", f"{sk}{tk}", f"C{i:06d}",
+            f"{rnd.choice(CITIES)}{rnd.randint(1, 9)}-{rnd.randint(1, 30)}-{rnd.randint(1, 20)}",
+            f"0{rnd.randint(3, 99)}-{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}",
+            "approved" if i % 10 else "pending",
+        ))
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.executemany("INSERT INTO customers (name, name_kana, customer_code, address, phone, status) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    with temp_app("scart_bench_cs_", SLOW_QUERY_LOG_ENABLED="0") as fx:
+        run(args, fx)
+
+
+def run(args, fx):
+    import logging
+
+    from sqlalchemy import or_
+    from app.customer_search import rebuild_customer_fts, search_customers
+    from app.migrations import connect
+    from app.models.customer import Customer, CustomerStatus
+
+    app, db_path = fx.app, fx.db_path
+    logging.disable(logging.INFO)
+
+    t0 = time.perf_counter()
+    seed(db_path, args.customers)
+    print(f"seed: {args.customers} customers ({time.perf_counter() - t0:.1f}s)")
+    conn = connect(db_path)
+    t0 = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    rebuild_customer_fts(conn)
+    conn.execute("COMMIT")
+    conn.close()
+    print(f"reindex-customers: {(time.perf_counter() - t0) * 1000.0:.0f}ms")
+
+    def like(q):
+        return Customer.query.filter(or_(Customer.name.contains(q), Customer.name_kana.contains(q)))
+
+    def fts(q):
+        return search_customers(Customer.query, q)
+
+    print(f"\n{'case':<24} {'mode':<5} {'rows':>6} {'p50 ms':>8} {'p95 ms':>8}  query")
+    with app.test_request_context():
+        for q, label in QUERIES:
+            for mode, build in (("like", like), ("fts", fts)):
+                samples = []
+                rows = 0
+                for _ in range(args.iterations):
+                    t0 = time.perf_counter()
+                    rows = len(build(q).filter(Customer.status == CustomerStatus.APPROVED.value)
+                               .order_by(Customer.name).all())
+                    samples.append((time.perf_counter() - t0) * 1000.0)
+                print(f"{label:<24} {mode:<5} {rows:>6} "
+                      f"{statistics.median(samples):>8.2f} {percentile(samples, 95):>8.2f}  {q}")
+
+
+if __name__ == "__main__":
+    main()
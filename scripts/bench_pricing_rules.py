@@ -0,0 +1,140 @@
+"""
+設計/セットアップ費用のスカラー計算の速度: 手書きの関数とコンパイルした計算式（app/pricing_rules.py）。
+
+使い方:
+  python scripts/bench_pricing_rules.py [--count N] [--iterations N]
+  # 既定: 200000件 × 5回（中央値）
+
+- handwritten: 計算式を定義に移す前の cost_utils（単価表の属性を参照し、人数の段階をループで探す）をここに写したもの
+- breakdown  : app/cost_utils.calc_design_setup_breakdown（入力の dict → 出力の dict。コンパイルした関数を呼ぶ）
+- compiled   : 単価表の rules.evaluate を直接呼ぶ（係数は定数に畳み込み済み。dict の変換なし）
+最後に全件で3つの結果が一致することを確かめる。DB もアプリも使わない。
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+# --- 比較用: 手書き時代の計算（app/cost_utils.py の旧実装） ---
+def _safe_float(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _workers_for(rates, vehicle_count, distance):
+    for tier in rates.worker_tiers:
+        if ((tier.min_vehicles is None or vehicle_count >= tier.min_vehicles)
+                and (tier.max_vehicles is None or vehicle_count <= tier.max_vehicles)
+                and distance <= tier.max_distance):
+            return tier.workers
+    return rates.default_workers
+
+
+def _design_hours(distance, intersections, stations, vehicle_count, rates):
+    distance, intersections = _safe_float(distance), _safe_float(intersections)
+    stations, vehicle_count = _safe_float(stations), _safe_float(vehicle_count)
+    design_hours_base = (
+        vehicle_count * intersections * rates.design_intersection_hours
+        + stations * rates.design_station_hours
+        + distance / rates.design_meters_per_hour
+    )
+    return design_hours_base * rates.design_safety_factor
+
+
+def _setup_hours(distance, intersections, stations, vehicle_count, rates):
+    distance, intersections = _safe_float(distance), _safe_float(intersections)
+    stations, vehicle_count = _safe_float(stations), _safe_float(vehicle_count)
+    ct_min = distance / rates.setup_speed_m_per_min + rates.setup_station_ct_min * stations
+    trial_count = rates.trial_runs_per_vehicle * vehicle_count
+    trial_hours = (ct_min * trial_count) / 60.0
+    bug_fix_hours = rates.bug_fix_hours_per_trial * trial_count
+    interlock_hours = rates.interlock_hours * vehicle_count * intersections * stations
+    base_hours = trial_hours + bug_fix_hours + interlock_hours
+    return base_hours * rates.setup_safety_factor * _workers_for(rates, vehicle_count, distance)
+
+
+def _profit_rate(fee, cost):
+    return (fee - cost) / fee * 100.0 if fee > 0 else 0.0
+
+
+def handwritten_breakdown(param_dict, rates):
+    distance = _safe_float(param_dict.get("distance_m", param_dict.get("distance", 0)))
+    intersections = _safe_float(param_dict.get("intersection_count", param_dict.get("intersections", 0)))
+    stations = _safe_float(param_dict.get("station_count", param_dict.get("stations", 0)))
+    vehicle_count = _safe_float(param_dict.get("vehicle_count", param_dict.get("vehicles", 0)))
+    design_hours = math.ceil(_design_hours(distance, intersections, stations, vehicle_count, rates))
+    design_cost = design_hours * rates.labor_rate
+    design_fee = design_hours * rates.design_sell_rate
+    setup_hours = math.ceil(_setup_hours(distance, intersections, stations, vehicle_count, rates))
+    setup_cost = setup_hours * rates.labor_rate
+    setup_fee = setup_hours * rates.setup_sell_rate
+    return {
+        "design_hours": design_hours,
+        "design_cost": design_cost,
+        "design_fee": design_fee,
+        "design_profit_rate": _profit_rate(design_fee, design_cost),
+        "setup_hours": setup_hours,
+        "setup_cost": setup_cost,
+        "setup_fee": setup_fee,
+        "setup_profit_rate": _profit_rate(setup_fee, setup_cost),
+        "rate_table_version": rates.version,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.cost_utils import DEFAULT_RATE_TABLE, DESIGN_SETUP_KEYS, calc_design_setup_breakdown
+    from app.pricing_rules import compile_pricing_rules
+
+    rng = random.Random(42)
+    rows = [{"distance_m": round(rng.uniform(0, 1500), 1), "intersection_count": float(rng.randint(0, 29)),
+             "station_count": float(rng.randint(0, 39)), "vehicle_count": float(rng.randint(0, 11))}
+            for _ in range(args.count)]
+    tuples = [(r["distance_m"], r["intersection_count"], r["station_count"], r["vehicle_count"]) for r in rows]
+    rates = DEFAULT_RATE_TABLE
+
+    t0 = time.perf_counter()
+    compile_pricing_rules(rates)
+    compile_ms = (time.perf_counter() - t0) * 1000.0
+    evaluate = rates.rules.evaluate
+
+    def run(label, fn):
+        samples = []
+        result = None
+        for _ in range(args.iterations):
+            t0 = time.perf_counter()
+            result = fn()
+            samples.append(time.perf_counter() - t0)
+        seconds = statistics.median(samples)
+        print(f"{label:<12} {args.count:>9} {seconds:>9.3f} {args.count / seconds:>13,.0f}")
+        return result, seconds
+
+    print(f"{'mode':<12} {'rows':>9} {'seconds':>9} {'rows/s':>13}  (median of {args.iterations})")
+    hand, hand_s = run("handwritten", lambda: [handwritten_breakdown(r, rates) for r in rows])
+    breakdown, breakdown_s = run("breakdown", lambda: [calc_design_setup_breakdown(r, rates) for r in rows])
+    compiled, compiled_s = run("compiled", lambda: [evaluate(*t) for t in tuples])
+    print(f"compile: {compile_ms:.1f}ms per rate table version")
+    print(f"breakdown vs handwritten: {hand_s / breakdown_s:.2f}x, compiled vs handwritten: {hand_s / compiled_s:.2f}x")
+
+    mismatched = sum(
+        1 for h, b, c in zip(hand, breakdown, compiled)
+        if h != b or tuple(h[k] for k in DESIGN_SETUP_KEYS) != c
+    )
+    print(f"exact match on {args.count} rows: {'yes' if not mismatched else f'NO ({mismatched} rows differ)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+見積明細の書き込み方式による保存レイテンシの比較（10 / 100 / 1000 行）。
+
+使い方:
+  python scripts/bench_quotation_save.py [--iterations N] [--lines 10,100,1000]   # 既定: 20回
+
+一時ディレクトリの新規 DB で計測する（既存の DB には触れない）。
+- orm : 明細ごとに db.session.add(QuotationDetail(...))（従来の _save_quotation の書き方）
+- bulk: app/services/quotation_details.insert_detail_lines（executemany の INSERT を1回＋id の読み戻し）
+どちらも見積ヘッダ INSERT・集計列更新・コミットまでを1回の保存として計る。
+最後に POST /quotation/new 全体（フォーム解析〜書き込みキュー経由の保存）のレイテンシも表示する。
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def make_lines(count, product_ids):
+    return [
+        {"product_id": product_ids[i % len(product_ids)], "label": None, "quantity": 1 + i % 5,
+         "price": 1000.0 + i, "subtotal": (1000.0 + i) * (1 + i % 5), "description": f"部品{i:04d}"}
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--lines", default="10,100,1000")
+    args = parser.parse_args()
+    with temp_app("scart_bench_save_", SLOW_QUERY_LOG_ENABLED="0") as fx:
+        return run(args, fx)
+
+
+def run(args, fx):
+    import logging
+
+    from app import db
+    from app.models.quotation import Quotation
+    from app.models.quotation_detail import QuotationDetail
+    from app.services.quotation_details import insert_detail_lines
+    from app.services.quotation_totals import refresh_quotation_totals
+
+    app, db_path = fx.app, fx.db_path
+    line_counts = [int(x) for x in args.lines.split(",") if x.strip()]
+    logging.disable(logging.INFO)
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    cust_id = conn.execute("INSERT INTO customers (name, status) VALUES ('ベンチ用顧客', 'approved')").lastrowid
+    product_ids = [conn.execute("INSERT INTO products (name, unit_price, cost) VALUES (?, 1000, 600)",
+                                (f"部品{i:03d}",)).lastrowid for i in range(100)]
+    conn.commit()
+    conn.close()
+
+    def save(lines, bulk):
+        now = datetime.utcnow()
+        quotation = Quotation(company_name="ベンチ用顧客", project_name="保存ベンチ", customer_id=cust_id,
+                              discount_rate=0.0, revision_no=0, created_at=now, updated_at=now)
+        db.session.add(quotation)
+        db.session.flush()
+        quotation.original_id = quotation.latest_revision_id = quotation.id
+        if bulk:
+            insert_detail_lines(quotation.id, lines)
+        else:
+            for line in lines:
+                db.session.add(QuotationDetail(quotation_id=quotation.id, **line))
+        refresh_quotation_totals(quotation)
+        db.session.commit()
+
+    print(f"iterations={args.iterations}")
+    print(f"{'lines':>6} {'mode':<6} {'median_ms':>10} {'p95_ms':>10}")
+    with app.app_context():
+        for count in line_counts:
+            lines = make_lines(count, product_ids)
+            medians = {}
+            for mode in ("orm", "bulk"):
+                save(lines, mode == "bulk")  # ウォームアップ
+                samples = []
+                for _ in range(args.iterations):
+                    t0 = time.perf_counter()
+                    save(lines, mode == "bulk")
+                    samples.append((time.perf_counter() - t0) * 1000.0)
+                    db.session.expunge_all()
+                medians[mode] = statistics.median(samples)
+                print(f"{count:>6} {mode:<6} {medians[mode]:>10.2f} {percentile(samples, 95):>10.2f}")
+            print(f"{count:>6} {'speedup':<6} {medians['orm'] / medians['bulk'] if medians['bulk'] else 0:>10.2f}x")
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+    print("\nPOST /quotation/new end to end")
+    print(f"{'lines':>6} {'median_ms':>10} {'p95_ms':>10}")
+    for count in line_counts:
+        form = {
+            "company_name": "x", "project_name": "保存ベンチ", "customer_id": str(cust_id),
+            "product_id[]": [str(product_ids[i % len(product_ids)]) for i in range(count)],
+            "code[]": ["C"] * count, "description[]": [f"部品{i:04d}" for i in range(count)],
+            "unit_price[]": ["1000"] * count, "quantity[]": ["2"] * count, "subtotal[]": [""] * count,
+        }
+        client.post("/quotation/new", data=form)
+        samples = []
+        for _ in range(args.iterations):
+            t0 = time.perf_counter()
+            resp = client.post("/quotation/new", data=form)
+            samples.append((time.perf_counter() - t0) * 1000.0)
+            if resp.status_code != 302:
+                raise RuntimeError(f"unexpected status {resp.status_code}")
+        print(f"{count:>6} {statistics.median(samples):>10.2f} {percentile(samples, 95):>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
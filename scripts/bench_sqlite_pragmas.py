@@ -0,0 +1,146 @@
+"""
+SQLite 接続 PRAGMA（app/sqlite_tuning.py）の有無で、見積一覧表示と見積保存のレイテンシを比較する。
+
+使い方:
+  python scripts/bench_sqlite_pragmas.py [元DB] [--iterations N]   # 既定: estimates.db, 50回
+
+元DB は一時ディレクトリにコピーしてから計測する（元ファイルは変更しない）。
+各モード（SQLITE_TUNING=0 / 1）は別プロセスで create_app し、Flask テストクライアントで
+GET /quotations と POST /quotation/new を N 回ずつ実行して中央値・p95 を表示する。
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def copy_db(src, dst_dir):
+    dst = os.path.join(dst_dir, "bench.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(src + suffix):
+            shutil.copyfile(src + suffix, dst + suffix)
+    return dst
+
+
+def prepare_fixture(db_path):
+    """計測用の管理ユーザーと承認済み顧客の id を返す（無ければ作る）。"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        user = conn.execute("SELECT id FROM users WHERE role='admin' AND is_active=1 ORDER BY id LIMIT 1").fetchone()
+        cust = conn.execute("SELECT id FROM customers WHERE status='approved' ORDER BY id LIMIT 1").fetchone()
+        if not cust:
+            cur = conn.execute(
+                "INSERT INTO customers (name, status, created_at, updated_at) "
+                "VALUES ('ベンチ用顧客', 'approved', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+            )
+            conn.commit()
+            cust = (cur.lastrowid,)
+        return user[0], cust[0]
+    finally:
+        conn.close()
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def run_child(iterations):
+    """子プロセス側: 環境変数で指定された DB・モードで計測し JSON を標準出力に書く。"""
+    import logging
+
+    sys.path.insert(0, PROJECT_ROOT)
+    from app import create_app
+
+    app = create_app()
+    logging.disable(logging.INFO)
+    user_id = int(os.environ["BENCH_USER_ID"])
+    customer_id = os.environ["BENCH_CUSTOMER_ID"]
+    form = {
+        "company_name": "ベンチ",
+        "project_name": "PRAGMA ベンチマーク",
+        "customer_id": customer_id,
+        "product_id[]": ["", "", ""],
+        "code[]": ["A", "B", "C"],
+        "description[]": ["明細A", "明細B", "明細C"],
+        "unit_price[]": ["1000", "2500", "300"],
+        "quantity[]": ["1", "2", "10"],
+        "subtotal[]": ["", "", ""],
+    }
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+
+    def measure(fn):
+        fn()  # ウォームアップ（接続生成・テンプレートコンパイル）
+        samples = []
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            resp = fn()
+            samples.append((time.perf_counter() - t0) * 1000.0)
+            if resp.status_code >= 400:
+                raise RuntimeError(f"unexpected status {resp.status_code}")
+        return samples
+
+    result = {
+        "list": measure(lambda: client.get("/quotations")),
+        "save": measure(lambda: client.post("/quotation/new", data=form)),
+    }
+    print(json.dumps(result))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("db", nargs="?", default=os.path.join(PROJECT_ROOT, "estimates.db"))
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args.iterations)
+
+    if not os.path.exists(args.db):
+        print(f"[FAIL] DB not found: {args.db}")
+        return 2
+
+    results = {}
+    for label, tuning in (("default", "0"), ("tuned", "1")):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = copy_db(args.db, tmp)
+            env = dict(os.environ, SCART_DB_PATH=db_path, SQLITE_TUNING=tuning, FLASK_DEBUG="0",
+                       SCART_TEMPLATE_MODE="debug")
+            # 移行を先に済ませてから fixture を用意する
+            subprocess.check_call([sys.executable, "-m", "app.migrations", db_path],
+                                  cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            user_id, customer_id = prepare_fixture(db_path)
+            env.update(BENCH_USER_ID=str(user_id), BENCH_CUSTOMER_ID=str(customer_id))
+            out = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), "--child", "--iterations", str(args.iterations)],
+                cwd=PROJECT_ROOT, env=env, stderr=subprocess.DEVNULL,
+            )
+            results[label] = json.loads(out.decode("utf-8").strip().splitlines()[-1])
+
+    print(f"iterations={args.iterations}")
+    print(f"{'case':<6} {'mode':<8} {'median_ms':>10} {'p95_ms':>10}")
+    for case in ("list", "save"):
+        for label in ("default", "tuned"):
+            samples = results[label][case]
+            print(f"{case:<6} {label:<8} {statistics.median(samples):>10.2f} {percentile(samples, 95):>10.2f}")
+        base = statistics.median(results["default"][case])
+        tuned = statistics.median(results["tuned"][case])
+        print(f"{case:<6} {'speedup':<8} {base / tuned if tuned else 0:>10.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Jinja テンプレートをビルド時に事前コンパイルし、EXE 同梱用のバイトコードキャッシュを作る。
+
+使い方:
+  python scripts/precompile_templates.py [出力ディレクトリ]   # 既定: build/jinja_cache
+
+SCARTQuotation.spec から PyInstaller 実行時に自動で呼ばれる。
+バイトコードは Python バージョン依存のため、EXE をビルドする Python で実行すること。
+"""
+import os
+import shutil
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from flask import Flask
+
+from app.template_cache import PortableBytecodeCache, warm_up_templates
+
+
+def precompile(out_dir):
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    # create_app と同じ Jinja 設定（Flask 既定）の環境でコンパイルする。DB やルートは不要
+    app = Flask("app", template_folder=os.path.join(PROJECT_ROOT, "app", "templates"))
+    app.jinja_env.bytecode_cache = PortableBytecodeCache(out_dir)
+    return warm_up_templates(app.jinja_env)
+
+
+def main():
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PROJECT_ROOT, "build", "jinja_cache")
+    count = precompile(out_dir)
+    print(f"[OK] precompiled {count} templates -> {out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,10 +8,23 @@ import datetime
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
+# 起動済みのサーバー（BASE_URL）と DB（SCART_DB_PATH）に対して実行するテスト
+# （test_schema_users.py は運用中の DB の users 表を確かめるガード。SCART_DB_PATH 未指定なら estimates.db を開く）
+SERVER_TESTS = ("test_permissions.py", "test_concurrent_approve.py", "test_schema_users.py")
+# 手動実行用（サーバーと既存 DB の testuser1 を前提にし、後片付けをしない）
+MANUAL_TESTS = ("test_register.py",)
+
+
+def standalone_tests():
+    """それ以外の scripts/test_*.py は一時 DB で自己完結する。追加したファイルは自動で対象になる。"""
+    skip = set(SERVER_TESTS) | set(MANUAL_TESTS)
+    return sorted(p.name for p in (PROJECT_ROOT / "scripts").glob("test_*.py") if p.name not in skip)
+
+
 def run_test(script, env):
     proc = subprocess.run([
         sys.executable, str(PROJECT_ROOT / 'scripts' / script)
-    ], cwd=str(PROJECT_ROOT), capture_output=True, text=True, env=env)
+    ], cwd=str(PROJECT_ROOT), capture_output=True, text=True, encoding="utf-8", errors="replace", env=env)
     print(proc.stdout, end="")
     print(proc.stderr, end="")
     fail_log_paths = []
@@ -24,7 +37,7 @@ def extract_key_failure(stdout, stderr):
     lines = (stdout + '\n' + stderr).splitlines()
     # Prefer first FAIL: line
     for line in lines:
-        if line.startswith("FAIL:") and not any(x in line.lower() for x in ["password", "token", "salt"]):
+        if line.startswith(("FAIL:", "[FAIL]")) and not any(x in line.lower() for x in ["password", "token", "salt"]):
             return line.strip()
     # Next, look for Traceback
     for i, line in enumerate(lines):
@@ -44,10 +57,15 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--base-url', type=str, default=None)
     parser.add_argument('--db', type=str, default=None)
-        parser.add_argument("--write-summary-on-pass", action="store_true", help="Write summary even if all tests pass (CI mode)")
+    parser.add_argument("--write-summary-on-pass", action="store_true", help="Write summary even if all tests pass (CI mode)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--server", action="store_true", help="Run only the tests that need a running server")
+    group.add_argument("--standalone", action="store_true", help="Run only the self-contained tests (no server)")
     args = parser.parse_args()
 
     env = dict(os.environ)
+    # テストの出力（日本語）を Windows のコンソールでも UTF-8 で受け取る
+    env.setdefault("PYTHONIOENCODING", "utf-8")
     base_url = args.base_url or env.get('BASE_URL', 'default')
     db_path = args.db or env.get('SCART_DB_PATH', 'auto')
     if args.base_url:
@@ -55,39 +73,33 @@ def main():
     if args.db:
         env['SCART_DB_PATH'] = args.db
 
+    scripts = []
+    if not args.standalone:
+        scripts.extend(SERVER_TESTS)
+    if not args.server:
+        scripts.extend(standalone_tests())
+
     test_results = []
     fail_log_paths = []
-
-    rc1, logs1, out1, err1 = run_test('test_permissions.py', env)
-    key_failure1 = extract_key_failure(out1, err1)
-    fail_log1 = logs1[0] if logs1 else ""
-    test_results.append({
-        "name": "test_permissions",
-        "returncode": rc1,
-        "fail_log_path": fail_log1,
-        "stdout": out1,
-        "stderr": err1,
-        "key_failure": key_failure1
-    })
-    fail_log_paths.extend(logs1)
-
-    rc2, logs2, out2, err2 = run_test('test_concurrent_approve.py', env)
-    key_failure2 = extract_key_failure(out2, err2)
-    fail_log2 = logs2[0] if logs2 else ""
-    test_results.append({
-        "name": "test_concurrent_approve",
-        "returncode": rc2,
-        "fail_log_path": fail_log2,
-        "stdout": out2,
-        "stderr": err2,
-        "key_failure": key_failure2
-    })
-    fail_log_paths.extend(logs2)
+    for script in scripts:
+        # 自己完結のテストは自前の一時 DB を使う（サーバー用の DB を渡さない）
+        script_env = env if script in SERVER_TESTS else {k: v for k, v in env.items() if k != "SCART_DB_PATH"}
+        rc, logs, out, err = run_test(script, script_env)
+        test_results.append({
+            "name": Path(script).stem,
+            "returncode": rc,
+            "fail_log_path": logs[0] if logs else "",
+            "stdout": out,
+            "stderr": err,
+            "key_failure": extract_key_failure(out, err),
+        })
+        fail_log_paths.extend(logs)
+    failed = any(tr["returncode"] != 0 for tr in test_results)
 
     print("\n==== SUMMARY ====")
-    print(f"test_permissions: {'PASS' if rc1 == 0 else 'FAIL'}")
-    print(f"test_concurrent_approve: {'PASS' if rc2 == 0 else 'FAIL'}")
-    if rc1 != 0 or rc2 != 0:
+    for tr in test_results:
+        print(f"{tr['name']}: {'PASS' if tr['returncode'] == 0 else 'FAIL'}")
+    if failed:
         print("FAIL LOGS:")
         if fail_log_paths:
             for path in fail_log_paths:
@@ -96,7 +108,7 @@ def main():
             print("  (not found)")
 
     # Markdown summary generation (FAIL only)
-        if rc1 != 0 or rc2 != 0 or args.write_summary_on_pass:
+    if failed or args.write_summary_on_pass:
         summary_dir = PROJECT_ROOT / "artifacts" / "test_summary"
         summary_dir.mkdir(parents=True, exist_ok=True)
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -123,7 +135,7 @@ def main():
             else:
                 f.write("- (not found)\n")
         print(f"[INFO] Summary written: {summary_file.resolve()}")
-    sys.exit(1 if rc1 != 0 or rc2 != 0 else 0)
+    sys.exit(1 if failed else 0)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,132 @@
+"""
+商品カタログキャッシュ（app/catalog_cache.py）のテスト。
+
+- 見積保存（POST /quotation/new）のクエリ数が明細行数（10行 / 200行）によらず一定で、
+  品名が空の行には商品名が入ること
+- 2回目以降の見積フォーム表示で商品一覧を読み直さないこと
+- 商品の登録・編集（ORM）と一括 UPDATE でカタログ版数が上がり、次の表示に反映されること
+- create_app() を重ねて呼んでもセッションのリスナーは増えず、1回のコミットで版数が1つだけ上がること
+"""
+import os
+import sqlite3
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+PRODUCTS = 50
+
+
+def run(fx) -> int:
+    from app import db
+    from app.models.product import Product
+
+    app, db_path = fx.app, fx.db_path
+    cache = app.extensions["scart_catalog_cache"]
+    failures = []
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    cust_id = conn.execute("INSERT INTO customers (name, status) VALUES ('カタログ顧客', 'approved')").lastrowid
+    product_ids = [
+        conn.execute("INSERT INTO products (name, unit_price, cost) VALUES (?, ?, ?)",
+                     (f"商品{i:03d}", 100 + i, 50 + i)).lastrowid
+        for i in range(PRODUCTS)
+    ]
+    conn.commit()
+    conn.close()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+
+    # 1) 明細行数によらずクエリ数一定・品名の補完
+    def post(lines, project):
+        ids = [str(product_ids[i % PRODUCTS]) for i in range(lines)]
+        resp = client.post("/quotation/new", data={
+            "company_name": "x", "project_name": project, "customer_id": str(cust_id),
+            "product_id[]": ids, "code[]": ["C"] * lines, "description[]": [""] * lines,
+            "unit_price[]": ["100"] * lines, "quantity[]": ["1"] * lines, "subtotal[]": [""] * lines,
+        })
+        return resp.status_code, int(resp.headers.get("X-DB-Query-Count", -1))
+
+    client.get("/quotation/new")  # カタログを読み込んでおく
+    counts = {}
+    for lines in (10, 200):
+        status, counts[lines] = post(lines, f"カタログ{lines}")
+        if status != 302:
+            failures.append(f"save {lines} lines: status={status}")
+    conn = sqlite3.connect(db_path, timeout=30)
+    unnamed = conn.execute("SELECT COUNT(*) FROM quotation_details WHERE description IS NULL OR description = ''").fetchone()[0]
+    saved = conn.execute("SELECT COUNT(*) FROM quotation_details").fetchone()[0]
+    conn.close()
+    if counts.get(10) != counts.get(200) or unnamed or saved != 210:
+        failures.append(f"save: queries={counts} details={saved} unnamed={unnamed}")
+    else:
+        print(f"[OK] save: {counts[200]} queries for both 10 and 200 lines, names resolved")
+
+    # 2) フォーム表示はキャッシュから
+    first = int(client.get("/quotation/new").headers["X-DB-Query-Count"])
+    loads = cache.stats()["loads"]
+    second = int(client.get("/quotation/new").headers["X-DB-Query-Count"])
+    if cache.stats()["loads"] != loads or second > first:
+        failures.append(f"form: queries {first} -> {second}, loads {loads} -> {cache.stats()['loads']}")
+    else:
+        print(f"[OK] form: served from catalog (queries={second}, hits={cache.stats()['hits']})")
+
+    # 3) 版数の更新
+    version = cache.version
+    client.post(f"/products/{product_ids[0]}/edit", data={"name": "改名商品", "unit_price": "1", "cost": "0"})
+    loads = cache.stats()["loads"]
+    client.get("/quotation/new")
+    with app.app_context():
+        shown = cache.stats()["loads"] == loads + 1 and any(p["name"] == "改名商品" for p in cache.get().products)
+    if cache.version == version or not shown:
+        failures.append(f"edit: version {version} -> {cache.version}, renamed product shown={shown}")
+    else:
+        print(f"[OK] edit: catalog version {version} -> {cache.version}")
+
+    client.post("/products/new", data={"name": "新商品", "unit_price": "10", "cost": "5"})
+    with app.app_context():
+        version = cache.version
+        Product.query.filter(Product.id == product_ids[1]).update({Product.name: "一括更新商品"})
+        db.session.commit()
+        names = {p["name"] for p in cache.get().products}
+    if cache.version == version or not {"新商品", "一括更新商品"} <= names:
+        failures.append(f"bulk update/new: version {version} -> {cache.version}")
+    else:
+        print("[OK] new product and bulk UPDATE invalidate the catalog")
+
+    # 4) アプリを作り直してもリスナーは1組
+    from app import create_app, master_versions
+
+    create_app()
+    marks = []
+    mark = master_versions.mark_tables_changed
+    master_versions.mark_tables_changed = lambda session, *tables: (marks.append(tables), mark(session, *tables))
+    try:
+        with app.app_context():
+            version = cache.version
+            db.session.get(Product, product_ids[2]).name = "再作成後の商品"
+            db.session.commit()
+    finally:
+        master_versions.mark_tables_changed = mark
+    if marks != [("products",)] or cache.version != version + 1:
+        failures.append(f"second create_app: flush marked {marks}, version {version} -> {cache.version}")
+    else:
+        print("[OK] second create_app() does not register the session listeners again")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_cc_", WRITE_QUEUE_ENABLED="0") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+設計/セットアップ費用の一括計算（app/cost_utils.calc_design_setup_batch）のテスト。
+
+- 乱数のパラメータ集合（人数の段階の境界・小数・0 を含む）で、各要素がスカラー版
+  calc_design_setup_breakdown と完全に一致すること（工数・原価・売価・利益率）
+- dict / 構造化配列 / 別名の列 / 欠けた列 / スカラーの列 / NaN を受け付けること
+DB もアプリも使わない。
+"""
+import os
+import random
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+COUNT = 20000
+
+
+def main() -> int:
+    import numpy as np
+
+    from app.cost_utils import DESIGN_SETUP_KEYS, RATE_TABLE_VERSION, calc_design_setup_batch, calc_design_setup_breakdown
+
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    def mismatches(rows, result):
+        bad = []
+        for i, row in enumerate(rows):
+            expected = calc_design_setup_breakdown(row)
+            got = {k: result[k][i].item() for k in DESIGN_SETUP_KEYS}
+            if any(got[k] != expected[k] or type(got[k]) is not type(expected[k]) for k in DESIGN_SETUP_KEYS):
+                bad.append((row, got, expected))
+        return bad
+
+    # 1) 乱数のパラメータ集合（人数の段階の境界 50m / 100m・1台 / 2〜5台を多めに）
+    rnd = random.Random(20)
+    rows = []
+    for _ in range(COUNT):
+        rows.append({
+            "distance_m": rnd.choice([0.0, 50.0, 50.5, 100.0, 100.01, rnd.uniform(0, 2000), float(rnd.randint(0, 500))]),
+            "intersection_count": float(rnd.randint(0, 30)),
+            "station_count": rnd.choice([float(rnd.randint(0, 40)), rnd.uniform(0, 10)]),
+            "vehicle_count": rnd.choice([0.0, 1.0, 1.5, 2.0, 5.0, 5.5, 6.0, float(rnd.randint(0, 20))]),
+        })
+    columns = {k: np.array([r[k] for r in rows]) for k in rows[0]}
+    result = calc_design_setup_batch(columns)
+    bad = mismatches(rows, result)
+    check(f"batch equals scalar path exactly ({COUNT} parameter sets)", not bad, bad[:3])
+    check("result dtypes and version",
+          result["design_hours"].dtype == np.int64 and result["setup_fee"].dtype == np.int64
+          and result["setup_profit_rate"].dtype == np.float64 and result["rate_table_version"] == RATE_TABLE_VERSION,
+          {k: result[k].dtype for k in DESIGN_SETUP_KEYS})
+
+    # 2) 入力の形
+    structured = np.zeros(3, dtype=[("distance", "f8"), ("intersections", "i4"), ("stations", "i4"), ("vehicles", "i4")])
+    structured[:] = [(120.0, 3, 2, 1), (40.0, 0, 1, 1), (90.0, 2, 4, 3)]
+    rows = [{"distance_m": float(d), "intersection_count": i, "station_count": s, "vehicle_count": v}
+            for d, i, s, v in structured.tolist()]
+    bad = mismatches(rows, calc_design_setup_batch(structured))
+    check("structured array with alias field names", not bad, bad)
+
+    partial = calc_design_setup_batch({"distance_m": [10.0, 80.0, 300.0], "vehicle_count": 2})
+    rows = [{"distance_m": d, "vehicle_count": 2} for d in (10.0, 80.0, 300.0)]
+    bad = mismatches(rows, partial)
+    check("missing columns are 0 and scalars broadcast", not bad and partial["design_hours"].shape == (3,), bad)
+
+    nan = calc_design_setup_batch({"distance_m": [float("nan"), 120.0], "intersection_count": [3, float("nan")],
+                                   "station_count": [2, 2], "vehicle_count": [1, 1]})
+    rows = [{"distance_m": 0, "intersection_count": 3, "station_count": 2, "vehicle_count": 1},
+            {"distance_m": 120.0, "intersection_count": 0, "station_count": 2, "vehicle_count": 1}]
+    bad = mismatches(rows, nan)
+    check("NaN is treated as unfilled (0)", not bad, bad)
+
+    empty = calc_design_setup_batch({"distance_m": []})
+    check("empty input", all(empty[k].shape == (0,) for k in DESIGN_SETUP_KEYS),
+          {k: empty[k].shape for k in DESIGN_SETUP_KEYS})
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+顧客一覧の全文検索（customers_fts、app/customer_search.py）のテスト。
+
+- 正規化: 半角カナ・ひらがな・全角英数字の検索語で、カタカナ・半角で登録した顧客が引ける
+- 対象列: 顧客名・カナ・得意先コード・住所・電話番号。空白区切りは AND
+- 並び順: 顧客名に含む顧客が住所に含む顧客より先（bm25 の列重み）。2文字以下の語（LIKE）でも動く
+- 同期: 登録・編集・削除が同じトランザクションで索引に反映される。create_app() を重ねても同期は1回
+- flask scart reindex-customers で、索引外の書き込み（sqlite3 直書き）を取り込める
+"""
+import os
+import sqlite3
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+CUSTOMERS = [
+    # name, name_kana, customer_code, address, phone, status
+    ("山田商事", "ヤマダショウジ", "C001", "東京都港区芝1-1", "03-1111-2222", "approved"),
+    ("佐藤工務店", "サトウコウムテン", "C002", "大阪府大阪市 山田商店街2-3", "06-3333-4444", "approved"),
+    ("ＡＢＣ工業", "ｴｰﾋﾞｰｼｰｺｳｷﾞｮｳ", "Ｃ００３", "東京都千代田区丸の内", "03-5555-6666", "approved"),
+    ("山田運輸", "ヤマダウンユ", "C004", "北海道札幌市", "011-777-8888", "pending"),
+]
+
+
+def run(fx) -> int:
+    from app import db
+    from app.models.customer import Customer
+
+    app, db_path = fx.app, fx.db_path
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    conn.execute("INSERT INTO users (login_id, display_name, password_hash, role, is_active, created_at) "
+                 "VALUES ('cs_user', '一般', 'x', 'user', 1, CURRENT_TIMESTAMP)")
+    user_id = conn.execute("SELECT id FROM users WHERE login_id='cs_user'").fetchone()[0]
+    conn.commit()
+    conn.close()
+
+    # 登録は ORM 経由（after_flush で索引に入る）
+    with app.app_context():
+        for name, kana, code, address, phone, status in CUSTOMERS:
+            db.session.add(Customer(name=name, name_kana=kana, customer_code=code,
+                                    address=address, phone=phone, status=status))
+        db.session.commit()
+
+    def client_for(uid):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = uid
+        return client
+
+    admin = client_for(admin_id)
+    user = client_for(user_id)
+    known = [c[0] for c in CUSTOMERS] + ["山田ホールディングス", "直書き顧客", "ＸＹＺ商事"]
+
+    def listed(q, client=admin):
+        html = client.get("/customers", query_string={"q": q}).get_data(as_text=True)
+        body = html[html.find("<tbody"):] if "<tbody" in html else html
+        found = [(body.find(n), n) for n in known if n in body]
+        return [n for _, n in sorted(found)]
+
+    # 1) 正規化
+    check("half-width kana query", "山田商事" in listed("ﾔﾏﾀﾞｼｮｳｼﾞ"), listed("ﾔﾏﾀﾞｼｮｳｼﾞ"))
+    check("hiragana query", "山田商事" in listed("やまだしょうじ"), listed("やまだしょうじ"))
+    check("half-width kana / full-width code are indexed normalized",
+          listed("えーびーしー") == ["ＡＢＣ工業"] and listed("c003") == ["ＡＢＣ工業"], listed("c003"))
+    check("case-insensitive", listed("abc工") == ["ＡＢＣ工業"], listed("abc工"))
+
+    # 2) 対象列・AND
+    check("address", listed("千代田区") == ["ＡＢＣ工業"], listed("千代田区"))
+    check("phone", listed("5555-6666") == ["ＡＢＣ工業"], listed("5555-6666"))
+    check("space-separated terms are ANDed", listed("東京都 港区") == ["山田商事"], listed("東京都 港区"))
+
+    # 3) 並び順・短い語
+    check("name match ranks above address match", listed("山田商") == ["山田商事", "佐藤工務店"], listed("山田商"))
+    check("2-char term (LIKE fallback)", listed("山田") == ["山田商事", "山田運輸", "佐藤工務店"], listed("山田"))
+    check("non-admin sees approved only", "山田運輸" not in listed("山田", user), listed("山田", user))
+    statuses = {q: admin.get("/customers", query_string={"q": q}).status_code for q in ('"山田', 'a"b OR', "*", "%")}
+    check("quotes / operators / wildcards in the query are literal",
+          set(statuses.values()) == {200} and listed('"山田') == [] and listed("%") == [] and listed("山田_") == [],
+          statuses)
+
+    # 4) 同期（ルート経由の登録・編集・削除）
+    admin.post("/customers/new", data={"name": "山田ホールディングス", "name_kana": "ヤマダホールディングス"})
+    check("create is indexed", "山田ホールディングス" in listed("ほーるでぃんぐす"), listed("ほーるでぃんぐす"))
+    with app.app_context():
+        abc_id = db.session.query(Customer.id).filter_by(name="ＡＢＣ工業").scalar()
+        new_id = db.session.query(Customer.id).filter_by(name="山田ホールディングス").scalar()
+    admin.post(f"/customers/{abc_id}/edit", data={"name": "ＸＹＺ商事", "customer_code": "C003"})
+    check("edit is reindexed", listed("xyz") == ["ＸＹＺ商事"] and listed("えーびーしー") == [], listed("xyz"))
+    admin.post(f"/customers/{new_id}/delete")
+    check("delete removes the row", listed("ほーるでぃんぐす") == [], listed("ほーるでぃんぐす"))
+
+    from app import create_app
+
+    other = create_app().extensions["scart_customer_search"]
+    search = app.extensions["scart_customer_search"]
+    synced = (search.stats()["synced_rows"], other.stats()["synced_rows"])
+    admin.post(f"/customers/{abc_id}/edit", data={"name": "ＸＹＺ商事", "customer_code": "C005"})
+    after = (search.stats()["synced_rows"], other.stats()["synced_rows"])
+    check("second create_app() does not add another after_flush listener",
+          after == (synced[0] + 1, synced[1]) and listed("c005") == ["ＸＹＺ商事"], (synced, after))
+
+    # 5) CLI での作り直し
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("INSERT INTO customers (name, name_kana, status) VALUES ('直書き顧客', 'ジカガキ', 'approved')")
+    conn.commit()
+    conn.close()
+    missing = listed("じかがき") == []
+    result = app.test_cli_runner().invoke(args=["scart", "reindex-customers"])
+    check("reindex-customers picks up direct writes",
+          missing and result.exit_code == 0 and listed("じかがき") == ["直書き顧客"],
+          f"missing_before={missing} exit={result.exit_code} output={result.output!r}")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_cs_") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+顧客タイプアヘッド（GET /customers/typeahead、app/customer_typeahead.py）のテスト。
+
+- 正規化: 全角半角・カタカナひらがな・空白の揺れを同一視する
+- 前方一致が部分一致より先に並ぶ／承認済みのみ／limit 件まで／?id= で1件
+- 顧客の承認（書き込みキュー）・編集、支払条件名の変更で索引が作り直される
+  （作り直しはバックグラウンド。完了までは古い索引で答え、完了後に反映される）
+- 大量（30,000件）の承認済み顧客で1回の検索が数 ms に収まり、作り直し中の検索も待たされない
+"""
+import os
+import sqlite3
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+BULK_CUSTOMERS = 30000
+LATENCY_BUDGET_MS = 5.0
+# 作り直し中の検索（スレッド起動と GIL の取り合いを含む）。作り直しを待てば約1秒かかる
+STALE_BUDGET_MS = 50.0
+
+
+def run(fx) -> int:
+    from app import db
+    from app.models.customer import PaymentTerm
+    from app.text_normalize import normalize_text
+
+    app, db_path = fx.app, fx.db_path
+    typeahead = app.extensions["scart_customer_typeahead"]
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    # 1) 正規化
+    check("normalize: full-width / half-width kana / katakana / spaces",
+          normalize_text("ＡＢＣ　ｶﾌﾞｼｷ ガイシャ") == "abcかぶしきがいしゃ",
+          normalize_text("ＡＢＣ　ｶﾌﾞｼｷ ガイシャ"))
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    conn.execute("INSERT INTO users (login_id, display_name, password_hash, role, is_active, created_at) "
+                 "VALUES ('ta_user', '申請者', 'x', 'user', 0, CURRENT_TIMESTAMP)")
+    requester_id = conn.execute("SELECT id FROM users WHERE login_id='ta_user'").fetchone()[0]
+    term_id = conn.execute("INSERT INTO payment_terms (code, name) VALUES ('M1', '月末締め翌月末払い')").lastrowid
+    rows = [
+        ("山田商事", "ヤマダショウジ", "C001", "approved", term_id),
+        ("株式会社山田", "カブシキガイシャヤマダ", "C002", "approved", None),
+        ("ＡＢＣ工業", "エービーシーコウギョウ", "C003", "approved", None),
+        ("鈴木建設", "スズキケンセツ", "C004", "rejected", None),
+    ]
+    ids = {}
+    for name, kana, code, status, term in rows:
+        ids[name] = conn.execute("INSERT INTO customers (name, name_kana, customer_code, status, payment_term_id) "
+                                 "VALUES (?, ?, ?, ?, ?)", (name, kana, code, status, term)).lastrowid
+    pending_id = conn.execute("INSERT INTO customers (name, name_kana, status, requested_by_user_id) "
+                              "VALUES ('山田運輸', 'ヤマダウンユ', 'pending', ?)", (requester_id,)).lastrowid
+    conn.commit()
+    conn.close()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+
+    def names(q, **params):
+        resp = client.get("/customers/typeahead", query_string={"q": q, **params})
+        return [c["name"] for c in (resp.get_json() or {}).get("items", [])]
+
+    def refreshed(q, **params):
+        # 変更後の最初の検索が作り直しを始める。完了を待ってから引き直す
+        names(q, **params)
+        typeahead.wait()
+        return names(q, **params)
+
+    # 2) 検索
+    check("prefix matches rank before substring matches", names("山田") == ["山田商事", "株式会社山田"], names("山田"))
+    check("katakana query matches kana (hiragana / half-width)",
+          names("やまだしょう") == ["山田商事"] and names("ﾔﾏﾀﾞｼｮｳ") == ["山田商事"], names("ﾔﾏﾀﾞｼｮｳ"))
+    check("full-width / case-insensitive code and name", names("abc") == ["ＡＢＣ工業"] and names("ｃ００３") == ["ＡＢＣ工業"],
+          names("abc"))
+    check("space-insensitive", names("山田 商事") == ["山田商事"], names("山田 商事"))
+    check("approved only", names("鈴木") == [] and names("運輸") == [], names("運輸"))
+    check("limit", names("山田", limit=1) == ["山田商事"], names("山田", limit=1))
+    check("empty query", names("") == [], names(""))
+    resp = client.get("/customers/typeahead", query_string={"id": ids["山田商事"]})
+    item = (resp.get_json() or {}).get("items", [{}])[0]
+    check("?id= returns one customer with payment terms", item.get("payment_term_name") == "月末締め翌月末払い", item)
+    resp = client.get("/customers/typeahead", query_string={"id": ids["鈴木建設"]})
+    check("?id= of a non-approved customer is empty", resp.get_json() == {"items": []}, resp.get_json())
+    check("login required", app.test_client().get("/customers/typeahead?q=a").status_code in (302, 401),
+          "anonymous request was served")
+
+    # 3) 変更で作り直される
+    builds = typeahead.stats()["builds"]
+    names("山田")
+    check("memoized between searches", typeahead.stats()["builds"] == builds, typeahead.stats())
+
+    client.post(f"/customers/{pending_id}/approve")
+    stale = names("山田")
+    check("first search after a change is served from the old index while it rebuilds",
+          "山田運輸" not in stale and typeahead.stats()["stale_searches"] >= 1, (stale, typeahead.stats()))
+    typeahead.wait()
+    check("approve (write queue) refreshes the index", "山田運輸" in names("山田"), names("山田"))
+
+    client.post(f"/customers/{ids['ＡＢＣ工業']}/edit",
+                data={"name": "ＸＹＺ工業", "name_kana": "エックスワイゼットコウギョウ", "customer_code": "C003"})
+    check("edit refreshes the index", refreshed("xyz") == ["ＸＹＺ工業"] and names("abc") == [], names("xyz"))
+
+    with app.app_context():
+        db.session.get(PaymentTerm, term_id).name = "20日締め翌月10日払い"
+        db.session.commit()
+    client.get("/customers/typeahead", query_string={"id": ids["山田商事"]})
+    typeahead.wait()
+    resp = client.get("/customers/typeahead", query_string={"id": ids["山田商事"]})
+    item = (resp.get_json() or {}).get("items", [{}])[0]
+    check("payment term rename refreshes the index", item.get("payment_term_name") == "20日締め翌月10日払い", item)
+
+    # 4) 大量データでの検索時間
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.executemany(
+        "INSERT INTO customers (name, name_kana, customer_code, status) VALUES (?, ?, ?, 'approved')",
+        ((f"テスト顧客{i:05d}株式会社", f"テストコキャク{i:05d}", f"B{i:05d}") for i in range(BULK_CUSTOMERS)),
+    )
+    conn.commit()
+    conn.close()
+    with app.app_context():
+        typeahead.versions.bump("customers")  # sqlite3 直書きは検知されないので明示
+        t0 = time.perf_counter()
+        during = typeahead.search("山田", 10)
+        stale_ms = (time.perf_counter() - t0) * 1000.0
+        rebuilding = typeahead.stats()["rebuilding"]
+        typeahead.wait()
+        build_ms = typeahead.stats()["last_build_ms"]
+        queries = ["テスト", "こきゃく", "12345", "株式会社", "b0999", "該当なし", "山田"]
+        worst = 0.0
+        for q in queries:
+            t0 = time.perf_counter()
+            for _ in range(20):
+                typeahead.search(q, 10)
+            worst = max(worst, (time.perf_counter() - t0) * 1000.0 / 20)
+    check(f"search during the {BULK_CUSTOMERS}-customer rebuild does not wait ({stale_ms:.2f}ms)",
+          rebuilding and stale_ms < STALE_BUDGET_MS and [c["name"] for c in during][:1] == ["山田商事"],
+          f"rebuilding={rebuilding} {stale_ms:.2f}ms {during}")
+    check(f"{BULK_CUSTOMERS} customers: worst search {worst:.2f}ms (build {build_ms:.0f}ms)",
+          worst < LATENCY_BUDGET_MS, f"{worst:.2f}ms >= {LATENCY_BUDGET_MS}ms")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_ta_") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
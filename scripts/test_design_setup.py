@@ -0,0 +1,153 @@
+"""
+走行条件パラメータと設計/セットアップ内訳の保存（app/cost_utils.py、v8 マイグレーション）のテスト。
+
+- POST /quotation/new で走行条件・内訳（工数・原価・売価・利益率）・単価表の版が見積に保存されること
+- 見積書画面は保存値を使い、再計算しないこと（計算関数を壊しても同じ値が出る）
+- 走行条件なし・旧データの見積は NULL のまま、画面では 0 になること
+- 改定フォームに保存した走行条件が戻ること
+- v8 マイグレーションが列を追加し、再実行しても壊れないこと
+"""
+import os
+import sqlite3
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+
+def run(fx) -> int:
+    from flask import template_rendered
+
+    from app import cost_utils
+    from app.cost_utils import DESIGN_SETUP_KEYS, RATE_TABLE_VERSION, TRAVEL_PARAM_KEYS
+    from app.migrations import MigrationContext, _m0008_design_setup_breakdown
+
+    tmp = fx.tmp
+    app, db_path = fx.app, fx.db_path
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    rendered = []
+
+    def _record(sender, template, context, **extra):
+        rendered.append(context)
+
+    template_rendered.connect(_record, app)
+
+    # 1) 内訳の計算（タプル版と同じ値）
+    breakdown = cost_utils.calc_design_setup_breakdown({"distance_m": 120.0, "intersection_count": 3,
+                                                        "station_count": 2, "vehicle_count": 1})
+    check("breakdown matches tuple API and has profit rates",
+          (breakdown["design_fee"], breakdown["design_cost"], breakdown["design_hours"],
+           breakdown["setup_fee"], breakdown["setup_cost"], breakdown["setup_hours"])
+          == cost_utils.calc_design_and_setup_amounts({"distance_m": "120", "intersection_count": "3",
+                                                       "station_count": "2", "vehicle_count": "1"})
+          and breakdown["design_profit_rate"] == (breakdown["design_fee"] - breakdown["design_cost"])
+          / breakdown["design_fee"] * 100.0
+          and breakdown["rate_table_version"] == RATE_TABLE_VERSION,
+          breakdown)
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    cust_id = conn.execute("INSERT INTO customers (name, status) VALUES ('走行顧客', 'approved')").lastrowid
+    conn.commit()
+    conn.close()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+
+    def save(project, **params):
+        form = {
+            "company_name": "x", "project_name": project, "customer_id": str(cust_id),
+            "product_id[]": [""], "code[]": [""], "description[]": ["作業"], "unit_price[]": ["1000"],
+            "quantity[]": ["1"], "subtotal[]": [""], **params,
+        }
+        resp = client.post("/quotation/new", data=form)
+        if resp.status_code != 302:
+            failures.append(f"save {project}: status={resp.status_code}")
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM quotations WHERE id = (SELECT MAX(id) FROM quotations)").fetchone()
+        conn.close()
+        return row
+
+    # 2) 保存
+    row = save("走行条件あり", distance_m="120", intersection_count="3", station_count="2", vehicle_count="1",
+               equipment_count="4", circuit_difficulty="1.5")
+    q_id = row["id"]
+    check("travel parameters are stored",
+          [row[k] for k in TRAVEL_PARAM_KEYS] == [120.0, 3.0, 2.0, 1.0, 4.0, 1.5],
+          [row[k] for k in TRAVEL_PARAM_KEYS])
+    check("breakdown and rate table version are stored",
+          all(row[k] == breakdown[k] for k in DESIGN_SETUP_KEYS) and row["rate_table_version"] == RATE_TABLE_VERSION,
+          {k: row[k] for k in DESIGN_SETUP_KEYS + ("rate_table_version",)})
+
+    # 3) 画面は保存値を使う（計算関数を壊しても同じ値）
+    original = cost_utils.calc_design_setup_breakdown
+
+    def _broken(*args, **kwargs):
+        raise AssertionError("view must not recompute design/setup amounts")
+
+    cost_utils.calc_design_setup_breakdown = _broken
+    try:
+        rendered.clear()
+        resp = client.get(f"/quotation/{q_id}/view")
+    finally:
+        cost_utils.calc_design_setup_breakdown = original
+    shown = rendered[-1]["design_setup"] if rendered else {}
+    check("view renders stored breakdown without recomputing",
+          resp.status_code == 200 and all(shown.get(k) == breakdown[k] for k in DESIGN_SETUP_KEYS)
+          and shown.get("rate_table_version") == RATE_TABLE_VERSION,
+          f"status={resp.status_code} design_setup={shown}")
+
+    # 4) 走行条件なし
+    row = save("走行条件なし")
+    rendered.clear()
+    resp = client.get(f"/quotation/{row['id']}/view")
+    shown = rendered[-1]["design_setup"] if rendered else {}
+    check("no parameters: columns stay NULL and view shows zeros",
+          all(row[k] is None for k in TRAVEL_PARAM_KEYS + DESIGN_SETUP_KEYS + ("rate_table_version",))
+          and resp.status_code == 200 and all(shown.get(k) == 0 for k in DESIGN_SETUP_KEYS),
+          f"status={resp.status_code} design_setup={shown}")
+
+    # 5) 改定フォームへの引き継ぎ
+    rendered.clear()
+    resp = client.get(f"/quotations/{q_id}/revise")
+    values = rendered[-1]["values"] if rendered else {}
+    check("revise form is prefilled with stored parameters",
+          resp.status_code == 200 and [values.get(k) for k in TRAVEL_PARAM_KEYS] == ["120", "3", "2", "1", "4", "1.5"],
+          f"status={resp.status_code} values={[values.get(k) for k in TRAVEL_PARAM_KEYS]}")
+
+    # 6) v8 マイグレーション（列の無い旧テーブルに追加、再実行で変化なし）
+    legacy = sqlite3.connect(os.path.join(tmp, "legacy.db"))
+    legacy.execute("CREATE TABLE quotations (id INTEGER PRIMARY KEY, project_name TEXT)")
+    legacy.execute("INSERT INTO quotations (project_name) VALUES ('旧見積')")
+    _m0008_design_setup_breakdown(MigrationContext(legacy))
+    _m0008_design_setup_breakdown(MigrationContext(legacy))
+    cols = [r[1] for r in legacy.execute("PRAGMA table_info(quotations)")]
+    expected = set(TRAVEL_PARAM_KEYS + DESIGN_SETUP_KEYS + ("rate_table_version",))
+    old = legacy.execute(f"SELECT {', '.join(sorted(expected))} FROM quotations").fetchone()
+    legacy.close()
+    check("v8 migration adds columns idempotently and leaves old rows NULL",
+          expected <= set(cols) and len(cols) == len(set(cols)) and all(v is None for v in old), cols)
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_ds_", WRITE_QUEUE_ENABLED="0") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
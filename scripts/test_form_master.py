@@ -0,0 +1,117 @@
+"""
+見積フォーム用マスタ JSON（GET /quotation/form-master、app/form_master.py）のテスト。
+
+- フォームページにはマスタ本体を埋め込まず、版数付き URL だけを載せること
+- ETag / Cache-Control（版数一致時 max-age、それ以外 no-cache）/ If-None-Match での 304
+- 本文がメモ化され、商品の変更で作り直されること（顧客は載せない。顧客の承認では変わらない）
+"""
+import os
+import sqlite3
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+
+def run(fx) -> int:
+
+    app, db_path = fx.app, fx.db_path
+    cache = app.extensions["scart_form_master"]
+    failures = []
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    conn.execute("INSERT INTO users (login_id, display_name, password_hash, role, is_active, created_at) "
+                 "VALUES ('fm_user', '申請者', 'x', 'user', 0, CURRENT_TIMESTAMP)")
+    requester_id = conn.execute("SELECT id FROM users WHERE login_id='fm_user'").fetchone()[0]
+    conn.execute("INSERT INTO customers (name, status) VALUES ('マスタ顧客', 'approved')")
+    pending_id = conn.execute("INSERT INTO customers (name, status, requested_by_user_id) VALUES ('承認待ち顧客', 'pending', ?)",
+                              (requester_id,)).lastrowid
+    product_id = conn.execute("INSERT INTO products (name, unit_price, cost) VALUES ('マスタ商品', 1000, 600)").lastrowid
+    conn.commit()
+    conn.close()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+
+    def master_url():
+        with app.test_request_context():
+            from flask import url_for
+
+            etag = cache.get().etag
+            return etag, url_for("quotation.quotation_form_master", v=etag)
+
+    # 1) フォームページは版数付き URL のみ
+    html = client.get("/quotation/new").get_data(as_text=True)
+    etag, url = master_url()
+    if "マスタ商品" in html or "マスタ顧客" in html or "products-json" in html or url not in html:
+        failures.append("form page: master data is still inlined or the versioned URL is missing")
+    else:
+        print(f"[OK] form page carries only the master URL ({url})")
+
+    # 2) ETag / Cache-Control / 304
+    resp = client.get(url)
+    data = resp.get_json() or {}
+    cc = resp.headers.get("Cache-Control", "")
+    if (resp.status_code != 200 or resp.headers.get("ETag") != f'"{etag}"' or "max-age=" not in cc
+            or [p["name"] for p in data.get("products", [])] != ["マスタ商品"] or "customers" in data):
+        failures.append(f"GET: status={resp.status_code} etag={resp.headers.get('ETag')} cache-control={cc} body={data}")
+    else:
+        print(f"[OK] GET: 200, ETag, Cache-Control: {cc}")
+    resp = client.get(url, headers={"If-None-Match": f'"{etag}"'})
+    if resp.status_code != 304 or resp.data:
+        failures.append(f"If-None-Match: status={resp.status_code}")
+    else:
+        print("[OK] If-None-Match -> 304")
+    resp = client.get("/quotation/form-master")
+    if "no-cache" not in resp.headers.get("Cache-Control", ""):
+        failures.append(f"unversioned: Cache-Control={resp.headers.get('Cache-Control')}")
+    else:
+        print("[OK] unversioned URL is revalidated (no-cache)")
+    builds = cache.stats()["builds"]
+    client.get(url)
+    client.get("/quotation/new")
+    if cache.stats()["builds"] != builds:
+        failures.append(f"memo: rebuilt without changes ({builds} -> {cache.stats()['builds']})")
+    else:
+        print(f"[OK] memoized (builds={builds}, hits={cache.stats()['hits']})")
+
+    # 3) 変更で作り直される
+    def changed(label, action, check):
+        before, _ = master_url()
+        action()
+        after, url = master_url()
+        body = client.get(url).get_json() or {}
+        if after == before or not check(body):
+            failures.append(f"{label}: etag {before} -> {after}")
+        else:
+            print(f"[OK] {label} changes the ETag")
+
+    changed("product edit",
+            lambda: client.post(f"/products/{product_id}/edit", data={"name": "改名商品", "unit_price": "1", "cost": "0"}),
+            lambda b: [p["name"] for p in b["products"]] == ["改名商品"])
+
+    # 4) 顧客の変更では作り直さない（顧客はタイプアヘッド側）
+    before, _ = master_url()
+    client.post(f"/customers/{pending_id}/approve")
+    after, _ = master_url()
+    if after != before:
+        failures.append(f"customer approve: etag {before} -> {after}")
+    else:
+        print("[OK] customer approve keeps the ETag")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_fm_") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+DB 移行の実行系（app/migrations.py の run_migrations）のテスト。
+
+- 新規 DB に全ステップを適用し、2回目の起動は指紋の確認だけで終わること
+- 移行後の表にモデル（app/models）の列がすべてあること（各版の列は固定値なので、列を足したら新しい版が要る）
+- 指紋の不一致（外部で索引を足した・列を消した）からの修復は、無い列・索引だけを補い、
+  データのバックフィル（v4 の改定ポインタ・v5/v10 の金額集計）で既存の行を書き換えないこと
+- 修復で作り直した全文索引（customers_fts / quotations_fts）は空のままにせず、元の表から投入すること
+Flask アプリは起動しない（run_migrations を直接呼ぶ）。
+"""
+import logging
+import os
+import sqlite3
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+
+def model_tables():
+    import importlib
+    import pkgutil
+
+    import app.models
+    from app import db
+
+    for module in pkgutil.iter_modules(app.models.__path__):
+        importlib.import_module(f"app.models.{module.name}")
+    return db.metadata.sorted_tables
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def run(fx) -> int:
+    from app.fts import fts_supported
+    from app.migrations import LATEST_VERSION, run_migrations
+
+    db_path = fx.db_path
+    records = _Records()
+    logging.getLogger().addHandler(records)
+    logging.getLogger().setLevel(logging.INFO)
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    try:
+        # 1) 新規 DB と2回目の起動
+        run_migrations(db_path)
+        records.messages.clear()
+        run_migrations(db_path)
+        conn = sqlite3.connect(db_path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        check("fresh database is migrated; second boot only checks the fingerprint",
+              version == LATEST_VERSION and any("up to date" in m for m in records.messages)
+              and not any("applied" in m for m in records.messages), (version, records.messages))
+        missing = {}
+        for table in model_tables():
+            columns = {r[1] for r in conn.execute(f"PRAGMA table_info({table.name})")}
+            if {c.name for c in table.columns} - columns:
+                missing[table.name] = sorted({c.name for c in table.columns} - columns)
+        check("migrated tables have every model column", not missing, missing)
+
+        # 2) 指紋の不一致からの修復
+        q_id = conn.execute(
+            "INSERT INTO quotations (company_name, project_name, revision_no, original_id, discount_rate, "
+            "subtotal_amount, total_amount, cost_amount, gross_margin_amount, latest_revision_id, revision_count) "
+            "VALUES ('修復', '手入力', 0, NULL, 0, 1000, 1000, 123, 877, 99, 7)").lastrowid
+        conn.execute("INSERT INTO quotation_details (quotation_id, product_id, quantity, price, subtotal, label) "
+                     "VALUES (?, NULL, 1, 165000, 165000, '設計費（パラメータ）')", (q_id,))
+        c_id = conn.execute("INSERT INTO customers (name, name_kana, status) VALUES ('修復顧客', 'シュウフク', 'approved')"
+                            ).lastrowid
+        conn.execute("CREATE INDEX ix_manual_quotations_project ON quotations(project_name)")
+        conn.execute("DROP INDEX ix_products_name")
+        fts = fts_supported()
+        if fts:
+            conn.execute("DROP TABLE customers_fts")
+            conn.execute("DROP TABLE quotations_fts")
+        conn.commit()
+        before = conn.execute("SELECT * FROM quotations WHERE id = ?", (q_id,)).fetchone()
+        conn.close()
+
+        records.messages.clear()
+        run_migrations(db_path)
+        conn = sqlite3.connect(db_path)
+        after = conn.execute("SELECT * FROM quotations WHERE id = ?", (q_id,)).fetchone()
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        if fts:
+            fts_rows = {
+                "customers_fts": [r[0] for r in conn.execute("SELECT name FROM customers_fts WHERE rowid = ?", (c_id,))],
+                "quotations_fts": [r[0] for r in conn.execute(
+                    "SELECT rowid FROM quotations_fts WHERE quotations_fts MATCH '\"手入力\"'")],
+            }
+        conn.close()
+        check("fingerprint mismatch restores missing indexes without rewriting rows",
+              after == before and "ix_products_name" in indexes and "ix_manual_quotations_project" in indexes
+              and any("mismatch" in m for m in records.messages)
+              and any("skipped" in m for m in records.messages),
+              f"before={before} after={after} log={records.messages}")
+
+        if fts:
+            check("repair repopulates a dropped full-text index",
+                  fts_rows == {"customers_fts": ["修復顧客"], "quotations_fts": [q_id]}, fts_rows)
+        else:
+            print("[SKIP] FTS5 trigram not available")
+
+        records.messages.clear()
+        run_migrations(db_path)
+        check("repaired fingerprint is stored (next boot is up to date)",
+              any("up to date" in m for m in records.messages), records.messages)
+    finally:
+        logging.getLogger().removeHandler(records)
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_mig_", create=False) as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
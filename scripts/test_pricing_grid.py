@@ -0,0 +1,170 @@
+"""
+設計/セットアップ費用の what-if グリッド（GET /quotation/pricing-grid、app/pricing_grid.py）のテスト。
+
+- 軸の指定（列挙・範囲・混在・省略）の解釈と、不正な指定・セル数超過の 400
+- 各セルがスカラー版 calc_design_setup_breakdown と一致すること（軸の順・C 順の平たい配列）
+- 同じ指定はキャッシュから返り（ETag で 304）、単価表の新しい版を登録すると計算し直すこと
+- キャッシュは本文の合計バイト数で古いものから捨て、1件の上限を超える本文は保持しないこと
+- 100k セルを超えるグリッドの計算時間、CLI（flask scart pricing-grid）の CSV 出力
+"""
+import itertools
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+LARGE_GRID_MS = 2000  # 110,000 セルの計算＋シリアライズの上限（初回・キャッシュなし）
+
+
+def run(fx) -> int:
+    import sqlite3
+
+    from app import cost_utils, db
+    from app.models.logic_config import LogicConfig
+    from app.pricing_grid import GRID_AXES, PricingGridCache, PricingGridError, parse_axis, parse_grid_axes
+
+    app, db_path = fx.app, fx.db_path
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    # 1) 軸の指定
+    check("axis parsing: list / range / mixed / empty",
+          parse_axis("3,5,8") == [3, 5, 8] and parse_axis("200-800:200") == [200, 400, 600, 800]
+          and parse_axis("0-1:0.25, 1, 2") == [0, 0.25, 0.5, 0.75, 1, 2] and parse_axis("") == [0]
+          and parse_axis("1-3") == [1, 2, 3],
+          [parse_axis("0-1:0.25, 1, 2"), parse_axis("1-3")])
+    errors = 0
+    for bad in ("abc", "5-1", "1-5:0", "-3", "1-1000000000"):
+        try:
+            parse_axis(bad, max_values=1000)
+        except PricingGridError:
+            errors += 1
+    check("invalid axis specs are rejected", errors == 5, f"{errors}/5 rejected")
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    conn.close()
+    anonymous = app.test_client()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+
+    check("login required", anonymous.get("/quotation/pricing-grid").status_code == 302)
+
+    # 2) 値の一致
+    query = {"vehicle_count": "1,3,5,8", "distance_m": "40-800:95", "intersection_count": "0,2,5", "station_count": "1-4"}
+    resp = client.get("/quotation/pricing-grid", query_string=query)
+    payload = resp.get_json()
+    cells = list(itertools.product(*(payload["axes"][name] for name in GRID_AXES)))
+    mismatched = []
+    for i, cell in enumerate(cells):
+        expected = cost_utils.calc_design_setup_breakdown(dict(zip(GRID_AXES, cell)))
+        total_fee = expected["design_fee"] + expected["setup_fee"]
+        total_cost = expected["design_cost"] + expected["setup_cost"]
+        expected.update(total_fee=total_fee, total_cost=total_cost,
+                        total_profit_rate=(total_fee - total_cost) / total_fee * 100.0 if total_fee > 0 else 0.0)
+        for name, values in payload["fields"].items():
+            want = round(expected[name], 2) if name.endswith("_profit_rate") else expected[name]
+            if values[i] != want:
+                mismatched.append((cell, name, values[i], want))
+    check(f"grid cells match the scalar path ({len(cells)} cells)",
+          resp.status_code == 200 and payload["shape"] == [4, 9, 3, 4] and payload["cells"] == len(cells)
+          and not mismatched, mismatched[:3] or payload.get("shape"))
+
+    only = client.get("/quotation/pricing-grid", query_string={**query, "fields": "setup_fee,design_fee"}).get_json()
+    check("fields selection", list(only["fields"]) == ["design_fee", "setup_fee"]
+          and only["fields"]["setup_fee"] == payload["fields"]["setup_fee"], list(only["fields"]))
+
+    # 3) キャッシュ・ETag・版の切り替え
+    cache = app.extensions["scart_pricing_grid"]
+    before = cache.stats()
+    again = client.get("/quotation/pricing-grid", query_string=query)
+    after = cache.stats()
+    check("same grid is served from cache", after["hits"] == before["hits"] + 1 and after["misses"] == before["misses"]
+          and again.get_data() == resp.get_data(), after)
+    check("ETag revalidation returns 304",
+          client.get("/quotation/pricing-grid", query_string=query,
+                     headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304)
+    # 新しい単価表の版（logic_configs の行）を登録すると、次の要求で計算し直す
+    with app.app_context():
+        db.session.add(LogicConfig(design_rate=20000, setup_rate=15000))
+        db.session.commit()
+    changed = client.get("/quotation/pricing-grid", query_string=query)
+    stats = cache.stats()
+    new_payload = changed.get_json()
+    check("new rate table version drops cached grids",
+          new_payload["rate_table_version"] == "logic_configs:1" and stats["misses"] == after["misses"] + 1
+          and stats["entries"] == 1 and changed.headers["ETag"] != resp.headers["ETag"]
+          and new_payload["fields"]["design_fee"] == [h * 20000 for h in payload["fields"]["design_hours"]]
+          and new_payload["fields"]["setup_fee"] == payload["fields"]["setup_fee"], stats)
+
+    # キャッシュのバイト数上限
+    with app.app_context():
+        sizes = [len(PricingGridCache(max_entries=0).get(parse_grid_axes({"distance_m": f"1-{n}"}, 1000)).body)
+                 for n in (10, 100)]
+        small = PricingGridCache(max_entries=16, max_bytes=sizes[0] * 2 + 10, max_entry_bytes=sizes[1] - 1)
+        for start in (1, 2, 3):
+            small.get(parse_grid_axes({"distance_m": f"{start}-{start + 9}"}, 1000))
+        by_bytes = small.stats()
+        small.get(parse_grid_axes({"distance_m": "1-100"}, 1000))
+        oversized = small.stats()
+    check("cache is bounded by body bytes and skips oversized bodies",
+          by_bytes["entries"] == 2 and by_bytes["evictions"] == 1 and by_bytes["bytes"] <= by_bytes["max_bytes"]
+          and oversized["entries"] == 2 and oversized["too_large"] == 1 and oversized["bytes"] == by_bytes["bytes"],
+          (sizes, by_bytes, oversized))
+
+    # 4) 不正な指定
+    bad = client.get("/quotation/pricing-grid", query_string={"distance_m": "x"})
+    too_many = client.get("/quotation/pricing-grid",
+                          query_string={"vehicle_count": "1-100", "distance_m": "1-100", "intersection_count": "1-100"})
+    unknown = client.get("/quotation/pricing-grid", query_string={"fields": "design_fee,nope"})
+    check("bad spec / too many cells / unknown field are 400",
+          bad.status_code == 400 and too_many.status_code == 400 and unknown.status_code == 400
+          and "error" in too_many.get_json(), [bad.status_code, too_many.status_code, unknown.status_code])
+
+    # 5) 100k セル超
+    large = {"vehicle_count": "1-10", "distance_m": "50-2500:50", "intersection_count": "0-19",
+             "station_count": "0-10"}
+    t0 = time.perf_counter()
+    resp = client.get("/quotation/pricing-grid", query_string=large)
+    first_ms = (time.perf_counter() - t0) * 1000.0
+    t0 = time.perf_counter()
+    client.get("/quotation/pricing-grid", query_string=large)
+    cached_ms = (time.perf_counter() - t0) * 1000.0
+    cells = resp.get_json()["cells"] if resp.status_code == 200 else 0
+    check(f"large grid: {cells:,} cells in {first_ms:.0f}ms (cached {cached_ms:.1f}ms)",
+          cells == 110000 and first_ms < LARGE_GRID_MS, f"status={resp.status_code} {first_ms:.0f}ms")
+
+    # 6) CLI
+    result = app.test_cli_runner().invoke(args=["scart", "pricing-grid", "--vehicles", "3,5", "--distance", "200-400:100",
+                                                "--fields", "design_fee,setup_fee"])
+    lines = [line for line in result.output.strip().splitlines() if not line.startswith("#")]
+    with app.app_context():
+        expected = cost_utils.calc_design_setup_breakdown({"vehicle_count": 3, "distance_m": 200})
+    check("CLI prints one CSV row per cell",
+          result.exit_code == 0 and lines[0] == ",".join(GRID_AXES) + ",design_fee,setup_fee"
+          and lines[1] == f"3,200,0,0,{expected['design_fee']},{expected['setup_fee']}"
+          and len(lines) == 7,
+          f"exit={result.exit_code} output={result.output[:200]!r}")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_pg_", PRICING_GRID_MAX_CELLS="200000") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
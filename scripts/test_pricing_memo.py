@@ -0,0 +1,169 @@
+"""
+設計/セットアップ費用の計算メモ（app/pricing_memo.py、cost_utils.calc_design_setup_breakdown の前段）のテスト。
+
+- 同じパラメータ（"120" と 120.0、別名キーを含む）は2回目から計算せずに返り、値はメモなしと同じこと
+- 返した dict を書き換えてもメモの値は変わらないこと
+- 件数の上限（PRICING_MEMO_SIZE）で最も長く参照されていないものから追い出すこと
+- 単価表の新しい版を登録すると全件捨てて新しい単価で計算すること
+- 単価表を明示した呼び出しはメモを通らないこと、PRICING_MEMO_SIZE=0 で無効になること
+- 見積の保存（POST /quotation/new）が同じ走行条件でメモに当たること、/admin/metrics に pricing_memo が出ること
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+MEMO_SIZE = 8
+
+
+def run(fx) -> int:
+    from app import cost_utils, db
+    from app.cost_utils import DEFAULT_RATE_TABLE, calc_design_setup_breakdown
+    from app.models.logic_config import LogicConfig
+
+    app, db_path = fx.app, fx.db_path
+    memo = app.extensions["scart_pricing_memo"]
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    params = {"distance_m": 120.0, "intersection_count": 3, "station_count": 2, "vehicle_count": 1}
+    expected = calc_design_setup_breakdown(params, DEFAULT_RATE_TABLE)
+
+    with app.app_context():
+        # 1) 同じパラメータはメモから
+        first = calc_design_setup_breakdown(params)
+        same = [
+            calc_design_setup_breakdown({"distance_m": "120", "intersection_count": "3", "station_count": "2",
+                                         "vehicle_count": "1"}),
+            calc_design_setup_breakdown({"distance": 120, "intersections": 3, "stations": 2, "vehicles": 1}),
+            cost_utils.calc_design_and_setup_amounts(params),
+        ]
+        stats = memo.stats()
+        check("normalized parameters hit the memo with identical results",
+              first == expected and same[0] == expected and same[1] == expected
+              and same[2] == (expected["design_fee"], expected["design_cost"], expected["design_hours"],
+                              expected["setup_fee"], expected["setup_cost"], expected["setup_hours"])
+              and stats["misses"] == 1 and stats["hits"] == 3 and stats["entries"] == 1 and stats["hit_rate"] == 0.75,
+              stats)
+
+        first["design_fee"] = -1
+        check("returned dict is a copy", calc_design_setup_breakdown(params)["design_fee"] == expected["design_fee"])
+
+        # 2) 単価表を明示した呼び出しはメモを通らない
+        before = memo.stats()
+        calc_design_setup_breakdown({"distance_m": 999}, DEFAULT_RATE_TABLE)
+        cost_utils.calc_design_setup_batch({"distance_m": [1.0, 2.0]})
+        after = memo.stats()
+        check("explicit rate tables and batches bypass the memo",
+              (after["hits"], after["misses"], after["entries"]) == (before["hits"], before["misses"], before["entries"]),
+              after)
+
+        # 3) LRU の追い出し（最初のキーは参照し直したので残る）
+        for d in range(1, MEMO_SIZE):
+            calc_design_setup_breakdown({**params, "distance_m": d})
+        calc_design_setup_breakdown(params)
+        calc_design_setup_breakdown({**params, "distance_m": 500})
+        stats = memo.stats()
+        hits = stats["hits"]
+        calc_design_setup_breakdown(params)
+        kept = memo.stats()["hits"] == hits + 1
+        calc_design_setup_breakdown({**params, "distance_m": 1})
+        check(f"bounded to {MEMO_SIZE} entries, least recently used evicted first",
+              stats["entries"] == MEMO_SIZE and stats["evictions"] == 1 and kept
+              and memo.stats()["misses"] == stats["misses"] + 1, stats)
+
+        # 4) 単価表の新しい版で全件捨てる
+        db.session.add(LogicConfig(design_rate=20000, setup_rate=15000))
+        db.session.commit()
+        changed = calc_design_setup_breakdown(params)
+        stats = memo.stats()
+        check("new rate table version invalidates the memo",
+              changed["rate_table_version"] == "logic_configs:1"
+              and changed["design_fee"] == expected["design_hours"] * 20000
+              and stats["entries"] == 1 and stats["invalidations"] == 1
+              and stats["rate_table_version"] == "logic_configs:1", stats)
+
+        # 5) 並行呼び出し
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(500):
+                    got = calc_design_setup_breakdown({**params, "distance_m": (n * 7 + i) % 20})
+                    if got["rate_table_version"] != "logic_configs:1":
+                        errors.append(got)
+            except Exception as e:  # noqa: BLE001
+                errors.append(e)
+
+        before = memo.stats()
+
+        def run(n):
+            with app.app_context():
+                worker(n)
+
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        after = memo.stats()
+        check("concurrent lookups are counted and stay bounded",
+              not errors and after["hits"] + after["misses"] == before["hits"] + before["misses"] + 8 * 500
+              and after["entries"] <= MEMO_SIZE, errors[:3] or after)
+
+        # 6) PRICING_MEMO_SIZE=0 は無効
+        memo.max_entries = 0
+        before = memo.stats()
+        calc_design_setup_breakdown(params)
+        check("size 0 disables the memo", memo.stats()["hits"] == before["hits"]
+              and memo.stats()["misses"] == before["misses"])
+        memo.max_entries = MEMO_SIZE
+
+    # 7) 見積の保存とメトリクス
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    cust_id = conn.execute("INSERT INTO customers (name, status) VALUES ('メモ顧客', 'approved')").lastrowid
+    conn.commit()
+    conn.close()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+    form = {
+        "company_name": "x", "project_name": "メモ", "customer_id": str(cust_id),
+        "product_id[]": [""], "code[]": [""], "description[]": ["作業"], "unit_price[]": ["1000"],
+        "quantity[]": ["1"], "subtotal[]": [""], "distance_m": "345", "intersection_count": "4",
+        "station_count": "6", "vehicle_count": "3",
+    }
+    before = memo.stats()
+    statuses = [client.post("/quotation/new", data=form).status_code for _ in range(3)]
+    after = memo.stats()
+    metrics = client.get("/admin/metrics").get_json() or {}
+    check("repeated quotation saves hit the memo; metrics expose counters",
+          statuses == [302, 302, 302] and after["misses"] == before["misses"] + 1
+          and after["hits"] == before["hits"] + 2
+          and metrics.get("pricing_memo", {}).get("max_entries") == MEMO_SIZE
+          and "hit_rate" in metrics.get("pricing_memo", {}),
+          f"statuses={statuses} stats={after} metrics={metrics.get('pricing_memo')}")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_memo_", WRITE_QUEUE_ENABLED="0", PRICING_MEMO_SIZE=MEMO_SIZE) as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+設計/セットアップ費用の計算式（app/pricing_rules.py）のテスト。
+
+- 定数で書かれていた頃の計算結果（ゴールデン値）と一致すること
+- ゴールデンコーパス（境界値と乱数のパラメータ集合 × 既定・独自の単価表）で、
+  Python・NumPy・JavaScript（node で実行）の3つのコンパイル結果が完全に一致すること
+- 許可しない構文・未知の名前・名前の重複を拒否すること
+- GET /quotation/pricing-rules.js の配信（版付き URL・ETag・304）と、単価表の新しい版で JS が変わること
+node が無い環境では JavaScript の比較を [SKIP] にする。
+"""
+import dataclasses
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+CORPUS_SIZE = 5000
+
+# (distance, intersections, stations, vehicles) → (設計 工数・売価・原価, セットアップ 工数・売価・原価)
+# 計算式を定義に移す前の cost_utils（v6 の定数）で計算した値
+GOLDEN = [
+    ((0, 0, 0, 0), (0, 0, 0, 0, 0, 0)),
+    ((120, 3, 2, 1), (11, 165000, 87120, 38, 570000, 300960)),
+    ((50, 0, 1, 1), (2, 30000, 15840, 12, 180000, 95040)),
+    ((51, 0, 1, 1), (2, 30000, 15840, 34, 510000, 269280)),
+    ((100, 2, 3, 2), (14, 210000, 110880, 50, 750000, 396000)),
+    ((100.5, 2, 3, 5), (27, 405000, 213840, 185, 2775000, 1465200)),
+    ((101, 4, 4, 6), (59, 885000, 467280, 243, 3645000, 1924560)),
+    ((1500, 29, 39, 11), (762, 11430000, 6035040, 4795, 71925000, 37976400)),
+    ((33.3, 1, 7, 3), (15, 225000, 118800, 73, 1095000, 578160)),
+    ((800, 10, 12, 8), (199, 2985000, 1576080, 704, 10560000, 5575680)),
+    ((0, 5, 0, 4), (44, 660000, 348480, 88, 1320000, 696960)),
+    ((12.5, 0, 0, 0), (1, 15000, 7920, 0, 0, 0)),
+]
+
+# ゴールデンコーパスを JS で評価する（stdin: {"rules": パス, "inputs": [[d, i, s, v], ...]}）
+JS_HARNESS = """
+global.window = {};
+const input = JSON.parse(require("fs").readFileSync(0, "utf8"));
+require(input.rules);
+const out = input.inputs.map((p) => {
+  const r = window.PRICING_RULES.evaluate(p[0], p[1], p[2], p[3]);
+  return window.PRICING_RULES.outputs.map((k) => r[k]);
+});
+process.stdout.write(JSON.stringify({version: window.PRICING_RULES.version, outputs: out}));
+"""
+
+
+def make_corpus(seed):
+    rng = random.Random(seed)
+    # 人数の段階・切り上げの境界の前後
+    corpus = [(d, i, s, v) for d in (0, 49.9, 50, 50.1, 99.99, 100, 100.01, 500, 1000, 1000.5)
+              for v in (0, 1, 1.5, 2, 5, 6, 9) for i, s in ((0, 0), (1, 3), (7, 2))]
+    while len(corpus) < CORPUS_SIZE:
+        corpus.append((
+            rng.choice([rng.randint(0, 2000), round(rng.uniform(0, 2000), rng.randint(0, 3))]),
+            rng.randint(0, 30), rng.randint(0, 40), rng.choice([rng.randint(0, 12), round(rng.uniform(0, 12), 1)]),
+        ))
+    return corpus
+
+
+def run(fx) -> int:
+    import numpy as np
+
+    from app import db
+    from app.cost_utils import DEFAULT_RATE_TABLE, WorkerTier, calc_design_and_setup_amounts
+    from app.models.logic_config import LogicConfig
+    from app.pricing_rules import PRICING_RULES, PricingRuleError, compile_pricing_rules
+
+    tmp = fx.tmp
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    # 1) ゴールデン値
+    mismatched = []
+    for (d, i, s, v), want in GOLDEN:
+        fee, cost, hours, s_fee, s_cost, s_hours = calc_design_and_setup_amounts(
+            {"distance_m": d, "intersection_count": i, "station_count": s, "vehicle_count": v}, DEFAULT_RATE_TABLE)
+        got = (hours, fee, cost, s_hours, s_fee, s_cost)
+        if got != want:
+            mismatched.append(((d, i, s, v), got, want))
+    check(f"golden values of the v6 constants ({len(GOLDEN)} cases)", not mismatched, mismatched)
+    check("rules are compiled once per rate table",
+          DEFAULT_RATE_TABLE.rules is DEFAULT_RATE_TABLE.rules
+          and dataclasses.replace(DEFAULT_RATE_TABLE).rules is not DEFAULT_RATE_TABLE.rules)
+
+    # 2) Python / NumPy / JavaScript の一致
+    custom = dataclasses.replace(
+        DEFAULT_RATE_TABLE, version="logic_configs:7", labor_rate=8123.5, design_sell_rate=16500,
+        design_intersection_hours=2.25, design_meters_per_hour=75.0, setup_speed_m_per_min=27.5,
+        trial_runs_per_vehicle=12.0, default_workers=3.5,
+        worker_tiers=(WorkerTier(None, 1, 80, 1.0), WorkerTier(2, 4, 300, 2.0), WorkerTier(5, None, 120, 2.5)),
+    )
+    node = shutil.which("node")
+    for n, rates in enumerate((DEFAULT_RATE_TABLE, custom)):
+        rules = rates.rules
+        corpus = make_corpus(n)
+        python = [rules.evaluate(*map(float, p)) for p in corpus]
+        columns = np.array(corpus, dtype=np.float64).T
+        batch = list(zip(*(a.tolist() for a in rules.evaluate_batch(*columns))))
+        bad = [(p, a, b) for p, a, b in zip(corpus, python, batch) if a != b]
+        check(f"{rates.version}: numpy equals python ({len(corpus)} sets)", not bad, bad[:3])
+
+        if node is None:
+            print(f"[SKIP] {rates.version}: node not found; JS output not compared")
+            continue
+        rules_path = os.path.join(tmp, f"rules_{n}.js")
+        with open(rules_path, "w", encoding="utf-8") as f:
+            f.write(rules.js)
+        proc = subprocess.run([node, "-e", JS_HARNESS], input=json.dumps({"rules": rules_path, "inputs": corpus}),
+                              capture_output=True, text=True, timeout=60)
+        if proc.returncode != 0:
+            check(f"{rates.version}: JS runs", False, proc.stderr[-500:])
+            continue
+        js = json.loads(proc.stdout)
+        bad = [(p, a, tuple(b)) for p, a, b in zip(corpus, python, js["outputs"]) if a != tuple(b)]
+        check(f"{rates.version}: JS equals python ({len(corpus)} sets)",
+              js["version"] == rates.version and len(js["outputs"]) == len(corpus) and not bad,
+              bad[:3] or js["version"])
+
+    # 3) 不正なルール
+    bad_rules = {
+        "attribute": ("x", "design_hours.__class__"),
+        "builtin call": ("x", "__import__('os')"),
+        "unknown name": ("x", "design_hours * unknown_rate"),
+        "chained compare": ("x", "0 < design_hours < 10"),
+        "string constant": ("x", "'a'"),
+        "shadows coefficient": ("labor_rate", "1"),
+        "duplicate rule": ("design_fee", "1"),
+    }
+    accepted = []
+    for label, rule in bad_rules.items():
+        try:
+            compile_pricing_rules(DEFAULT_RATE_TABLE, PRICING_RULES + (rule,))
+            accepted.append(label)
+        except PricingRuleError:
+            pass
+    try:
+        compile_pricing_rules(DEFAULT_RATE_TABLE, tuple(r for r in PRICING_RULES if r[0] != "setup_profit_rate"))
+        accepted.append("missing output")
+    except PricingRuleError:
+        pass
+    check("invalid rules are rejected", not accepted, accepted)
+
+    # 4) 見積フォームへの配信
+    app, db_path = fx.app, fx.db_path
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    conn.close()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+
+    def rules_url():
+        html = client.get("/quotation/new").get_data(as_text=True)
+        start = html.find("/quotation/pricing-rules.js?v=")
+        return html[start:html.find('"', start)] if start >= 0 else None
+
+    url = rules_url()
+    resp = client.get(url)
+    etag = resp.headers.get("ETag", "").strip('"')
+    check("form page loads the versioned rules script",
+          url is not None and resp.status_code == 200 and resp.mimetype == "text/javascript"
+          and "window.PRICING_RULES" in resp.get_data(as_text=True) and url.endswith(etag)
+          and "max-age" in resp.headers.get("Cache-Control", ""),
+          f"url={url} status={resp.status_code} headers={dict(resp.headers)}")
+    check("If-None-Match -> 304; unversioned URL is revalidated",
+          client.get("/quotation/pricing-rules.js", headers={"If-None-Match": f'"{etag}"'}).status_code == 304
+          and client.get("/quotation/pricing-rules.js").headers.get("Cache-Control") == "private, no-cache")
+
+    with app.app_context():
+        db.session.add(LogicConfig(design_rate=20000, setup_rate=15000))
+        db.session.commit()
+    new_url = rules_url()
+    body = client.get(new_url).get_data(as_text=True)
+    check("new rate table version changes the script URL and rates",
+          new_url != url and '"logic_configs:1"' in body and "design_hours * 20000" in body, new_url)
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_rules_") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+ルートごとの SQL 件数予算テスト（app/query_stats.py の strict モード）。
+
+scripts/test_query_plans.py と同じデータを一時 DB に作り、QUERY_STATS_STRICT=1 で各ルートを呼ぶ。
+予算（QUERY_BUDGETS）を超えたルート、同形の文が繰り返される（N+1 の疑い）ルートは
+QueryBudgetExceeded が送出されて [FAIL] になる。
+予算はデータ件数に依存しない（一覧の件数が増えても文の数は増えない）前提の値。
+"""
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+from test_query_plans import route_cases, seed
+
+# エンドポイント名 → 上限件数（ログインユーザー読込の1件を含む）
+BUDGETS = {
+    "quotation.quotation_list": 3,
+    "quotation.quotation_view": 3,
+    "quotation.quotation_search": 2,
+    "quotation.quotation_revise": 6,
+    "quotation.quotation_new": 2,
+    "quotation.quotation_form_master": 2,
+    "quotation.quotation_pricing_rules": 1,
+    "quotation.quotation_pricing_grid": 1,
+    "quotation.quotation_layout_params": 1,
+    "customer.customer_list": 2,
+    "customer.customer_typeahead": 2,
+    "customer.customer_edit": 3,
+    "customer.customer_approval_history": 4,
+    "customer.customer_delete": 4,
+    "customer.customer_reject": 3,
+    "product.product_list": 2,
+    "logic_config.logic_config_list": 2,
+    "auth.login": 1,
+}
+
+
+def run(fx) -> int:
+    from app import db
+    from app.query_stats import QueryBudgetExceeded
+
+    app, db_path = fx.app, fx.db_path
+    app.config["TESTING"] = True
+    app.config["QUERY_BUDGETS"] = BUDGETS
+    ids = seed(db_path)
+
+    # 検出器自体の確認用: 1件ずつ引くループ（典型的な N+1）
+    @app.route("/_test/nplus1")
+    def _nplus1():
+        from app.models.user import User
+        for _ in range(app.config["QUERY_NPLUS1_THRESHOLD"]):
+            db.session.execute(db.select(User).where(User.id == ids["admin"])).scalar()
+        return "ok"
+
+    failures = []
+    for name, user_id, method, url, form in route_cases(ids):
+        client = app.test_client()
+        if user_id:
+            with client.session_transaction() as sess:
+                sess["user_id"] = user_id
+        try:
+            resp = client.open(url, method=method, data=form)
+        except QueryBudgetExceeded as e:
+            failures.append(f"{name}: {e}")
+            continue
+        count = resp.headers.get("X-DB-Query-Count")
+        if resp.status_code >= 400 or count is None:
+            failures.append(f"{name}: status={resp.status_code} X-DB-Query-Count={count}")
+            continue
+        print(f"[OK] {name}: queries={count} db={resp.headers.get('X-DB-Time-ms')}ms")
+
+    try:
+        app.test_client().get("/_test/nplus1")
+        failures.append("N+1 detector: repeated statement was not flagged")
+    except QueryBudgetExceeded:
+        print("[OK] N+1 detector flags repeated statement shapes")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_qb_", QUERY_STATS_STRICT="1") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+画面ごとの SQL が全表走査に退行していないかを EXPLAIN QUERY PLAN で検査する。
+
+一時ディレクトリに新規 DB を作って（= 全マイグレーション適用済み）少量のデータを入れ、
+Flask テストクライアントで各ルートを呼び出しながら発行された SQL を SQLAlchemy のイベントで収集する。
+収集した SELECT / UPDATE / DELETE それぞれに EXPLAIN QUERY PLAN を実行し、
+実テーブルに対する索引なしの SCAN があれば [FAIL] とする。
+
+一覧画面のように「全件を返すこと自体が仕様」の文は FULL_SCAN_ALLOWED に理由付きで登録する。
+"""
+import io
+import os
+import re
+import sqlite3
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+# (ルート名, テーブル): 理由
+FULL_SCAN_ALLOWED = {
+    ("customer_list(admin)", "customers"): "管理者は全顧客を名前順に表示する（name の UNIQUE 索引順で走査）",
+    ("product_list", "products"): "全商品を id 降順で表示する（rowid 順の走査で並べ替え不要）",
+    ("logic_config_list", "logic_configs"): "単価表の全版を id 降順で表示する（版は管理者の登録分だけで少数）",
+}
+
+_SCAN_RE = re.compile(r"^SCAN (\w+)")
+# FTS5 仮想表を MATCH（"SCAN customers_fts VIRTUAL TABLE INDEX 0:M5"）や rowid の等号（"... INDEX 0:="）で
+# 引く計画は、全文索引の検索・rowid での1行参照であって全件走査ではない
+_FTS_MATCH_RE = re.compile(r" VIRTUAL TABLE INDEX \d+:[M=]")
+
+
+def seed(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    conn.execute("INSERT INTO users (login_id, display_name, password_hash, role, is_active, created_at) "
+                 "VALUES ('qp_user', '一般', 'x', 'user', 1, CURRENT_TIMESTAMP)")
+    user_id = conn.execute("SELECT id FROM users WHERE login_id='qp_user'").fetchone()[0]
+    cust_id = conn.execute("INSERT INTO customers (name, status) VALUES ('索引テスト顧客', 'approved')").lastrowid
+    pending_id = conn.execute("INSERT INTO customers (name, status, requested_by_user_id) VALUES ('承認待ち', 'pending', ?)",
+                              (user_id,)).lastrowid
+    conn.execute("INSERT INTO products (name, unit_price, cost) VALUES ('商品A', 1000, 600)")
+    q_id = conn.execute(
+        "INSERT INTO quotations (company_name, project_name, customer_id, revision_no, discount_rate, created_at, updated_at) "
+        "VALUES ('索引テスト顧客', '案件', ?, 0, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)", (cust_id,)
+    ).lastrowid
+    conn.execute("UPDATE quotations SET original_id = id WHERE id = ?", (q_id,))
+    rev_id = conn.execute(
+        "INSERT INTO quotations (company_name, project_name, customer_id, original_id, revision_no, discount_rate, created_at, updated_at) "
+        "VALUES ('索引テスト顧客', '案件', ?, ?, 1, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)", (cust_id, q_id)
+    ).lastrowid
+    conn.execute("UPDATE quotations SET latest_revision_id = ?, revision_count = 2 WHERE id = ?", (rev_id, q_id))
+    conn.execute("INSERT INTO quotation_details (quotation_id, description, quantity, price, subtotal) "
+                 "VALUES (?, '明細', 1, 1000, 1000)", (q_id,))
+    conn.execute("INSERT INTO customer_approval_log (customer_id, user_id, approved_by, approved_at) "
+                 "VALUES (?, ?, ?, CURRENT_TIMESTAMP)", (cust_id, user_id, admin_id))
+    conn.commit()
+    conn.close()
+    return {"admin": admin_id, "user": user_id, "customer": cust_id, "pending": pending_id, "quotation": q_id}
+
+
+def route_cases(ids):
+    """(名前, ユーザーid, メソッド, URL, フォーム)"""
+    from app.routes.quotation import encode_list_cursor
+
+    cursor = encode_list_cursor("9999-12-31 00:00:00", 2 ** 31)
+    return [
+        ("quotation_list", ids["admin"], "GET", "/quotations", None),
+        ("quotation_list(next page)", ids["admin"], "GET", f"/quotations?page_size=10&cursor={cursor}", None),
+        ("quotation_list(filtered)", ids["admin"], "GET",
+         "/quotations?estimator=x&project=y&date_from=2020-01-01&date_to=2030-12-31", None),
+        ("quotation_search", ids["admin"], "GET", "/quotations/search?q=索引テスト案件", None),
+        ("quotation_search(short term, filtered)", ids["admin"], "GET",
+         f"/quotations/search?q=索引&customer_id={ids['customer']}&date_from=2020-01-01&cursor={cursor}", None),
+        ("quotation_view", ids["admin"], "GET", f"/quotation/{ids['quotation']}/view", None),
+        ("quotation_revise", ids["admin"], "GET", f"/quotations/{ids['quotation']}/revise", None),
+        ("quotation_new(GET)", ids["admin"], "GET", "/quotation/new", None),
+        ("quotation_form_master", ids["admin"], "GET", "/quotation/form-master", None),
+        ("quotation_pricing_rules", ids["admin"], "GET", "/quotation/pricing-rules.js", None),
+        ("quotation_pricing_grid", ids["admin"], "GET",
+         "/quotation/pricing-grid?vehicle_count=3,5,8&distance_m=200-800:100", None),
+        ("quotation_layout_params", ids["admin"], "POST", "/quotation/layout-params",
+         {"layout": (io.BytesIO(b"from,to,length\nA,B,10\nB,C,20\nB,D,5\n"), "layout.csv"), "vehicle_count": "2"}),
+        ("logic_config_list", ids["admin"], "GET", "/logic-configs", None),
+        ("customer_list(admin)", ids["admin"], "GET", "/customers", None),
+        ("customer_list(user)", ids["user"], "GET", "/customers", None),
+        ("customer_list(search)", ids["user"], "GET", "/customers?q=索引テスト", None),
+        ("customer_typeahead", ids["admin"], "GET", "/customers/typeahead?q=索引", None),
+        ("customer_edit", ids["admin"], "GET", f"/customers/{ids['customer']}/edit", None),
+        ("customer_approval_history", ids["admin"], "GET", f"/customers/{ids['customer']}/approval-history", None),
+        # 見積で使用中のため削除されず、使用中チェックの SQL だけが走る
+        ("customer_delete", ids["admin"], "POST", f"/customers/{ids['customer']}/delete", {}),
+        ("customer_reject", ids["admin"], "POST", f"/customers/{ids['pending']}/reject", {"comment": "x"}),
+        ("product_list", ids["admin"], "GET", "/products", None),
+        ("login", None, "POST", "/login", {"login_id": "admin", "password": "wrong"}),
+    ]
+
+
+def run(fx) -> int:
+    from sqlalchemy import event
+    from app import db
+
+    app, db_path = fx.app, fx.db_path
+    ids = seed(db_path)
+
+    captured = []
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            captured.append((statement, parameters))
+
+    plan_conn = sqlite3.connect(db_path, timeout=30)
+    tables = {r[0] for r in plan_conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+    failures = []
+    checked = 0
+    for name, user_id, method, url, form in route_cases(ids):
+        client = app.test_client()
+        if user_id:
+            with client.session_transaction() as sess:
+                sess["user_id"] = user_id
+        captured.clear()
+        resp = client.open(url, method=method, data=form)
+        if resp.status_code >= 400:
+            failures.append(f"{name}: status={resp.status_code}")
+            continue
+        for statement, params in list(captured):
+            if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+            try:
+                plan = [r[3] for r in plan_conn.execute(f"EXPLAIN QUERY PLAN {statement}", params or ())]
+            except sqlite3.Error as e:
+                failures.append(f"{name}: EXPLAIN failed ({e}): {statement}")
+                continue
+            checked += 1
+            for detail in plan:
+                m = _SCAN_RE.match(detail)
+                if not m or m.group(1) not in tables or " USING " in detail or _FTS_MATCH_RE.search(detail):
+                    continue
+                if (name, m.group(1)) in FULL_SCAN_ALLOWED:
+                    continue
+                failures.append(f"{name}: {detail}\n        {' '.join(statement.split())}")
+    plan_conn.close()
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    if failures:
+        return 1
+    print(f"[OK] {checked} statements across {len(route_cases(ids))} routes use indexes")
+    return 0
+
+
+def main() -> int:
+    # 書き込みも同じスレッドで実行させ、文をルートごとに確実に収集する
+    with temp_app("scart_qp_", WRITE_QUEUE_ENABLED="0") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
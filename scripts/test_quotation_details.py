@@ -0,0 +1,95 @@
+"""
+見積明細の一括書き込み（app/services/quotation_details.py）のテスト。
+
+- insert_detail_lines() が全行を1回の executemany で書き込み、採番 id を行順で返すこと
+- POST /quotation/new の新規保存・改定保存（revise_source_id）で明細が全行保存されること
+"""
+import os
+import sqlite3
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+LINES = 300
+
+
+def run(fx) -> int:
+    from sqlalchemy import event
+    from app import db
+    from app.services.quotation_details import insert_detail_lines
+
+    app, db_path = fx.app, fx.db_path
+    failures = []
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    cust_id = conn.execute("INSERT INTO customers (name, status) VALUES ('明細顧客', 'approved')").lastrowid
+    q_id = conn.execute(
+        "INSERT INTO quotations (company_name, project_name, revision_no, discount_rate, created_at, updated_at) "
+        "VALUES ('明細顧客', '直接', 0, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)").lastrowid
+    conn.commit()
+    conn.close()
+
+    # 1) 一括 INSERT と id の順序
+    lines = [{"quantity": 1, "price": i, "subtotal": i, "description": f"行{i}"} for i in range(LINES)]
+    inserts = []
+    with app.app_context():
+        engine = db.engine
+
+        def count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("INSERT INTO QUOTATION_DETAILS"):
+                inserts.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count_inserts)
+        ids = insert_detail_lines(q_id, lines)
+        db.session.commit()
+        event.remove(engine, "before_cursor_execute", count_inserts)
+    conn = sqlite3.connect(db_path, timeout=30)
+    stored = dict(conn.execute("SELECT id, description FROM quotation_details WHERE quotation_id=?", (q_id,)).fetchall())
+    conn.close()
+    if len(ids) != LINES or [stored.get(i) for i in ids] != [l["description"] for l in lines] or len(inserts) != 1:
+        failures.append(f"insert_detail_lines: ids={len(ids)} stored={len(stored)} statements={len(inserts)}")
+    else:
+        print(f"[OK] insert_detail_lines: {LINES} lines in 1 statement, ids in input order")
+
+    # 2) 新規保存・改定保存
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+
+    def form(count, **extra):
+        return {
+            "company_name": "x", "project_name": "一括保存", "customer_id": str(cust_id),
+            "product_id[]": [""] * count, "code[]": ["C"] * count, "description[]": [f"明細{i}" for i in range(count)],
+            "unit_price[]": ["10"] * count, "quantity[]": ["3"] * count, "subtotal[]": [""] * count, **extra,
+        }
+
+    resp = client.post("/quotation/new", data=form(120))
+    new_id = int(resp.headers["Location"].rstrip("/view").rsplit("/", 1)[-1]) if resp.status_code == 302 else None
+    resp = client.post("/quotation/new", data=form(80, revise_source_id=str(new_id))) if new_id else None
+    conn = sqlite3.connect(db_path, timeout=30)
+    rows = conn.execute(
+        "SELECT q.revision_no, COUNT(d.id), q.subtotal_amount FROM quotations q "
+        "JOIN quotation_details d ON d.quotation_id = q.id WHERE q.original_id = ? GROUP BY q.id ORDER BY q.revision_no",
+        (new_id,)).fetchall()
+    conn.close()
+    if rows != [(0, 120, 3600.0), (1, 80, 2400.0)]:
+        failures.append(f"save/revise: {rows}")
+    else:
+        print("[OK] new and revised quotations store all detail lines")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_qd_") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+見積の全文検索（GET /quotations/search、app/quotation_search.py）のテスト。
+
+- 明細の説明文・備考・ヘッダ列がヒットし、一致箇所が <mark> 付きのスニペットで（HTML エスケープして）出る
+- 語（部分一致・AND）/ "フレーズ" / 語*（列・行の先頭）/ 2文字の語、全角半角・大文字小文字の揺れ
+- customer_id・作成日での絞り込み、キーセットページング
+- 保存（新規・改定）と削除で索引が更新され、reindex-quotations で作り直せる
+"""
+import os
+import re
+import sqlite3
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+_RESULT_RE = re.compile(r">(\d+)-R(\d+)</a>")
+
+
+def run(fx) -> int:
+    from app.quotation_search import SearchTerm, parse_search_query
+
+    app, db_path = fx.app, fx.db_path
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    check("query parser: words / phrase / prefix / width",
+          parse_search_query('ＬＥＤ "倉庫 照明" 駐車*') == [
+              SearchTerm("LED", "word"), SearchTerm("倉庫 照明", "phrase"), SearchTerm("駐車", "prefix")],
+          parse_search_query('ＬＥＤ "倉庫 照明" 駐車*'))
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    cust_a = conn.execute("INSERT INTO customers (name, status) VALUES ('山田商事', 'approved')").lastrowid
+    cust_b = conn.execute("INSERT INTO customers (name, status) VALUES ('佐藤工務店', 'approved')").lastrowid
+    conn.commit()
+    conn.close()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+
+    def save(customer_id, project, remarks, descriptions, revise_source_id=None):
+        form = {
+            "company_name": "x", "project_name": project, "remarks": remarks, "customer_id": str(customer_id),
+            "product_id[]": [""] * len(descriptions), "code[]": [""] * len(descriptions),
+            "description[]": descriptions, "unit_price[]": ["100"] * len(descriptions),
+            "quantity[]": ["1"] * len(descriptions), "subtotal[]": [""] * len(descriptions),
+        }
+        if revise_source_id:
+            form["revise_source_id"] = str(revise_source_id)
+        resp = client.post("/quotation/new", data=form)
+        if resp.status_code != 302:
+            failures.append(f"save {project}: status={resp.status_code}")
+        conn = sqlite3.connect(db_path, timeout=30)
+        q_id = conn.execute("SELECT MAX(id) FROM quotations").fetchone()[0]
+        conn.close()
+        return q_id
+
+    q1 = save(cust_a, "東京都港区 倉庫照明更新工事", "夜間作業\n駐車場あり", ["LED投光器 200W", "ケーブル敷設"])
+    q2 = save(cust_b, "大阪工場 配線工事", "", ["ＬＥＤ照明器具", "分電盤改修"])
+    q3 = save(cust_a, "倉庫照明 点検", "<script>alert(1)</script>テスト備考", ["点検作業"])
+
+    def search(q, **params):
+        resp = client.get("/quotations/search", query_string={"q": q, **params})
+        html = resp.get_data(as_text=True)
+        return [f"{o}-R{r}" for o, r in _RESULT_RE.findall(html)], html
+
+    def ids(q, **params):
+        return search(q, **params)[0]
+
+    r1, r2, r3 = f"{q1}-R0", f"{q2}-R0", f"{q3}-R0"
+
+    # 1) ヒットとスニペット
+    found, html = search("投光器")
+    check("detail description hit with highlighted snippet",
+          found == [r1] and "明細:" in html and "<mark>投光器</mark>" in html, found)
+    check("width / case folding (ＬＥＤ, led)", ids("led") == [r2, r1] and ids("ＬＥＤ") == [r2, r1], ids("led"))
+    found, html = search("テスト備考")
+    check("snippet is HTML-escaped", found == [r3] and "&lt;script&gt;" in html and "<script>alert" not in html,
+          found)
+
+    # 2) 語・フレーズ・前方一致・短い語
+    check("words are ANDed", ids("倉庫 照明") == [r3, r1] and ids("倉庫 投光器") == [r1], ids("倉庫 照明"))
+    check("phrase", ids('"照明更新"') == [r1] and ids('"倉庫 照明"') == [], ids('"倉庫 照明"'))
+    check("prefix at column start", ids("倉庫*") == [r3], ids("倉庫*"))
+    check("prefix at line start (remarks / details)", ids("駐車*") == [r1] and ids("ケーブル*") == [r1],
+          ids("ケーブル*"))
+    check("2-char term", ids("港区") == [r1] and ids("工事") == [r2, r1], ids("工事"))
+
+    # 3) 絞り込み・ページング
+    check("customer filter", ids("工事", customer_id=cust_b) == [r2], ids("工事", customer_id=cust_b))
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("UPDATE quotations SET created_at = '2020-01-15 10:00:00' WHERE id = ?", (q2,))
+    conn.commit()
+    conn.close()
+    check("date filter", ids("工事", date_to="2020-12-31") == [r2] and ids("工事", date_from="2021-01-01") == [r1],
+          ids("工事", date_to="2020-12-31"))
+    pages = []
+    cursor = ""
+    for _ in range(5):
+        resp = client.get("/quotations/search", query_string={"q": "照明", "page_size": 1, "cursor": cursor})
+        html = resp.get_data(as_text=True)
+        pages.append([f"{o}-R{r}" for o, r in _RESULT_RE.findall(html)])
+        m = re.search(r'cursor=([\w-]+)', html)
+        if not m:
+            break
+        cursor = m.group(1)
+    check("keyset pagination", pages == [[r3], [r1], [r2]], pages)
+
+    # 4) 改定・削除で更新
+    save(cust_a, "東京都港区 倉庫照明更新工事（第2期）", "", ["LED投光器 200W"], revise_source_id=q1)
+    check("revision is indexed", ids("第2期") == [f"{q1}-R1"], ids("第2期"))
+    client.post(f"/quotation/{q2}/delete")
+    conn = sqlite3.connect(db_path, timeout=30)
+    left = conn.execute("SELECT COUNT(*) FROM quotations_fts WHERE rowid = ?", (q2,)).fetchone()[0]
+    conn.close()
+    check("delete removes the row", ids("分電盤") == [] and left == 0, f"rows left={left}")
+
+    # 5) CLI での作り直し
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("INSERT INTO quotation_details (quotation_id, description, quantity, price, subtotal) "
+                 "VALUES (?, '直書き明細', 1, 0, 0)", (q3,))
+    conn.commit()
+    conn.close()
+    missing = ids("直書き明細") == []
+    result = app.test_cli_runner().invoke(args=["scart", "reindex-quotations"])
+    found, html = search("直書き明細")
+    check("reindex-quotations picks up direct writes (details in id order)",
+          missing and result.exit_code == 0 and found == [r3] and "点検作業 / <mark>直書き明細</mark>" in html,
+          f"missing_before={missing} exit={result.exit_code} output={result.output!r} found={found}")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_qs_") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+見積の金額集計列（app/services/quotation_totals.py）のテスト。
+
+- POST /quotation/new で保存した見積に小計・値引額・合計・原価・粗利が保存されること
+  （商品原価 × 数量 + 設計費・現地セットアップ費の原価）
+- 見積書画面が保存済みの集計値を表示すること
+- v5 マイグレーションのバックフィル（SQL）が compute_totals と同じ値になること
+  （内訳を保存していない見積の走行条件の明細は、保存時と同じく設計/セットアップ原価込み）
+- v10 が以前の v5（商品原価のみ）で入った原価・粗利を直し、内訳を保存した見積には触れないこと
+"""
+import os
+import sqlite3
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+COLUMNS = ("subtotal_amount", "discount_amount", "total_amount",
+           "cost_amount", "gross_margin_amount", "gross_margin_rate")
+
+
+def run(fx) -> int:
+    from app.cost_utils import calc_design_and_setup_amounts
+    from app.migrations import MigrationContext, _m0005_quotation_totals, _m0010_legacy_design_setup_cost
+    from app.services.quotation_totals import compute_totals
+
+    app, db_path = fx.app, fx.db_path
+    failures = []
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    cust_id = conn.execute("INSERT INTO customers (name, status) VALUES ('集計顧客', 'approved')").lastrowid
+    prod_a = conn.execute("INSERT INTO products (name, unit_price, cost) VALUES ('商品A', 1000, 600)").lastrowid
+    prod_b = conn.execute("INSERT INTO products (name, unit_price, cost) VALUES ('商品B', 333, 123.5)").lastrowid
+    conn.commit()
+    conn.close()
+
+    # 1) 保存時の集計
+    params = {"distance_m": "120", "intersection_count": "3", "station_count": "2", "vehicle_count": "1",
+              "equipment_count": "0", "circuit_difficulty": "1"}
+    form = {
+        "company_name": "x",
+        "project_name": "集計",
+        "customer_id": str(cust_id),
+        "discount_rate": "3.3",
+        "product_id[]": [str(prod_a), str(prod_b)],
+        "code[]": ["A", "B"],
+        "description[]": ["商品A", "商品B"],
+        "unit_price[]": ["1000", "333"],
+        "quantity[]": ["2", "3"],
+        "subtotal[]": ["", ""],
+        **params,
+    }
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+    resp = client.post("/quotation/new", data=form)
+    if resp.status_code != 302:
+        failures.append(f"save: status={resp.status_code}")
+    else:
+        conn = sqlite3.connect(db_path, timeout=30)
+        q_id = conn.execute("SELECT MAX(id) FROM quotations").fetchone()[0]
+        got = dict(zip(COLUMNS, conn.execute(f"SELECT {', '.join(COLUMNS)} FROM quotations WHERE id=?", (q_id,)).fetchone()))
+        subtotal = conn.execute("SELECT SUM(subtotal) FROM quotation_details WHERE quotation_id=?", (q_id,)).fetchone()[0]
+        conn.close()
+        design_fee, design_cost, _, setup_fee, setup_cost, _ = calc_design_and_setup_amounts({
+            "distance_m": 120.0, "intersection_count": 3, "station_count": 2, "vehicle_count": 1,
+            "equipment_count": 0, "circuit_difficulty": 1,
+        })
+        extra = (design_cost if design_fee > 0 else 0) + (setup_cost if setup_fee > 0 else 0)
+        expected = compute_totals(subtotal, 3.3, 600 * 2 + 123.5 * 3 + extra)
+        if got != expected:
+            failures.append(f"save: stored={got} expected={expected}")
+        else:
+            print(f"[OK] save: total={got['total_amount']:,.0f} cost={got['cost_amount']:,.1f} "
+                  f"margin={got['gross_margin_rate']:.1f}%")
+
+        # 2) 見積書画面は集計列を表示する
+        html = client.get(f"/quotation/{q_id}/view").get_data(as_text=True)
+        shown = [f"{got[k]:,.0f}" for k in ("subtotal_amount", "discount_amount", "total_amount")]
+        if not all(s in html for s in shown):
+            failures.append(f"view: amounts {shown} not rendered")
+        else:
+            print("[OK] view renders stored subtotal/discount/total")
+
+    # 3) v5 バックフィルと compute_totals の一致（小数の値引率・原価なし・明細なしを含む）
+    conn = sqlite3.connect(db_path, timeout=30)
+    # 走行条件の明細（120m・交差点3・ステーション2・1台）: 設計 11h 165,000円、セットアップ 38h 570,000円
+    design_line = (None, 1, 165000, "設計費（パラメータ）")
+    setup_line = (None, 1, 570000, "現地セットアップ（パラメータ）")
+    cases = [(0, [(prod_a, 1, 1000, None)]), (7.5, [(prod_a, 3, 1000, None), (None, 1, 12345, None)]),
+             (12.34, [(prod_b, 7, 333, None)]), (50, []), (100, [(prod_b, 1.5, 499.5, None)]),
+             (5, [(prod_a, 2, 1000, None), design_line, setup_line]), (0, [setup_line])]
+    ids = []
+    for rate, lines in cases:
+        q_id = conn.execute(
+            "INSERT INTO quotations (company_name, project_name, revision_no, discount_rate, created_at, updated_at) "
+            "VALUES ('集計顧客', 'バックフィル', 0, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)", (rate,)).lastrowid
+        for product_id, qty, price, label in lines:
+            conn.execute("INSERT INTO quotation_details (quotation_id, product_id, quantity, price, subtotal, label) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (q_id, product_id, qty, price, qty * price, label))
+        ids.append((q_id, rate, lines))
+    costs = {prod_a: 600, prod_b: 123.5, None: 0}
+    # 保存時と同じ原価（設計 11h・セットアップ 38h × 7,920円）
+    line_costs = {"設計費（パラメータ）": 87120, "現地セットアップ（パラメータ）": 300960, None: 0}
+
+    def expected_totals(rate, lines):
+        return compute_totals(sum(q * p for _, q, p, _ in lines), rate,
+                              sum(costs[pid] * q + line_costs[label] for pid, q, _, label in lines))
+
+    def stored(q_id):
+        return dict(zip(COLUMNS, conn.execute(f"SELECT {', '.join(COLUMNS)} FROM quotations WHERE id=?",
+                                              (q_id,)).fetchone()))
+
+    _m0005_quotation_totals(MigrationContext(conn))
+    for q_id, rate, lines in ids:
+        got, expected = stored(q_id), expected_totals(rate, lines)
+        if got != expected:
+            failures.append(f"backfill id={q_id}: {got} != {expected}")
+    if not any(f.startswith("backfill") for f in failures):
+        print(f"[OK] v5 backfill matches compute_totals for {len(ids)} quotations (incl. design/setup lines)")
+
+    # 4) v10: 以前の v5（商品原価のみ）で入った値を直す。内訳を保存した見積（1 の保存分）は変えない
+    saved = conn.execute("SELECT id FROM quotations WHERE design_cost IS NOT NULL").fetchone()[0]
+    saved_before = stored(saved)
+    conn.execute("""
+        UPDATE quotations SET cost_amount = (SELECT COALESCE(SUM(p.cost * d.quantity), 0) FROM quotation_details d
+                                             JOIN products p ON p.id = d.product_id
+                                             WHERE d.quotation_id = quotations.id)
+    """)
+    conn.execute("UPDATE quotations SET gross_margin_amount = total_amount - cost_amount")
+    conn.execute("UPDATE quotations SET cost_amount = ? WHERE id = ?", (saved_before["cost_amount"], saved))
+    conn.execute("UPDATE quotations SET gross_margin_amount = ? WHERE id = ?",
+                 (saved_before["gross_margin_amount"], saved))
+    _m0010_legacy_design_setup_cost(MigrationContext(conn))
+    wrong = [(q_id, stored(q_id)) for q_id, rate, lines in ids if stored(q_id) != expected_totals(rate, lines)]
+    if wrong or stored(saved) != saved_before:
+        failures.append(f"v10: {wrong} saved={stored(saved)} before={saved_before}")
+    else:
+        print("[OK] v10 restores design/setup cost on legacy totals and keeps stored breakdowns")
+    conn.close()
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_qt_", WRITE_QUEUE_ENABLED="0") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
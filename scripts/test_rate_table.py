@@ -0,0 +1,222 @@
+"""
+単価表（logic_configs の最新版、app/rate_table.py）と計算ロジック管理画面（/logic-configs）のテスト。
+
+- 行が無いときは既定値の単価表 "v6" で、定数時代と同じ値を返すこと
+- 管理者が新しい版を登録すると次の計算から使われ、以後の見積に版が記録され、既存の見積は変わらないこと
+- 版が変わらない間の参照は DB を読まない（再読み込み回数が増えず、SQL も発行しない）こと
+- 人数の段階を変えた単価表でも一括計算（calc_design_setup_batch）がスカラー版と一致すること
+- 不正な入力は登録されず、管理者以外は 403 になること
+- v9 マイグレーションが既存の行を保ったまま列を追加し、再実行しても壊れないこと
+"""
+import dataclasses
+import os
+import random
+import sqlite3
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+STEADY_STATE_CALLS = 10000
+
+
+def run(fx) -> int:
+    import numpy as np
+    from sqlalchemy import event
+
+    from app import cost_utils, db
+    from app.cost_utils import DEFAULT_RATE_TABLE, RATE_TABLE_VERSION, WorkerTier
+    from app.migrations import MigrationContext, _m0009_logic_config_rates
+    from app.rate_table import rate_table_from_row
+
+    tmp = fx.tmp
+    app, db_path = fx.app, fx.db_path
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    params = {"distance_m": 120.0, "intersection_count": 3, "station_count": 2, "vehicle_count": 4}
+    cache = app.extensions["scart_rate_table"]
+
+    # 1) 行が無いときは既定値（定数時代の値）
+    with app.app_context():
+        default = cost_utils.calc_design_setup_breakdown(params)
+    check("no logic_configs rows: default table v6",
+          cache.get() is DEFAULT_RATE_TABLE and default["rate_table_version"] == RATE_TABLE_VERSION
+          and default["design_fee"] == default["design_hours"] * cost_utils.DESIGN_SELL_RATE
+          and default["setup_cost"] == default["setup_hours"] * cost_utils.LABOR_RATE,
+          default)
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    conn.execute("INSERT INTO users (login_id, display_name, password_hash, role, is_active, created_at) "
+                 "VALUES ('rt_user', '一般', 'x', 'user', 1, CURRENT_TIMESTAMP)")
+    user_id = conn.execute("SELECT id FROM users WHERE login_id='rt_user'").fetchone()[0]
+    cust_id = conn.execute("INSERT INTO customers (name, status) VALUES ('単価顧客', 'approved')").lastrowid
+    conn.commit()
+    conn.close()
+
+    admin = app.test_client()
+    with admin.session_transaction() as sess:
+        sess["user_id"] = admin_id
+    user = app.test_client()
+    with user.session_transaction() as sess:
+        sess["user_id"] = user_id
+
+    def save(project):
+        form = {
+            "company_name": "x", "project_name": project, "customer_id": str(cust_id),
+            "product_id[]": [""], "code[]": [""], "description[]": ["作業"], "unit_price[]": ["1000"],
+            "quantity[]": ["1"], "subtotal[]": [""],
+            **{k: str(v) for k, v in params.items()},
+        }
+        resp = admin.post("/quotation/new", data=form)
+        if resp.status_code != 302:
+            failures.append(f"save {project}: status={resp.status_code}")
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM quotations WHERE id = (SELECT MAX(id) FROM quotations)").fetchone()
+        conn.close()
+        return row
+
+    def config_count():
+        conn = sqlite3.connect(db_path, timeout=30)
+        count = conn.execute("SELECT COUNT(*) FROM logic_configs").fetchone()[0]
+        conn.close()
+        return count
+
+    before = save("旧単価")
+
+    # 2) 権限・不正な入力
+    form = admin.get("/logic-configs")
+    check("admin sees the logic config screen; other roles get 403",
+          form.status_code == 200 and "v6" in form.get_data(as_text=True)
+          and user.get("/logic-configs").status_code == 403
+          and user.post("/logic-configs", data={}).status_code == 403,
+          f"admin={form.status_code}")
+
+    new_tiers = ('[{"min_vehicles": null, "max_vehicles": 2, "max_distance": 1000, "workers": 1},'
+                 ' {"min_vehicles": 3, "max_vehicles": 6, "max_distance": 500, "workers": 2.5}]')
+    values = {
+        "labor_rate": "8,000", "design_rate": "16000", "setup_rate": "17000",
+        "design_intersection_hours": "2.5", "design_station_hours": "1", "design_meters_per_hour": "80",
+        "design_safety_factor": "1.2", "setup_speed_m_per_min": "30", "setup_station_ct_min": "0.1",
+        "trial_runs_per_vehicle": "8", "bug_fix_hours_per_trial": "1", "interlock_hours": "0.1",
+        "setup_safety_factor": "1.1", "default_workers": "4", "worker_tiers": new_tiers, "note": "2026年度改定",
+    }
+    rejected = [
+        admin.post("/logic-configs", data={**values, "labor_rate": "abc"}),
+        admin.post("/logic-configs", data={**values, "design_rate": "0"}),
+        admin.post("/logic-configs", data={**values, "interlock_hours": "-1"}),
+        admin.post("/logic-configs", data={**values, "worker_tiers": '[{"workers": 1}]'}),
+    ]
+    check("invalid input is rejected without adding a version",
+          all(r.status_code == 200 and "alert-danger" in r.get_data(as_text=True) for r in rejected)
+          and config_count() == 0,
+          [r.status_code for r in rejected])
+
+    # 3) 新しい版の登録と即時反映
+    resp = admin.post("/logic-configs", data=values)
+    reloads = cache.stats()["reloads"]
+    expected_table = dataclasses.replace(
+        DEFAULT_RATE_TABLE, version="logic_configs:1", labor_rate=8000, design_sell_rate=16000, setup_sell_rate=17000,
+        design_intersection_hours=2.5, design_meters_per_hour=80.0, design_safety_factor=1.2,
+        trial_runs_per_vehicle=8.0, default_workers=4.0,
+        worker_tiers=(WorkerTier(None, 2.0, 1000.0, 1.0), WorkerTier(3.0, 6.0, 500.0, 2.5)),
+    )
+    with app.app_context():
+        active = cost_utils.current_rate_table()
+        changed = cost_utils.calc_design_setup_breakdown(params)
+    check("new version is active on the next calculation",
+          resp.status_code == 302 and config_count() == 1 and active == expected_table
+          and cache.stats()["reloads"] == reloads + 1
+          and changed == cost_utils.calc_design_setup_breakdown(params, expected_table)
+          and changed["rate_table_version"] == "logic_configs:1" and changed != default,
+          f"status={resp.status_code} active={active}")
+
+    after = save("新単価")
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    old = conn.execute("SELECT * FROM quotations WHERE id = ?", (before["id"],)).fetchone()
+    conn.close()
+    check("later quotations record the new version; earlier ones keep theirs",
+          after["rate_table_version"] == "logic_configs:1" and after["design_fee"] == changed["design_fee"]
+          and after["setup_cost"] == changed["setup_cost"]
+          and old["rate_table_version"] == RATE_TABLE_VERSION and old["design_fee"] == default["design_fee"],
+          {"after": (after["rate_table_version"], after["design_fee"]),
+           "old": (old["rate_table_version"], old["design_fee"])})
+
+    # 4) 定常状態の参照は版数の比較だけ（再読み込み・SQL なし）
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, "before_cursor_execute", _count)
+        try:
+            stats = cache.stats()
+            for _ in range(STEADY_STATE_CALLS):
+                cost_utils.calc_design_setup_breakdown(params)
+        finally:
+            event.remove(engine, "before_cursor_execute", _count)
+    now = cache.stats()
+    check(f"steady state: {STEADY_STATE_CALLS} calculations without reloading",
+          now["reloads"] == stats["reloads"] and now["hits"] >= stats["hits"] + STEADY_STATE_CALLS
+          and not statements and now["version"] == "logic_configs:1",
+          {"stats": now, "sql": len(statements)})
+
+    cache.invalidate()
+    check("invalidate() forces one reload", cache.get() == expected_table
+          and cache.stats()["reloads"] == now["reloads"] + 1, cache.stats())
+
+    # 5) 人数の段階を変えた単価表でも一括計算とスカラー版が一致
+    rng = random.Random(22)
+    sets = [{"vehicle_count": rng.randint(0, 9), "distance_m": rng.choice([0, 40, 120, 480, 950, 1500]),
+             "intersection_count": rng.randint(0, 6), "station_count": rng.randint(0, 8)} for _ in range(2000)]
+    batch = cost_utils.calc_design_setup_batch(
+        {k: np.array([s[k] for s in sets], dtype=np.float64) for k in sets[0]}, expected_table)
+    mismatched = []
+    for i, s in enumerate(sets):
+        scalar = cost_utils.calc_design_setup_breakdown(s, expected_table)
+        for key in cost_utils.DESIGN_SETUP_KEYS:
+            if batch[key][i] != scalar[key]:
+                mismatched.append((s, key, batch[key][i], scalar[key]))
+    check("custom worker tiers: batch matches scalar", not mismatched
+          and batch["rate_table_version"] == "logic_configs:1", mismatched[:3])
+
+    # 6) v9 マイグレーション（旧 logic_configs の行を保ち、再実行で変化なし）
+    legacy = sqlite3.connect(os.path.join(tmp, "legacy.db"))
+    legacy.row_factory = sqlite3.Row
+    legacy.execute("CREATE TABLE logic_configs (id INTEGER PRIMARY KEY, design_rate FLOAT NOT NULL, "
+                   "setup_rate FLOAT NOT NULL, created_at DATETIME)")
+    legacy.execute("INSERT INTO logic_configs (design_rate, setup_rate) VALUES (18000, 15000)")
+    _m0009_logic_config_rates(MigrationContext(legacy))
+    _m0009_logic_config_rates(MigrationContext(legacy))
+    cols = [r[1] for r in legacy.execute("PRAGMA table_info(logic_configs)")]
+    migrated = rate_table_from_row(dict(legacy.execute("SELECT * FROM logic_configs").fetchone()))
+    legacy.close()
+    check("v9 migration keeps old rows and fills defaults idempotently",
+          len(cols) == len(set(cols))
+          and migrated == dataclasses.replace(DEFAULT_RATE_TABLE, version="logic_configs:1", design_sell_rate=18000),
+          migrated)
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_rt_", WRITE_QUEUE_ENABLED="0") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
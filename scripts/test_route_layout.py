@@ -0,0 +1,237 @@
+"""
+AGV 走行レイアウトの取り込み（app/route_layout.py）のテスト。
+
+- 小さなレイアウトで 走行距離・交差点数（次数 3 以上）・ステーション数・隣接（CSR）が手計算と一致すること
+  （往復で書き出したエッジは1本。長さの無いエッジは座標の距離）
+- CSV（エッジ + ノード）・JSON・JSON Lines で同じ結果になること
+- 不正なファイル（列が無い・数値でない・長さも座標も無い・負の長さ・inf などの有限でない長さや座標・未対応の拡張子）は
+  行番号（または例のエッジ）付きの LayoutError
+- 走行条件が calc_design_and_setup_amounts にそのまま渡ること
+- POST /quotation/layout-params（200 / 400 / 413 / 未ログイン）と flask scart layout-params
+  （413 は Content-Length の無いチャンク転送の本文でも、読みながら上限で打ち切って返す）
+- 格子状の大きなレイアウト（約32万エッジ）の読み込み〜費用計算が LAYOUT_BUDGET_MS 以内に終わること
+"""
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.test import stream_encode_multipart
+
+LAYOUT_BUDGET_MS = 1000
+GRID = 400  # GRID × GRID の格子（エッジ 2 × GRID × (GRID - 1) 本）
+
+# A-B-C、B-D、D-E、D-F（C-B は B-C の往復）。交差点は B と D
+EDGES_CSV = "from,to,length\nA,B,10\nB,C,20\nB,D,5\nD,E,7\nD,F,3\nC,B,20\n"
+NODES_CSV = "id,x,y,station,type\nA,0,0,1,\nC,,,0,station\nE,,,0,\n"
+EXPECTED = {"distance_m": 45.0, "intersection_count": 2, "station_count": 2,
+            "nodes": 6, "edges": 5, "duplicate_edges": 1}
+LAYOUT_JSON = {
+    "nodes": [{"id": "A", "x": 0, "y": 0, "station": True}, {"id": "C", "type": "station"}, {"id": "E"}],
+    "edges": [{"source": a, "target": b, "length_m": n} for a, b, n in
+              (("A", "B", 10), ("B", "C", 20), ("B", "D", 5), ("D", "E", 7), ("D", "F", 3), ("C", "B", 20))],
+}
+
+
+def write_grid(tmp, size):
+    """size × size の格子（横 1.5m・縦 2m）。外周の各辺の中点をステーションにする。"""
+    edges_path = os.path.join(tmp, "grid_edges.csv")
+    nodes_path = os.path.join(tmp, "grid_nodes.csv")
+    with open(edges_path, "w", encoding="utf-8", newline="") as f:
+        f.write("from,to,length\n")
+        for y in range(size):
+            f.writelines(f"N{y}_{x},N{y}_{x + 1},1.5\n" for x in range(size - 1))
+            if y + 1 < size:
+                f.writelines(f"N{y}_{x},N{y + 1}_{x},2\n" for x in range(size))
+    mid = size // 2
+    with open(nodes_path, "w", encoding="utf-8", newline="") as f:
+        f.write("id,station\n")
+        for node in (f"N0_{mid}", f"N{size - 1}_{mid}", f"N{mid}_0", f"N{mid}_{size - 1}"):
+            f.write(f"{node},1\n")
+    expected = {
+        "distance_m": size * (size - 1) * 1.5 + (size - 1) * size * 2.0,
+        "intersection_count": size * size - 4,
+        "station_count": 4,
+        "nodes": size * size,
+        "edges": 2 * size * (size - 1),
+        "duplicate_edges": 0,
+    }
+    return edges_path, nodes_path, expected
+
+
+def run(fx) -> int:
+    from app.cost_utils import DEFAULT_RATE_TABLE, calc_design_and_setup_amounts
+    from app.route_layout import LayoutError, load_layout, price_layout, read_layout
+
+    tmp = fx.tmp
+    failures = []
+
+    def check(label, ok, detail=""):
+        if ok:
+            print(f"[OK] {label}")
+        else:
+            failures.append(f"{label}: {detail}")
+
+    # 1) 小さなレイアウト
+    layout = read_layout(io.StringIO(EDGES_CSV), "edges.csv", io.StringIO(NODES_CSV))
+    check("distance, intersections (degree >= 3) and stations of a small layout",
+          layout.summary() == EXPECTED, layout.summary())
+    offsets, neighbors = layout.adjacency()
+    check("CSR adjacency lists each undirected edge at both ends",
+          sorted(layout.neighbors("B")) == ["A", "C", "D"] and sorted(layout.neighbors("D")) == ["B", "E", "F"]
+          and layout.neighbors("F") == ["D"] and len(offsets) == 7 and len(neighbors) == 10,
+          (offsets.tolist(), neighbors.tolist()))
+
+    triangle = read_layout(io.StringIO("from,to,length\nP,Q,\nQ,R,\nR,P,6\n"), "t.csv",
+                           io.StringIO("id,x,y\nP,0,0\nQ,3,0\nR,3,4\n"))
+    check("missing lengths come from node coordinates", triangle.params()["distance_m"] == 13.0, triangle.params())
+
+    # 2) 形式ごとの一致
+    as_json = read_layout(io.BytesIO(json.dumps(LAYOUT_JSON).encode("utf-8")), "layout.json")
+    jsonl = "\n".join(json.dumps(obj) for obj in LAYOUT_JSON["edges"] + LAYOUT_JSON["nodes"]) + "\n"
+    as_jsonl = read_layout(io.BytesIO(("\ufeff" + jsonl).encode("utf-8")), "layout.ndjson")
+    check("CSV, JSON and JSON Lines give the same summary",
+          as_json.summary() == EXPECTED and as_jsonl.summary() == EXPECTED,
+          (as_json.summary(), as_jsonl.summary()))
+
+    # 3) 不正なファイル
+    bad_files = {
+        "missing column": ("from,length\nA,1\n", "e.csv", None, "to"),
+        "bad number": ("from,to,length\nA,B,1\nB,C,x\n", "e.csv", None, "3行目"),
+        "no length and no coordinates": ("from,to\nA,B\n", "e.csv", None, "A → B"),
+        "negative length": ("from,to,length\nA,B,-1\n", "e.csv", None, "負"),
+        "infinite length": ("from,to,length\nA,B,1\nB,C,inf\n", "e.csv", None, "B → C"),
+        "overflowing length": ("from,to,length\nA,B,1e400\n", "e.csv", None, "有限"),
+        "infinite coordinate": ("from,to\nA,B\n", "e.csv", "id,x,y\nA,0,0\nB,1e400,0\n", "有限"),
+        "JSON Infinity": ('{"nodes": [], "edges": [{"from": "A", "to": "B", "length": Infinity}]}', "e.json", None,
+                          "有限"),
+        "total distance overflows": ("from,to,length\nA,B,1e308\nB,C,1e308\n", "e.csv", None, "合計"),
+        "no edges": ("from,to\n", "e.csv", None, "エッジ"),
+        "bad node coordinate": ("from,to\nA,B\n", "e.csv", "id,x,y\nA,0,0\nB,1,y\n", "nodes 3行目"),
+        "JSON Lines edge without to": ('{"from": "A", "to": "B", "length": 1}\n{"from": "B"}\n', "e.jsonl", None,
+                                       "2行目"),
+        "JSON not an object": ("[1, 2]", "e.json", None, "nodes"),
+        "unsupported extension": ("", "e.xlsx", None, ".xlsx"),
+    }
+    accepted = []
+    for label, (text, name, nodes, needle) in bad_files.items():
+        try:
+            read_layout(io.StringIO(text), name, io.StringIO(nodes) if nodes else None)
+            accepted.append(label)
+        except LayoutError as e:
+            if needle not in str(e):
+                accepted.append(f"{label}: {e}")
+    check("invalid layouts raise LayoutError with the location", not accepted, accepted)
+
+    # 4) 費用計算
+    params, amounts = price_layout(layout, 3, DEFAULT_RATE_TABLE)
+    direct = calc_design_and_setup_amounts({"distance_m": 45.0, "intersection_count": 2, "station_count": 2,
+                                            "vehicle_count": 3}, DEFAULT_RATE_TABLE)
+    check("layout parameters feed calc_design_and_setup_amounts",
+          params == {"distance_m": 45.0, "intersection_count": 2, "station_count": 2, "vehicle_count": 3}
+          and tuple(amounts.values()) == direct and amounts["design_fee"] == direct[0] > 0, (params, amounts, direct))
+
+    # 5) API と CLI
+    app, db_path = fx.app, fx.db_path
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    conn.close()
+    client = app.test_client()
+
+    def post(data):
+        return client.post("/quotation/layout-params", data=data, content_type="multipart/form-data")
+
+    anonymous = post({"layout": (io.BytesIO(EDGES_CSV.encode()), "edges.csv")})
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+    resp = post({"layout": (io.BytesIO(EDGES_CSV.encode()), "edges.csv"),
+                 "nodes": (io.BytesIO(NODES_CSV.encode()), "nodes.csv"), "vehicle_count": "3"})
+    body = resp.get_json() or {}
+    check("POST /quotation/layout-params returns parameters and amounts",
+          anonymous.status_code == 302 and resp.status_code == 200 and body.get("layout") == EXPECTED
+          and body.get("params") == params and body.get("amounts") == amounts
+          and body.get("rate_table_version") == DEFAULT_RATE_TABLE.version and "elapsed_ms" in body,
+          f"anonymous={anonymous.status_code} status={resp.status_code} body={body}")
+
+    errors = [
+        post({"layout": (io.BytesIO(b"from,to,length\nA,B,x\n"), "edges.csv")}),
+        post({"vehicle_count": "1"}),
+        post({"layout": (io.BytesIO(EDGES_CSV.encode()), "edges.csv"), "vehicle_count": "many"}),
+        post({"layout": (io.BytesIO(b"from,to,length\nA,B,1\n\xff\n"), "edges.csv")}),
+        post({"layout": (io.BytesIO(b"from,to,length\nA,B,inf\n"), "edges.csv")}),
+        post({"layout": (io.BytesIO(EDGES_CSV.encode()), "edges.csv"), "vehicle_count": "inf"}),
+    ]
+    def post_chunked(data):
+        # Content-Length の無い本文（チャンク転送をサーバーが終端した状態 = wsgi.input_terminated）
+        stream, _, boundary = stream_encode_multipart(
+            {k: FileStorage(f, filename=name) for k, (f, name) in data.items()})
+        return client.post("/quotation/layout-params", input_stream=stream,
+                           content_type=f"multipart/form-data; boundary={boundary}",
+                           headers={"Transfer-Encoding": "chunked"}, environ_overrides={"wsgi.input_terminated": True})
+
+    max_bytes = app.config["LAYOUT_IMPORT_MAX_BYTES"]
+    app.config["LAYOUT_IMPORT_MAX_BYTES"] = 100
+    too_large = post({"layout": (io.BytesIO(EDGES_CSV.encode() * 10), "edges.csv")})
+    chunked_too_large = post_chunked({"layout": (io.BytesIO(EDGES_CSV.encode() * 10), "edges.csv")})
+    app.config["LAYOUT_IMPORT_MAX_BYTES"] = max_bytes
+    chunked = post_chunked({"layout": (io.BytesIO(EDGES_CSV.encode()), "edges.csv")})
+    check("invalid uploads -> 400 with a message; oversized (with or without Content-Length) -> 413",
+          [r.status_code for r in errors] == [400] * 6
+          and all((r.get_json() or {}).get("error") for r in errors)
+          and [r.status_code for r in (too_large, chunked_too_large)] == [413, 413]
+          and (chunked_too_large.get_json() or {}).get("error")
+          and chunked.status_code == 200 and (chunked.get_json() or {}).get("layout", {}).get("edges") == 5,
+          [(r.status_code, r.get_json()) for r in errors + [too_large, chunked_too_large, chunked]])
+
+    edges_path = os.path.join(tmp, "edges.csv")
+    nodes_path = os.path.join(tmp, "nodes.csv")
+    for path, text in ((edges_path, EDGES_CSV), (nodes_path, NODES_CSV)):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    runner = app.test_cli_runner()
+    text = runner.invoke(args=["scart", "layout-params", edges_path, "--nodes", nodes_path, "--vehicles", "3"])
+    as_json = runner.invoke(args=["scart", "layout-params", edges_path, "--nodes", nodes_path, "--vehicles", "3",
+                                  "--json"])
+    bad = runner.invoke(args=["scart", "layout-params", nodes_path])
+    infinite = runner.invoke(args=["scart", "layout-params", edges_path, "--vehicles", "inf"])
+    check("flask scart layout-params prints the same parameters",
+          text.exit_code == 0 and "intersection_count=2" in text.output
+          and f"design_fee={amounts['design_fee']}" in text.output
+          and as_json.exit_code == 0 and json.loads(as_json.output.splitlines()[0])["params"] == params
+          and bad.exit_code != 0 and "列がありません" in bad.output
+          and infinite.exit_code == 2 and "--vehicles" in infinite.output,
+          f"{text.output!r} {as_json.output!r} {bad.output!r} {infinite.output!r}")
+
+    # 6) 大きなレイアウト
+    edges_path, nodes_path, expected = write_grid(tmp, GRID)
+    samples = []
+    summary = None
+    for _ in range(3):
+        t0 = time.perf_counter()
+        grid = load_layout(edges_path, nodes_path)
+        price_layout(grid, 4, DEFAULT_RATE_TABLE)
+        summary = grid.summary()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    best = min(samples)
+    check(f"{expected['edges']} edges imported in {best:.0f}ms (budget {LAYOUT_BUDGET_MS}ms)",
+          summary == expected and best < LAYOUT_BUDGET_MS, f"summary={summary} expected={expected} ms={samples}")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_layout_") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+書き込みキュー（app/write_queue.py）の並行書き込みテスト。
+
+一時ディレクトリに新規 DB を作り、Flask テストクライアントを複数スレッドから同時に使って
+- 見積保存（POST /quotation/new）が "database is locked" なしで全件成功すること
+- 同一顧客への同時承認で承認ログが1件だけ記録されること
+- ログイン監査ログが書き込まれること
+- /admin/metrics に write_queue のメトリクスが出ること
+を確認する。サーバ起動は不要。
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from _app_fixture import temp_app
+
+THREADS = 8
+SAVES_PER_THREAD = 5
+
+
+def run_threads(target, count):
+    errors = []
+
+    def wrapper(idx):
+        try:
+            target(idx)
+        except Exception as e:
+            errors.append(f"thread {idx}: {e!r}")
+
+    threads = [threading.Thread(target=wrapper, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+def run(fx) -> int:
+    app, db_path = fx.app, fx.db_path
+    failures = []
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    admin_id = conn.execute("SELECT id FROM users WHERE login_id='admin'").fetchone()[0]
+    conn.execute("INSERT INTO users (login_id, display_name, password_hash, role, is_active, created_at) "
+                 "VALUES ('wq_user', 'WQ', 'x', 'user', 0, CURRENT_TIMESTAMP)")
+    requester_id = conn.execute("SELECT id FROM users WHERE login_id='wq_user'").fetchone()[0]
+    approved_id = conn.execute("INSERT INTO customers (name, status) VALUES ('承認済顧客', 'approved')").lastrowid
+    pending_id = conn.execute("INSERT INTO customers (name, status, requested_by_user_id) VALUES ('承認待顧客', 'pending', ?)",
+                              (requester_id,)).lastrowid
+    conn.commit()
+    conn.close()
+
+    def admin_client():
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = admin_id
+        return client
+
+    # 1) 並行見積保存
+    form = {
+        "company_name": "x",
+        "project_name": "並行保存",
+        "customer_id": str(approved_id),
+        "product_id[]": [""],
+        "code[]": ["A"],
+        "description[]": ["明細"],
+        "unit_price[]": ["100"],
+        "quantity[]": ["2"],
+        "subtotal[]": [""],
+    }
+
+    def save(idx):
+        client = admin_client()
+        for _ in range(SAVES_PER_THREAD):
+            resp = client.post("/quotation/new", data=form)
+            if resp.status_code != 302:
+                raise RuntimeError(f"status={resp.status_code}")
+
+    errors = run_threads(save, THREADS)
+    conn = sqlite3.connect(db_path, timeout=30)
+    saved = conn.execute("SELECT COUNT(*) FROM quotations WHERE project_name='並行保存'").fetchone()[0]
+    details = conn.execute("SELECT COUNT(*) FROM quotation_details").fetchone()[0]
+    conn.close()
+    expected = THREADS * SAVES_PER_THREAD
+    if errors or saved != expected or details != expected:
+        failures.append(f"concurrent save: saved={saved} details={details} expected={expected} errors={errors[:3]}")
+    else:
+        print(f"[OK] concurrent save: {saved} quotations from {THREADS} threads")
+
+    # 2) 同時承認 → 承認ログ1件
+    def approve(idx):
+        resp = admin_client().post(f"/customers/{pending_id}/approve")
+        if resp.status_code != 302:
+            raise RuntimeError(f"status={resp.status_code}")
+
+    errors = run_threads(approve, 4)
+    conn = sqlite3.connect(db_path, timeout=30)
+    logs = conn.execute("SELECT COUNT(*) FROM customer_approval_log WHERE customer_id=?", (pending_id,)).fetchone()[0]
+    status = conn.execute("SELECT status FROM customers WHERE id=?", (pending_id,)).fetchone()[0]
+    conn.close()
+    if errors or logs != 1 or status != "approved":
+        failures.append(f"concurrent approve: logs={logs} status={status} errors={errors[:3]}")
+    else:
+        print("[OK] concurrent approve: exactly one approval log")
+
+    # 3) ログイン監査ログ（非同期書き込み）
+    app.test_client().post("/login", data={"login_id": "admin", "password": "admin1234"})
+    app.extensions["scart_write_queue"].stop()
+    conn = sqlite3.connect(db_path, timeout=30)
+    login_logs = conn.execute("SELECT COUNT(*) FROM auth_login_log WHERE login_id='admin'").fetchone()[0]
+    conn.close()
+    if login_logs != 1:
+        failures.append(f"login log: count={login_logs}")
+    else:
+        print("[OK] login log written via write queue")
+
+    # 4) メトリクス
+    resp = admin_client().get("/admin/metrics")
+    stats = (resp.get_json() or {}).get("write_queue", {})
+    if resp.status_code != 200 or stats.get("failed") != 0 or stats.get("completed", 0) < expected:
+        failures.append(f"metrics: status={resp.status_code} write_queue={stats}")
+    else:
+        print(f"[OK] metrics: completed={stats['completed']} retries={stats['retries']} "
+              f"max_depth={stats['max_depth']} wait_p95={stats['wait']['p95_ms']}ms")
+
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    with temp_app("scart_wq_") as fx:
+        return run(fx)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,18 @@
+"""
+（旧）quotations.discount_rate 列の追加スクリプト（Flask 経由版）。
+現在は app/migrations.py の番号付き移行（PRAGMA user_version）に統合済み。
+互換のため残しているが、移行ランナーを呼ぶだけ（適用済みなら何もしない）。
 
-# tools/add_discount_rate_column.py
+使い方:
+  python tools/add_discount_rate_column.py [DBパス] [--dry-run]
+"""
 import os
 import sys
-import traceback
 
-# ★ プロジェクトルート（SCART Quotation）を import パスに追加
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.append(BASE_DIR)
+# プロジェクトルートを import パスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import create_app, db
-from sqlalchemy import text
-
-def main():
-    app = create_app()
-    with app.app_context():
-        print("DB Path:", db.engine.url)
-        try:
-            print("ALTER TABLE 実行中...")
-            db.session.execute(
-                text("ALTER TABLE quotations ADD COLUMN discount_rate REAL DEFAULT 0;")
-            )
-            db.session.commit()
-            print("✔ OK: quotations.discount_rate カラムを追加しました。")
-        except Exception as e:
-            db.session.rollback()
-            print("⚠ WARN: カラム追加時に例外が発生（既に追加済みの可能性あり）")
-            traceback.print_exc()
+from app.migrations import cli_main
 
 if __name__ == "__main__":
-    main()
+    sys.exit(cli_main())